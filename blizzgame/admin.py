@@ -8,6 +8,7 @@ from blizzgame.models import (
     Transaction, CinetPayTransaction, Dispute, DisputeMessage, Report, UserWarning, UserBan, Notification,
     PayoutRequest, EscrowTransaction, SellerPaymentInfo
 )
+from blizzgame import ban_status, media_uploads, notification_counters
 
 # Modèles existants
 admin.site.register(Profile)
@@ -23,7 +24,11 @@ class HighlightAdmin(admin.ModelAdmin):
     list_display = ['author', 'caption_preview', 'hashtags_display', 'appreciations_count', 'comments_count', 'views_count', 'created_at', 'expires_at', 'is_active']
     list_filter = ['is_active', 'created_at', 'expires_at']
     search_fields = ['author__username', 'caption', 'hashtags']
-    readonly_fields = ['created_at', 'expires_at', 'views_count']
+    readonly_fields = [
+        'created_at', 'expires_at', 'views_count', 'comments_count',
+        'appreciation_level_1_count', 'appreciation_level_2_count', 'appreciation_level_3_count',
+        'appreciation_level_4_count', 'appreciation_level_5_count', 'appreciation_level_6_count',
+    ]
     list_editable = ['is_active']
     
     def caption_preview(self, obj):
@@ -35,16 +40,8 @@ class HighlightAdmin(admin.ModelAdmin):
     hashtags_display.short_description = 'Hashtags'
     
     def appreciations_count(self, obj):
-        return obj.appreciations.count()
+        return obj.appreciations_count
     appreciations_count.short_description = 'Appréciations'
-    
-    def comments_count(self, obj):
-        return obj.comments.count()
-    comments_count.short_description = 'Commentaires'
-    
-    def views_count(self, obj):
-        return obj.views.count()
-    views_count.short_description = 'Vues'
 
 @admin.register(HighlightAppreciation)
 class HighlightAppreciationAdmin(admin.ModelAdmin):
@@ -125,6 +122,28 @@ class ProductAdmin(admin.ModelAdmin):
         }),
     )
 
+    def save_model(self, request, obj, form, change):
+        # Image principale normalisée (variantes thumb/card/full, media_uploads)
+        if 'featured_image' in form.changed_data:
+            image = form.cleaned_data.get('featured_image')
+            obj.featured_image_url = media_uploads.upload_file(image, 'product_images') if image else None
+        super().save_model(request, obj, form, change)
+
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not ProductImage:
+            return super().save_formset(request, form, formset, change)
+        instances = formset.save(commit=False)
+        changed = [obj for obj, fields in formset.changed_objects if 'image' in fields]
+        uploaded = [obj for obj in formset.new_objects + changed if obj.image]
+        urls = media_uploads.upload_files([(obj.image, 'product_images') for obj in uploaded])
+        for obj, url in zip(uploaded, urls):
+            obj.image_url = url
+        for obj in instances:
+            obj.save()
+        for obj in formset.deleted_objects:
+            obj.delete()
+        formset.save_m2m()
+
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
@@ -399,12 +418,16 @@ class UserBanAdmin(admin.ModelAdmin):
     actions = ['activate_bans', 'deactivate_bans']
     
     def activate_bans(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
         updated = queryset.update(is_active=True)
+        ban_status.invalidate_ban_status(user_ids)
         self.message_user(request, f'{updated} bannissement(s) activé(s).')
     activate_bans.short_description = "Activer les bannissements"
     
     def deactivate_bans(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
         updated = queryset.update(is_active=False)
+        ban_status.invalidate_ban_status(user_ids)
         self.message_user(request, f'{updated} bannissement(s) désactivé(s).')
     deactivate_bans.short_description = "Désactiver les bannissements"
 
@@ -419,12 +442,16 @@ class NotificationAdmin(admin.ModelAdmin):
     actions = ['mark_as_read', 'mark_as_unread']
     
     def mark_as_read(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
         updated = queryset.update(is_read=True)
+        notification_counters.invalidate_unread(user_ids)
         self.message_user(request, f'{updated} notification(s) marquée(s) comme lue(s).')
     mark_as_read.short_description = "Marquer comme lu"
     
     def mark_as_unread(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
         updated = queryset.update(is_read=False)
+        notification_counters.invalidate_unread(user_ids)
         self.message_user(request, f'{updated} notification(s) marquée(s) comme non lue(s).')
     mark_as_unread.short_description = "Marquer comme non lu"
 
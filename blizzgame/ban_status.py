@@ -0,0 +1,77 @@
+"""
+État de bannissement des utilisateurs (mis en cache)
+
+BanCheckMiddleware vérifie le bannissement à chaque requête authentifiée :
+l'état est gardé par utilisateur dans le cache au lieu d'une requête UserBan
+par page. L'entrée expire avec le bannissement lui-même (TTL = fin du ban)
+et est invalidée par les signaux de UserBan et les actions admin en masse.
+
+Le filtre d'expiration est fait en SQL (index (user, is_active, ends_at)).
+"""
+import logging
+from django.core.cache import caches
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.connection import ConnectionProxy
+from .models import UserBan
+
+logger = logging.getLogger(__name__)
+
+# État lu à chaque requête (middleware) : cache des compteurs chauds
+cache = ConnectionProxy(caches, 'counters')
+
+BAN_STATUS_TIMEOUT = 24 * 60 * 60  # 24 heures pour un utilisateur non banni
+NOT_BANNED = 0  # Valeur en cache pour « aucun bannissement actif »
+
+
+def _key(user_id):
+    return f'ban_status:{user_id}'
+
+
+def active_bans(now=None):
+    """Bannissements actifs et non expirés"""
+    now = now or timezone.now()
+    return UserBan.objects.filter(is_active=True).filter(
+        Q(ends_at__isnull=True) | Q(ends_at__gt=now)
+    )
+
+
+def ban_info(ban):
+    """Informations affichées sur la page « compte banni » (stockées en session)"""
+    return {
+        'reason': ban.reason,
+        'ban_type': ban.ban_type,
+        'ends_at': ban.ends_at.strftime('%d/%m/%Y à %H:%M') if ban.ends_at else '',
+        'details': ban.details or '',
+    }
+
+
+def get_active_ban(user_id):
+    """
+    Retourne le ban_info du bannissement actif le plus récent de
+    l'utilisateur, ou None s'il n'est pas banni.
+    """
+    cached = cache.get(_key(user_id))
+    if cached is not None:
+        return cached or None
+
+    now = timezone.now()
+    ban = active_bans(now).filter(user_id=user_id).order_by('-created_at').first()
+    if ban is None:
+        cache.set(_key(user_id), NOT_BANNED, BAN_STATUS_TIMEOUT)
+        return None
+
+    info = ban_info(ban)
+    timeout = BAN_STATUS_TIMEOUT
+    if ban.ends_at:
+        timeout = min(timeout, max(int((ban.ends_at - now).total_seconds()), 1))
+    cache.set(_key(user_id), info, timeout)
+    return info
+
+
+def is_banned(user_id):
+    return get_active_ban(user_id) is not None
+
+
+def invalidate_ban_status(user_ids):
+    cache.delete_many([_key(user_id) for user_id in set(user_ids)])
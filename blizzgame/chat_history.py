@@ -0,0 +1,104 @@
+"""
+Lecture paginée des messages de discussion par curseur
+
+Tous les endpoints de messages (chat de transaction/litige, conversations
+privées, groupes) lisent l'historique avec read_messages :
+
+- sans curseur : la dernière page (messages les plus récents) ;
+- `after` : uniquement les messages plus récents que le curseur (polling de
+  secours, rattrapage après reconnexion du WebSocket) ;
+- `before` : la page précédente (défilement vers le haut).
+
+Le curseur encode (created_at, id) ; chaque lecture est une recherche par
+plage sur l'index composite (discussion, created_at, id), sans COUNT ni
+OFFSET : un long chat coûte autant qu'un chat neuf.
+"""
+import logging
+import uuid
+from datetime import datetime
+from django.db.models import Q
+from .highlight_feed import InvalidCursor, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+CURSOR_KIND = 'm'
+
+
+def message_cursor(message):
+    return encode_cursor(CURSOR_KIND, [message.created_at.isoformat(), str(message.id)])
+
+
+def parse_cursor(cursor):
+    """Curseur -> (created_at, id). Lève InvalidCursor si le curseur est invalide."""
+    kind, values = decode_cursor(cursor)
+    try:
+        if kind != CURSOR_KIND or len(values) != 2:
+            raise ValueError
+        return datetime.fromisoformat(values[0]), uuid.UUID(values[1])
+    except (TypeError, ValueError):
+        raise InvalidCursor('Curseur invalide')
+
+
+def page_limit(value, default=PAGE_SIZE):
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def read_messages(queryset, after=None, before=None, limit=PAGE_SIZE):
+    """
+    Retourne un dict :
+    - messages : liste chronologique
+    - has_more : il reste des messages dans le sens de lecture
+    - after : curseur à repasser pour obtenir les messages suivants
+    - before : curseur de la page précédente (None s'il n'y en a pas)
+    """
+    if after:
+        created_at, message_id = parse_cursor(after)
+        page = list(queryset.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=message_id)
+        ).order_by('created_at', 'id')[:limit + 1])
+        has_more = len(page) > limit
+        messages = page[:limit]
+        return {
+            'messages': messages,
+            'has_more': has_more,
+            'after': message_cursor(messages[-1]) if messages else after,
+            'before': None,
+        }
+
+    if before:
+        created_at, message_id = parse_cursor(before)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=message_id)
+        )
+    page = list(queryset.order_by('-created_at', '-id')[:limit + 1])
+    has_more = len(page) > limit
+    messages = page[:limit][::-1]
+    return {
+        'messages': messages,
+        'has_more': has_more,
+        'after': message_cursor(messages[-1]) if messages else None,
+        'before': message_cursor(messages[0]) if messages and has_more else None,
+    }
+
+
+def read_request_messages(request, queryset, default_limit=PAGE_SIZE):
+    """read_messages avec les paramètres GET after / before / limit"""
+    return read_messages(
+        queryset,
+        after=request.GET.get('after') or None,
+        before=request.GET.get('before') or None,
+        limit=page_limit(request.GET.get('limit'), default_limit),
+    )
+
+
+def cursor_payload(page):
+    return {
+        'has_more': page['has_more'],
+        'after': page['after'],
+        'before': page['before'],
+    }
@@ -0,0 +1,125 @@
+"""
+Canaux temps réel des discussions (WebSocket multiplexé)
+
+Un onglet ouvre une seule connexion (/ws/realtime/, RealtimeConsumer) et s'y
+abonne à autant de discussions que nécessaire. Un canal est nommé
+« <type>:<uuid> » :
+
+- chat:<id>     Chat de transaction ou de litige (groupe chat_<id>)
+- private:<id>  PrivateConversation (groupe private_chat_<id>)
+- group:<id>    Group (groupe group_chat_<id>)
+
+Les vues d'envoi diffusent chaque message sur le groupe du canal avec
+broadcast_message (envoi différé par realtime_dispatch) ; les destinataires reçoivent aussi un événement
+chat_activity sur leur groupe personnel (liste des discussions, badges).
+Les endpoints get_*_messages ne servent plus qu'au chargement initial et au
+rattrapage après une reconnexion.
+"""
+import logging
+import uuid
+from django.db.models import Q
+from .models import Chat, GroupMembership, PrivateConversation
+from . import realtime_dispatch
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_GROUPS = {
+    'chat': 'chat_{}',
+    'private': 'private_chat_{}',
+    'group': 'group_chat_{}',
+}
+MAX_SUBSCRIPTIONS = 50
+
+
+class InvalidChannel(ValueError):
+    pass
+
+
+def parse_channel(channel):
+    """« type:uuid » -> (type, uuid). Lève InvalidChannel si le nom est invalide."""
+    kind, _, object_id = str(channel or '').partition(':')
+    if kind not in CHANNEL_GROUPS:
+        raise InvalidChannel('Type de canal inconnu')
+    try:
+        return kind, uuid.UUID(object_id)
+    except ValueError:
+        raise InvalidChannel('Identifiant de canal invalide')
+
+
+def channel_name(kind, object_id):
+    return f'{kind}:{object_id}'
+
+
+def channel_group(kind, object_id):
+    """Nom du groupe du channel layer pour un canal"""
+    return CHANNEL_GROUPS[kind].format(object_id)
+
+
+def user_group(user_id):
+    """Groupe personnel d'un utilisateur (toutes ses connexions)"""
+    return f'realtime_user_{user_id}'
+
+
+def can_access(user, kind, object_id):
+    """Vérifie que l'utilisateur peut s'abonner au canal (mêmes règles que les vues)"""
+    if not user or not user.is_authenticated:
+        return False
+
+    if kind == 'chat':
+        chat = Chat.objects.select_related(
+            'transaction__buyer', 'transaction__seller',
+            'dispute__transaction__buyer', 'dispute__transaction__seller'
+        ).filter(id=object_id).first()
+        if chat is None:
+            return False
+        if chat.transaction_id:
+            return user.id in (chat.transaction.buyer_id, chat.transaction.seller_id)
+        if chat.dispute_id:
+            transaction = chat.dispute.transaction
+            return user.is_staff or user.id in (transaction.buyer_id, transaction.seller_id)
+        return False
+
+    if kind == 'private':
+        return PrivateConversation.objects.filter(id=object_id).filter(
+            Q(user1=user) | Q(user2=user)
+        ).exists()
+
+    if kind == 'group':
+        return GroupMembership.objects.filter(
+            group_id=object_id, group__is_active=True, user=user, is_active=True
+        ).exists()
+
+    return False
+
+
+def broadcast_message(kind, object_id, message_data, recipient_ids=()):
+    """
+    Diffuse un nouveau message aux abonnés du canal et signale l'activité aux
+    destinataires. L'envoi est différé après le commit (realtime_dispatch) :
+    ni la latence ni une panne du channel layer n'affectent la requête.
+    """
+    channel = channel_name(kind, object_id)
+    realtime_dispatch.publish(
+        realtime_dispatch.CHANNEL_LAYER,
+        channel_group(kind, object_id),
+        'chat_message',
+        {
+            'type': 'chat_message',
+            'channel': channel,
+            'message': message_data,
+        }
+    )
+    for user_id in set(recipient_ids):
+        # Une rafale de messages ne produit qu'un événement d'activité par lot
+        realtime_dispatch.publish(
+            realtime_dispatch.CHANNEL_LAYER,
+            user_group(user_id),
+            f'chat_activity:{channel}',
+            {
+                'type': 'chat_activity',
+                'channel': channel,
+                'message_id': message_data.get('id'),
+                'sender_id': message_data.get('sender_id'),
+            },
+            coalesce=True
+        )
@@ -14,6 +14,10 @@ import uuid
 import os
 import logging
 from .models import Transaction, Chat, Message, Dispute, DisputeMessage, Notification, Profile
+from . import chat_history
+from . import chat_realtime
+from . import message_notifications
+from .highlight_feed import InvalidCursor
 from .consumers import TransactionChatConsumer, DisputeChatConsumer
 
 logger = logging.getLogger(__name__)
@@ -46,8 +50,9 @@ def transaction_chat(request, transaction_id):
         chat.is_locked = chat_locked
         chat.save()
     
-    # Récupérer les messages
-    chat_messages = Message.objects.filter(chat=chat).order_by('created_at')
+    # Récupérer la dernière page de messages (les plus anciens via le curseur `before`)
+    chat_page = chat_history.read_messages(Message.objects.filter(chat=chat).select_related('sender'))
+    chat_messages = chat_page['messages']
     
     # Marquer les messages comme lus
     Message.objects.filter(chat=chat, is_read=False).exclude(sender=request.user).update(is_read=True)
@@ -56,6 +61,7 @@ def transaction_chat(request, transaction_id):
         'transaction': transaction,
         'chat': chat,
         'chat_messages': chat_messages,
+        'chat_cursors': chat_history.cursor_payload(chat_page),
         'chat_locked': chat_locked,
         'other_user': transaction.seller if request.user == transaction.buyer else transaction.buyer,
         'websocket_url': f'ws://{request.get_host()}/ws/chat/transaction/{transaction_id}/'
@@ -85,8 +91,9 @@ def dispute_chat(request, dispute_id):
         }
     )
     
-    # Récupérer les messages
-    chat_messages = Message.objects.filter(chat=chat).order_by('created_at')
+    # Récupérer la dernière page de messages (les plus anciens via le curseur `before`)
+    chat_page = chat_history.read_messages(Message.objects.filter(chat=chat).select_related('sender'))
+    chat_messages = chat_page['messages']
     
     # Marquer les messages comme lus
     Message.objects.filter(chat=chat, is_read=False).exclude(sender=request.user).update(is_read=True)
@@ -95,6 +102,7 @@ def dispute_chat(request, dispute_id):
         'dispute': dispute,
         'chat': chat,
         'chat_messages': chat_messages,
+        'chat_cursors': chat_history.cursor_payload(chat_page),
         'transaction': dispute.transaction,
         'is_admin': request.user.is_staff,
         'websocket_url': f'ws://{request.get_host()}/ws/chat/dispute/{dispute_id}/'
@@ -164,41 +172,19 @@ def send_message(request, chat_id):
             message_type=message_type
         )
         
-        # Créer une notification pour l'autre utilisateur
-        other_user = chat.get_other_user(request.user)
-        if other_user:
-            from .models import Notification
-            Notification.objects.create(
-                user=other_user,
-                type='new_message',
-                title='Nouveau message',
-                content=f"Nouveau message de {request.user.username} dans la transaction",
-                transaction=chat.transaction if chat.transaction else None,
-                dispute=chat.dispute if chat.dispute else None
-            )
+        # Notification groupée pour les autres participants
+        message_notifications.notify_chat_message(chat, message)
         
         # Envoyer via WebSocket
-        from channels.layers import get_channel_layer
-        from asgiref.sync import async_to_sync
-        
-        channel_layer = get_channel_layer()
-        group_name = f'chat_{chat.id}'
-        
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                'type': 'chat_message',
-                'message': {
-                    'id': str(message.id),
-                    'content': message.content,
-                    'sender': message.sender.username,
-                    'sender_id': message.sender.id,
-                    'created_at': message.created_at.isoformat(),
-                    'message_type': message.message_type,
-                    'is_read': message.is_read
-                }
-            }
-        )
+        chat_realtime.broadcast_message('chat', chat.id, {
+            'id': str(message.id),
+            'content': message.content,
+            'sender': message.sender.username,
+            'sender_id': message.sender.id,
+            'created_at': message.created_at.isoformat(),
+            'message_type': message.message_type,
+            'is_read': message.is_read
+        }, recipient_ids=[user.id for user in chat.get_other_users(request.user)])
         
         return JsonResponse({
             'status': 'success',
@@ -209,6 +195,39 @@ def send_message(request, chat_id):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+@login_required
+@require_http_methods(["GET"])
+def get_chat_messages(request, chat_id):
+    """
+    API des messages d'un chat de transaction ou de litige
+    Paramètres GET : after (nouveaux messages), before (historique), limit
+    """
+    chat = get_object_or_404(Chat, id=chat_id)
+    if not chat.has_access(request.user):
+        return JsonResponse({'error': 'Accès refusé'}, status=403)
+    
+    try:
+        page = chat_history.read_request_messages(request, chat.messages.select_related('sender'))
+    except InvalidCursor:
+        return JsonResponse({'error': 'Curseur invalide'}, status=400)
+    
+    return JsonResponse({
+        'messages': [{
+            'id': str(message.id),
+            'content': message.content,
+            'sender': message.sender.username,
+            'sender_id': message.sender_id,
+            'created_at': message.created_at.isoformat(),
+            'message_type': message.message_type,
+            'image_url': message.image.url if message.image else None,
+            'is_read': message.is_read,
+            'is_admin': message.sender.is_staff,
+            'is_own': message.sender_id == request.user.id,
+            'is_mine': message.sender_id == request.user.id
+        } for message in page['messages']],
+        'cursors': chat_history.cursor_payload(page)
+    })
+
 @login_required
 @require_http_methods(["POST"])
 def upload_chat_image(request, chat_id):
@@ -253,40 +272,20 @@ def upload_chat_image(request, chat_id):
             image=file_path
         )
         
-        # Créer une notification pour les autres utilisateurs
-        other_users = chat.get_other_users(request.user)
-        for user in other_users:
-            Notification.objects.create(
-                user=user,
-                title='Nouvelle image',
-                message=f'{request.user.username} a partagé une image',
-                notification_type='message',
-                related_object_id=chat.id
-            )
+        # Notification groupée pour les autres participants
+        message_notifications.notify_chat_message(chat, message)
         
         # Envoyer via WebSocket
-        from channels.layers import get_channel_layer
-        from asgiref.sync import async_to_sync
-        
-        channel_layer = get_channel_layer()
-        group_name = f'chat_{chat.id}'
-        
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                'type': 'chat_message',
-                'message': {
-                    'id': str(message.id),
-                    'content': message.content,
-                    'sender': message.sender.username,
-                    'sender_id': message.sender.id,
-                    'created_at': message.created_at.isoformat(),
-                    'message_type': message.message_type,
-                    'image_url': message.image.url if message.image else None,
-                    'is_read': message.is_read
-                }
-            }
-        )
+        chat_realtime.broadcast_message('chat', chat.id, {
+            'id': str(message.id),
+            'content': message.content,
+            'sender': message.sender.username,
+            'sender_id': message.sender.id,
+            'created_at': message.created_at.isoformat(),
+            'message_type': message.message_type,
+            'image_url': message.image.url if message.image else None,
+            'is_read': message.is_read
+        }, recipient_ids=[user.id for user in chat.get_other_users(request.user)])
         
         return JsonResponse({
             'success': True,
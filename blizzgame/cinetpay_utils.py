@@ -103,7 +103,7 @@ class CinetPayAPI:
         self.test_mode = getattr(settings, 'CINETPAY_DROPSHIPPING_TEST_MODE', False)
         
         # URL de production CinetPay
-        self.base_url = 'https://api-checkout.cinetpay.com/v2'
+        self.base_url = getattr(settings, 'CINETPAY_CHECKOUT_BASE_URL', 'https://api-checkout.cinetpay.com/v2')
 
     def initiate_payment(self, order, customer_data):
         """
@@ -247,7 +247,8 @@ class CinetPayAPI:
             response = requests.post(
                 f"{self.base_url}/payment/check",
                 json=verification_data,
-                headers={'Content-Type': 'application/json'}
+                headers={'Content-Type': 'application/json'},
+                timeout=15,
             )
             
             response.raise_for_status()
@@ -261,82 +262,13 @@ class CinetPayAPI:
 
 def handle_cinetpay_notification(notification_data):
     """
-    Traite une notification CinetPay pour la boutique
+    Traite aussitôt une notification CinetPay pour la boutique (scripts,
+    support). Le webhook, lui, enregistre la notification et laisse le
+    worker la traiter (payment_webhooks).
     """
+    from .payment_webhooks import SHOP, process_now
     try:
-        transaction_id = notification_data.get('cpm_trans_id')
-        if not transaction_id:
-            logger.error("ID de transaction manquant dans la notification")
-            return False
-        
-        # Trouver la transaction locale
-        cinetpay_transaction = ShopCinetPayTransaction.objects.filter(
-            cinetpay_transaction_id=transaction_id
-        ).first()
-        
-        if not cinetpay_transaction:
-            logger.error(f"Transaction CinetPay non trouvée: {transaction_id}")
-            return False
-        
-        order = cinetpay_transaction.order
-        
-        # Vérifier le statut du paiement
-        cinetpay_api = CinetPayAPI()
-        verification_result = cinetpay_api.verify_payment(transaction_id)
-        
-        if not verification_result:
-            logger.error(f"Impossible de vérifier le paiement: {transaction_id}")
-            return False
-        
-        payment_status = verification_result.get('data', {}).get('payment_status')
-        
-        if payment_status == 'ACCEPTED':
-            # Paiement réussi
-            cinetpay_transaction.status = 'completed'
-            cinetpay_transaction.completed_at = timezone.now()
-            cinetpay_transaction.save()
-            
-            # Mettre à jour la commande
-            order.payment_status = 'paid'
-            order.status = 'processing'
-            order.save()
-            
-            # TEMPORAIRE: Désactiver Shopify car Wiio ne livre pas au Sénégal
-            # TODO: Réactiver quand un partenaire de livraison local sera trouvé
-            logger.info(f"Paiement accepté pour: {order.order_number} - Shopify désactivé temporairement")
-            
-            # Créer la commande sur Shopify (DÉSACTIVÉ TEMPORAIREMENT)
-            # from .shopify_utils import create_shopify_order_from_blizz_order, mark_order_as_paid_in_shopify
-            # 
-            # try:
-            #     shopify_order = create_shopify_order_from_blizz_order(order)
-            #     if shopify_order:
-            #         # Marquer comme payée dans Shopify
-            #         mark_order_as_paid_in_shopify(order)
-            #         logger.info(f"Commande transférée vers Shopify: {order.order_number}")
-            #     else:
-            #         logger.error(f"Échec de création commande Shopify pour: {order.order_number}")
-            # except Exception as e:
-            #     logger.error(f"Erreur lors du transfert Shopify: {e}")
-            
-            return True
-            
-        elif payment_status == 'REFUSED':
-            # Paiement échoué
-            cinetpay_transaction.status = 'failed'
-            cinetpay_transaction.save()
-            
-            order.payment_status = 'failed'
-            order.status = 'cancelled'
-            order.save()
-            
-            logger.info(f"Paiement échoué pour: {transaction_id}")
-            return True
-        
-        else:
-            logger.warning(f"Statut de paiement non géré: {payment_status}")
-            return False
-            
+        return process_now(SHOP, notification_data)
     except Exception as e:
         logger.error(f"Erreur lors du traitement de la notification: {e}")
         return False
@@ -697,94 +629,13 @@ class GamingCinetPayAPI(CinetPayAPI):
 
 def handle_gaming_cinetpay_notification(notification_data):
     """
-    Traite une notification CinetPay pour les transactions gaming
+    Traite aussitôt une notification CinetPay pour les transactions gaming
+    (scripts, support). Le webhook, lui, enregistre la notification et
+    laisse le worker la traiter (payment_webhooks).
     """
+    from .payment_webhooks import GAMING, process_now
     try:
-        # Nouvelle API v1 : on reçoit merchant_transaction_id / transaction_id
-        merchant_transaction_id = notification_data.get('merchant_transaction_id')
-        legacy_id = notification_data.get('cpm_trans_id')
-        identifier = merchant_transaction_id or legacy_id
-
-        if not identifier:
-            logger.error("ID de transaction manquant dans la notification gaming")
-            return False
-        
-        # Trouver la transaction CinetPay gaming
-        cinetpay_transaction = CinetPayTransaction.objects.filter(
-            cinetpay_transaction_id=identifier
-        ).first()
-        
-        if not cinetpay_transaction:
-            logger.error(f"Transaction CinetPay Gaming non trouvée: {identifier}")
-            return False
-        
-        transaction = cinetpay_transaction.transaction
-        
-        # Vérifier le statut du paiement via l'API v1
-        cinetpay_api = GamingCinetPayAPI()
-        # On privilégie le payment_token si présent, sinon l'identifiant marchand
-        verification_identifier = (
-            cinetpay_transaction.payment_token or cinetpay_transaction.cinetpay_transaction_id
-        )
-        verification_result = cinetpay_api.verify_payment(verification_identifier)
-        
-        if not verification_result:
-            logger.error(f"Impossible de vérifier le paiement gaming: {identifier}")
-            return False
-        
-        # Nouvelle API v1 : le champ de statut principal est "status"
-        payment_status = (verification_result.get('status') or '').upper()
-        
-        if payment_status == 'SUCCESS':
-            # Paiement réussi
-            cinetpay_transaction.status = 'payment_received'
-            cinetpay_transaction.completed_at = timezone.now()
-            cinetpay_transaction.save()
-            
-            # Mettre à jour la transaction gaming
-            transaction.status = 'processing'
-            transaction.save()
-            
-            # MAINTENANT on met l'annonce en mode transaction (paiement confirmé)
-            post = transaction.post
-            post.is_in_transaction = True
-            post.is_on_sale = False
-            post.save()
-            
-            # Créer une notification pour le vendeur
-            from .models import Notification
-            Notification.objects.create(
-                user=transaction.seller,
-                type='transaction_update',
-                title=' Paiement reçu',
-                content=f'Le paiement pour "{transaction.post.title}" a été reçu. La transaction est maintenant active.',
-                transaction=transaction
-            )
-            
-            logger.info(f"Paiement gaming réussi pour: {identifier}, annonce marquée en transaction")
-            return True
-            
-        elif payment_status == 'FAILED':
-            # Paiement échoué
-            cinetpay_transaction.status = 'failed'
-            cinetpay_transaction.save()
-            
-            transaction.status = 'cancelled'
-            transaction.save()
-            
-            # Remettre l'annonce en vente
-            post = transaction.post
-            post.is_in_transaction = False
-            post.is_on_sale = True
-            post.save()
-            
-            logger.info(f"Paiement gaming échoué pour: {identifier}, annonce remise en vente")
-            return True
-        
-        else:
-            logger.warning(f"Statut de paiement gaming non géré: {payment_status}")
-            return False
-            
+        return process_now(GAMING, notification_data)
     except Exception as e:
         logger.error(f"Erreur lors du traitement de la notification gaming: {e}")
         return False
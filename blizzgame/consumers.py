@@ -1,11 +1,17 @@
 import json
+import logging
 import uuid
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import User
 from .models import Transaction, Chat, Message, Dispute, DisputeMessage, Notification
+from . import chat_realtime
+from . import message_notifications
+from . import notification_counters
 from django.utils import timezone
 
+logger = logging.getLogger(__name__)
+
 class TransactionChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.transaction_id = self.scope['url_route']['kwargs']['transaction_id']
@@ -165,17 +171,8 @@ class TransactionChatConsumer(AsyncWebsocketConsumer):
                 message_type=message_type
             )
             
-            # Créer une notification pour l'autre utilisateur
-            other_user = chat.get_other_user(user)
-            if other_user:
-                from .models import Notification
-                Notification.objects.create(
-                    user=other_user,
-                    type='new_message',
-                    title='Nouveau message',
-                    content=f"Nouveau message de {user.username} dans la transaction",
-                    transaction=transaction
-                )
+            # Notification groupée pour les autres participants
+            message_notifications.notify_chat_message(chat, message)
             
             return message
         except Exception as e:
@@ -344,19 +341,193 @@ class DisputeChatConsumer(AsyncWebsocketConsumer):
                 message_type=message_type
             )
             
-            # Créer une notification pour l'autre utilisateur
-            other_user = chat.get_other_user(user)
-            if other_user:
-                from .models import Notification
-                Notification.objects.create(
-                    user=other_user,
-                    type='new_message',
-                    title='Nouveau message',
-                    content=f"Nouveau message de {user.username} dans le litige",
-                    dispute=dispute
-                )
+            # Notification groupée pour les autres participants
+            message_notifications.notify_chat_message(chat, message)
             
             return message
         except Exception as e:
             print(f"Erreur lors de la création du message: {e}")
-            return None
\ No newline at end of file
+            return None
+
+class RealtimeConsumer(AsyncWebsocketConsumer):
+    """
+    Connexion unique par onglet, multiplexée sur plusieurs discussions
+    (voir chat_realtime). Messages du client :
+
+    - {"action": "subscribe", "channel": "chat:<uuid>", "ref": ...}
+    - {"action": "unsubscribe", "channel": ...}
+    - {"action": "typing", "channel": ..., "is_typing": true}
+    - {"action": "ack", "channel": ..., "message_id": ...}  (accusé de réception)
+    - {"action": "ping"}
+    """
+
+    async def connect(self):
+        self.user = self.scope.get('user')
+        if not self.user or not self.user.is_authenticated:
+            await self.close(code=4401)
+            return
+
+        self.subscriptions = set()
+        self.user_group_name = chat_realtime.user_group(self.user.id)
+        await self.channel_layer.group_add(self.user_group_name, self.channel_name)
+        await self.accept()
+        # Compteur courant à la (re)connexion : rattrape les changements
+        # survenus pendant une coupure, sans requête HTTP du client
+        try:
+            unread = await database_sync_to_async(notification_counters.get_unread_count)(self.user.id)
+        except Exception as e:
+            logger.error(f"Compteur de notifications indisponible pour {self.user.id}: {e}")
+        else:
+            await self.send_json({'type': 'notifications', 'unread': unread})
+
+    async def disconnect(self, close_code):
+        if not getattr(self, 'user_group_name', None):
+            return
+        for channel in list(self.subscriptions):
+            await self.leave_channel(channel)
+        await self.channel_layer.group_discard(self.user_group_name, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = json.loads(text_data or '')
+        except json.JSONDecodeError:
+            await self.send_json({'type': 'error', 'code': 'invalid_json'})
+            return
+        if not isinstance(data, dict):
+            await self.send_json({'type': 'error', 'code': 'invalid_json'})
+            return
+
+        action = data.get('action')
+        if action == 'ping':
+            await self.send_json({'type': 'pong'})
+            return
+
+        handler = {
+            'subscribe': self.handle_subscribe,
+            'unsubscribe': self.handle_unsubscribe,
+            'typing': self.handle_typing,
+            'ack': self.handle_ack,
+        }.get(action)
+        if handler is None:
+            await self.send_json({'type': 'error', 'code': 'unknown_action', 'ref': data.get('ref')})
+            return
+
+        try:
+            kind, object_id = chat_realtime.parse_channel(data.get('channel'))
+        except chat_realtime.InvalidChannel:
+            await self.send_json({'type': 'error', 'code': 'invalid_channel', 'ref': data.get('ref')})
+            return
+        await handler(chat_realtime.channel_name(kind, object_id), kind, object_id, data)
+
+    async def handle_subscribe(self, channel, kind, object_id, data):
+        ref = data.get('ref')
+        if channel in self.subscriptions:
+            await self.send_json({'type': 'subscribed', 'channel': channel, 'ref': ref})
+            return
+        if len(self.subscriptions) >= chat_realtime.MAX_SUBSCRIPTIONS:
+            await self.send_json({'type': 'error', 'code': 'too_many_subscriptions', 'channel': channel, 'ref': ref})
+            return
+        if not await database_sync_to_async(chat_realtime.can_access)(self.user, kind, object_id):
+            await self.send_json({'type': 'error', 'code': 'forbidden', 'channel': channel, 'ref': ref})
+            return
+
+        group = chat_realtime.channel_group(kind, object_id)
+        await self.channel_layer.group_add(group, self.channel_name)
+        self.subscriptions.add(channel)
+        await self.send_json({'type': 'subscribed', 'channel': channel, 'ref': ref})
+        await self.channel_layer.group_send(group, self.presence_event(channel, 'online'))
+
+    async def handle_unsubscribe(self, channel, kind, object_id, data):
+        if channel in self.subscriptions:
+            await self.leave_channel(channel)
+        await self.send_json({'type': 'unsubscribed', 'channel': channel, 'ref': data.get('ref')})
+
+    async def handle_typing(self, channel, kind, object_id, data):
+        if channel not in self.subscriptions:
+            return
+        await self.channel_layer.group_send(chat_realtime.channel_group(kind, object_id), {
+            'type': 'chat_typing',
+            'channel': channel,
+            'user_id': self.user.id,
+            'username': self.user.username,
+            'is_typing': bool(data.get('is_typing', True)),
+        })
+
+    async def handle_ack(self, channel, kind, object_id, data):
+        if channel not in self.subscriptions or not data.get('message_id'):
+            return
+        await self.channel_layer.group_send(chat_realtime.channel_group(kind, object_id), {
+            'type': 'chat_ack',
+            'channel': channel,
+            'message_id': str(data['message_id']),
+            'user_id': self.user.id,
+        })
+
+    async def leave_channel(self, channel):
+        kind, object_id = chat_realtime.parse_channel(channel)
+        group = chat_realtime.channel_group(kind, object_id)
+        self.subscriptions.discard(channel)
+        await self.channel_layer.group_discard(group, self.channel_name)
+        await self.channel_layer.group_send(group, self.presence_event(channel, 'offline'))
+
+    def presence_event(self, channel, status):
+        return {
+            'type': 'chat_presence',
+            'channel': channel,
+            'user_id': self.user.id,
+            'username': self.user.username,
+            'status': status,
+            'sender_channel_name': self.channel_name,
+        }
+
+    async def send_json(self, content):
+        await self.send(text_data=json.dumps(content))
+
+    # ===== Événements du channel layer =====
+
+    async def chat_message(self, event):
+        channel = event.get('channel')
+        if channel not in self.subscriptions:
+            return
+        message = dict(event['message'])
+        message['is_own'] = message.get('sender_id') == self.user.id
+        await self.send_json({'type': 'message', 'channel': channel, 'message': message})
+
+    async def chat_activity(self, event):
+        await self.send_json({
+            'type': 'activity',
+            'channel': event['channel'],
+            'message_id': event.get('message_id'),
+            'is_own': event.get('sender_id') == self.user.id,
+        })
+
+    async def notification_count(self, event):
+        await self.send_json({'type': 'notifications', 'unread': event['unread']})
+
+    async def chat_typing(self, event):
+        if event['channel'] in self.subscriptions and event['user_id'] != self.user.id:
+            await self.send_json({
+                'type': 'typing',
+                'channel': event['channel'],
+                'username': event['username'],
+                'is_typing': event['is_typing'],
+            })
+
+    async def chat_ack(self, event):
+        if event['channel'] in self.subscriptions and event['user_id'] != self.user.id:
+            await self.send_json({
+                'type': 'ack',
+                'channel': event['channel'],
+                'message_id': event['message_id'],
+                'user_id': event['user_id'],
+            })
+
+    async def chat_presence(self, event):
+        if event['channel'] in self.subscriptions and event['sender_channel_name'] != self.channel_name:
+            await self.send_json({
+                'type': 'presence',
+                'channel': event['channel'],
+                'user_id': event['user_id'],
+                'username': event['username'],
+                'status': event['status'],
+            })
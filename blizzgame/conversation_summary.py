@@ -0,0 +1,124 @@
+"""
+Résumé des conversations de l'utilisateur (boîte de réception du chat)
+
+Conversations privées, groupes et chats de transaction sont listés avec leur
+dernier message et leur nombre de non lus, calculés en SQL par des
+sous-requêtes corrélées (Subquery / OuterRef) sur les index
+(discussion, created_at, id) des messages. Chaque liste coûte deux requêtes
+(les discussions annotées, puis leurs derniers messages en une fois) quel que
+soit le nombre de conversations.
+"""
+import logging
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from .models import (
+    Chat, GroupMembership, GroupMessage, Message, PrivateConversation, PrivateMessage
+)
+from . import group_reads
+
+logger = logging.getLogger(__name__)
+
+# Statuts de transaction dont le chat reste proposé dans le chat flottant
+ACTIVE_TRANSACTION_STATUSES = ['pending', 'processing', 'completed']
+
+
+def _last_message_id(model, fk, ref='pk'):
+    """Id du dernier message de la discussion (sous-requête corrélée)"""
+    latest = model.objects.filter(**{fk: OuterRef(ref)}).order_by('-created_at', '-id')
+    return Subquery(latest.values('id')[:1])
+
+
+def _unread_count(model, fk, user):
+    """Messages non lus reçus par `user` dans la discussion (is_read par message)"""
+    counts = model.objects.filter(
+        **{fk: OuterRef('pk')}, is_read=False
+    ).exclude(
+        sender=user
+    ).order_by().values(fk).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def _last_messages(model, rows):
+    """Charge en une requête les derniers messages annotés (last_message_id)"""
+    ids = [row.last_message_id for row in rows if row.last_message_id]
+    return model.objects.select_related('sender').in_bulk(ids) if ids else {}
+
+
+def private_conversations(user, limit=None):
+    """[{conversation, other_user, last_message, unread_count}]"""
+    conversations = PrivateConversation.objects.filter(
+        Q(user1=user) | Q(user2=user),
+        is_active=True
+    ).select_related('user1__profile', 'user2__profile').annotate(
+        last_message_id=_last_message_id(PrivateMessage, 'conversation'),
+        unread_count=_unread_count(PrivateMessage, 'conversation', user),
+    ).order_by('-last_message_at')
+    if limit is not None:
+        conversations = conversations[:limit]
+    conversations = list(conversations)
+
+    last_messages = _last_messages(PrivateMessage, conversations)
+    return [{
+        'conversation': conversation,
+        'other_user': conversation.user2 if conversation.user1_id == user.id else conversation.user1,
+        'last_message': last_messages.get(conversation.last_message_id),
+        'unread_count': conversation.unread_count,
+    } for conversation in conversations]
+
+
+def group_conversations(user, limit=None):
+    """[{group, membership, is_admin, members_count, last_message, unread_count}]"""
+    members_count = GroupMembership.objects.filter(
+        group=OuterRef('group'), is_active=True
+    ).order_by().values('group').annotate(total=Count('pk')).values('total')
+    memberships = GroupMembership.objects.filter(
+        user=user, is_active=True, group__is_active=True
+    ).select_related('group', 'group__created_by').annotate(
+        last_message_id=_last_message_id(GroupMessage, 'group', ref='group'),
+        unread_count=group_reads.unread_count_subquery(),
+        members_count=Coalesce(Subquery(members_count, output_field=IntegerField()), Value(0)),
+    ).order_by('-group__last_message_at')
+    if limit is not None:
+        memberships = memberships[:limit]
+    memberships = list(memberships)
+
+    last_messages = _last_messages(GroupMessage, memberships)
+    return [{
+        'group': membership.group,
+        'membership': membership,
+        'is_admin': membership.is_admin,
+        'members_count': membership.members_count,
+        'last_message': last_messages.get(membership.last_message_id),
+        'unread_count': membership.unread_count,
+    } for membership in memberships]
+
+
+def transaction_chats(user, limit=None):
+    """[{chat, transaction, other_user, is_buyer, last_message, unread_count}]"""
+    chats = Chat.objects.filter(
+        Q(transaction__buyer=user) | Q(transaction__seller=user),
+        transaction__status__in=ACTIVE_TRANSACTION_STATUSES
+    ).select_related(
+        'transaction__buyer__profile', 'transaction__seller__profile', 'transaction__post'
+    ).annotate(
+        last_message_id=_last_message_id(Message, 'chat'),
+        unread_count=_unread_count(Message, 'chat', user),
+    ).order_by('-transaction__created_at')
+    if limit is not None:
+        chats = chats[:limit]
+    chats = list(chats)
+
+    last_messages = _last_messages(Message, chats)
+    summaries = []
+    for chat in chats:
+        transaction = chat.transaction
+        is_buyer = transaction.buyer_id == user.id
+        summaries.append({
+            'chat': chat,
+            'transaction': transaction,
+            'other_user': transaction.seller if is_buyer else transaction.buyer,
+            'is_buyer': is_buyer,
+            'last_message': last_messages.get(chat.last_message_id),
+            'unread_count': chat.unread_count,
+        })
+    return summaries
@@ -1,19 +1,32 @@
 import requests
+import time
+from datetime import datetime
 from decimal import Decimal
 from django.core.cache import cache
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from .models import ExchangeRate
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Table des taux du processus courant (voir CurrencyService._get_rate_table)
+_rate_table = None
+
 class CurrencyService:
     """Service pour la gestion des conversions monétaires avec cache"""
     
     # API gratuite pour les taux de change
     EXCHANGE_API_URL = "https://api.exchangerate-api.com/v4/latest/"
-    CACHE_TIMEOUT = 3600  # 1 heure en secondes
+    CACHE_TIMEOUT = 3600  # 1 heure en secondes (au-delà, un taux est périmé)
+    RATE_TABLE_TTL = 60  # Durée de vie de la table en mémoire
+    RATE_TABLE_CACHE_KEY = 'exchange_rates:table'
+    RATE_TABLE_CACHE_TIMEOUT = 7 * 24 * 3600  # Un taux périmé reste servi
+    REFRESH_REQUESTED_KEY = 'exchange_rates:refresh_requested'
+    # Devise de la table téléchargée, dont sont dérivés tous les taux croisés
+    REFERENCE_CURRENCY = 'EUR'
+    RATE_PRECISION = Decimal('0.0000000001')  # ExchangeRate.rate (10 décimales)
     
     # Devises supportées par CinetPay
     CINETPAY_CURRENCIES = ['XOF', 'XAF', 'GNF']
@@ -94,6 +107,11 @@ class CurrencyService:
         """
         Récupère le taux de change entre deux devises
         Utilise un taux fixe pour EUR/XOF pour éviter les variations
+
+        Aucun appel à l'API externe ici : les taux viennent de la table en
+        mémoire (processus), puis du cache Redis, puis de ExchangeRate.
+        Un taux périmé est servi tel quel et signalé pour rafraîchissement
+        (refresh_exchange_rates).
         """
         if from_currency == to_currency:
             return Decimal('1.0')
@@ -105,61 +123,147 @@ class CurrencyService:
             else:
                 return Decimal('0.00152')  # 1 FCFA = 0.00152 EUR (1/657.89)
         
-        # Vérifier le cache Django pour les autres devises
-        cache_key = f"exchange_rate_{from_currency}_{to_currency}"
-        cached_rate = cache.get(cache_key)
-        if cached_rate:
-            return Decimal(str(cached_rate))
-        
-        # Vérifier la base de données
-        try:
-            db_rate = ExchangeRate.objects.get(
-                base_currency=from_currency,
-                target_currency=to_currency
-            )
-            if db_rate.is_fresh:
-                cache.set(cache_key, float(db_rate.rate), cls.CACHE_TIMEOUT)
-                return db_rate.rate
-        except ExchangeRate.DoesNotExist:
-            pass
+        table = cls._get_rate_table()
+        rate = cls._lookup_rate(table['rates'], from_currency, to_currency)
+        if table['stale'] or rate is None:
+            cls.request_refresh()
+        if rate is not None:
+            return rate
         
-        # Récupérer depuis l'API externe
-        try:
-            rate = cls._fetch_rate_from_api(from_currency, to_currency)
+        # Fallback: retourner 1.0 si le taux n'est pas encore connu
+        logger.warning(f"Taux {from_currency}->{to_currency} inconnu, utilisation de 1.0")
+        return Decimal('1.0')
+    
+    @staticmethod
+    def _lookup_rate(rates, from_currency, to_currency):
+        """Taux direct ou inverse, sinon croisé via l'EUR/USD"""
+        def direct(base, target):
+            rate = rates.get((base, target))
             if rate:
-                # Sauvegarder en base de données
-                ExchangeRate.objects.update_or_create(
-                    base_currency=from_currency,
-                    target_currency=to_currency,
-                    defaults={'rate': rate}
-                )
-                # Mettre en cache
-                cache.set(cache_key, float(rate), cls.CACHE_TIMEOUT)
                 return rate
-        except Exception as e:
-            logger.error(f"Erreur lors de la récupération du taux {from_currency}->{to_currency}: {e}")
+            inverse = rates.get((target, base))
+            return Decimal('1') / inverse if inverse else None
         
-        # Fallback: retourner 1.0 si impossible de récupérer le taux
-        logger.warning(f"Impossible de récupérer le taux {from_currency}->{to_currency}, utilisation de 1.0")
-        return Decimal('1.0')
+        rate = direct(from_currency, to_currency)
+        if rate is not None:
+            return rate
+        for pivot in ('EUR', 'USD'):
+            first = direct(from_currency, pivot)
+            second = direct(pivot, to_currency)
+            if first and second:
+                return first * second
+        return None
+    
+    # ===== TABLE DES TAUX (mémoire > Redis > base) =====
+    
+    @classmethod
+    def _get_rate_table(cls):
+        """
+        Table complète des taux : gardée en mémoire RATE_TABLE_TTL secondes,
+        partagée entre processus via Redis, rechargée depuis ExchangeRate en
+        une seule requête si Redis est vide.
+        """
+        now = time.monotonic()
+        table = _rate_table
+        if table is not None and now - table['loaded_at'] < cls.RATE_TABLE_TTL:
+            return table
+        
+        cached = cache.get(cls.RATE_TABLE_CACHE_KEY)
+        if cached is None:
+            cached = cls._load_rate_table_from_db()
+            cache.set(cls.RATE_TABLE_CACHE_KEY, cached, cls.RATE_TABLE_CACHE_TIMEOUT)
+        
+        return cls._install_rate_table(cached, now)
+    
+    @classmethod
+    def _load_rate_table_from_db(cls):
+        """
+        Sérialise tous les taux de ExchangeRate (une requête). La fraîcheur
+        est celle du dernier rafraîchissement : refresh_all_rates écrit toutes
+        ses paires avec la même date, la plus récente. Une paire qu'il n'écrit
+        plus (devise absente de la réponse API, ancienne devise) reste servie
+        sans rendre la table périmée pour toujours.
+        """
+        rates = {}
+        latest = None
+        for base, target, rate, last_updated in ExchangeRate.objects.values_list(
+            'base_currency', 'target_currency', 'rate', 'last_updated'
+        ):
+            rates[f'{base}:{target}'] = str(rate)
+            if latest is None or last_updated > latest:
+                latest = last_updated
+        return {
+            'rates': rates,
+            'updated_at': latest.isoformat() if latest else None,
+        }
     
     @classmethod
-    def _fetch_rate_from_api(cls, from_currency, to_currency):
-        """Récupère le taux depuis l'API externe"""
+    def _install_rate_table(cls, cached, now=None):
+        global _rate_table
+        rates = {}
+        for pair, rate in cached['rates'].items():
+            base, target = pair.split(':')
+            rates[(base, target)] = Decimal(rate)
+        
+        updated_at = cached.get('updated_at')
+        stale = True
+        if updated_at:
+            age = timezone.now() - datetime.fromisoformat(updated_at)
+            stale = age.total_seconds() > cls.CACHE_TIMEOUT
+        
+        _rate_table = {
+            'rates': rates,
+            'stale': stale,
+            'loaded_at': time.monotonic() if now is None else now,
+        }
+        return _rate_table
+    
+    @classmethod
+    def prime_rate_cache(cls):
+        """Recharge la table depuis la base et la publie dans Redis et en mémoire"""
+        cached = cls._load_rate_table_from_db()
+        cache.set(cls.RATE_TABLE_CACHE_KEY, cached, cls.RATE_TABLE_CACHE_TIMEOUT)
+        cache.delete(cls.REFRESH_REQUESTED_KEY)
+        return cls._install_rate_table(cached)
+    
+    @classmethod
+    def request_refresh(cls):
+        """Signale (sans bloquer) que les taux doivent être rafraîchis"""
+        cache.add(cls.REFRESH_REQUESTED_KEY, 1, cls.RATE_TABLE_CACHE_TIMEOUT)
+    
+    @classmethod
+    def refresh_requested(cls):
+        return bool(cache.get(cls.REFRESH_REQUESTED_KEY))
+    
+    @classmethod
+    def rates_are_fresh(cls):
+        """Vrai si le dernier rafraîchissement des taux a moins de CACHE_TIMEOUT secondes"""
+        table = cls._install_rate_table(cls._load_rate_table_from_db())
+        return bool(table['rates']) and not table['stale']
+    
+    @classmethod
+    def _fetch_rates_from_api(cls, base_currency):
+        """
+        Récupère la table complète des taux pour une devise de base
+        Retourne {devise: Decimal} ou None en cas d'erreur
+        """
         try:
             response = requests.get(
-                f"{cls.EXCHANGE_API_URL}{from_currency}",
+                f"{cls.EXCHANGE_API_URL}{base_currency}",
                 timeout=10
             )
             response.raise_for_status()
             data = response.json()
             
-            if to_currency in data.get('rates', {}):
-                return Decimal(str(data['rates'][to_currency]))
+            return {
+                currency: Decimal(str(rate))
+                for currency, rate in data['rates'].items()
+                if rate
+            }
             
         except requests.RequestException as e:
             logger.error(f"Erreur API exchange rate: {e}")
-        except (KeyError, ValueError) as e:
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
             logger.error(f"Erreur parsing API response: {e}")
         
         return None
@@ -172,10 +276,24 @@ class CurrencyService:
         if not amount:
             return Decimal('0.00')
         
-        amount = Decimal(str(amount))
         rate = cls.get_exchange_rate(from_currency, to_currency)
-        converted = amount * rate
-        
+        return cls._round_amount(Decimal(str(amount)) * rate, from_currency, to_currency)
+    
+    @classmethod
+    def convert_many(cls, amounts, from_currency, to_currency):
+        """
+        Convertit une liste de montants avec un seul accès au taux
+        Retourne la liste des montants convertis, dans le même ordre
+        """
+        rate = cls.get_exchange_rate(from_currency, to_currency)
+        return [
+            cls._round_amount(Decimal(str(amount)) * rate, from_currency, to_currency)
+            if amount else Decimal('0.00')
+            for amount in amounts
+        ]
+    
+    @staticmethod
+    def _round_amount(converted, from_currency, to_currency):
         # Arrondir selon la devise de destination
         if to_currency in ['GNF']:
             # Devises sans centimes
@@ -227,6 +345,20 @@ class CurrencyService:
         except UserCurrency.DoesNotExist:
             return 'EUR'  # Devise par défaut
     
+    @classmethod
+    def get_request_currency(cls, request):
+        """
+        Devise de l'utilisateur de la requête, résolue une seule fois
+        (request.user_currency est posé par UserCurrencyMiddleware)
+        """
+        if request is None:
+            return 'EUR'
+        currency = getattr(request, 'user_currency', None)
+        if currency is None:
+            currency = cls.get_user_currency(request.user)
+            request.user_currency = currency
+        return str(currency)
+    
     @classmethod
     def convert_for_cinetpay(cls, amount, from_currency):
         """
@@ -255,31 +387,70 @@ class CurrencyService:
         return converted_amount, user_currency, formatted_amount
     
     @classmethod
-    def refresh_all_rates(cls):
+    def build_rate_matrix(cls, base_rates, currencies):
+        """
+        Dérive tous les taux croisés à partir d'une table basée sur une
+        seule devise : taux(A→B) = taux(base→B) / taux(base→A)
+        Retourne {(A, B): Decimal} pour toutes les paires A ≠ B connues
+        """
+        known = [currency for currency in currencies if base_rates.get(currency)]
+        matrix = {}
+        for base in known:
+            for target in known:
+                if base != target:
+                    rate = base_rates[target] / base_rates[base]
+                    matrix[(base, target)] = rate.quantize(cls.RATE_PRECISION)
+        return matrix
+    
+    @classmethod
+    def refresh_all_rates(cls, timings=None):
         """
         Rafraîchit tous les taux de change en base
-        À utiliser dans une tâche cron
+        À utiliser dans une tâche cron (commande refresh_exchange_rates)
+        
+        Une seule requête HTTP (table basée sur REFERENCE_CURRENCY), la
+        matrice complète des devises supportées est dérivée puis écrite en
+        une transaction ; le cache est ensuite remplacé d'un bloc.
+        `timings` (dict optionnel) reçoit la durée de chaque étape.
         """
-        currencies = ['EUR', 'USD', 'XOF', 'XAF', 'GNF', 'GBP', 'CAD']
-        updated_count = 0
+        from .models import UserCurrency
+        timings = {} if timings is None else timings
         
-        for base in currencies:
-            for target in currencies:
-                if base != target:
-                    try:
-                        rate = cls._fetch_rate_from_api(base, target)
-                        if rate:
-                            ExchangeRate.objects.update_or_create(
-                                base_currency=base,
-                                target_currency=target,
-                                defaults={'rate': rate}
-                            )
-                            updated_count += 1
-                    except Exception as e:
-                        logger.error(f"Erreur refresh rate {base}->{target}: {e}")
+        started = time.monotonic()
+        base_rates = cls._fetch_rates_from_api(cls.REFERENCE_CURRENCY)
+        timings['fetch'] = time.monotonic() - started
+        if not base_rates:
+            logger.error("Rafraîchissement des taux impossible: API indisponible")
+            return 0
+        base_rates[cls.REFERENCE_CURRENCY] = Decimal('1')
+        
+        currencies = [code for code, _ in UserCurrency.CURRENCY_CHOICES]
+        missing = [code for code in currencies if code not in base_rates]
+        if missing:
+            logger.warning(f"Devises absentes de la réponse API: {', '.join(missing)}")
+        
+        started = time.monotonic()
+        matrix = cls.build_rate_matrix(base_rates, currencies)
+        now = timezone.now()
+        with transaction.atomic():
+            ExchangeRate.objects.bulk_create(
+                [
+                    ExchangeRate(base_currency=base, target_currency=target, rate=rate, last_updated=now)
+                    for (base, target), rate in matrix.items()
+                ],
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['base_currency', 'target_currency'],
+                update_fields=['rate', 'last_updated'],
+            )
+        timings['write'] = time.monotonic() - started
+        
+        started = time.monotonic()
+        cls.prime_rate_cache()
+        timings['cache'] = time.monotonic() - started
         
-        logger.info(f"Rafraîchi {updated_count} taux de change")
-        return updated_count
+        logger.info(f"Rafraîchi {len(matrix)} taux de change")
+        return len(matrix)
     
     @classmethod
     def get_currencies_for_template(cls):
@@ -0,0 +1,127 @@
+"""
+Faux serveur CinetPay pour les tests (HTTP local, dans un thread)
+
+Sert les routes appelées par cinetpay_utils :
+
+- POST /v1/oauth/login : jeton d'accès (API v1)
+- GET  /v1/payment/<identifiant> : statut d'un paiement gaming (« status »)
+- POST /v2/payment/check : statut d'un paiement boutique (« data.payment_status »)
+
+server.payments[identifiant] fixe le statut renvoyé : 'SUCCESS', 'FAILED'
+ou 'PENDING' (ACCEPTED / REFUSED / PENDING côté v2) ; un identifiant inconnu
+est en attente. server.fail_next = n fait échouer les n prochaines
+vérifications (HTTP 500), server.requests garde la liste des appels reçus.
+
+    with fake_cinetpay() as server:
+        server.payments['BLZ123'] = 'SUCCESS'
+        ...
+"""
+import json
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.test.utils import override_settings
+
+ACCESS_TOKEN = 'fake-cinetpay-token'
+V2_STATUSES = {'SUCCESS': 'ACCEPTED', 'FAILED': 'REFUSED'}
+
+
+class FakeCinetPayServer:
+    def __init__(self):
+        self.payments = {}
+        self.fail_next = 0
+        self.requests = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-cinetpay', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def verifications(self):
+        """Appels de vérification reçus (hors authentification)"""
+        return [path for method, path in self.requests if '/oauth/' not in path]
+
+    def _should_fail(self):
+        with self._lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return True
+        return False
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def do_POST(self):
+                server.requests.append(('POST', self.path))
+                body = self._body()
+                if self.path == '/v1/oauth/login':
+                    self._send(200, {'status': 'OK', 'access_token': ACCESS_TOKEN})
+                elif self.path == '/v2/payment/check':
+                    if server._should_fail():
+                        return self._send(500, {'message': 'Erreur simulée'})
+                    status = server.payments.get(body.get('transaction_id'), 'PENDING')
+                    self._send(200, {'code': '00', 'data': {'payment_status': V2_STATUSES.get(status, status)}})
+                else:
+                    self._send(404, {'message': 'Not found'})
+
+            def do_GET(self):
+                server.requests.append(('GET', self.path))
+                if not self.path.startswith('/v1/payment/'):
+                    return self._send(404, {'message': 'Not found'})
+                if self.headers.get('Authorization') != f'Bearer {ACCESS_TOKEN}':
+                    return self._send(401, {'message': 'Unauthorized'})
+                if server._should_fail():
+                    return self._send(500, {'message': 'Erreur simulée'})
+                identifier = self.path[len('/v1/payment/'):]
+                self._send(200, {'status': server.payments.get(identifier, 'PENDING')})
+
+        return Handler
+
+
+@contextmanager
+def fake_cinetpay():
+    """Démarre le faux serveur et pointe les réglages CinetPay dessus"""
+    server = FakeCinetPayServer().start()
+    settings = override_settings(
+        CINETPAY_API_BASE_URL=server.url,
+        CINETPAY_CHECKOUT_BASE_URL=f'{server.url}/v2',
+        CINETPAY_ACCOUNT_KEY='fake-key',
+        CINETPAY_ACCOUNT_PASSWORD='fake-password',
+        CINETPAY_API_KEY='fake-key',
+        CINETPAY_SITE_ID='000000',
+    )
+    try:
+        with settings:
+            yield server
+    finally:
+        server.stop()
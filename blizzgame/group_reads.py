@@ -0,0 +1,61 @@
+"""
+État de lecture des groupes (watermark par membre)
+
+Au lieu d'une ligne GroupMessageRead par (message, membre), chaque
+GroupMembership garde le dernier message lu (last_read_message_at /
+last_read_message). Un message est lu par un membre si sa date est
+inférieure ou égale au watermark : le stockage est en O(membres) et le
+nombre de non lus est une seule comparaison sur l'index
+(group, created_at, id) des messages.
+
+Sans watermark (membre n'ayant encore rien lu), les messages postérieurs à
+son arrivée dans le groupe sont non lus.
+"""
+import logging
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from .models import GroupMembership, GroupMessage
+
+logger = logging.getLogger(__name__)
+
+
+def mark_read(membership, message):
+    """
+    Avance le watermark jusqu'à `message` (jamais en arrière : UPDATE
+    conditionnel). Retourne True si le watermark a bougé.
+    """
+    if message is None:
+        return False
+    updated = GroupMembership.objects.filter(pk=membership.pk).filter(
+        Q(last_read_message_at__isnull=True) | Q(last_read_message_at__lt=message.created_at)
+    ).update(last_read_message_at=message.created_at, last_read_message=message)
+    if updated:
+        membership.last_read_message_at = message.created_at
+        membership.last_read_message_id = message.id
+    return bool(updated)
+
+
+def unread_messages(membership):
+    """Messages non lus du membre (hors les siens), ordre chronologique"""
+    watermark = membership.last_read_message_at or membership.joined_at
+    return GroupMessage.objects.filter(
+        group_id=membership.group_id, created_at__gt=watermark
+    ).exclude(sender_id=membership.user_id).order_by('created_at', 'id')
+
+
+def unread_count_subquery():
+    """COUNT corrélé des messages non lus, à annoter sur une requête GroupMembership"""
+    watermark = Coalesce(OuterRef('last_read_message_at'), OuterRef('joined_at'))
+    counts = GroupMessage.objects.filter(
+        group=OuterRef('group'), created_at__gt=watermark
+    ).exclude(
+        sender=OuterRef('user')
+    ).order_by().values('group').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def readers(message):
+    """Membres actifs ayant lu le message (accusés de lecture)"""
+    return GroupMembership.objects.filter(
+        group_id=message.group_id, is_active=True, last_read_message_at__gte=message.created_at
+    ).exclude(user_id=message.sender_id).select_related('user')
@@ -0,0 +1,90 @@
+"""
+Compteurs d'engagement dénormalisés des Highlights
+
+Les vues, commentaires et appréciations (par niveau) sont stockés directement
+sur Highlight et mis à jour de façon atomique avec des expressions F(), pour
+éviter les requêtes COUNT répétées dans le feed.
+"""
+import logging
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from .models import Highlight, HighlightAppreciation, HighlightComment, HighlightView
+
+logger = logging.getLogger(__name__)
+
+APPRECIATION_LEVELS = range(1, 7)
+
+
+def appreciation_field(level):
+    """Nom du champ compteur pour un niveau d'appréciation donné"""
+    return f'appreciation_level_{level}_count'
+
+
+COUNTER_FIELDS = ['views_count', 'comments_count'] + [
+    appreciation_field(level) for level in APPRECIATION_LEVELS
+]
+
+
+def bump_counters(highlight_id, **deltas):
+    """
+    Applique des incréments atomiques sur les compteurs d'un highlight.
+    Ex: bump_counters(h.id, comments_count=1, appreciation_level_3_count=-1)
+    """
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not updates:
+        return 0
+    return Highlight.objects.filter(pk=highlight_id).update(**updates)
+
+
+def _count_subquery(model, **filters):
+    """Sous-requête COUNT corrélée sur highlight_id (évite le produit cartésien des JOIN)"""
+    counts = model.objects.filter(
+        highlight=OuterRef('pk'), **filters
+    ).order_by().values('highlight').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def rebuild_highlight_counters(queryset=None, batch_size=500):
+    """
+    Recalcule tous les compteurs depuis les tables sources
+    (HighlightView, HighlightComment, HighlightAppreciation).
+    Retourne le nombre de highlights corrigés.
+    """
+    if queryset is None:
+        queryset = Highlight.objects.all()
+
+    annotations = {
+        'real_views': _count_subquery(HighlightView),
+        'real_comments': _count_subquery(HighlightComment),
+    }
+    for level in APPRECIATION_LEVELS:
+        annotations[f'real_level_{level}'] = _count_subquery(
+            HighlightAppreciation, appreciation_level=level
+        )
+
+    fixed = []
+    fixed_count = 0
+    for highlight in queryset.order_by().annotate(**annotations).iterator(chunk_size=batch_size):
+        expected = {
+            'views_count': highlight.real_views,
+            'comments_count': highlight.real_comments,
+        }
+        for level in APPRECIATION_LEVELS:
+            expected[appreciation_field(level)] = getattr(highlight, f'real_level_{level}')
+
+        if any(getattr(highlight, field) != value for field, value in expected.items()):
+            for field, value in expected.items():
+                setattr(highlight, field, value)
+            fixed.append(highlight)
+
+        if len(fixed) >= batch_size:
+            Highlight.objects.bulk_update(fixed, COUNTER_FIELDS)
+            fixed_count += len(fixed)
+            fixed = []
+
+    if fixed:
+        Highlight.objects.bulk_update(fixed, COUNTER_FIELDS)
+        fixed_count += len(fixed)
+
+    logger.info(f"Compteurs Highlights reconstruits: {fixed_count} highlights corrigés")
+    return fixed_count
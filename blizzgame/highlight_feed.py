@@ -0,0 +1,375 @@
+"""
+Feed « Pour toi » matérialisé des Highlights
+
+Chaque utilisateur actif possède une liste de candidats classés
+(HighlightFeedEntry) et un état d'affinités (HighlightFeedState) mis à jour
+de façon incrémentale par les signaux (nouveau highlight, appréciation,
+commentaire, abonnement). Les API lisent cette liste avec un curseur opaque
+(pagination par clé) au lieu d'OFFSET + COUNT, ce qui garde un coût constant
+quelle que soit la profondeur de scroll.
+"""
+import base64
+import json
+import logging
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import (
+    Highlight, HighlightAppreciation, HighlightComment, HighlightFeedEntry,
+    HighlightFeedState, HighlightHashtag, UserSubscription,
+)
+
+logger = logging.getLogger(__name__)
+
+# Nombre maximum de candidats conservés par utilisateur
+FEED_SIZE = 500
+# Un utilisateur est « actif » s'il a lu son feed durant cette période
+ACTIVE_FEED_DAYS = 7
+# Évite une écriture à chaque page pour mettre à jour last_read_at
+LAST_READ_RESOLUTION = timedelta(hours=1)
+
+# Pondérations du classement (même logique que l'ancien algorithme de découverte)
+TOP_HASHTAGS = 5
+TOP_AUTHORS = 10
+SCORE_HASHTAG = 5
+SCORE_INTERACTION = 3
+SCORE_SUBSCRIPTION = 4
+
+ENTRY_ORDERING = ('score', 'highlight_created_at', 'highlight_id')
+CHRONO_ORDERING = ('created_at', 'id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# ===== CURSEURS OPAQUES =====
+
+def encode_cursor(kind, values):
+    """Encode un curseur opaque (type + valeurs de la clé de tri)"""
+    payload = {'k': kind, 'v': [_serialize(v) for v in values]}
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Décode un curseur; retourne (kind, values) ou lève InvalidCursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return payload['k'], payload['v']
+    except Exception:
+        raise InvalidCursor('Curseur invalide')
+
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _keyset_filter(fields, values, after=True):
+    """
+    Construit le filtre de pagination par clé pour un tri décroissant sur `fields`.
+    after=True : éléments situés après la clé; after=False : éléments situés avant.
+    """
+    lookup = 'lt' if after else 'gt'
+    condition = Q()
+    for i, field in enumerate(fields):
+        clause = Q(**{f'{field}__{lookup}': values[i]})
+        for previous_field, previous_value in zip(fields[:i], values[:i]):
+            clause &= Q(**{previous_field: previous_value})
+        condition |= clause
+    return condition
+
+
+def _entry_key(entry):
+    return (entry.score, entry.highlight_created_at, entry.highlight_id)
+
+
+def _chrono_key(highlight):
+    return (highlight.created_at, highlight.id)
+
+
+def _parse_values(kind, values):
+    try:
+        if kind == 'r':
+            return (int(values[0]), datetime.fromisoformat(values[1]), uuid.UUID(values[2]))
+        if kind == 'c':
+            return (datetime.fromisoformat(values[0]), uuid.UUID(values[1]))
+    except (TypeError, ValueError, IndexError):
+        pass
+    raise InvalidCursor('Curseur invalide')
+
+
+# ===== AFFINITÉS ET SCORE =====
+
+def _top_keys(affinity, limit):
+    return {key for key, count in Counter(affinity).most_common(limit)}
+
+
+def score_highlight(highlight, top_hashtags, top_authors, subscribed_ids):
+    score = 0
+    if top_hashtags and any(tag.lower() in top_hashtags for tag in (highlight.hashtags or [])):
+        score += SCORE_HASHTAG
+    if str(highlight.author_id) in top_authors:
+        score += SCORE_INTERACTION
+    if highlight.author_id in subscribed_ids:
+        score += SCORE_SUBSCRIPTION
+    return score
+
+
+def _initial_affinities(user):
+    """Calcule les affinités de départ depuis l'historique (uniquement à la création de l'état)"""
+    hashtag_counts = Counter()
+    rows = HighlightHashtag.objects.filter(highlight__appreciations__user=user).values('tag').annotate(total=Count('pk'))
+    for row in rows:
+        hashtag_counts[row['tag']] += row['total']
+
+    author_counts = Counter()
+    for model in (HighlightAppreciation, HighlightComment):
+        rows = model.objects.filter(user=user).values('highlight__author').annotate(total=Count('pk'))
+        for row in rows:
+            author_counts[str(row['highlight__author'])] += row['total']
+
+    return dict(hashtag_counts), dict(author_counts)
+
+
+def get_feed_state(user):
+    state = HighlightFeedState.objects.filter(user=user).first()
+    if state is None:
+        hashtag_affinity, author_affinity = _initial_affinities(user)
+        state, _ = HighlightFeedState.objects.get_or_create(
+            user=user,
+            defaults={
+                'hashtag_affinity': hashtag_affinity,
+                'author_affinity': author_affinity,
+                'is_stale': True,
+            }
+        )
+    elif state.last_read_at < timezone.now() - timedelta(days=ACTIVE_FEED_DAYS):
+        # Utilisateur inactif : les nouveaux highlights n'ont pas été insérés dans son classement
+        state.is_stale = True
+    return state
+
+
+def refresh_user_feed(state):
+    """
+    Met à jour le classement d'un utilisateur par fusion : ajoute les nouveaux
+    candidats, re-score ceux qui changent et retire les highlights expirés.
+    """
+    user = state.user
+    now = timezone.now()
+    top_hashtags = _top_keys(state.hashtag_affinity, TOP_HASHTAGS)
+    top_authors = _top_keys(state.author_affinity, TOP_AUTHORS)
+    subscribed_ids = set(user.subscriptions.values_list('subscribed_to_id', flat=True))
+
+    candidates = Highlight.objects.filter(
+        is_active=True,
+        expires_at__gt=now
+    ).only('id', 'author_id', 'hashtags', 'created_at').order_by('-created_at')[:FEED_SIZE]
+
+    desired = {
+        h.id: (score_highlight(h, top_hashtags, top_authors, subscribed_ids), h.created_at)
+        for h in candidates
+    }
+    existing = {entry.highlight_id: entry for entry in HighlightFeedEntry.objects.filter(user=user)}
+
+    to_create, to_update = [], []
+    for highlight_id, (score, created_at) in desired.items():
+        entry = existing.get(highlight_id)
+        if entry is None:
+            to_create.append(HighlightFeedEntry(
+                user=user, highlight_id=highlight_id, score=score, highlight_created_at=created_at
+            ))
+        elif entry.score != score:
+            entry.score = score
+            to_update.append(entry)
+    stale_ids = [highlight_id for highlight_id in existing if highlight_id not in desired]
+
+    with transaction.atomic():
+        if stale_ids:
+            HighlightFeedEntry.objects.filter(user=user, highlight_id__in=stale_ids).delete()
+        if to_update:
+            HighlightFeedEntry.objects.bulk_update(to_update, ['score'], batch_size=500)
+        if to_create:
+            HighlightFeedEntry.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+        state.is_stale = False
+        state.built_at = now
+        state.save(update_fields=['is_stale', 'built_at'])
+
+    return len(to_create), len(to_update), len(stale_ids)
+
+
+def _touch(state):
+    now = timezone.now()
+    if now - state.last_read_at > LAST_READ_RESOLUTION:
+        state.last_read_at = now
+        state.save(update_fields=['last_read_at'])
+
+
+# ===== MISES À JOUR INCRÉMENTALES (appelées par les signaux) =====
+
+def active_feed_states():
+    return HighlightFeedState.objects.filter(
+        last_read_at__gte=timezone.now() - timedelta(days=ACTIVE_FEED_DAYS)
+    )
+
+
+def add_highlight_to_feeds(highlight):
+    """Insère un nouveau highlight dans le classement de chaque utilisateur actif"""
+    subscriber_ids = set(UserSubscription.objects.filter(
+        subscribed_to_id=highlight.author_id
+    ).values_list('subscriber_id', flat=True))
+
+    entries = []
+    for state in active_feed_states().only('user_id', 'hashtag_affinity', 'author_affinity'):
+        top_hashtags = _top_keys(state.hashtag_affinity, TOP_HASHTAGS)
+        top_authors = _top_keys(state.author_affinity, TOP_AUTHORS)
+        subscribed = {highlight.author_id} if state.user_id in subscriber_ids else set()
+        entries.append(HighlightFeedEntry(
+            user_id=state.user_id,
+            highlight_id=highlight.id,
+            score=score_highlight(highlight, top_hashtags, top_authors, subscribed),
+            highlight_created_at=highlight.created_at,
+        ))
+
+    HighlightFeedEntry.objects.bulk_create(entries, batch_size=1000, ignore_conflicts=True)
+    return len(entries)
+
+
+def record_interaction(user_id, highlight, include_hashtags=True):
+    """Met à jour les affinités d'un utilisateur après une appréciation ou un commentaire"""
+    with transaction.atomic():
+        state = HighlightFeedState.objects.select_for_update().filter(user_id=user_id).first()
+        if state is None:
+            return
+        if include_hashtags:
+            for tag in highlight.hashtags or []:
+                tag = tag.lower()
+                state.hashtag_affinity[tag] = state.hashtag_affinity.get(tag, 0) + 1
+        author_key = str(highlight.author_id)
+        state.author_affinity[author_key] = state.author_affinity.get(author_key, 0) + 1
+        state.is_stale = True
+        state.save(update_fields=['hashtag_affinity', 'author_affinity', 'is_stale'])
+
+
+def mark_feed_stale(user_id):
+    HighlightFeedState.objects.filter(user_id=user_id).update(is_stale=True)
+
+
+# ===== LECTURE =====
+
+def _base_highlights():
+    return Highlight.objects.filter(
+        is_active=True,
+        expires_at__gt=timezone.now()
+    ).select_related('author', 'author__profile')
+
+
+def _page(queryset, limit, kind, key):
+    """Découpe limit + 1 éléments pour savoir s'il reste une page"""
+    rows = list(queryset[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(kind, key(rows[-1])) if has_more and rows else None
+    return rows, next_cursor
+
+
+def _ranked_entries(user):
+    now = timezone.now()
+    return HighlightFeedEntry.objects.filter(
+        user=user,
+        highlight__is_active=True,
+        highlight__expires_at__gt=now,
+    ).select_related('highlight', 'highlight__author', 'highlight__author__profile')
+
+
+def _chronological(user, feed_type):
+    highlights = _base_highlights()
+    if feed_type == 'friends' and user.is_authenticated:
+        highlights = highlights.filter(
+            author__in=user.subscriptions.values_list('subscribed_to', flat=True)
+        )
+    return highlights
+
+
+def uses_ranked_feed(user, feed_type):
+    return feed_type == 'for_you' and user.is_authenticated
+
+
+def read_feed(user, feed_type='for_you', cursor=None, limit=5):
+    """
+    Retourne (highlights, next_cursor) pour une page du feed.
+    Le premier chargement (sans curseur) rafraîchit le classement s'il est périmé.
+    """
+    if uses_ranked_feed(user, feed_type):
+        state = get_feed_state(user)
+        if cursor is None and state.is_stale:
+            refresh_user_feed(state)
+        _touch(state)
+
+        entries = _ranked_entries(user).order_by(*[f'-{f}' for f in ENTRY_ORDERING])
+        if cursor:
+            kind, values = decode_cursor(cursor)
+            if kind != 'r':
+                raise InvalidCursor('Curseur invalide')
+            entries = entries.filter(_keyset_filter(ENTRY_ORDERING, _parse_values(kind, values)))
+        rows, next_cursor = _page(entries, limit, 'r', _entry_key)
+        return [entry.highlight for entry in rows], next_cursor
+
+    highlights = _chronological(user, feed_type).order_by(*[f'-{f}' for f in CHRONO_ORDERING])
+    if cursor:
+        kind, values = decode_cursor(cursor)
+        if kind != 'c':
+            raise InvalidCursor('Curseur invalide')
+        highlights = highlights.filter(_keyset_filter(CHRONO_ORDERING, _parse_values(kind, values)))
+    return _page(highlights, limit, 'c', _chrono_key)
+
+
+def read_context(user, target, feed_type='for_you', before=2, after=3):
+    """
+    Retourne (avant, après, next_cursor) autour d'un highlight cible, dans
+    l'ordre du feed de l'utilisateur. Le curseur permet de continuer le scroll
+    après le dernier élément renvoyé.
+    """
+    entry = None
+    if uses_ranked_feed(user, feed_type):
+        state = get_feed_state(user)
+        if state.is_stale:
+            refresh_user_feed(state)
+        _touch(state)
+        entry = HighlightFeedEntry.objects.filter(user=user, highlight=target).first()
+
+    if entry is not None:
+        key = _entry_key(entry)
+        entries = _ranked_entries(user)
+        previous_rows = entries.filter(
+            _keyset_filter(ENTRY_ORDERING, key, after=False)
+        ).order_by(*ENTRY_ORDERING)[:before]
+        next_rows, next_cursor = _page(
+            entries.filter(_keyset_filter(ENTRY_ORDERING, key)).order_by(*[f'-{f}' for f in ENTRY_ORDERING]),
+            after, 'r', _entry_key
+        )
+        return (
+            [e.highlight for e in reversed(list(previous_rows))],
+            [e.highlight for e in next_rows],
+            next_cursor,
+        )
+
+    # Highlight hors classement (ou feed chronologique) : contexte par date
+    key = _chrono_key(target)
+    highlights = _chronological(user, feed_type)
+    previous_rows = highlights.filter(
+        _keyset_filter(CHRONO_ORDERING, key, after=False)
+    ).order_by(*CHRONO_ORDERING)[:before]
+    next_rows, next_cursor = _page(
+        highlights.filter(_keyset_filter(CHRONO_ORDERING, key)).order_by(*[f'-{f}' for f in CHRONO_ORDERING]),
+        after, 'c', _chrono_key
+    )
+    return list(reversed(list(previous_rows))), next_rows, next_cursor
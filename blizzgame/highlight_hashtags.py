@@ -0,0 +1,98 @@
+"""
+Index inversé des hashtags des Highlights
+
+Chaque hashtag d'un highlight est stocké dans une ligne HighlightHashtag
+normalisée, ce qui permet des recherches exactes indexées (#ff ne correspond
+plus à #ffa) et des agrégations GROUP BY en SQL au lieu de boucles Python
+sur le JSONField.
+"""
+import logging
+from django.db.models import Count
+from django.utils import timezone
+from .models import Highlight, HighlightHashtag
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_hashtag(tag):
+    """Normalise un hashtag : minuscules, sans '#' ni espaces"""
+    return (tag or '').strip().lstrip('#').lower()[:100]
+
+
+def normalized_hashtags(hashtags):
+    """Liste dédoublonnée des hashtags normalisés (ordre conservé)"""
+    tags = []
+    for tag in hashtags or []:
+        tag = normalize_hashtag(tag)
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def sync_highlight_hashtags(highlight):
+    """Synchronise l'index avec le JSONField hashtags d'un highlight"""
+    desired = set(normalized_hashtags(highlight.hashtags))
+    existing = set(highlight.hashtag_index.values_list('tag', flat=True))
+
+    removed = existing - desired
+    if removed:
+        highlight.hashtag_index.filter(tag__in=removed).delete()
+
+    added = desired - existing
+    if added:
+        HighlightHashtag.objects.bulk_create(
+            [HighlightHashtag(tag=tag, highlight=highlight, created_at=highlight.created_at) for tag in added],
+            ignore_conflicts=True,
+        )
+    return len(added), len(removed)
+
+
+def backfill_hashtag_index(queryset=None, batch_size=1000):
+    """Indexe les hashtags des highlights existants (idempotent)"""
+    if queryset is None:
+        queryset = Highlight.objects.all()
+
+    rows = []
+    indexed = 0
+    for highlight_id, hashtags, created_at in queryset.values_list('id', 'hashtags', 'created_at').iterator(chunk_size=batch_size):
+        for tag in normalized_hashtags(hashtags):
+            rows.append(HighlightHashtag(tag=tag, highlight_id=highlight_id, created_at=created_at))
+        if len(rows) >= batch_size:
+            HighlightHashtag.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+            indexed += len(rows)
+            rows = []
+
+    if rows:
+        HighlightHashtag.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+        indexed += len(rows)
+
+    logger.info(f"Index des hashtags: {indexed} entrées traitées")
+    return indexed
+
+
+# ===== REQUÊTES =====
+
+def active_hashtag_entries():
+    return HighlightHashtag.objects.filter(
+        highlight__is_active=True,
+        highlight__expires_at__gt=timezone.now()
+    )
+
+
+def highlights_with_hashtag(queryset, tag):
+    """Filtre un queryset de highlights sur un hashtag exact (via l'index)"""
+    return queryset.filter(
+        id__in=HighlightHashtag.objects.filter(tag=normalize_hashtag(tag)).values('highlight_id')
+    )
+
+
+def popular_hashtags(since=None, limit=10, min_count=1, active_only=True):
+    """Hashtags les plus utilisés : [{'tag': ..., 'count': ...}] (GROUP BY SQL)"""
+    entries = active_hashtag_entries() if active_only else HighlightHashtag.objects.all()
+    if since is not None:
+        entries = entries.filter(created_at__gte=since)
+    rows = entries.values('tag').annotate(count=Count('id')).filter(
+        count__gte=min_count
+    ).order_by('-count', 'tag')[:limit]
+    return [{'tag': row['tag'], 'count': row['count']} for row in rows]
+
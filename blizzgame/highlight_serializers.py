@@ -0,0 +1,95 @@
+"""
+Sérialisation groupée des Highlights
+
+Toutes les vues (JSON et templates) passent par ce module pour préparer une
+page de highlights : auteurs et avatars, appréciations et vues de l'utilisateur
+sont résolus en un nombre fixe de requêtes IN (...) quel que soit le nombre de
+highlights, et les compteurs sont lus depuis les colonnes dénormalisées.
+"""
+import logging
+from django.db.models import prefetch_related_objects
+from .models import HighlightAppreciation, HighlightView
+from . import image_variants
+
+logger = logging.getLogger(__name__)
+
+
+def load_viewer_state(highlights, viewer):
+    """
+    Retourne ({highlight_id: HighlightAppreciation}, {highlight_id vus})
+    pour l'utilisateur courant (2 requêtes, aucune pour un anonyme).
+    """
+    if viewer is None or not viewer.is_authenticated or not highlights:
+        return {}, set()
+
+    highlight_ids = [h.id for h in highlights]
+    appreciations = {
+        appreciation.highlight_id: appreciation
+        for appreciation in HighlightAppreciation.objects.filter(user=viewer, highlight_id__in=highlight_ids)
+    }
+    viewed = set(
+        HighlightView.objects.filter(user=viewer, highlight_id__in=highlight_ids).values_list('highlight_id', flat=True)
+    )
+    return appreciations, viewed
+
+
+def prepare_highlights(highlights, viewer):
+    """
+    Charge en bloc ce dont les templates et l'API ont besoin et l'attache à
+    chaque highlight : user_appreciation, is_viewed, appreciation_counts.
+    Les auteurs/profils déjà chargés par select_related ne sont pas relus.
+    """
+    highlights = list(highlights)
+    if not highlights:
+        return highlights
+
+    prefetch_related_objects(highlights, 'author__profile')
+    appreciations, viewed = load_viewer_state(highlights, viewer)
+
+    for highlight in highlights:
+        highlight.user_appreciation = appreciations.get(highlight.id)
+        highlight.is_viewed = highlight.id in viewed
+        highlight.appreciation_counts = highlight.get_appreciation_counts_by_level()
+    return highlights
+
+
+def author_avatar_url(user):
+    """URL de l'avatar d'un auteur (profil préchargé), ou None"""
+    try:
+        profile = user.profile
+    except Exception:
+        return None
+    if profile.profileimg_url:
+        return image_variants.variant_url(profile.profileimg_url, 'thumb')
+    return profile.profileimg.url if profile.profileimg else None
+
+
+def serialize_highlight(highlight):
+    """Dictionnaire JSON d'un highlight préparé par prepare_highlights"""
+    user_appreciation = getattr(highlight, 'user_appreciation', None)
+    return {
+        'id': str(highlight.id),
+        'video_url': highlight.video.url,
+        'caption': highlight.caption,
+        'hashtags': highlight.hashtags,
+        'author': {
+            'id': highlight.author.id,
+            'username': highlight.author.username,
+            'avatar': author_avatar_url(highlight.author)
+        },
+        'appreciations_count': highlight.appreciations_count,
+        'appreciation_counts': highlight.appreciation_counts,
+        'comments_count': highlight.comments_count,
+        'views_count': highlight.views_count,
+        'user_appreciation': {
+            'appreciation_level': user_appreciation.appreciation_level if user_appreciation else None
+        },
+        'is_viewed': highlight.is_viewed,
+        'created_at': highlight.created_at.strftime('%H:%M'),
+        'time_remaining': str(highlight.time_remaining) if highlight.time_remaining else None,
+    }
+
+
+def serialize_highlights(highlights, viewer):
+    """Sérialise une liste de highlights pour l'utilisateur courant (requêtes groupées)"""
+    return [serialize_highlight(highlight) for highlight in prepare_highlights(highlights, viewer)]
@@ -0,0 +1,176 @@
+"""
+Moteur de tendances des hashtags en continu
+
+Chaque vue, appréciation, commentaire ou publication ajoute un poids aux
+hashtags du highlight concerné. Les scores décroissent exponentiellement
+(demi-vie configurable) grâce à la « décroissance avant » : un événement du
+bucket t vaut poids * 2^((t - époque) / demi-vie), et on stocke le log2 de la
+somme. L'ordre des scores ne change donc pas avec le temps et le top-N se lit
+directement par l'index sur log_score, sans recalcul à chaque requête.
+
+Réglages (settings.py) :
+- TRENDING_HASHTAGS_HALF_LIFE_HOURS : demi-vie des scores (défaut 6h)
+- TRENDING_HASHTAGS_BUCKET_MINUTES : granularité temporelle des événements (défaut 5 min)
+"""
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest, Least, Log, Power
+from django.utils import timezone
+from .models import (
+    HashtagTrend, Highlight, HighlightAppreciation, HighlightComment, HighlightHashtag, HighlightView,
+)
+from .highlight_hashtags import normalized_hashtags
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+EVENT_WEIGHTS = {
+    'publish': 1,
+    'view': 1,
+    'comment': 2,
+    'appreciation': 3,
+}
+
+# En dessous de ce score décroissant, un hashtag est retiré de la table
+MIN_SCORE = 0.01
+
+
+def half_life_hours():
+    return getattr(settings, 'TRENDING_HASHTAGS_HALF_LIFE_HOURS', 6)
+
+
+def bucket_minutes():
+    return getattr(settings, 'TRENDING_HASHTAGS_BUCKET_MINUTES', 5)
+
+
+def _half_lives_since_epoch(when):
+    """Nombre de demi-vies écoulées entre l'époque et `when`"""
+    return (when - EPOCH).total_seconds() / 3600 / half_life_hours()
+
+
+def bucket_start(when):
+    """Début du bucket auquel appartient `when`"""
+    bucket_seconds = bucket_minutes() * 60
+    seconds = int((when - EPOCH).total_seconds()) // bucket_seconds * bucket_seconds
+    return EPOCH + timezone.timedelta(seconds=seconds)
+
+
+def event_log_weight(weight, when):
+    """log2 du poids d'un événement ramené à l'époque"""
+    return math.log2(weight) + _half_lives_since_epoch(bucket_start(when))
+
+
+def decayed_score(log_score, now=None):
+    """Score réel d'un hashtag à l'instant `now`"""
+    now = now or timezone.now()
+    return 2 ** (log_score - _half_lives_since_epoch(now))
+
+
+def _log_sum(log_value):
+    """Expression SQL log2(2^log_score + 2^log_value), stable numériquement"""
+    value = Value(log_value, output_field=FloatField())
+    high = Greatest(F('log_score'), value)
+    low = Least(F('log_score'), value)
+    return high + Log(Value(2.0), Value(1.0) + Power(Value(2.0), low - high))
+
+
+def record_hashtag_event(tags, event, when=None, count=1):
+    """Ajoute le poids d'un événement (répété `count` fois) à chacun des hashtags donnés"""
+    tags = normalized_hashtags(tags)
+    weight = EVENT_WEIGHTS.get(event, 0) * count
+    if not tags or weight <= 0:
+        return
+
+    try:
+        log_value = event_log_weight(weight, when or timezone.now())
+        existing = set(HashtagTrend.objects.filter(tag__in=tags).values_list('tag', flat=True))
+        if existing:
+            HashtagTrend.objects.filter(tag__in=existing).update(
+                log_score=_log_sum(log_value), updated_at=timezone.now()
+            )
+        for tag in tags:
+            if tag in existing:
+                continue
+            try:
+                with transaction.atomic():
+                    HashtagTrend.objects.create(tag=tag, log_score=log_value)
+            except IntegrityError:
+                # Inséré entre-temps par un autre processus : le poids s'ajoute à sa ligne
+                HashtagTrend.objects.filter(tag=tag).update(
+                    log_score=_log_sum(log_value), updated_at=timezone.now()
+                )
+    except Exception as e:
+        logger.error(f"Erreur mise à jour des tendances ({event}): {e}")
+
+
+def record_highlight_event(highlight_id, event, when=None, count=1):
+    """Ajoute un événement aux hashtags d'un highlight (lus depuis l'index)"""
+    tags = HighlightHashtag.objects.filter(highlight_id=highlight_id).values_list('tag', flat=True)
+    record_hashtag_event(list(tags), event, when, count)
+
+
+def top_hashtags(limit=10, now=None):
+    """Top-N des hashtags tendances : [{'tag': ..., 'score': ...}]"""
+    rows = HashtagTrend.objects.order_by('-log_score').values_list('tag', 'log_score')[:limit]
+    return [
+        {'tag': tag, 'score': round(decayed_score(log_score, now), 2)}
+        for tag, log_score in rows
+    ]
+
+
+def prune_trends(now=None):
+    """Supprime les hashtags dont le score a décru sous MIN_SCORE"""
+    threshold = math.log2(MIN_SCORE) + _half_lives_since_epoch(now or timezone.now())
+    deleted, _ = HashtagTrend.objects.filter(log_score__lt=threshold).delete()
+    return deleted
+
+
+def rebuild_trends(window_half_lives=10, now=None):
+    """
+    Recalcule la table des tendances depuis les événements sources
+    (publications, vues, appréciations, commentaires) des `window_half_lives`
+    dernières demi-vies. Retourne le nombre de hashtags conservés.
+    """
+    now = now or timezone.now()
+    since = now - timezone.timedelta(hours=half_life_hours() * window_half_lives)
+    now_offset = _half_lives_since_epoch(now)
+
+    sources = [
+        (Highlight.objects.filter(created_at__gte=since).values_list('id', 'created_at'), 'publish'),
+        (HighlightView.objects.filter(created_at__gte=since).values_list('highlight_id', 'created_at'), 'view'),
+        (HighlightAppreciation.objects.filter(created_at__gte=since).values_list('highlight_id', 'created_at'), 'appreciation'),
+        (HighlightComment.objects.filter(created_at__gte=since).values_list('highlight_id', 'created_at'), 'comment'),
+    ]
+
+    # Sommes relatives à `now` pour éviter les débordements
+    highlight_weights = defaultdict(float)
+    for queryset, event in sources:
+        weight = EVENT_WEIGHTS[event]
+        for highlight_id, created_at in queryset.iterator(chunk_size=2000):
+            highlight_weights[highlight_id] += weight * 2 ** (
+                _half_lives_since_epoch(bucket_start(created_at)) - now_offset
+            )
+
+    tag_weights = defaultdict(float)
+    entries = HighlightHashtag.objects.filter(highlight_id__in=list(highlight_weights)).values_list('highlight_id', 'tag')
+    for highlight_id, tag in entries.iterator(chunk_size=2000):
+        tag_weights[tag] += highlight_weights[highlight_id]
+
+    trends = [
+        HashtagTrend(tag=tag, log_score=math.log2(total) + now_offset)
+        for tag, total in tag_weights.items()
+        if total >= MIN_SCORE
+    ]
+    # Remplacement atomique : les lecteurs voient l'ancienne ou la nouvelle
+    # table, jamais une table vide (ni partielle en cas d'erreur)
+    with transaction.atomic():
+        HashtagTrend.objects.all().delete()
+        HashtagTrend.objects.bulk_create(trends, batch_size=1000)
+    logger.info(f"Tendances des hashtags reconstruites: {len(trends)} hashtags")
+    return len(trends)
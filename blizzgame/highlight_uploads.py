@@ -0,0 +1,493 @@
+"""
+Upload fractionné et reprenable des vidéos de Highlights, puis traitement en file
+
+Le client envoie la vidéo par morceaux (PUT avec l'en-tête
+« Content-Range: bytes <début>-<fin>/<total> »), ajoutés au fichier temporaire
+<HIGHLIGHT_UPLOAD_DIR>/<upload_id>.part. Après une coupure réseau, il demande
+l'offset déjà reçu (GET) et reprend à partir de là :
+
+- un morceau déjà reçu (renvoi après un timeout) est ignoré ;
+- un morceau qui laisserait un trou est refusé (OffsetMismatch, offset attendu) ;
+- un morceau tronqué garde les octets arrivés, le client reprend à l'offset.
+
+Une requête ne transporte qu'un morceau (CHUNK_SIZE proposé au client) : aucun
+worker web n'est bloqué pendant tout le transfert. Quand tous les octets sont
+arrivés, le fichier réassemblé est copié dans le stockage des médias
+(HighlightUpload.source, lisible par le worker sans disque partagé), le
+Highlight est créé inactif et l'upload passe en file (« queued »). Le worker
+(commande process_highlight_uploads) :
+
+- valide taille, durée et codec ;
+- avec ffmpeg (FFMPEG_BINARY / FFPROBE_BINARY) : rendu H.264 de largeur et de
+  débit plafonnés (faststart) et image d'aperçu ;
+- sans ffmpeg : validation seule en Python pur (lecture des boîtes MP4/MOV),
+  la vidéo d'origine est publiée telle quelle, sans aperçu ;
+- active le Highlight (expiration à 48 h à partir de la publication) et
+  supprime la source. Une vidéo refusée supprime le Highlight.
+
+Les morceaux d'un même upload doivent arriver sur le même disque
+(HIGHLIGHT_UPLOAD_DIR) : un seul service web, ou un répertoire partagé.
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import struct
+import subprocess
+import tempfile
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Highlight, HighlightUpload
+from . import highlight_feed, highlight_hashtags, highlight_trending
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024  # 100 Mo, comme la limite affichée au client
+CHUNK_SIZE = 1024 * 1024  # Taille de morceau proposée au client (réseaux mobiles)
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_DURATION = getattr(settings, 'HIGHLIGHT_MAX_DURATION', 60)  # secondes
+DURATION_TOLERANCE = 0.5
+ALLOWED_EXTENSIONS = {'.mp4', '.m4v', '.mov', '.avi'}
+# Codecs lisibles par les navigateurs, publiés sans transcodage (validation seule)
+PLAYABLE_CODECS = {'avc1', 'avc3', 'hvc1', 'hev1', 'av01', 'vp09'}
+
+RENDITION_WIDTH = 720
+VIDEO_BITRATE = '1500k'
+VIDEO_BUFSIZE = '3000k'
+AUDIO_BITRATE = '96k'
+MAX_RENDITION_SIZE = 30 * 1024 * 1024
+FFMPEG_TIMEOUT = 600
+
+HIGHLIGHT_LIFETIME = timedelta(hours=48)
+MAX_ATTEMPTS = 3
+PROCESSING_TIMEOUT = timedelta(minutes=30)  # Traitement interrompu (worker arrêté)
+UPLOAD_EXPIRY = timedelta(hours=24)  # Upload abandonné en cours de route
+
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(ValueError):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    def __init__(self, offset):
+        super().__init__(f'Morceau hors séquence, offset attendu : {offset}')
+        self.offset = offset
+
+
+class InvalidVideo(ValueError):
+    pass
+
+
+def _upload_dir():
+    directory = getattr(settings, 'HIGHLIGHT_UPLOAD_DIR', None) or os.path.join(tempfile.gettempdir(), 'highlight_uploads')
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def part_path(upload):
+    return os.path.join(_upload_dir(), f'{upload.id}.part')
+
+
+def _remove_part(upload):
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def _discard_source(upload):
+    if not upload.source:
+        return
+    try:
+        upload.source.delete(save=False)
+    except Exception as e:
+        logger.error(f"Erreur suppression source upload {upload.id}: {e}")
+
+
+def _binary(setting, default):
+    """Chemin de ffmpeg/ffprobe, None s'il est absent ou désactivé (réglage vide)"""
+    name = getattr(settings, setting, default)
+    return shutil.which(name) if name else None
+
+
+def upload_status(upload):
+    """Réponse JSON commune aux endpoints d'upload"""
+    return {
+        'upload_id': str(upload.id),
+        'status': upload.status,
+        'offset': upload.received_size,
+        'total_size': upload.total_size,
+        'chunk_size': CHUNK_SIZE,
+        'highlight_id': str(upload.highlight_id) if upload.highlight_id else None,
+        'error': upload.error,
+    }
+
+
+# ===== RÉCEPTION =====
+
+def start_upload(user, filename, total_size, caption=''):
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension not in ALLOWED_EXTENSIONS:
+        raise UploadError('Format vidéo non supporté')
+    if not 0 < total_size <= MAX_UPLOAD_SIZE:
+        raise UploadError('Fichier trop volumineux. Taille maximum : 100MB')
+
+    upload = HighlightUpload.objects.create(
+        author=user,
+        filename=os.path.basename(filename)[:255],
+        caption=caption[:500],
+        total_size=total_size
+    )
+    open(part_path(upload), 'wb').close()
+    return upload
+
+
+def parse_content_range(header):
+    match = _CONTENT_RANGE.match((header or '').strip())
+    if not match:
+        raise UploadError('En-tête Content-Range invalide')
+    start, end, total = map(int, match.groups())
+    if end < start or end >= total:
+        raise UploadError('En-tête Content-Range invalide')
+    return start, end, total
+
+
+def _read(stream, length):
+    """Lit au plus `length` octets (moins si la connexion a été coupée)"""
+    chunks, remaining = [], length
+    while remaining:
+        data = stream.read(min(remaining, 65536))
+        if not data:
+            break
+        chunks.append(data)
+        remaining -= len(data)
+    return b''.join(chunks)
+
+
+def write_chunk(upload, content_range, stream):
+    """Ajoute un morceau au fichier temporaire ; retourne l'upload à jour"""
+    start, end, total = parse_content_range(content_range)
+    if total != upload.total_size:
+        raise UploadError('Taille totale incohérente')
+    if end - start + 1 > MAX_CHUNK_SIZE:
+        raise UploadError('Morceau trop volumineux')
+
+    # Corps lu avant de verrouiller la ligne : le verrou ne dure pas le transfert
+    data = _read(stream, end - start + 1)
+
+    with transaction.atomic():
+        upload = HighlightUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.status != 'uploading':
+            return upload
+        if start > upload.received_size:
+            raise OffsetMismatch(upload.received_size)
+
+        received = start + len(data)
+        if received > upload.received_size:
+            with open(part_path(upload), 'r+b') as f:
+                f.seek(start)
+                f.write(data)
+            upload.received_size = received
+            if received == upload.total_size:
+                _queue(upload)
+            else:
+                upload.save(update_fields=['received_size', 'updated_at'])
+    return upload
+
+
+def upload_from_file(user, file, caption=''):
+    """Envoi classique en un seul formulaire : même file de traitement"""
+    upload = start_upload(user, file.name, file.size, caption)
+    with open(part_path(upload), 'wb') as f:
+        for chunk in file.chunks():
+            f.write(chunk)
+    with transaction.atomic():
+        upload.received_size = upload.total_size
+        _queue(upload)
+    return upload
+
+
+def _queue(upload):
+    """Fichier complet : source stockée, Highlight créé inactif, upload mis en file"""
+    path = part_path(upload)
+    os.truncate(path, upload.total_size)
+    with open(path, 'rb') as f:
+        upload.source.save(f'{upload.id}{os.path.splitext(upload.filename)[1].lower()}', File(f), save=False)
+    transaction.on_commit(lambda: _remove_part(upload))
+    hashtags = highlight_hashtags.normalized_hashtags(re.findall(r'#(\w+)', upload.caption.lower()))
+    upload.highlight = Highlight.objects.create(
+        author=upload.author,
+        video='',
+        caption=upload.caption,
+        hashtags=hashtags,
+        is_active=False
+    )
+    upload.status = 'queued'
+    upload.save(update_fields=['received_size', 'source', 'highlight', 'status', 'updated_at'])
+
+
+# ===== ANALYSE =====
+
+def _boxes(f, start, end):
+    """Boîtes ISO BMFF (MP4/MOV) entre start et end : (type, début du contenu, fin)"""
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        size, kind = struct.unpack('>I4s', f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            raise InvalidVideo('Conteneur vidéo corrompu')
+        yield kind.decode('latin-1'), offset + header, offset + size
+        offset += size
+
+
+def _child(f, box, kind):
+    if box is None:
+        return None
+    return next(((start, end) for name, start, end in _boxes(f, *box) if name == kind), None)
+
+
+def _probe_iso(path):
+    """Durée, codec et dimensions d'un MP4/MOV sans dépendance externe"""
+    with open(path, 'rb') as f:
+        top = {}
+        for kind, start, end in _boxes(f, 0, os.fstat(f.fileno()).st_size):
+            top.setdefault(kind, (start, end))
+        if 'ftyp' not in top or 'moov' not in top:
+            raise InvalidVideo('Format non supporté (MP4 ou MOV attendu)')
+
+        mvhd = _child(f, top['moov'], 'mvhd')
+        if mvhd is None:
+            raise InvalidVideo('Conteneur vidéo corrompu')
+        f.seek(mvhd[0])
+        if f.read(1) == b'\x01':
+            f.seek(mvhd[0] + 20)
+            timescale, duration = struct.unpack('>IQ', f.read(12))
+        else:
+            f.seek(mvhd[0] + 12)
+            timescale, duration = struct.unpack('>II', f.read(8))
+        if not timescale:
+            raise InvalidVideo('Conteneur vidéo corrompu')
+
+        for kind, start, end in _boxes(f, *top['moov']):
+            if kind != 'trak':
+                continue
+            mdia = _child(f, (start, end), 'mdia')
+            hdlr = _child(f, mdia, 'hdlr')
+            if hdlr is None:
+                continue
+            f.seek(hdlr[0] + 8)
+            if f.read(4) != b'vide':
+                continue
+            stsd = _child(f, _child(f, _child(f, mdia, 'minf'), 'stbl'), 'stsd')
+            if stsd is None:
+                continue
+            # Première entrée de stsd : taille, codec, puis champs VisualSampleEntry
+            f.seek(stsd[0] + 8)
+            entry = f.read(36)
+            if len(entry) < 36:
+                raise InvalidVideo('Conteneur vidéo corrompu')
+            width, height = struct.unpack('>HH', entry[32:36])
+            return {
+                'duration': duration / timescale,
+                'codec': entry[4:8].decode('latin-1'),
+                'width': width,
+                'height': height,
+            }
+    raise InvalidVideo('Aucune piste vidéo')
+
+
+def _probe_ffprobe(ffprobe, path):
+    result = subprocess.run(
+        [ffprobe, '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path],
+        capture_output=True, timeout=60
+    )
+    if result.returncode:
+        raise InvalidVideo('Vidéo illisible')
+    data = json.loads(result.stdout or b'{}')
+    video = next((s for s in data.get('streams', []) if s.get('codec_type') == 'video'), None)
+    if video is None:
+        raise InvalidVideo('Aucune piste vidéo')
+    duration = data.get('format', {}).get('duration') or video.get('duration') or 0
+    return {
+        'duration': float(duration),
+        'codec': video.get('codec_name', ''),
+        'width': video.get('width', 0),
+        'height': video.get('height', 0),
+    }
+
+
+def probe(path):
+    ffprobe = _binary('FFPROBE_BINARY', 'ffprobe')
+    return _probe_ffprobe(ffprobe, path) if ffprobe else _probe_iso(path)
+
+
+def validate(path, info, transcoding):
+    if os.path.getsize(path) > MAX_UPLOAD_SIZE:
+        raise InvalidVideo('Fichier trop volumineux')
+    if not 0 < info['duration'] <= MAX_DURATION + DURATION_TOLERANCE:
+        raise InvalidVideo(f"Durée invalide ({info['duration']:.0f} s, maximum {MAX_DURATION} s)")
+    if not transcoding and info['codec'] not in PLAYABLE_CODECS:
+        raise InvalidVideo(f"Codec non supporté ({info['codec']})")
+
+
+# ===== TRAITEMENT =====
+
+def _run(command):
+    result = subprocess.run(command, capture_output=True, timeout=FFMPEG_TIMEOUT)
+    if result.returncode:
+        error = result.stderr.decode(errors='replace').strip()
+        raise InvalidVideo(error[-200:] or 'Erreur ffmpeg')
+
+
+def _transcode(ffmpeg, source, workdir, info):
+    """Rendu H.264/AAC plafonné (largeur, débit) et image d'aperçu"""
+    video = os.path.join(workdir, 'video.mp4')
+    poster = os.path.join(workdir, 'poster.jpg')
+    scale = f"scale='min({RENDITION_WIDTH},iw)':-2"
+    _run([
+        ffmpeg, '-y', '-v', 'error', '-i', source,
+        '-map', '0:v:0', '-map', '0:a:0?', '-vf', scale,
+        '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '28',
+        '-maxrate', VIDEO_BITRATE, '-bufsize', VIDEO_BUFSIZE, '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-b:a', AUDIO_BITRATE, '-movflags', '+faststart', video
+    ])
+    _run([
+        ffmpeg, '-y', '-v', 'error', '-ss', f"{min(1.0, info['duration'] / 2):.2f}", '-i', source,
+        '-frames:v', '1', '-vf', scale, poster
+    ])
+    if os.path.getsize(video) > MAX_RENDITION_SIZE:
+        raise InvalidVideo('Vidéo trop volumineuse après conversion')
+    return video, poster
+
+
+def _publish(upload, video, poster, extension):
+    highlight = upload.highlight
+    if highlight is None:
+        raise InvalidVideo('Highlight supprimé pendant le traitement')
+
+    with open(video, 'rb') as f:
+        highlight.video.save(f'{highlight.id}{extension}', File(f), save=False)
+    if poster:
+        with open(poster, 'rb') as f:
+            highlight.poster.save(f'{highlight.id}.jpg', File(f), save=False)
+    published_at = timezone.now()
+    highlight.is_active = True
+    highlight.expires_at = published_at + HIGHLIGHT_LIFETIME
+
+    with transaction.atomic():
+        highlight.save(update_fields=['video', 'poster', 'is_active', 'expires_at'])
+        HighlightUpload.objects.filter(pk=upload.pk).update(status='ready', error='', source='', updated_at=published_at)
+        transaction.on_commit(lambda: highlight_feed.add_highlight_to_feeds(highlight))
+        # Tendances : la publication compte maintenant, pas à la mise en file
+        transaction.on_commit(lambda: highlight_trending.record_hashtag_event(highlight.hashtags, 'publish', published_at))
+
+
+def _fail(upload, error):
+    with transaction.atomic():
+        HighlightUpload.objects.filter(pk=upload.pk).update(
+            status='failed', error=error[:255], highlight=None, source='', updated_at=timezone.now()
+        )
+        if upload.highlight_id:
+            Highlight.objects.filter(pk=upload.highlight_id, is_active=False).delete()
+    _discard_source(upload)
+
+
+def claim_next():
+    """Prend la plus ancienne tâche en file (UPDATE conditionnel : un seul worker la traite)"""
+    while True:
+        upload = HighlightUpload.objects.filter(status='queued').order_by('updated_at').first()
+        if upload is None:
+            return None
+        claimed = HighlightUpload.objects.filter(pk=upload.pk, status='queued').update(
+            status='processing', attempts=F('attempts') + 1, updated_at=timezone.now()
+        )
+        if claimed:
+            upload.refresh_from_db()
+            return upload
+
+
+def process_upload(upload):
+    """Valide, convertit et publie ; retourne True si le Highlight est publié"""
+    ffmpeg = _binary('FFMPEG_BINARY', 'ffmpeg')
+    extension = os.path.splitext(upload.filename)[1].lower()
+    try:
+        with tempfile.TemporaryDirectory(dir=_upload_dir()) as workdir:
+            source = os.path.join(workdir, f'source{extension}')
+            with upload.source.open('rb') as src, open(source, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+
+            info = probe(source)
+            validate(source, info, transcoding=bool(ffmpeg))
+            if ffmpeg:
+                video, poster = _transcode(ffmpeg, source, workdir, info)
+                _publish(upload, video, poster, '.mp4')
+            else:
+                _publish(upload, source, None, extension)
+    except InvalidVideo as e:
+        logger.warning(f"Vidéo refusée (upload {upload.id}): {e}")
+        _fail(upload, str(e))
+        return False
+    except Exception as e:
+        logger.error(f"Erreur traitement upload {upload.id} (tentative {upload.attempts}): {e}")
+        if upload.attempts >= MAX_ATTEMPTS:
+            _fail(upload, 'Erreur lors du traitement de la vidéo')
+        else:
+            HighlightUpload.objects.filter(pk=upload.pk).update(
+                status='queued', error=str(e)[:255], updated_at=timezone.now()
+            )
+        return False
+
+    _discard_source(upload)
+    return True
+
+
+def recover_stale_uploads():
+    """
+    Remet en file les traitements interrompus (sauf ceux qui ont épuisé leurs
+    tentatives : une vidéo qui fait tomber le worker ne tourne pas en boucle)
+    et supprime les uploads abandonnés
+    """
+    now = timezone.now()
+    stale = HighlightUpload.objects.filter(status='processing', updated_at__lt=now - PROCESSING_TIMEOUT)
+    for upload in stale.filter(attempts__gte=MAX_ATTEMPTS):
+        logger.error(f"Upload {upload.id} abandonné après {upload.attempts} traitements interrompus")
+        _fail(upload, 'Erreur lors du traitement de la vidéo')
+    requeued = stale.filter(attempts__lt=MAX_ATTEMPTS).update(status='queued', updated_at=now)
+
+    abandoned = list(HighlightUpload.objects.filter(status='uploading', updated_at__lt=now - UPLOAD_EXPIRY))
+    for upload in abandoned:
+        _remove_part(upload)
+    HighlightUpload.objects.filter(pk__in=[upload.pk for upload in abandoned]).delete()
+    return requeued, len(abandoned)
+
+
+def process_pending(limit=10):
+    """Traite jusqu'à `limit` uploads en file ; retourne (publiés, refusés ou en échec)"""
+    recover_stale_uploads()
+    published = failed = 0
+    for _ in range(limit):
+        upload = claim_next()
+        if upload is None:
+            break
+        if process_upload(upload):
+            published += 1
+        else:
+            failed += 1
+    return published, failed
+
+
+def pending_uploads():
+    return HighlightUpload.objects.filter(status__in=['queued', 'processing']).count()
@@ -0,0 +1,218 @@
+"""
+Tampon d'écriture différée des vues de Highlights
+
+Les endpoints de vue n'écrivent plus en base : chaque événement (vue et durée)
+est ajouté à une liste Redis et la requête répond 204 immédiatement. Le
+flusher (commande flush_highlight_views) lit le tampon par lots, fait un
+upsert groupé des HighlightView et incrémente views_count par highlight.
+
+- Dédoublonnage : un même spectateur (utilisateur ou IP anonyme) n'est mis en
+  tampon qu'une fois par highlight pendant VIEW_DEDUP_TTL, sauf s'il envoie une
+  durée à mettre à jour.
+- Livraison au moins une fois : un lot n'est retiré du tampon qu'après son
+  traitement ; l'upsert est idempotent (vues existantes ignorées, durée = max)
+  et se fait sous verrou des highlights concernés : un lot rejoué ou traité en
+  parallèle ne compte donc jamais une vue deux fois.
+- Si Redis est indisponible, l'événement est écrit directement en base.
+"""
+import json
+import logging
+from collections import Counter
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django_redis import get_redis_connection
+from .highlight_counters import bump_counters
+from .models import Highlight, HighlightView
+from . import highlight_trending
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = f"{settings.CACHES['default'].get('KEY_PREFIX', 'blizz')}:highlight_views:buffer"
+LOCK_KEY = f"{BUFFER_KEY}:lock"
+VIEW_DEDUP_TTL = 6 * 60 * 60  # 6 heures
+FLUSH_BATCH_SIZE = 1000
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _dedup_key(highlight_id, user_id, ip_address):
+    viewer = f'u{user_id}' if user_id else f'ip{ip_address}'
+    return f'highlight_view_seen:{highlight_id}:{viewer}'
+
+
+def _parse_duration(duration):
+    try:
+        return max(float(duration or 0), 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def enqueue_view(highlight_id, user=None, ip_address=None, duration=0):
+    """
+    Ajoute un événement de vue au tampon. Retourne False si l'événement est
+    ignoré (doublon récent sans durée ou anonyme sans IP).
+    """
+    user_id = user.id if user is not None and user.is_authenticated else None
+    if not user_id and not ip_address:
+        return False
+
+    duration = _parse_duration(duration)
+    first_seen = cache.add(_dedup_key(highlight_id, user_id, ip_address), 1, VIEW_DEDUP_TTL)
+    # cache.add renvoie None si Redis est indisponible : on ne dédoublonne pas dans ce cas
+    if first_seen is False and not duration:
+        return False
+
+    event = {
+        'h': str(highlight_id),
+        'u': user_id,
+        'ip': ip_address,
+        'd': duration,
+        't': timezone.now().isoformat(),
+    }
+    try:
+        _redis().rpush(BUFFER_KEY, json.dumps(event))
+    except Exception as e:
+        logger.warning(f"Tampon des vues indisponible, écriture directe: {e}")
+        apply_view_events([event])
+    return True
+
+
+def _merge_events(events):
+    """Regroupe les événements par (highlight, spectateur) en gardant la durée max"""
+    merged = {}
+    for event in events:
+        user_id = event.get('u')
+        key = (event['h'], f'u{user_id}' if user_id else f"ip{event.get('ip')}")
+        current = merged.get(key)
+        if current is None:
+            merged[key] = dict(event)
+        else:
+            current['d'] = max(current.get('d') or 0, event.get('d') or 0)
+    return list(merged.values())
+
+
+def apply_view_events(events):
+    """
+    Upsert groupé des vues et incrément des compteurs (idempotent).
+    Retourne le nombre de nouvelles vues créées.
+    """
+    events = [event for event in _merge_events(events) if event.get('u') or event.get('ip')]
+    if not events:
+        return 0
+
+    highlight_ids = {event['h'] for event in events}
+    user_ids = {event['u'] for event in events if event.get('u')}
+    ips = {event['ip'] for event in events if not event.get('u')}
+
+    with transaction.atomic():
+        # Highlights concernés verrouillés (ordre fixe) avant de lire les vues
+        # existantes : un flush concurrent ou une écriture directe attend, la
+        # lecture est exacte et views_count n'augmente que des vues insérées.
+        # Les highlights supprimés ou désactivés entre-temps sont ignorés, de
+        # même que les vues d'utilisateurs supprimés avant le flush (sinon la
+        # clé étrangère ferait échouer tout le lot, rejoué indéfiniment).
+        live_ids = set(
+            str(pk) for pk in Highlight.objects.select_for_update().filter(
+                id__in=highlight_ids,
+                is_active=True
+            ).order_by('id').values_list('id', flat=True)
+        )
+        live_user_ids = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+
+        existing = {}
+        candidates = HighlightView.objects.filter(highlight_id__in=highlight_ids).filter(
+            Q(user_id__in=user_ids) | Q(user__isnull=True, ip_address__in=ips)
+        )
+        for view in candidates:
+            viewer = f'u{view.user_id}' if view.user_id else f'ip{view.ip_address}'
+            existing.setdefault((str(view.highlight_id), viewer), view)
+
+        to_create = []
+        to_update = []
+        for event in events:
+            viewer = f"u{event['u']}" if event.get('u') else f"ip{event['ip']}"
+            view = existing.get((event['h'], viewer))
+            if view is None:
+                to_create.append(HighlightView(
+                    highlight_id=event['h'],
+                    user_id=event.get('u'),
+                    ip_address=event.get('ip'),
+                    view_duration=event.get('d') or 0,
+                ))
+            elif (event.get('d') or 0) > (view.view_duration or 0):
+                view.view_duration = event['d']
+                to_update.append(view)
+
+        to_create = [
+            view for view in to_create
+            if str(view.highlight_id) in live_ids and (not view.user_id or view.user_id in live_user_ids)
+        ]
+
+        if to_create:
+            HighlightView.objects.bulk_create(to_create, ignore_conflicts=True)
+        if to_update:
+            HighlightView.objects.bulk_update(to_update, ['view_duration'])
+
+        new_views = Counter(str(view.highlight_id) for view in to_create)
+        for highlight_id, count in new_views.items():
+            bump_counters(highlight_id, views_count=count)
+
+    for highlight_id, count in new_views.items():
+        highlight_trending.record_highlight_event(highlight_id, 'view', count=count)
+    return len(to_create)
+
+
+def flush_view_buffer(batch_size=FLUSH_BATCH_SIZE, max_batches=None):
+    """
+    Vide le tampon par lots. Un lot n'est retiré (LTRIM) qu'une fois appliqué :
+    en cas d'erreur il reste en tête et sera rejoué au prochain passage.
+    Retourne (événements traités, vues créées).
+    """
+    conn = _redis()
+    processed = created = batches = 0
+
+    lock = conn.lock(LOCK_KEY, timeout=300, blocking_timeout=0)
+    if not lock.acquire(blocking=False):
+        logger.info("Flush des vues déjà en cours sur un autre worker")
+        return processed, created
+
+    try:
+        while max_batches is None or batches < max_batches:
+            raw_events = conn.lrange(BUFFER_KEY, 0, batch_size - 1)
+            if not raw_events:
+                break
+
+            events = []
+            for raw in raw_events:
+                try:
+                    events.append(json.loads(raw))
+                except (TypeError, ValueError):
+                    logger.error(f"Événement de vue illisible ignoré: {raw!r}")
+
+            created += apply_view_events(events)
+            conn.ltrim(BUFFER_KEY, len(raw_events), -1)
+            processed += len(raw_events)
+            batches += 1
+    finally:
+        try:
+            lock.release()
+        except Exception:
+            pass
+
+    if processed:
+        logger.info(f"Tampon des vues: {processed} événements traités, {created} nouvelles vues")
+    return processed, created
+
+
+def pending_views():
+    """Nombre d'événements en attente dans le tampon"""
+    try:
+        return _redis().llen(BUFFER_KEY)
+    except Exception:
+        return 0
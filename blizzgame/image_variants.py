@@ -0,0 +1,129 @@
+"""
+Normalisation des images et variantes responsives (Pillow)
+
+Chaque image envoyée par media_uploads est ré-encodée avant l'upload :
+orientation EXIF appliquée puis métadonnées supprimées (position GPS des
+photos de téléphone), conversion en WebP (JPEG si Pillow n'a pas WebP) et
+trois variantes de taille plafonnée (hauteur limitée au double de la
+largeur, jamais agrandies au-delà de l'image d'origine) :
+
+- thumb : 160 px (avatars, vignettes)
+- card  : 480 px (cartes des grilles d'annonces)
+- full  : 1600 px (page produit, bannières)
+
+Les noms sont déterministes (<sha256>-<largeur>x<hauteur>_<variante>.<ext>,
+dimensions de l'image d'origine) : l'URL d'une variante se déduit de celle de
+la variante full enregistrée en base (variant_url), et la largeur réelle de
+chaque variante (descripteur de srcset) se calcule à partir des dimensions,
+sans colonne supplémentaire. Les URLs d'anciens médias, qui ne suivent pas ce
+schéma, sont renvoyées telles quelles.
+"""
+import logging
+import re
+from io import BytesIO
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+logger = logging.getLogger(__name__)
+
+# Largeur maximale de chaque variante, de la plus petite à la plus grande
+VARIANTS = {
+    'thumb': 160,
+    'card': 480,
+    'full': 1600,
+}
+DEFAULT_VARIANT = 'full'
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+MAX_PIXELS = 50_000_000  # Refus des images démesurées (bombes de décompression)
+
+FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+EXTENSION = '.webp' if FORMAT == 'WEBP' else '.jpg'
+
+_VARIANT_URL = re.compile(r'_(%s)(\.(?:webp|jpg))(?=$|\?)' % '|'.join(VARIANTS))
+_DIMENSIONS = re.compile(r'-(\d+)x(\d+)_(?:%s)\.(?:webp|jpg)(?=$|\?)' % '|'.join(VARIANTS))
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def variant_name(base, variant):
+    return f'{base}_{variant}'
+
+
+def variant_size(width, height, variant):
+    """Dimensions de la variante `variant` d'une image width x height"""
+    limit = VARIANTS[variant]
+    scale = min(1, limit / width, 2 * limit / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _open(file):
+    file.seek(0)
+    try:
+        image = Image.open(file)
+        if image.width * image.height > MAX_PIXELS:
+            raise InvalidImage('Image trop grande')
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e))
+    finally:
+        file.seek(0)
+
+    # Orientation EXIF appliquée aux pixels (les métadonnées ne sont pas recopiées)
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    if FORMAT == 'WEBP' and has_alpha:
+        return image.convert('RGBA')
+    return image.convert('RGB')
+
+
+def _encode(image):
+    buffer = BytesIO()
+    if FORMAT == 'WEBP':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def render_variants(file, digest):
+    """
+    Retourne {variante: ContentFile} pour le fichier image `file`, nommés
+    <digest>-<largeur>x<hauteur>_<variante>.<ext>. Lève InvalidImage si le
+    fichier n'est pas une image lisible.
+    """
+    image = _open(file)
+    base = f'{digest}-{image.width}x{image.height}'
+    variants = {}
+    for variant in VARIANTS:
+        size = variant_size(image.width, image.height, variant)
+        resized = image.resize(size, Image.LANCZOS) if size != image.size else image
+        variants[variant] = ContentFile(_encode(resized), name=f'{variant_name(base, variant)}{EXTENSION}')
+    return variants
+
+
+def variant_url(url, variant):
+    """URL de la variante `variant` d'un média (inchangée pour un ancien média)"""
+    if not url or variant not in VARIANTS:
+        return url
+    return _VARIANT_URL.sub(lambda match: f'_{variant}{match.group(2)}', url, count=1)
+
+
+def srcset(url):
+    """
+    Attribut srcset (« <url> <largeur>w, ... ») avec la largeur réelle de
+    chaque variante, ou '' pour un ancien média. Une variante qui a la même
+    largeur qu'une plus petite (image d'origine étroite) n'est pas proposée.
+    """
+    match = _DIMENSIONS.search(url or '')
+    if not match:
+        return ''
+    width, height = int(match.group(1)), int(match.group(2))
+    if not width or not height:
+        return ''
+    candidates = {}
+    for variant in VARIANTS:
+        candidates.setdefault(variant_size(width, height, variant)[0], variant)
+    return ', '.join(f'{variant_url(url, variant)} {size}w' for size, variant in candidates.items())
@@ -0,0 +1,247 @@
+"""
+Recherche plein texte des annonces (marketplace)
+
+- PostgreSQL : colonne Post.search_vector (SearchVector pondéré titre/jeu/description)
+  indexée en GIN, avec la configuration « french_unaccent » (stemming français
+  + suppression des accents) créée par la migration 0108.
+- SQLite (développement local) : table virtuelle FTS5 blizzgame_post_fts avec
+  le tokenizer unicode61 remove_diacritics.
+
+Les résultats sont classés d'abord par priorité de disponibilité (comme le
+listing de l'accueil) puis par pertinence. L'index est maintenu à chaque
+sauvegarde d'annonce (signal) et peut être reconstruit avec la commande
+rebuild_listing_search_index.
+"""
+import logging
+import re
+import unicodedata
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from .marketplace_listing import PRIORITY_BANDS, listing_queryset
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'french_unaccent'
+FTS_TABLE = 'blizzgame_post_fts'
+SEARCH_LIMIT = 48
+AUTOCOMPLETE_LIMIT = 8
+# Nombre de candidats classés par pertinence avant le tri par disponibilité
+CANDIDATE_LIMIT = 500
+
+GAME_LABELS = dict(Post.GAME_CHOICES)
+
+
+def uses_postgres():
+    return connection.vendor == 'postgresql'
+
+
+def uses_fts5():
+    return connection.vendor == 'sqlite'
+
+
+def normalize(text):
+    """Minuscules sans accents (pour comparer les préfixes côté Python)"""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def search_terms(query):
+    """Découpe une requête utilisateur en mots sûrs (lettres/chiffres uniquement)"""
+    return re.findall(r'\w+', query or '')[:8]
+
+
+def _priority_expression():
+    return Case(
+        *[When(band_filter, then=Value(band)) for band, band_filter in PRIORITY_BANDS],
+        default=Value(len(PRIORITY_BANDS)),
+        output_field=IntegerField()
+    )
+
+
+# ===== MAINTENANCE DE L'INDEX =====
+
+def search_vector():
+    """Vecteur pondéré : titre et jeu (A), description (B)"""
+    game_label = Case(
+        *[When(game_type=key, then=Value(label)) for key, label in Post.GAME_CHOICES],
+        default=Value(''),
+    )
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(game_label, 'custom_game_name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('caption', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def _game_text(post):
+    return ' '.join(filter(None, [GAME_LABELS.get(post.game_type, ''), post.custom_game_name]))
+
+
+def index_posts(post_ids):
+    """Met à jour l'index de recherche des annonces données"""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+    if uses_postgres():
+        Post.objects.filter(pk__in=post_ids).update(search_vector=search_vector())
+        return
+    if not uses_fts5():
+        return
+
+    rows = [
+        (str(post.id), post.title or '', post.caption or '', _game_text(post))
+        for post in Post.objects.filter(pk__in=post_ids).only('id', 'title', 'caption', 'game_type', 'custom_game_name')
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE post_id = %s', [(str(pk),) for pk in post_ids])
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (post_id, title, caption, game) VALUES (%s, %s, %s, %s)', rows
+        )
+
+
+def remove_post(post_id):
+    """Retire une annonce de l'index (SQLite uniquement : la colonne PostgreSQL disparaît avec la ligne)"""
+    if not uses_fts5():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE post_id = %s', [str(post_id)])
+
+
+def rebuild_search_index(batch_size=1000):
+    """Reconstruit entièrement l'index de recherche. Retourne le nombre d'annonces indexées."""
+    if uses_postgres():
+        return Post.objects.update(search_vector=search_vector())
+    if not uses_fts5():
+        return 0
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    indexed = 0
+    ids = []
+    for post_id in Post.objects.values_list('id', flat=True).iterator(chunk_size=batch_size):
+        ids.append(post_id)
+        if len(ids) >= batch_size:
+            index_posts(ids)
+            indexed += len(ids)
+            ids = []
+    if ids:
+        index_posts(ids)
+        indexed += len(ids)
+    return indexed
+
+
+# ===== RECHERCHE =====
+
+def _fts_match(terms, prefix_last=False, columns=None):
+    """Expression MATCH FTS5 : mots entre guillemets, dernier mot en préfixe"""
+    parts = []
+    for i, term in enumerate(terms):
+        token = '"%s"' % term.replace('"', '')
+        if prefix_last and i == len(terms) - 1:
+            token += '*'
+        parts.append(token)
+    expression = ' '.join(parts)
+    if columns:
+        expression = '{%s} : (%s)' % (' '.join(columns), expression)
+    return expression
+
+
+def _fts_ranked_ids(terms, prefix_last=False, columns=None, limit=CANDIDATE_LIMIT):
+    """[(post_id, rang)] classés par bm25 (titre x10, jeu x5, description x1)"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT post_id, -bm25({FTS_TABLE}, 0, 10.0, 1.0, 5.0) AS rank FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s ORDER BY rank DESC LIMIT %s',
+            [_fts_match(terms, prefix_last, columns), limit]
+        )
+        return cursor.fetchall()
+
+
+def _pg_query(terms, prefix_last=False):
+    """tsquery brute : mots en ET, dernier mot en préfixe (:*)"""
+    parts = [term + (':*' if prefix_last and i == len(terms) - 1 else '') for i, term in enumerate(terms)]
+    return SearchQuery(' & '.join(parts), config=SEARCH_CONFIG, search_type='raw')
+
+
+def search_posts(query, filters=None, limit=SEARCH_LIMIT, prefix=True):
+    """
+    Recherche les annonces correspondant à `query`. Retourne une liste de posts
+    portant `priority` (disponibilité) et `search_rank`, triés par priorité
+    puis pertinence.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    queryset = listing_queryset()
+    if filters:
+        queryset = queryset.filter(filters)
+
+    if uses_postgres():
+        search_query = _pg_query(terms, prefix_last=prefix)
+        posts = list(
+            queryset.filter(search_vector=search_query).annotate(
+                search_rank=SearchRank(F('search_vector'), search_query),
+                priority=_priority_expression(),
+            ).order_by('priority', '-search_rank', '-created_at')[:limit]
+        )
+        return posts
+
+    if not uses_fts5():
+        # Autres moteurs : simple recherche sur le titre, sans classement
+        title_filter = Q()
+        for term in terms:
+            title_filter &= Q(title__icontains=term)
+        return list(queryset.filter(title_filter).annotate(priority=_priority_expression()).order_by('priority', '-created_at')[:limit])
+
+    ranks = dict(_fts_ranked_ids(terms, prefix_last=prefix))
+    if not ranks:
+        return []
+    posts = list(queryset.filter(pk__in=list(ranks)).annotate(priority=_priority_expression()))
+    for post in posts:
+        post.search_rank = ranks.get(str(post.id), 0)
+    posts.sort(key=lambda post: (post.priority, -post.search_rank, -post.created_at.timestamp()))
+    return posts[:limit]
+
+
+def autocomplete(prefix, limit=AUTOCOMPLETE_LIMIT):
+    """Suggestions de titres d'annonces disponibles et de noms de jeux pour un préfixe"""
+    terms = search_terms(prefix)
+    if not terms:
+        return {'titles': [], 'games': []}
+
+    available = PRIORITY_BANDS[0][1]
+    if uses_postgres():
+        search_query = _pg_query(terms, prefix_last=True)
+        titles = list(Post.objects.filter(available, search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-search_rank', '-created_at').values_list('title', flat=True)[:limit * 3])
+    elif uses_fts5():
+        ranked_ids = [post_id for post_id, rank in _fts_ranked_ids(terms, prefix_last=True, columns=['title'], limit=limit * 3)]
+        titles_by_id = {
+            str(pk): title
+            for pk, title in Post.objects.filter(available, pk__in=ranked_ids).values_list('id', 'title')
+        }
+        titles = [titles_by_id[post_id] for post_id in ranked_ids if post_id in titles_by_id]
+    else:
+        titles = list(Post.objects.filter(available, title__istartswith=terms[0]).values_list('title', flat=True)[:limit * 3])
+
+    custom_games = Post.objects.filter(
+        available, game_type='other', custom_game_name__istartswith=terms[0]
+    ).values_list('custom_game_name', flat=True).distinct()[:limit]
+
+    normalized_prefix = normalize(' '.join(terms))
+    games = [
+        label for label in GAME_LABELS.values()
+        if any(normalize(word).startswith(normalized_prefix) for word in [label] + label.split())
+    ]
+    for name in custom_games:
+        if name and name not in games:
+            games.append(name)
+
+    return {
+        'titles': list(dict.fromkeys(titles))[:limit],
+        'games': games[:limit],
+    }
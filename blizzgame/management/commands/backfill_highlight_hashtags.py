@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from blizzgame.models import Highlight
+from blizzgame.highlight_hashtags import backfill_hashtag_index
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = "Remplit l'index inversé des hashtags (HighlightHashtag) depuis le champ hashtags des Highlights existants"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Taille des lots pour bulk_create (défaut: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Highlight.objects.exclude(hashtags=[])
+
+        self.stdout.write(f'Indexation des hashtags de {queryset.count()} Highlights...')
+
+        try:
+            indexed = backfill_hashtag_index(queryset, batch_size=options['batch_size'])
+            self.stdout.write(
+                self.style.SUCCESS(f'[OK] {indexed} entrées d\'index traitées')
+            )
+        except Exception as e:
+            logger.error(f"Erreur backfill_highlight_hashtags: {e}")
+            self.stdout.write(
+                self.style.ERROR(f"Erreur lors de l'indexation des hashtags: {e}")
+            )
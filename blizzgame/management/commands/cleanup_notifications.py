@@ -2,59 +2,78 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
 from blizzgame.models import Notification
+from blizzgame.notification_inbox import ARCHIVE_BATCH_SIZE, archive_read_notifications
 
 class Command(BaseCommand):
-    help = 'Supprime les anciennes notifications (sauf chat et avertissements)'
+    help = 'Archive les notifications lues anciennes et supprime les anciennes notifications non lues (sauf chat et avertissements)'
 
     def add_arguments(self, parser):
         parser.add_argument(
             '--days',
             type=int,
             default=30,
-            help='Nombre de jours après lesquels supprimer les notifications (défaut: 30)'
+            help='Nombre de jours après lesquels archiver/supprimer les notifications (défaut: 30)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=ARCHIVE_BATCH_SIZE,
+            help=f'Nombre de notifications archivées par lot (défaut: {ARCHIVE_BATCH_SIZE})'
         )
         parser.add_argument(
             '--dry-run',
             action='store_true',
-            help='Affiche ce qui serait supprimé sans rien supprimer'
+            help='Affiche ce qui serait archivé/supprimé sans rien modifier'
         )
 
     def handle(self, *args, **options):
         days = options['days']
         dry_run = options['dry_run']
-        
+
         # Date limite
         cutoff_date = timezone.now() - timedelta(days=days)
-        
+
+        # Notifications lues : déplacées vers le stockage froid (ArchivedNotification)
+        archived = archive_read_notifications(cutoff_date, batch_size=options['batch_size'], dry_run=dry_run)
+        if dry_run:
+            self.stdout.write(
+                self.style.WARNING(f'[DRY RUN] {archived} notifications lues seraient archivées (plus anciennes que {days} jours)')
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f'✅ {archived} notifications lues archivées')
+            )
+
         # Types de notifications à exclure de la suppression
         excluded_types = [
             'new_message',  # Messages de chat
             'dispute_message',  # Messages de litige
             'warning',  # Avertissements
         ]
-        
-        # Récupérer les notifications à supprimer
+
+        # Notifications non lues anciennes à supprimer
         notifications_to_delete = Notification.objects.filter(
-            created_at__lt=cutoff_date
+            created_at__lt=cutoff_date,
+            is_read=False
         ).exclude(
             type__in=excluded_types
         )
-        
+
         count = notifications_to_delete.count()
-        
+
         if dry_run:
             self.stdout.write(
                 self.style.WARNING(
-                    f'[DRY RUN] {count} notifications seraient supprimées '
+                    f'[DRY RUN] {count} notifications non lues seraient supprimées '
                     f'(plus anciennes que {days} jours, excluant: {", ".join(excluded_types)})'
                 )
             )
-            
+
             # Afficher quelques exemples
             examples = notifications_to_delete[:5]
             for notif in examples:
                 self.stdout.write(f'  - {notif.type}: {notif.title} ({notif.created_at})')
-            
+
             if count > 5:
                 self.stdout.write(f'  ... et {count - 5} autres')
         else:
@@ -62,10 +81,10 @@ class Command(BaseCommand):
                 notifications_to_delete.delete()
                 self.stdout.write(
                     self.style.SUCCESS(
-                        f'✅ {count} notifications supprimées avec succès'
+                        f'✅ {count} notifications non lues supprimées avec succès'
                     )
                 )
             else:
                 self.stdout.write(
-                    self.style.SUCCESS('Aucune notification à supprimer')
+                    self.style.SUCCESS('Aucune notification non lue à supprimer')
                 )
@@ -1,13 +1,13 @@
 """
 Commande Django pour nettoyer les médias des annonces vendues
-Usage: python manage.py cleanup_sold_posts_media
+Usage: python manage.py cleanup_sold_posts_media [--dry-run]
 """
 from django.core.management.base import BaseCommand
 from blizzgame.media_cleanup import cleanup_sold_posts_media
 
 
 class Command(BaseCommand):
-    help = 'Nettoie les médias (images et vidéos) des annonces vendues pour économiser l\'espace de stockage'
+    help = 'Détache les médias (images et vidéos) des annonces vendues ; les fichiers sont supprimés par media_gc'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -21,23 +21,26 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.WARNING('Mode dry-run activé - aucune suppression ne sera effectuée')
             )
-            # TODO: Implémenter le mode dry-run si nécessaire
-            return
 
         self.stdout.write('Début du nettoyage des médias des annonces vendues...')
         
-        result = cleanup_sold_posts_media()
+        result = cleanup_sold_posts_media(dry_run=options['dry_run'])
         
-        if result['success']:
+        if not result['success']:
             self.stdout.write(
-                self.style.SUCCESS(
-                    f'Nettoyage terminé avec succès! '
-                    f'{result["cleaned_posts"]} annonces nettoyées.'
+                self.style.ERROR(
+                    f'Erreur lors du nettoyage: {result["error"]}'
                 )
             )
+        elif options['dry_run']:
+            self.stdout.write(
+                f'{result["cleaned_posts"]} annonces vendues ont encore des médias à nettoyer.'
+            )
         else:
             self.stdout.write(
-                self.style.ERROR(
-                    f'Erreur lors du nettoyage: {result["error"]}'
+                self.style.SUCCESS(
+                    f'Nettoyage terminé avec succès! '
+                    f'{result["cleaned_posts"]} annonces nettoyées '
+                    f'(fichiers supprimés au prochain passage de media_gc).'
                 )
             )
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from blizzgame.realtime_dispatch import DISPATCH_BATCH_SIZE, dispatch_pending, pending_events
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Envoie les événements temps réel en file (Pusher par lots, channel layer) en fusionnant les rafales par canal'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DISPATCH_BATCH_SIZE,
+            help=f'Nombre maximum d\'événements par lot (défaut: {DISPATCH_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Tourne en continu (worker) au lieu de vider la file une fois',
+        )
+        parser.add_argument(
+            '--wait',
+            type=int,
+            default=5,
+            help='Secondes d\'attente d\'un événement en mode --loop (défaut: 5)',
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            total = 0
+            while True:
+                read = self.dispatch(options['batch_size'], wait=0)
+                if not read:
+                    break
+                total += read
+            self.stdout.write(self.style.SUCCESS(f'[OK] {total} événements traités'))
+            return
+
+        self.stdout.write('Diffusion temps réel en continu...')
+        while True:
+            if self.dispatch(options['batch_size'], wait=options['wait']) is None:
+                time.sleep(options['wait'])
+
+    def dispatch(self, batch_size, wait):
+        try:
+            read, sent = dispatch_pending(batch_size=batch_size, wait=wait)
+            if read:
+                logger.info(f"Temps réel: {read} événements lus, {sent} envoyés ({pending_events()} en attente)")
+            return read
+        except Exception as e:
+            logger.error(f"Erreur dispatch_realtime: {e}")
+            self.stdout.write(
+                self.style.ERROR(f'Erreur lors de la diffusion temps réel: {e}')
+            )
+            return None
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from blizzgame.highlight_view_buffer import FLUSH_BATCH_SIZE, flush_view_buffer, pending_views
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Écrit en base les vues de Highlights mises en tampon (upsert groupé des HighlightView et des compteurs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=FLUSH_BATCH_SIZE,
+            help=f'Nombre d\'événements traités par lot (défaut: {FLUSH_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Tourne en continu (worker) au lieu d\'un seul passage',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Secondes entre deux passages en mode --loop (défaut: 5)',
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.flush(options['batch_size'])
+            return
+
+        self.stdout.write(f'Flush des vues en continu toutes les {options["interval"]}s...')
+        while True:
+            self.flush(options['batch_size'])
+            time.sleep(options['interval'])
+
+    def flush(self, batch_size):
+        try:
+            processed, created = flush_view_buffer(batch_size=batch_size)
+            if processed:
+                self.stdout.write(
+                    self.style.SUCCESS(f'[OK] {processed} événements traités, {created} nouvelles vues ({pending_views()} en attente)')
+                )
+        except Exception as e:
+            logger.error(f"Erreur flush_highlight_views: {e}")
+            self.stdout.write(
+                self.style.ERROR(f'Erreur lors du flush des vues: {e}')
+            )
@@ -0,0 +1,74 @@
+"""
+Commande Django pour supprimer les médias orphelins du stockage
+Usage: python manage.py media_gc [--dry-run] [--max-pages N] [--restart]
+"""
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+from blizzgame.media_gc import MIN_AGE, collect_garbage
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Supprime du stockage les médias qui ne sont plus référencés en base (reprise au dernier checkpoint)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Calcule le rapport (fichiers et octets orphelins) sans rien supprimer',
+        )
+        parser.add_argument(
+            '--max-pages',
+            type=int,
+            default=None,
+            help='Nombre maximum de pages de listing pour ce passage (la suite reprend au checkpoint)',
+        )
+        parser.add_argument(
+            '--min-age-hours',
+            type=float,
+            default=MIN_AGE.total_seconds() / 3600,
+            help=f'Âge minimum d\'un fichier orphelin avant suppression (défaut: {MIN_AGE.total_seconds() / 3600:.0f}h)',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore le checkpoint et recommence le balayage depuis le début',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(
+                self.style.WARNING('Mode dry-run activé - aucune suppression ne sera effectuée')
+            )
+
+        try:
+            report = collect_garbage(
+                dry_run=options['dry_run'],
+                min_age=timedelta(hours=options['min_age_hours']),
+                max_pages=options['max_pages'],
+                restart=options['restart'],
+            )
+        except Exception as e:
+            logger.error(f"Erreur media_gc: {e}")
+            self.stdout.write(self.style.ERROR(f'Erreur lors du nettoyage des médias: {e}'))
+            return
+
+        for folder, stats in sorted(report['folders'].items()):
+            self.stdout.write(f'  - {folder}: {stats["orphans"]} orphelins ({filesizeformat(stats["orphan_bytes"])})')
+        self.stdout.write(
+            f'{report["scanned"]} fichiers parcourus ({filesizeformat(report["scanned_bytes"])}), '
+            f'{report["orphans"]} orphelins ({filesizeformat(report["orphan_bytes"])}), '
+            f'{report["recent"]} non référencés trop récents ignorés'
+        )
+
+        if report['errors']:
+            self.stdout.write(self.style.ERROR(f'{report["errors"]} erreurs (voir les logs)'))
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'[OK] {report["deleted"]} fichiers supprimés ({filesizeformat(report["deleted_bytes"])})'
+            ))
+        if not report['completed']:
+            self.stdout.write(self.style.WARNING('Balayage incomplet : le prochain passage reprendra au checkpoint'))
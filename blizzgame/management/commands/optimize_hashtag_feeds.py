@@ -2,6 +2,7 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.db.models import Count, Q, F
 from blizzgame.models import Highlight, HighlightAppreciation, HighlightView, User
+from blizzgame import highlight_trending
 from collections import Counter
 import logging
 
@@ -127,45 +128,18 @@ class Command(BaseCommand):
         return score
 
     def update_trending_hashtags(self):
-        """Met à jour la liste des hashtags tendances"""
+        """Reconstruit la table des tendances (HashtagTrend) depuis les événements récents"""
         try:
-            # Hashtags des dernières 24h avec pondération par engagement
-            recent_highlights = Highlight.objects.filter(
-                is_active=True,
-                created_at__gte=timezone.now() - timezone.timedelta(hours=24)
-            ).prefetch_related('appreciations', 'views')
-            
-            hashtag_scores = {}
-            
-            for highlight in recent_highlights:
-                if not highlight.hashtags:
-                    continue
-                
-                # Score basé sur l'engagement
-                engagement_score = (
-                    highlight.appreciations.count() * 3 +
-                    highlight.views.count() * 1 +
-                    highlight.comments.count() * 2
-                )
-                
-                for hashtag in highlight.hashtags:
-                    hashtag_lower = hashtag.lower()
-                    if hashtag_lower not in hashtag_scores:
-                        hashtag_scores[hashtag_lower] = 0
-                    hashtag_scores[hashtag_lower] += engagement_score + 1
-            
-            # Trier par score
-            trending_hashtags = sorted(
-                hashtag_scores.items(), 
-                key=lambda x: x[1], 
-                reverse=True
-            )[:20]
+            kept = highlight_trending.rebuild_trends()
+            pruned = highlight_trending.prune_trends()
+            trending_hashtags = highlight_trending.top_hashtags(20)
             
+            self.stdout.write(f'{kept} hashtags tendances recalculés ({pruned} expirés supprimés)')
             self.stdout.write('Top 10 hashtags tendances:')
-            for i, (hashtag, score) in enumerate(trending_hashtags[:10], 1):
-                self.stdout.write(f'{i}. #{hashtag} (score: {score})')
+            for i, item in enumerate(trending_hashtags[:10], 1):
+                self.stdout.write(f'{i}. #{item["tag"]} (score: {item["score"]})')
             
-            return [hashtag for hashtag, score in trending_hashtags]
+            return [item['tag'] for item in trending_hashtags]
             
         except Exception as e:
             logger.error(f"Erreur lors de la mise à jour des hashtags tendances: {e}")
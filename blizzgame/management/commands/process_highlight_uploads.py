@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from blizzgame.highlight_uploads import pending_uploads, process_pending
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Traite les vidéos de Highlights en file (validation, conversion ffmpeg, aperçu) et publie les Highlights'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10,
+            help='Nombre de vidéos traitées par passage (défaut: 10)',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Tourne en continu (worker) au lieu d\'un seul passage',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Secondes entre deux passages en mode --loop (défaut: 5)',
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.process(options['batch_size'])
+            return
+
+        self.stdout.write(f'Traitement des vidéos en continu toutes les {options["interval"]}s...')
+        while True:
+            self.process(options['batch_size'])
+            time.sleep(options['interval'])
+
+    def process(self, batch_size):
+        try:
+            published, failed = process_pending(limit=batch_size)
+            if published or failed:
+                style = self.style.WARNING if failed else self.style.SUCCESS
+                self.stdout.write(
+                    style(f'[OK] {published} Highlights publiés, {failed} vidéos refusées ou en échec ({pending_uploads()} en attente)')
+                )
+        except Exception as e:
+            logger.error(f"Erreur process_highlight_uploads: {e}")
+            self.stdout.write(
+                self.style.ERROR(f'Erreur lors du traitement des vidéos: {e}')
+            )
@@ -0,0 +1,95 @@
+"""
+Commande Django pour normaliser les images déjà en base (variantes thumb/card/full)
+Usage: python manage.py process_media_variants [--dry-run] [--batch-size 50]
+"""
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from blizzgame.image_variants import srcset
+from blizzgame.media_uploads import upload_files
+from blizzgame.models import Post, PostImage, Product, ProductImage, Profile
+import logging
+import requests
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_TIMEOUT = 30
+
+# (modèle, champ fichier, champ URL, dossier, image par défaut)
+MEDIA_FIELDS = [
+    (Post, 'banner', 'banner_url', 'post_banners', 'def_img.png'),
+    (PostImage, 'image', 'image_url', 'post_images', None),
+    (Profile, 'profileimg', 'profileimg_url', 'profile_images', 'default_profile.png'),
+    (Profile, 'banner', 'banner_url', 'banner_images', 'default_banner.png'),
+    (Product, 'featured_image', 'featured_image_url', 'product_images', None),
+    (ProductImage, 'image', 'image_url', 'product_images', None),
+]
+
+
+def _needs_variants(obj, file_field, url_field, default):
+    url = getattr(obj, url_field)
+    if url:
+        return not srcset(url)
+    name = getattr(obj, file_field).name
+    return bool(name) and name != default
+
+
+def _source(obj, file_field, url_field):
+    """Contenu de l'image actuelle (URL distante, sinon stockage du FileField)"""
+    url = getattr(obj, url_field)
+    if url:
+        response = requests.get(url, timeout=DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        return ContentFile(response.content, name=url.rsplit('/', 1)[-1].split('?')[0])
+    field = getattr(obj, file_field)
+    with field.open('rb') as f:
+        return ContentFile(f.read(), name=field.name)
+
+
+class Command(BaseCommand):
+    help = 'Ré-encode les images existantes en variantes WebP (thumb/card/full) et met à jour leurs URLs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Compte les images à traiter sans rien envoyer',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Nombre d\'images envoyées en parallèle par lot (défaut: 50)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model, file_field, url_field, folder, default in MEDIA_FIELDS:
+            label = f'{model.__name__}.{url_field}'
+            pending = [
+                obj for obj in model.objects.only('pk', file_field, url_field).iterator()
+                if _needs_variants(obj, file_field, url_field, default)
+            ]
+            if options['dry_run']:
+                self.stdout.write(f'{label}: {len(pending)} images à traiter')
+                continue
+
+            processed = failed = 0
+            for start in range(0, len(pending), batch_size):
+                batch, sources = [], []
+                for obj in pending[start:start + batch_size]:
+                    try:
+                        sources.append((_source(obj, file_field, url_field), folder))
+                        batch.append(obj)
+                    except Exception as e:
+                        failed += 1
+                        logger.error(f"Image illisible {label} #{obj.pk}: {e}")
+
+                for obj, url in zip(batch, upload_files(sources)):
+                    if not url:
+                        failed += 1
+                        continue
+                    model.objects.filter(pk=obj.pk).update(**{url_field: url})
+                    processed += 1
+
+            style = self.style.WARNING if failed else self.style.SUCCESS
+            self.stdout.write(style(f'[OK] {label}: {processed} images normalisées, {failed} échecs'))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from blizzgame.payment_webhooks import PROCESS_BATCH_SIZE, pending_events, process_pending
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Traite les notifications de paiement CinetPay enregistrées par les webhooks (vérification, mise à jour des transactions)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=PROCESS_BATCH_SIZE,
+            help=f'Nombre de notifications traitées par passage (défaut: {PROCESS_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Tourne en continu (worker) au lieu d\'un seul passage',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2,
+            help='Secondes entre deux passages en mode --loop (défaut: 2)',
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.process(options['batch_size'])
+            return
+
+        self.stdout.write(f'Traitement des notifications de paiement en continu toutes les {options["interval"]}s...')
+        while True:
+            self.process(options['batch_size'])
+            time.sleep(options['interval'])
+
+    def process(self, batch_size):
+        try:
+            results = process_pending(limit=batch_size)
+            if any(results.values()):
+                style = self.style.WARNING if results['retry'] or results['failed'] else self.style.SUCCESS
+                self.stdout.write(
+                    style(
+                        f'[OK] {results["processed"]} paiements mis à jour, {results["ignored"]} doublons, '
+                        f'{results["retry"]} à réessayer, {results["failed"]} en échec ({pending_events()} en attente)'
+                    )
+                )
+        except Exception as e:
+            logger.error(f"Erreur process_payment_webhooks: {e}")
+            self.stdout.write(
+                self.style.ERROR(f'Erreur lors du traitement des notifications de paiement: {e}')
+            )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from blizzgame.models import Highlight
+from blizzgame.highlight_counters import rebuild_highlight_counters
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Reconstruit les compteurs dénormalisés des Highlights (vues, commentaires, appréciations) depuis les tables sources'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--active-only',
+            action='store_true',
+            help='Ne recalcule que les Highlights actifs',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Taille des lots pour bulk_update (défaut: 500)',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Highlight.objects.all()
+        if options['active_only']:
+            queryset = queryset.filter(is_active=True)
+
+        self.stdout.write(f'Vérification de {queryset.count()} Highlights...')
+
+        try:
+            fixed_count = rebuild_highlight_counters(queryset, batch_size=options['batch_size'])
+            self.stdout.write(
+                self.style.SUCCESS(f'[OK] {fixed_count} Highlights avaient des compteurs désynchronisés et ont été corrigés')
+            )
+        except Exception as e:
+            logger.error(f"Erreur rebuild_highlight_counters: {e}")
+            self.stdout.write(
+                self.style.ERROR(f'Erreur lors de la reconstruction des compteurs: {e}')
+            )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from blizzgame.listing_search import rebuild_search_index
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des annonces (PostgreSQL search_vector ou FTS5 SQLite)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Taille des lots pour SQLite FTS5 (défaut: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Reconstruction de l\'index de recherche ({connection.vendor})...')
+
+        try:
+            indexed = rebuild_search_index(batch_size=options['batch_size'])
+            self.stdout.write(
+                self.style.SUCCESS(f'[OK] {indexed} annonces indexées')
+            )
+        except Exception as e:
+            logger.error(f"Erreur rebuild_listing_search_index: {e}")
+            self.stdout.write(
+                self.style.ERROR(f'Erreur lors de la reconstruction de l\'index: {e}')
+            )
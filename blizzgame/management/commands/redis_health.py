@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from blizzgame.redis_health import cache_stats, channel_layer_stats, queue_stats
+import time
+
+# Seuils au-delà desquels une ligne est affichée en avertissement
+SATURATION_WARNING = 0.8
+HIT_RATIO_WARNING = 0.8
+
+class Command(BaseCommand):
+    help = 'Affiche la santé de Redis : files du channel layer, taux de succès du cache et saturation des connexions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Affiche les métriques en continu au lieu d\'une seule fois',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=60,
+            help='Secondes entre deux relevés en mode --loop (défaut: 60)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.report()
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def report(self):
+        self.stdout.write('=== Channel layer ===')
+        for shard in channel_layer_stats():
+            if 'error' in shard:
+                self.stdout.write(self.style.ERROR(f"Shard {shard['shard']}: {shard['error']}"))
+                continue
+            line = (
+                f"Shard {shard['shard']}: {shard['pending_messages']} messages en attente "
+                f"sur {shard['channels']} canaux (plus longue file: {shard['largest_queue']}/{shard['capacity']}), "
+                f"{shard['groups']} groupes, {self.format_clients(shard)}"
+            )
+            self.write(line, shard['largest_queue'] >= shard['capacity'] * SATURATION_WARNING or self.saturated(shard))
+
+        self.stdout.write('=== Caches ===')
+        for cache in cache_stats():
+            if 'error' in cache:
+                self.stdout.write(self.style.ERROR(f"{cache['alias']}: {cache['error']}"))
+                continue
+            ratio = cache['hit_ratio']
+            line = (
+                f"{cache['alias']} ({cache['location']}): taux de succès "
+                f"{'n/a' if ratio is None else f'{ratio:.1%}'} ({cache['hits']} hits, {cache['misses']} misses), "
+                f"pool {cache['pool_size']} x processus = {cache['web_connections']} connexions web max, "
+                f"{self.format_clients(cache)}"
+            )
+            self.write(line, (ratio is not None and ratio < HIT_RATIO_WARNING) or self.saturated(cache))
+
+        self.stdout.write('=== Files ===')
+        for name, pending in queue_stats().items():
+            self.stdout.write(f'{name}: {pending} en attente')
+
+    def write(self, line, warning):
+        self.stdout.write(self.style.WARNING(line) if warning else self.style.SUCCESS(line))
+
+    def saturated(self, stats):
+        return stats['saturation'] is not None and stats['saturation'] >= SATURATION_WARNING
+
+    def format_clients(self, stats):
+        saturation = stats['saturation']
+        return (
+            f"{stats['connected_clients']}/{stats['max_clients']} clients"
+            f"{'' if saturation is None else f' ({saturation:.0%})'}"
+        )
@@ -20,14 +20,29 @@ class Command(BaseCommand):
             self.style.SUCCESS('Début du rafraîchissement des taux de change...')
         )
         
+        if not options['force'] and CurrencyService.rates_are_fresh() and not CurrencyService.refresh_requested():
+            CurrencyService.prime_rate_cache()
+            self.stdout.write(self.style.SUCCESS('Taux encore frais, rafraîchissement ignoré (--force pour forcer).'))
+            return
+
         try:
-            updated_count = CurrencyService.refresh_all_rates()
+            timings = {}
+            updated_count = CurrencyService.refresh_all_rates(timings=timings)
+            
+            if not updated_count:
+                self.stdout.write(self.style.ERROR('Aucun taux mis à jour (API indisponible ?).'))
+                return
             
             self.stdout.write(
                 self.style.SUCCESS(
                     f'Rafraîchissement terminé. {updated_count} taux mis à jour.'
                 )
             )
+            self.stdout.write(
+                f"Durées : API {timings.get('fetch', 0) * 1000:.0f} ms, "
+                f"base {timings.get('write', 0) * 1000:.0f} ms, "
+                f"cache {timings.get('cache', 0) * 1000:.0f} ms"
+            )
             
         except Exception as e:
             self.stdout.write(
@@ -0,0 +1,223 @@
+"""
+Listing des annonces de la page d'accueil (marketplace)
+
+Les annonces sont servies par tranches de priorité (disponibles, en
+transaction, vendues, désactivées) lues l'une après l'autre au lieu d'un
+tri sur une annotation Case/When. Chaque tranche est lue dans l'ordre de
+created_at par un index :
+
+- disponibles et désactivées : égalité sur les trois booléens de statut,
+  index composite post_listing_status_idx
+  (is_on_sale, is_sold, is_in_transaction, created_at) ;
+- en transaction et vendues : is_on_sale (et is_sold) libres, index partiels
+  post_listing_in_tx_idx et post_listing_sold_idx sur created_at, dont la
+  condition est celle de la tranche.
+
+La pagination se fait par curseur (clé de tri + tranche), sans COUNT ni
+OFFSET.
+
+La première page sans filtre (hors filtre de jeu) est mise en cache par jeu
+et invalidée à chaque sauvegarde/suppression d'annonce.
+"""
+import logging
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from .highlight_feed import InvalidCursor, decode_cursor, encode_cursor
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 12
+FIRST_PAGE_CACHE_TIMEOUT = 300  # 5 minutes (invalidé à chaque sauvegarde d'annonce)
+CURSOR_KIND = 'p'
+
+# Tranches de priorité, dans l'ordre d'affichage (conditions des tranches 2
+# et 3 identiques à celles des index partiels de Post)
+PRIORITY_BANDS = [
+    (1, Q(is_on_sale=True, is_sold=False, is_in_transaction=False)),  # Disponibles
+    (2, Q(is_in_transaction=True)),                                   # En transaction
+    (3, Q(is_sold=True, is_in_transaction=False)),                    # Vendues
+    (4, Q(is_on_sale=False, is_sold=False, is_in_transaction=False)), # Désactivées
+]
+
+SORT_ORDERINGS = {
+    'created_at': ('-created_at', '-id'),
+    'price_asc': ('price', '-created_at', '-id'),
+    'price_desc': ('-price', '-created_at', '-id'),
+    'title': ('title', '-created_at', '-id'),
+}
+
+
+def listing_queryset():
+    return Post.objects.select_related('author', 'author__profile', 'author__userreputation')
+
+
+def build_filters(params):
+    """Construit le filtre Q à partir des paramètres GET (hors tri et curseur)"""
+    filters = Q()
+
+    game_filter = params.get('game')
+    if game_filter and game_filter != 'all':
+        filters &= Q(game_type=game_filter)
+
+    for param, lookup in (('price_min', 'price__gte'), ('price_max', 'price__lte')):
+        value = params.get(param)
+        if value:
+            try:
+                filters &= Q(**{lookup: Decimal(value)})
+            except InvalidOperation:
+                pass
+
+    # Pièces et niveau : champs dédiés (courts) plutôt que le titre/la description,
+    # la recherche libre passant par listing_search
+    coins_filter = (params.get('coins') or '').strip()
+    if coins_filter:
+        filters &= Q(coins__icontains=coins_filter)
+
+    level_filter = (params.get('level') or '').strip()
+    if level_filter:
+        filters &= Q(level__icontains=level_filter)
+
+    date_filter = params.get('date')
+    now = timezone.now()
+    if date_filter == 'today':
+        filters &= Q(created_at__date=now.date())
+    elif date_filter == 'week':
+        filters &= Q(created_at__gte=now - timedelta(days=7))
+    elif date_filter == 'month':
+        filters &= Q(created_at__gte=now - timedelta(days=30))
+
+    return filters
+
+
+def _field_name(ordering):
+    return ordering.lstrip('-')
+
+
+def _keyset_filter(ordering, values):
+    """Filtre « après la clé » pour un tri à directions mixtes"""
+    condition = Q()
+    for i, order in enumerate(ordering):
+        lookup = 'lt' if order.startswith('-') else 'gt'
+        clause = Q(**{f'{_field_name(order)}__{lookup}': values[i]})
+        for previous, previous_value in zip(ordering[:i], values[:i]):
+            clause &= Q(**{_field_name(previous): previous_value})
+        condition |= clause
+    return condition
+
+
+def _sort_key(post, ordering):
+    return [getattr(post, _field_name(order)) for order in ordering]
+
+
+def _parse_value(field, value):
+    if field == 'created_at':
+        return datetime.fromisoformat(value)
+    if field == 'id':
+        return uuid.UUID(value)
+    if field == 'price':
+        return Decimal(str(value))
+    return str(value)
+
+
+def _decode(cursor, ordering):
+    kind, values = decode_cursor(cursor)
+    try:
+        if kind != CURSOR_KIND or len(values) != len(ordering) + 1:
+            raise ValueError
+        band = int(values[0])
+        key = [_parse_value(_field_name(order), value) for order, value in zip(ordering, values[1:])]
+    except (TypeError, ValueError, InvalidOperation):
+        raise InvalidCursor('Curseur invalide')
+    return band, key
+
+
+def _encode(post, ordering):
+    values = [str(v) if isinstance(v, Decimal) else v for v in _sort_key(post, ordering)]
+    return encode_cursor(CURSOR_KIND, [post.priority] + values)
+
+
+def read_listing(filters=None, sort='created_at', cursor=None, limit=PAGE_SIZE):
+    """
+    Retourne (posts, next_cursor). Chaque post porte l'attribut `priority`
+    (1 à 4) utilisé par le template pour les séparateurs de sections.
+    Au plus une requête par tranche de priorité, quelle que soit la profondeur.
+    """
+    ordering = SORT_ORDERINGS.get(sort, SORT_ORDERINGS['created_at'])
+    start_band, key = (1, None)
+    if cursor:
+        start_band, key = _decode(cursor, ordering)
+
+    posts = []
+    for band, band_filter in PRIORITY_BANDS:
+        if band < start_band:
+            continue
+        queryset = listing_queryset().filter(band_filter)
+        if filters:
+            queryset = queryset.filter(filters)
+        if key is not None and band == start_band:
+            queryset = queryset.filter(_keyset_filter(ordering, key))
+
+        remaining = limit + 1 - len(posts)
+        for post in queryset.order_by(*ordering)[:remaining]:
+            post.priority = band
+            posts.append(post)
+        if len(posts) > limit:
+            break
+
+    has_more = len(posts) > limit
+    posts = posts[:limit]
+    next_cursor = _encode(posts[-1], ordering) if has_more and posts else None
+    return posts, next_cursor
+
+
+# ===== CACHE DE LA PREMIÈRE PAGE =====
+
+def first_page_cache_key(game):
+    return f'marketplace:first_page:{game or "all"}'
+
+
+def is_cacheable(params):
+    """Seule la première page sans filtre (hors jeu) et au tri par défaut est mise en cache"""
+    if params.get('cursor'):
+        return False
+    if params.get('sort', 'created_at') != 'created_at':
+        return False
+    return not any(params.get(name) for name in ('price_min', 'price_max', 'coins', 'level', 'date', 'q'))
+
+
+def read_first_page(game=None):
+    """
+    Première page (filtre de jeu uniquement) servie depuis le cache : on y
+    stocke les ids et priorités, puis on recharge les annonces en une requête
+    pour que les données vendeur (profil, réputation) restent à jour.
+    """
+    cache_key = first_page_cache_key(game)
+    cached = cache.get(cache_key)
+    if cached is None:
+        filters = build_filters({'game': game}) if game else None
+        posts, next_cursor = read_listing(filters)
+        cache.set(cache_key, {
+            'items': [(str(post.id), post.priority) for post in posts],
+            'next_cursor': next_cursor,
+        }, FIRST_PAGE_CACHE_TIMEOUT)
+        return posts, next_cursor
+
+    priorities = dict(cached['items'])
+    posts_by_id = {str(post.id): post for post in listing_queryset().filter(id__in=list(priorities))}
+    posts = []
+    for post_id, priority in cached['items']:
+        post = posts_by_id.get(post_id)
+        if post is not None:
+            post.priority = priority
+            posts.append(post)
+    return posts, cached['next_cursor']
+
+
+def invalidate_first_page():
+    """Invalide la première page en cache pour tous les filtres de jeu"""
+    cache.delete_many([first_page_cache_key(None)] + [first_page_cache_key(game) for game, _ in Post.GAME_CHOICES])
@@ -1,65 +1,50 @@
 """
-Utilitaires pour la suppression des médias des annonces vendues
+Détachement des médias des annonces vendues
+
+Les fichiers ne sont plus supprimés ici, un par un : les annonces vendues
+perdent leurs références (bannière remise par défaut, lignes PostImage et
+PostVideo supprimées) et le ramasse-miettes (media_gc) supprime ensuite les
+fichiers devenus orphelins, par lots. Un média dédupliqué encore utilisé par
+une autre annonce n'est donc jamais supprimé.
 """
-import os
 import logging
-from django.conf import settings
-from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from . import marketplace_listing
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_BANNER = 'def_img.png'
+
 
 def delete_post_media(post):
     """
-    Supprime tous les médias (images et vidéos) d'une annonce vendue
-    pour économiser l'espace de stockage
+    Détache les médias (images et vidéos) d'une annonce vendue ; les fichiers
+    sont supprimés au prochain passage de media_gc
     """
     try:
-        deleted_files = []
-        
-        # Supprimer la bannière si ce n'est pas l'image par défaut
-        if post.banner and post.banner.name != 'def_img.png':
-            try:
-                if default_storage.exists(post.banner.name):
-                    default_storage.delete(post.banner.name)
-                    deleted_files.append(f"Banner: {post.banner.name}")
-                    logger.info(f"Bannière supprimée: {post.banner.name}")
-            except Exception as e:
-                logger.error(f"Erreur lors de la suppression de la bannière {post.banner.name}: {e}")
-        
-        # Supprimer toutes les images supplémentaires
-        for image in post.images.all():
-            try:
-                if default_storage.exists(image.image.name):
-                    default_storage.delete(image.image.name)
-                    deleted_files.append(f"Image: {image.image.name}")
-                    logger.info(f"Image supprimée: {image.image.name}")
-            except Exception as e:
-                logger.error(f"Erreur lors de la suppression de l'image {image.image.name}: {e}")
-        
-        # Supprimer toutes les vidéos
-        for video in post.videos.all():
-            try:
-                if default_storage.exists(video.video.name):
-                    default_storage.delete(video.video.name)
-                    deleted_files.append(f"Video: {video.video.name}")
-                    logger.info(f"Vidéo supprimée: {video.video.name}")
-            except Exception as e:
-                logger.error(f"Erreur lors de la suppression de la vidéo {video.video.name}: {e}")
+        detached_files = []
+        if post.banner_url:
+            detached_files.append(f"Banner: {post.banner_url}")
+        elif post.banner and post.banner.name != DEFAULT_BANNER:
+            detached_files.append(f"Banner: {post.banner.name}")
+        detached_files += [f"Image: {image.image_url or image.image.name}" for image in post.images.all()]
+        detached_files += [f"Video: {video.video.name}" for video in post.videos.all()]
         
-        # Supprimer les enregistrements de la base de données
-        post.images.all().delete()
-        post.videos.all().delete()
-        
-        # Réinitialiser la bannière à l'image par défaut
-        post.banner = 'def_img.png'
-        post.save()
+        with transaction.atomic():
+            post.images.all().delete()
+            post.videos.all().delete()
+            
+            # Réinitialiser la bannière à l'image par défaut
+            post.banner = DEFAULT_BANNER
+            post.banner_url = None
+            post.save()
         
-        logger.info(f"Suppression des médias terminée pour l'annonce {post.id}. Fichiers supprimés: {len(deleted_files)}")
+        logger.info(f"Médias détachés de l'annonce {post.id}: {len(detached_files)} fichiers (supprimés par media_gc)")
         return {
             'success': True,
-            'deleted_files': deleted_files,
-            'count': len(deleted_files)
+            'deleted_files': detached_files,
+            'count': len(detached_files)
         }
         
     except Exception as e:
@@ -71,35 +56,43 @@ def delete_post_media(post):
         }
 
 
-def cleanup_sold_posts_media():
+def sold_posts_with_media():
+    """Annonces vendues qui référencent encore des médias"""
+    from .models import Post, PostImage, PostVideo
+    return Post.objects.filter(is_sold=True).filter(
+        (Q(banner_url__isnull=False) & ~Q(banner_url='')) |
+        ~Q(banner=DEFAULT_BANNER) |
+        Exists(PostImage.objects.filter(post=OuterRef('pk'))) |
+        Exists(PostVideo.objects.filter(post=OuterRef('pk')))
+    )
+
+
+def cleanup_sold_posts_media(dry_run=False):
     """
-    Fonction de maintenance pour nettoyer les médias de toutes les annonces vendues
-    qui n'ont pas encore été nettoyées
+    Fonction de maintenance : détache en quelques requêtes groupées les médias
+    de toutes les annonces vendues qui n'ont pas encore été nettoyées
     """
     try:
-        from .models import Post
+        from .models import Post, PostImage, PostVideo
         
-        sold_posts = Post.objects.filter(is_sold=True)
-        cleaned_count = 0
+        post_ids = list(sold_posts_with_media().values_list('id', flat=True))
+        if dry_run or not post_ids:
+            return {
+                'success': True,
+                'cleaned_posts': len(post_ids)
+            }
         
-        for post in sold_posts:
-            # Vérifier si l'annonce a encore des médias (pas encore nettoyée)
-            has_media = (
-                (post.banner and post.banner.name != 'def_img.png') or
-                post.images.exists() or
-                post.videos.exists()
-            )
-            
-            if has_media:
-                result = delete_post_media(post)
-                if result['success']:
-                    cleaned_count += 1
-                    logger.info(f"Annonce {post.id} nettoyée: {result['count']} fichiers supprimés")
+        with transaction.atomic():
+            PostImage.objects.filter(post_id__in=post_ids).delete()
+            PostVideo.objects.filter(post_id__in=post_ids).delete()
+            Post.objects.filter(id__in=post_ids).update(banner=DEFAULT_BANNER, banner_url=None)
+        # update() ne déclenche pas les signaux de Post
+        marketplace_listing.invalidate_first_page()
         
-        logger.info(f"Nettoyage terminé: {cleaned_count} annonces nettoyées")
+        logger.info(f"Nettoyage terminé: {len(post_ids)} annonces nettoyées")
         return {
             'success': True,
-            'cleaned_posts': cleaned_count
+            'cleaned_posts': len(post_ids)
         }
         
     except Exception as e:
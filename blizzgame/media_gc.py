@@ -0,0 +1,308 @@
+"""
+Ramasse-miettes des médias (commande media_gc)
+
+Marquage puis balayage, sans parcourir les annonces une par une :
+
+1. Références : toutes les valeurs des FileField/ImageField et des URLField
+   (URLs de media_uploads) de tous les modèles, lues par lots avec
+   values_list. Une URL est ramenée au chemin du média dans le stockage
+   (public_id Cloudinary, chemin relatif à MEDIA_ROOT en local) ; une
+   variante référencée (image_variants) protège les autres variantes du même
+   contenu. Un média dédupliqué, partagé par plusieurs annonces, reste donc
+   en place tant qu'une seule ligne y fait référence.
+2. Balayage du stockage par pages (API Admin Cloudinary avec next_cursor, ou
+   système de fichiers en local), limité aux dossiers des médias (upload_to
+   des modèles).
+3. Orphelins : fichiers non référencés et plus anciens que MIN_AGE (un upload
+   en cours n'a pas encore sa ligne en base). Ils sont supprimés par lots en
+   parallèle (delete_resources Cloudinary : 100 public_ids par appel).
+
+Les annonces vendues et les Highlights supprimés n'ont plus de références :
+leurs fichiers deviennent des orphelins et partent au passage suivant.
+
+Après chaque page, un checkpoint (cache) garde la position du balayage et le
+rapport en cours : une exécution interrompue, ou limitée par max_pages,
+reprend là où elle s'était arrêtée. Le dry-run produit le même rapport
+(nombre de fichiers et octets) sans rien supprimer ni écrire de checkpoint.
+"""
+import logging
+import os
+import re
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from urllib.parse import unquote, urlsplit
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import models
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from . import image_variants
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 500
+DELETE_BATCH_SIZE = 100  # Limite de delete_resources (API Admin Cloudinary)
+REFERENCE_BATCH_SIZE = 5000
+GC_WORKERS = getattr(settings, 'MEDIA_GC_WORKERS', 4)
+MIN_AGE = timedelta(hours=24)
+CHECKPOINT_KEY = 'media:gc:checkpoint'
+CHECKPOINT_TIMEOUT = 7 * 24 * 60 * 60
+
+_VARIANT_KEY = re.compile(r'_(%s)$' % '|'.join(image_variants.VARIANTS))
+_VERSION = re.compile(r'v\d+')
+
+MediaFile = namedtuple('MediaFile', ['name', 'key', 'size', 'modified', 'resource_type'])
+
+
+# ===== RÉFÉRENCES =====
+
+def media_path(value):
+    """Chemin d'un média dans le stockage à partir d'un nom de FileField ou d'une URL"""
+    value = str(value or '').strip()
+    if not value:
+        return None
+    if '://' not in value and not value.startswith('/'):
+        return value
+
+    path = unquote(urlsplit(value).path)
+    if '/upload/' in path:
+        # .../image/upload/<transformations>/v123/<public_id>.<ext>
+        segments = path.split('/upload/', 1)[1].split('/')
+        versions = [index for index, segment in enumerate(segments) if _VERSION.fullmatch(segment)]
+        if versions:
+            segments = segments[versions[-1] + 1:]
+        return '/'.join(segments) or None
+    if path.startswith(settings.MEDIA_URL):
+        return path[len(settings.MEDIA_URL):] or None
+    return None
+
+
+def _reference_keys(path):
+    """Le chemin, sans extension (public_id), et les variantes du même contenu"""
+    key = os.path.splitext(path)[0]
+    keys = {path, key}
+    match = _VARIANT_KEY.search(key)
+    if match:
+        base = key[:match.start()]
+        keys.update(image_variants.variant_name(base, variant) for variant in image_variants.VARIANTS)
+    return keys
+
+
+def referenced_keys():
+    """Ensemble des médias référencés en base (tous modèles, lecture par lots)"""
+    keys = set()
+    for model in apps.get_models():
+        fields = [
+            field.attname for field in model._meta.concrete_fields
+            if isinstance(field, (models.FileField, models.URLField))
+        ]
+        if not fields:
+            continue
+        for row in model._base_manager.values_list(*fields).iterator(chunk_size=REFERENCE_BATCH_SIZE):
+            for value in row:
+                path = media_path(value)
+                if path:
+                    keys.update(_reference_keys(path))
+    return keys
+
+
+def media_folders():
+    """Dossiers gérés par l'application (upload_to des FileField)"""
+    folders = set()
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField) and isinstance(field.upload_to, str):
+                folder = field.upload_to.split('%')[0].strip('/')
+                if folder:
+                    folders.add(folder)
+    return sorted(folders)
+
+
+# ===== STOCKAGES =====
+
+class LocalMediaStore:
+    """Système de fichiers (développement, tests) : pagination par nom"""
+    resource_types = [None]
+
+    def __init__(self, storage=None):
+        self.storage = storage or default_storage
+
+    def prefixes(self, folders):
+        return list(folders)
+
+    def list_page(self, prefix, resource_type, cursor, page_size=PAGE_SIZE):
+        names = []
+        for directory, _, filenames in os.walk(self.storage.path(prefix)):
+            for filename in filenames:
+                name = os.path.relpath(os.path.join(directory, filename), self.storage.location)
+                names.append(name.replace(os.sep, '/'))
+        names = sorted(name for name in names if cursor is None or name > cursor)[:page_size]
+
+        files = []
+        for name in names:
+            stat = os.stat(self.storage.path(name))
+            modified = datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc)
+            files.append(MediaFile(name, os.path.splitext(name)[0], stat.st_size, modified, None))
+        return files, names[-1] if len(names) == page_size else None
+
+    def delete(self, files):
+        for media in files:
+            self.storage.delete(media.name)
+
+
+class CloudinaryMediaStore:
+    """API Admin Cloudinary : listing par préfixe (next_cursor), suppression groupée"""
+    resource_types = ['image', 'video', 'raw']
+
+    def prefixes(self, folders):
+        # Les FileField (MediaCloudinaryStorage) préfixent leurs public_id (« media/ »)
+        storage_prefix = getattr(settings, 'CLOUDINARY_STORAGE', {}).get('PREFIX', settings.MEDIA_URL).strip('/')
+        prefixes = list(folders)
+        if storage_prefix:
+            prefixes += [f'{storage_prefix}/{folder}' for folder in folders]
+        return prefixes
+
+    def list_page(self, prefix, resource_type, cursor, page_size=PAGE_SIZE):
+        import cloudinary.api
+        options = {'type': 'upload', 'resource_type': resource_type, 'prefix': f'{prefix}/', 'max_results': page_size}
+        if cursor:
+            options['next_cursor'] = cursor
+        result = cloudinary.api.resources(**options)
+
+        files = []
+        for resource in result.get('resources', []):
+            public_id = resource['public_id']
+            files.append(MediaFile(
+                public_id,
+                os.path.splitext(public_id)[0] if resource_type == 'raw' else public_id,
+                resource.get('bytes', 0),
+                parse_datetime(resource.get('created_at') or '') or timezone.now(),
+                resource_type
+            ))
+        return files, result.get('next_cursor')
+
+    def delete(self, files):
+        import cloudinary.api
+        public_ids = defaultdict(list)
+        for media in files:
+            public_ids[media.resource_type].append(media.name)
+        for resource_type, names in public_ids.items():
+            cloudinary.api.delete_resources(names, resource_type=resource_type, type='upload', invalidate=True)
+
+
+def default_store():
+    if getattr(settings, 'CLOUDINARY_URL', None):
+        return CloudinaryMediaStore()
+    return LocalMediaStore()
+
+
+# ===== BALAYAGE =====
+
+def _empty_report(dry_run):
+    return {
+        'dry_run': dry_run,
+        'completed': False,
+        'scanned': 0,
+        'scanned_bytes': 0,
+        'recent': 0,
+        'orphans': 0,
+        'orphan_bytes': 0,
+        'deleted': 0,
+        'deleted_bytes': 0,
+        'errors': 0,
+        'folders': {},
+    }
+
+
+def _sweep_page(files, referenced, cutoff, report, prefix):
+    """Orphelins d'une page (non référencés et assez anciens) ; met le rapport à jour"""
+    orphans = []
+    for media in files:
+        report['scanned'] += 1
+        report['scanned_bytes'] += media.size
+        if media.name in referenced or media.key in referenced:
+            continue
+        if media.modified > cutoff:
+            report['recent'] += 1
+            continue
+        orphans.append(media)
+
+    if orphans:
+        folder = report['folders'].setdefault(prefix, {'orphans': 0, 'orphan_bytes': 0})
+        folder['orphans'] += len(orphans)
+        folder['orphan_bytes'] += sum(media.size for media in orphans)
+        report['orphans'] += len(orphans)
+        report['orphan_bytes'] += sum(media.size for media in orphans)
+    return orphans
+
+
+def _delete(pool, store, orphans, report):
+    """Suppression par lots de DELETE_BATCH_SIZE, en parallèle"""
+    batches = [orphans[start:start + DELETE_BATCH_SIZE] for start in range(0, len(orphans), DELETE_BATCH_SIZE)]
+    futures = [(batch, pool.submit(store.delete, batch)) for batch in batches]
+    for batch, future in futures:
+        try:
+            future.result()
+            report['deleted'] += len(batch)
+            report['deleted_bytes'] += sum(media.size for media in batch)
+        except Exception as e:
+            report['errors'] += len(batch)
+            logger.error(f"Erreur suppression de {len(batch)} médias ({batch[0].name}...): {e}")
+
+
+def _save_checkpoint(position, cursor, report):
+    cache.set(CHECKPOINT_KEY, {'position': position, 'cursor': cursor, 'report': report}, CHECKPOINT_TIMEOUT)
+
+
+def collect_garbage(store=None, dry_run=False, min_age=MIN_AGE, max_pages=None, restart=False):
+    """
+    Supprime les médias orphelins et retourne le rapport. Reprend au
+    checkpoint d'une exécution précédente inachevée (sauf restart / dry-run).
+    """
+    store = store or default_store()
+    checkpoint = None if dry_run or restart else cache.get(CHECKPOINT_KEY)
+    report = checkpoint['report'] if checkpoint else _empty_report(dry_run)
+    position, cursor = (checkpoint['position'], checkpoint['cursor']) if checkpoint else (0, None)
+
+    referenced = referenced_keys()
+    cutoff = timezone.now() - min_age
+    targets = [
+        (prefix, resource_type)
+        for prefix in store.prefixes(media_folders())
+        for resource_type in store.resource_types
+    ]
+
+    pages = 0
+    with ThreadPoolExecutor(max_workers=GC_WORKERS, thread_name_prefix='media-gc') as pool:
+        while position < len(targets):
+            if max_pages is not None and pages >= max_pages:
+                return report
+            prefix, resource_type = targets[position]
+            try:
+                files, cursor = store.list_page(prefix, resource_type, cursor)
+            except Exception as e:
+                # Position conservée : la prochaine exécution reprend sur cette page
+                logger.error(f"Erreur listing médias {prefix} ({resource_type}): {e}")
+                report['errors'] += 1
+                return report
+            pages += 1
+
+            orphans = _sweep_page(files, referenced, cutoff, report, prefix)
+            if orphans and not dry_run:
+                _delete(pool, store, orphans, report)
+            if not cursor:
+                position += 1
+            if not dry_run:
+                _save_checkpoint(position, cursor, report)
+
+    report['completed'] = True
+    if not dry_run:
+        cache.delete(CHECKPOINT_KEY)
+    logger.info(
+        f"Media GC: {report['scanned']} fichiers parcourus, {report['orphans']} orphelins "
+        f"({report['orphan_bytes']} octets), {report['deleted']} supprimés"
+    )
+    return report
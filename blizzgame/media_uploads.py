@@ -0,0 +1,175 @@
+"""
+Pipeline d'upload des médias (annonces, profils)
+
+Chaque fichier est envoyé une seule fois, directement au stockage (Cloudinary
+en production) ; seule l'URL obtenue est enregistrée en base, le FileField
+n'est plus utilisé pour ré-uploader le même fichier via MediaCloudinaryStorage.
+
+- Déduplication par contenu : le nom du média est le SHA-256 de son contenu
+  (public_id Cloudinary sans écrasement, nom de fichier en local). Deux
+  fichiers identiques d'une même requête ne partent qu'une fois, et un contenu
+  déjà envoyé récemment est retrouvé dans le cache sans nouvel upload.
+- Parallélisme : les uploads d'une requête tournent sur un pool de threads
+  borné (MEDIA_UPLOAD_WORKERS par processus) ; la durée d'une création
+  d'annonce est celle de l'upload le plus lent, pas la somme.
+- Normalisation : chaque image est ré-encodée en variantes thumb/card/full
+  (image_variants) dans le thread d'upload ; l'URL retournée est celle de la
+  variante full. Un fichier que Pillow ne sait pas lire est envoyé tel quel.
+
+En développement (sans CLOUDINARY_URL) et dans les tests, LocalUploader écrit
+sur le système de fichiers (local_uploads() pour un répertoire temporaire).
+"""
+import hashlib
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from . import image_variants
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_WORKERS = getattr(settings, 'MEDIA_UPLOAD_WORKERS', 4)
+UPLOADED_TIMEOUT = 24 * 60 * 60  # Mémoire des contenus déjà envoyés (24 heures)
+DEFAULT_EXTENSION = '.jpg'
+
+_executor = None
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix='media-upload')
+    return _executor
+
+
+def content_hash(file):
+    """SHA-256 du contenu (le fichier est rembobiné pour l'upload)"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks() if hasattr(file, 'chunks') else iter(lambda: file.read(65536), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def _extension(file):
+    extension = os.path.splitext(getattr(file, 'name', '') or '')[1].lower()
+    return extension if re.fullmatch(r'\.[a-z0-9]{1,5}', extension) else DEFAULT_EXTENSION
+
+
+class CloudinaryUploader:
+    def upload(self, file, folder, name):
+        import cloudinary
+        import cloudinary.uploader
+        # Configuration Cloudinary (déjà faite dans settings.py mais on s'assure)
+        if not getattr(cloudinary.config(), 'cloud_name', None):
+            match = re.search(r'cloudinary://([^:]+):([^@]+)@(.+)', os.environ.get('CLOUDINARY_URL', ''))
+            if match:
+                api_key, api_secret, cloud_name = match.groups()
+                cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret, secure=True)
+
+        result = cloudinary.uploader.upload(
+            file,
+            folder=folder,
+            public_id=name,
+            overwrite=False,
+            resource_type='image'
+        )
+        return result.get('secure_url', result.get('url'))
+
+
+class LocalUploader:
+    """Stockage local (développement, tests) : mêmes noms déterministes"""
+
+    def __init__(self, location=None, base_url=None):
+        self.storage = FileSystemStorage(location=location, base_url=base_url)
+
+    def upload(self, file, folder, name):
+        name = f'{folder}/{name}{_extension(file)}'
+        if not self.storage.exists(name):
+            name = self.storage.save(name, file)
+        return self.storage.url(name)
+
+
+def _default_uploader():
+    if getattr(settings, 'CLOUDINARY_URL', None):
+        return CloudinaryUploader()
+    return LocalUploader()
+
+
+_uploader = _default_uploader()
+
+
+@contextmanager
+def local_uploads(location, base_url='/media/'):
+    """Remplace l'uploader par un LocalUploader sur `location` le temps du bloc"""
+    global _uploader
+    previous = _uploader
+    _uploader = LocalUploader(location=location, base_url=base_url)
+    try:
+        yield _uploader
+    finally:
+        _uploader = previous
+
+
+def _cache_key(digest):
+    return f'media:variants:{digest}'
+
+
+def _upload_variants(uploader, file, folder, digest):
+    """Variantes normalisées (URL de la variante full), ou l'original si ce n'est pas une image lisible"""
+    try:
+        variants = image_variants.render_variants(file, digest)
+    except image_variants.InvalidImage as e:
+        logger.warning(f"Image non normalisée {folder}/{digest}: {e}")
+        return uploader.upload(file, folder, digest)
+
+    urls = {
+        variant: uploader.upload(content, folder, os.path.splitext(content.name)[0])
+        for variant, content in variants.items()
+    }
+    return urls[image_variants.DEFAULT_VARIANT]
+
+
+def _upload(uploader, file, folder, digest):
+    try:
+        url = _upload_variants(uploader, file, folder, digest)
+    except Exception as e:
+        # En cas d'erreur, log et None : l'appelant garde son fallback
+        logger.error(f"Erreur upload média {folder}/{digest}: {e}")
+        return None
+    if url:
+        cache.set(_cache_key(digest), url, UPLOADED_TIMEOUT)
+    return url
+
+
+def upload_files(items):
+    """
+    Envoie une liste de (fichier, dossier) et retourne les URLs dans le même
+    ordre (None pour un fichier absent ou en échec). Les contenus identiques
+    ne sont envoyés qu'une fois ; les uploads tournent en parallèle.
+    """
+    uploader = _uploader
+    digests = [content_hash(file) if file else None for file, folder in items]
+
+    known = cache.get_many([_cache_key(digest) for digest in set(digests) if digest])
+    futures = {}
+    for (file, folder), digest in zip(items, digests):
+        if digest is None or _cache_key(digest) in known or digest in futures:
+            continue
+        futures[digest] = _pool().submit(_upload, uploader, file, folder, digest)
+
+    urls = {digest: future.result() for digest, future in futures.items()}
+    return [
+        (known.get(_cache_key(digest)) or urls.get(digest)) if digest else None
+        for digest in digests
+    ]
+
+
+def upload_file(file, folder):
+    """Upload d'un seul fichier (profil, bannière de profil) ; retourne l'URL ou None"""
+    return upload_files([(file, folder)])[0]
@@ -0,0 +1,140 @@
+"""
+Notifications de nouveaux messages, regroupées par discussion
+
+Tous les chemins d'envoi de message (chat de transaction et de litige, HTTP
+ou WebSocket, conversations privées, groupes) passent par ce module. Un
+destinataire a au plus une notification non lue par discussion (`thread`,
+même nommage que les canaux temps réel : chat:<id>, private:<id>,
+group:<id>), garantie par la contrainte unique partielle
+notif_unread_thread_uniq sur (user, type, thread) WHERE is_read = false.
+
+Un nouveau message incrémente message_count par un UPDATE atomique
+(message_count = message_count + 1) ; seuls les destinataires sans
+notification non lue reçoivent un INSERT. Si deux premiers messages se
+croisent, l'INSERT perdant est refusé par la contrainte unique et rejoue
+l'UPDATE sur la notification gagnante. Le nombre de lignes croît donc avec
+le nombre de discussions, plus avec le nombre de messages.
+"""
+import logging
+from django.db import IntegrityError, transaction
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+from .models import Notification
+from . import chat_realtime, notification_counters
+
+logger = logging.getLogger(__name__)
+
+
+def _notify(recipient_ids, sender, thread, type, title, content, grouped_suffix, **links):
+    """
+    Regroupe ou crée la notification non lue de chaque destinataire.
+    - content : texte de la première notification
+    - grouped_suffix : fin du texte regroupé (« Vous avez reçu N messages <suffix> »)
+    - links : relations posées à la création (transaction, dispute, message)
+    Retourne le nombre de notifications créées.
+    """
+    recipient_ids = {user_id for user_id in recipient_ids if user_id and user_id != sender.id}
+    if not recipient_ids:
+        return 0
+
+    unread = Notification.objects.filter(
+        user_id__in=recipient_ids, type=type, thread=thread, is_read=False
+    )
+    updates = {
+        'message_count': F('message_count') + 1,
+        'content': Concat(
+            Value('Vous avez reçu '),
+            Cast(F('message_count') + 1, output_field=CharField()),
+            Value(f' messages {grouped_suffix}'),
+            output_field=CharField()
+        ),
+        'sender_username': sender.username,
+        'created_at': timezone.now(),
+    }
+    if links.get('message') is not None:
+        updates['message'] = links['message']
+    updated = unread.update(**updates)
+    if updated == len(recipient_ids):
+        return 0
+
+    missing = recipient_ids
+    if updated:
+        missing = recipient_ids - set(unread.values_list('user_id', flat=True))
+    if not missing:
+        return 0
+
+    def new_notification(user_id):
+        return Notification(
+            user_id=user_id,
+            type=type,
+            thread=thread,
+            title=title,
+            content=content,
+            sender_username=sender.username,
+            message_count=1,
+            **links
+        )
+
+    created = len(missing)
+    try:
+        with transaction.atomic():
+            Notification.objects.bulk_create([new_notification(user_id) for user_id in missing])
+    except IntegrityError:
+        # Premier message concurrent pour un même destinataire : la contrainte
+        # unique refuse le second INSERT, le message est alors compté sur la
+        # notification créée par l'autre requête
+        for user_id in missing:
+            try:
+                with transaction.atomic():
+                    Notification.objects.bulk_create([new_notification(user_id)])
+            except IntegrityError:
+                unread.filter(user_id=user_id).update(**updates)
+                created -= 1
+    # bulk_create n'envoie pas post_save : compteurs de non lues recalculés
+    transaction.on_commit(lambda: notification_counters.invalidate_unread(missing))
+    return created
+
+
+def notify_chat_message(chat, message, recipients=None):
+    """Chat de transaction ou de litige (destinataires : autres participants)"""
+    if recipients is None:
+        recipients = chat.get_other_users(message.sender)
+    context = 'la transaction' if chat.transaction_id else 'le litige'
+    return _notify(
+        [user.id for user in recipients],
+        message.sender,
+        chat_realtime.channel_name('chat', chat.id),
+        type='new_message',
+        title='Nouveau message',
+        content=f"Vous avez reçu un message de {message.sender.username} dans {context}",
+        grouped_suffix=f"de {message.sender.username} dans {context}",
+        transaction_id=chat.transaction_id,
+        dispute_id=chat.dispute_id,
+        message=message,
+    )
+
+
+def notify_private_message(conversation, sender):
+    recipient_id = conversation.user2_id if sender.id == conversation.user1_id else conversation.user1_id
+    return _notify(
+        [recipient_id],
+        sender,
+        chat_realtime.channel_name('private', conversation.id),
+        type='private_message',
+        title='Nouveau message privé',
+        content=f"Vous avez reçu un message de {sender.username}",
+        grouped_suffix=f"de {sender.username}",
+    )
+
+
+def notify_group_message(group, sender, recipient_ids):
+    return _notify(
+        recipient_ids,
+        sender,
+        chat_realtime.channel_name('group', group.id),
+        type='group_message',
+        title=f'Nouveau message dans {group.name}'[:100],
+        content=f"{sender.username} a écrit dans {group.name}",
+        grouped_suffix=f"dans {group.name}",
+    )
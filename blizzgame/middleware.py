@@ -1,7 +1,8 @@
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.utils import timezone
-from .models import UserBan
+from django.utils.functional import SimpleLazyObject
+from . import ban_status
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,39 +18,12 @@ class BanCheckMiddleware:
         # Vérifier si l'utilisateur est connecté
         if request.user.is_authenticated:
             try:
-                # Vérifier s'il y a des bannissements actifs
-                active_bans_qs = UserBan.objects.filter(
-                    user=request.user,
-                    is_active=True
-                )
-                # Filtrer côté Python pour compat champs ends_at/end_date
-                now_ts = timezone.now()
-                active_bans = []
-                for b in active_bans_qs:
-                    ban_end = getattr(b, 'ends_at', getattr(b, 'end_date', None))
-                    if ban_end and ban_end < now_ts:
-                        continue
-                    active_bans.append(b)
+                # État de bannissement en cache (ban_status), une requête au plus par expiration
+                info = ban_status.get_active_ban(request.user.id)
                 
-                if active_bans:
-                    # Récupérer le bannissement le plus récent
-                    latest_ban = sorted(
-                        active_bans,
-                        key=lambda x: getattr(x, 'created_at', getattr(x, 'starts_at', now_ts)),
-                        reverse=True
-                    )[0]
-                    
+                if info:
                     # Stocker les informations du bannissement dans la session
-                    request.session['ban_info'] = {
-                        'reason': latest_ban.reason,
-                        'ban_type': latest_ban.ban_type,
-                        'ends_at': (
-                            getattr(latest_ban, 'ends_at', None) or getattr(latest_ban, 'end_date', None)
-                        ).strftime('%d/%m/%Y à %H:%M') if (
-                            getattr(latest_ban, 'ends_at', None) or getattr(latest_ban, 'end_date', None)
-                        ) else '',
-                        'details': latest_ban.details or '',
-                    }
+                    request.session['ban_info'] = info
                     
                     # Déconnecter l'utilisateur
                     from django.contrib.auth import logout
@@ -67,3 +41,17 @@ class BanCheckMiddleware:
 
         response = self.get_response(request)
         return response
+
+
+class UserCurrencyMiddleware:
+    """
+    Middleware qui résout la devise préférée de l'utilisateur une seule fois
+    par requête (à la première lecture de request.user_currency)
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from .currency_service import CurrencyService
+        request.user_currency = SimpleLazyObject(lambda: CurrencyService.get_user_currency(request.user))
+        return self.get_response(request)
@@ -0,0 +1,71 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:00
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    """Initialise les compteurs dénormalisés depuis les tables sources"""
+    Highlight = apps.get_model('blizzgame', 'Highlight')
+
+    def count_of(model_name, **filters):
+        model = apps.get_model('blizzgame', model_name)
+        counts = model.objects.filter(
+            highlight=OuterRef('pk'), **filters
+        ).order_by().values('highlight').annotate(total=Count('pk')).values('total')
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    updates = {
+        'views_count': count_of('HighlightView'),
+        'comments_count': count_of('HighlightComment'),
+    }
+    for level in range(1, 7):
+        updates[f'appreciation_level_{level}_count'] = count_of('HighlightAppreciation', appreciation_level=level)
+    Highlight.objects.update(**updates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blizzgame', '0102_alter_sellerpaymentinfo_encrypted_account_holder_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='highlight',
+            name='appreciation_level_1_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='highlight',
+            name='appreciation_level_2_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='highlight',
+            name='appreciation_level_3_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='highlight',
+            name='appreciation_level_4_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='highlight',
+            name='appreciation_level_5_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='highlight',
+            name='appreciation_level_6_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='highlight',
+            name='comments_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:03
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blizzgame', '0103_highlight_engagement_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HighlightFeedState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hashtag_affinity', models.JSONField(blank=True, default=dict, help_text="{hashtag: nombre d'interactions}")),
+                ('author_affinity', models.JSONField(blank=True, default=dict, help_text="{author_id: nombre d'interactions}")),
+                ('is_stale', models.BooleanField(default=True, help_text='Le classement doit être recalculé au prochain chargement')),
+                ('built_at', models.DateTimeField(blank=True, null=True)),
+                ('last_read_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='highlight_feed_state', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='HighlightFeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField(default=0)),
+                ('highlight_created_at', models.DateTimeField()),
+                ('highlight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='blizzgame.highlight')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='highlight_feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-score', '-highlight_created_at', '-highlight'], name='feed_entry_rank_idx')],
+                'unique_together': {('user', 'highlight')},
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_hashtag_index(apps, schema_editor):
+    """Indexe les hashtags des highlights existants"""
+    Highlight = apps.get_model('blizzgame', 'Highlight')
+    HighlightHashtag = apps.get_model('blizzgame', 'HighlightHashtag')
+
+    rows = []
+    for highlight_id, hashtags, created_at in Highlight.objects.values_list('id', 'hashtags', 'created_at').iterator():
+        tags = set()
+        for tag in hashtags or []:
+            tag = str(tag).strip().lstrip('#').lower()[:100]
+            if tag:
+                tags.add(tag)
+        rows.extend(HighlightHashtag(tag=tag, highlight_id=highlight_id, created_at=created_at) for tag in tags)
+        if len(rows) >= 1000:
+            HighlightHashtag.objects.bulk_create(rows, ignore_conflicts=True)
+            rows = []
+    if rows:
+        HighlightHashtag.objects.bulk_create(rows, ignore_conflicts=True)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blizzgame', '0104_highlight_feed_materialization'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HighlightHashtag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(help_text='Date de création du highlight (pour les fenêtres de tendances)')),
+                ('highlight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hashtag_index', to='blizzgame.highlight')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tag', '-created_at'], name='hashtag_tag_created_idx'), models.Index(fields=['created_at', 'tag'], name='hashtag_created_tag_idx')],
+                'unique_together': {('highlight', 'tag')},
+            },
+        ),
+        migrations.RunPython(backfill_hashtag_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blizzgame', '0105_highlight_hashtag_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HashtagTrend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=100, unique=True)),
+                ('log_score', models.FloatField(db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blizzgame', '0106_hashtag_trends'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['is_on_sale', 'is_sold', 'is_in_transaction', '-created_at'], name='post_listing_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['game_type', 'price'], name='post_game_price_idx'),
+        ),
+    ]
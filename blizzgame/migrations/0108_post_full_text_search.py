@@ -0,0 +1,91 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:14
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import Case, Value, When
+
+
+POSTGRES_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'french_unaccent') THEN
+            CREATE TEXT SEARCH CONFIGURATION french_unaccent (COPY = french);
+            ALTER TEXT SEARCH CONFIGURATION french_unaccent
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+        END IF;
+    END
+    $$
+    """,
+    "CREATE INDEX IF NOT EXISTS post_search_vector_gin ON blizzgame_post USING gin (search_vector)",
+]
+
+SQLITE_SETUP = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS blizzgame_post_fts USING fts5("
+    "post_id UNINDEXED, title, caption, game, tokenize='unicode61 remove_diacritics 2')",
+]
+
+
+def setup_search_backend(apps, schema_editor):
+    """Crée l'index de recherche propre au moteur (GIN PostgreSQL ou FTS5 SQLite) puis l'alimente"""
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRES_SETUP, 'sqlite': SQLITE_SETUP}.get(vendor)
+    if not statements:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+    # Alimentation avec le modèle historique (même pondération que
+    # listing_search.search_vector) : titre et jeu (A), description (B)
+    Post = apps.get_model('blizzgame', 'Post')
+    game_labels = dict(Post._meta.get_field('game_type').choices)
+    if vendor == 'postgresql':
+        game_label = Case(
+            *[When(game_type=key, then=Value(label)) for key, label in game_labels.items()],
+            default=Value(''),
+        )
+        Post.objects.update(search_vector=(
+            SearchVector('title', weight='A', config='french_unaccent')
+            + SearchVector(game_label, 'custom_game_name', weight='A', config='french_unaccent')
+            + SearchVector('caption', weight='B', config='french_unaccent')
+        ))
+        return
+
+    rows = [
+        (
+            str(post.id), post.title or '', post.caption or '',
+            ' '.join(filter(None, [game_labels.get(post.game_type, ''), post.custom_game_name])),
+        )
+        for post in Post.objects.only('id', 'title', 'caption', 'game_type', 'custom_game_name').iterator()
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DELETE FROM blizzgame_post_fts")
+        cursor.executemany(
+            "INSERT INTO blizzgame_post_fts (post_id, title, caption, game) VALUES (%s, %s, %s, %s)", rows
+        )
+
+
+def drop_search_backend(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS post_search_vector_gin")
+    elif vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS blizzgame_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blizzgame', '0107_post_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(setup_search_backend, drop_search_backend),
+    ]
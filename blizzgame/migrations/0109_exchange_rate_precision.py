@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blizzgame', '0108_post_full_text_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exchangerate',
+            name='rate',
+            field=models.DecimalField(decimal_places=10, max_digits=20),
+        ),
+    ]
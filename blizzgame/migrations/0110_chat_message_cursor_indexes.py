@@ -0,0 +1,27 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blizzgame', '0109_exchange_rate_precision'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='groupmessage',
+            index=models.Index(fields=['group', 'created_at', 'id'], name='groupmsg_group_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['chat', 'created_at', 'id'], name='message_chat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='privatemessage',
+            index=models.Index(fields=['conversation', 'created_at', 'id'], name='privmsg_conv_created_idx'),
+        ),
+    ]
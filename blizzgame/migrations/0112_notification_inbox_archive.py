@@ -0,0 +1,46 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blizzgame', '0111_notification_unread_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.UUIDField(primary_key=True, serialize=False)),
+                ('type', models.CharField(choices=[('purchase_intent', "Intention d'achat"), ('new_message', 'Nouveau message'), ('transaction_update', 'Mise à jour de transaction'), ('system', 'Notification système'), ('private_message', 'Message privé'), ('group_message', 'Message de groupe'), ('group_invite', 'Invitation de groupe'), ('friend_request', "Demande d'ami"), ('friend_accept', 'Amitié acceptée'), ('dispute_created', 'Litige créé'), ('dispute_resolved', 'Litige résolu'), ('dispute_message', 'Message de litige'), ('new_report', 'Nouveau signalement'), ('marketing', 'Notification marketing')], max_length=20)),
+                ('title', models.CharField(max_length=100)),
+                ('content', models.TextField()),
+                ('message_count', models.PositiveIntegerField(default=1)),
+                ('sender_username', models.CharField(blank=True, max_length=150)),
+                ('links', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', '-created_at', '-id'], name='notif_user_read_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivednotification',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_notifications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivednotification',
+            index=models.Index(fields=['user', '-created_at'], name='archived_notif_user_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blizzgame', '0112_notification_inbox_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='userban',
+            name='blizzgame_u_user_id_00f5ee_idx',
+        ),
+        migrations.AddIndex(
+            model_name='userban',
+            index=models.Index(fields=['user', 'is_active', 'ends_at'], name='userban_active_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blizzgame', '0113_userban_active_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='thread',
+            field=models.CharField(blank=True, default='', help_text='Discussion des messages groupés (chat:<id>, private:<id>, group:<id>)', max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_read', False), models.Q(('thread', ''), _negated=True)), fields=('user', 'type', 'thread'), name='notif_unread_thread_uniq'),
+        ),
+    ]
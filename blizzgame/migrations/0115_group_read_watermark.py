@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def collapse_read_rows(apps, schema_editor):
+    """Réduit les lignes GroupMessageRead au dernier message lu de chaque membre"""
+    GroupMembership = apps.get_model('blizzgame', 'GroupMembership')
+    GroupMessageRead = apps.get_model('blizzgame', 'GroupMessageRead')
+
+    latest = GroupMessageRead.objects.filter(
+        user_id=OuterRef('user_id'), message__group_id=OuterRef('group_id')
+    ).order_by('-message__created_at', '-message_id')
+    GroupMembership.objects.update(
+        last_read_message_at=Subquery(latest.values('message__created_at')[:1]),
+        last_read_message_id=Subquery(latest.values('message_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blizzgame', '0114_notification_thread'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='groupmembership',
+            name='last_read_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='blizzgame.groupmessage'),
+        ),
+        migrations.AddField(
+            model_name='groupmembership',
+            name='last_read_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(collapse_read_rows, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='GroupMessageRead',
+        ),
+    ]
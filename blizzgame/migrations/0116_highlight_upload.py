@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:49
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blizzgame', '0115_group_read_watermark'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='highlight',
+            name='poster',
+            field=models.ImageField(blank=True, help_text="Image d'aperçu extraite de la vidéo", upload_to='highlights_posters/'),
+        ),
+        migrations.CreateModel(
+            name='HighlightUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('caption', models.TextField(blank=True, max_length=500)),
+                ('source', models.FileField(blank=True, help_text='Vidéo réassemblée en attente de traitement', upload_to='highlights_uploads/')),
+                ('total_size', models.BigIntegerField()),
+                ('received_size', models.BigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('uploading', 'Upload en cours'), ('queued', 'En attente de traitement'), ('processing', 'Traitement en cours'), ('ready', 'Publiée'), ('failed', 'Échec')], default='uploading', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='highlight_uploads', to=settings.AUTH_USER_MODEL)),
+                ('highlight', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload', to='blizzgame.highlight')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='hl_upload_status_idx')],
+            },
+        ),
+    ]
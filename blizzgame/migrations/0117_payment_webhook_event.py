@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-17 20:54
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blizzgame', '0116_highlight_upload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentWebhookEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('provider', models.CharField(choices=[('cinetpay_gaming', 'CinetPay (transactions gaming)'), ('cinetpay_shop', 'CinetPay (boutique)')], max_length=20)),
+                ('merchant_transaction_id', models.CharField(max_length=100)),
+                ('status', models.CharField(blank=True, help_text='Statut annoncé par la notification', max_length=50)),
+                ('payload', models.JSONField(default=dict)),
+                ('state', models.CharField(choices=[('pending', 'En attente'), ('processing', 'En cours'), ('processed', 'Traité'), ('ignored', 'Ignoré (déjà traité)'), ('failed', 'Échec')], default='pending', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.CharField(blank=True, max_length=255)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['state', 'next_attempt_at'], name='payment_event_due_idx')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'merchant_transaction_id', 'status'), name='unique_payment_webhook_event')],
+            },
+        ),
+    ]
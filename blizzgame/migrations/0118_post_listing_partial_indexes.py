@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-17 21:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blizzgame', '0117_payment_webhook_event'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_in_transaction', True)), fields=['-created_at'], name='post_listing_in_tx_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_in_transaction', False), ('is_sold', True)), fields=['-created_at'], name='post_listing_sold_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator
 from django.utils import timezone
 import json
@@ -13,6 +14,7 @@ class Highlight(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='highlights')
     video = models.FileField(upload_to='highlights_videos/')
+    poster = models.ImageField(upload_to='highlights_posters/', blank=True, help_text="Image d'aperçu extraite de la vidéo")
     caption = models.TextField(max_length=500, blank=True)
     hashtags = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -20,6 +22,15 @@ class Highlight(models.Model):
     views_count = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
     
+    # Compteurs dénormalisés, maintenus par les signaux (voir highlight_counters.py)
+    comments_count = models.IntegerField(default=0)
+    appreciation_level_1_count = models.IntegerField(default=0)
+    appreciation_level_2_count = models.IntegerField(default=0)
+    appreciation_level_3_count = models.IntegerField(default=0)
+    appreciation_level_4_count = models.IntegerField(default=0)
+    appreciation_level_5_count = models.IntegerField(default=0)
+    appreciation_level_6_count = models.IntegerField(default=0)
+    
     class Meta:
         ordering = ['-created_at']
     
@@ -40,22 +51,53 @@ class Highlight(models.Model):
     
     @property
     def appreciations_count(self):
-        return self.appreciations.count()
-    
-    @property
-    def comments_count(self):
-        return self.comments.count()
+        return sum(self.get_appreciation_counts_by_level().values())
     
     def get_appreciation_counts_by_level(self):
         """Retourne un dictionnaire avec le nombre d'appréciations par niveau"""
-        counts = {}
-        for level in range(1, 7):
-            counts[level] = self.appreciations.filter(appreciation_level=level).count()
-        return counts
+        return {
+            level: getattr(self, f'appreciation_level_{level}_count')
+            for level in range(1, 7)
+        }
     
     def __str__(self):
         return f"Highlight by {self.author.username} - {self.created_at}"
 
+class HighlightUpload(models.Model):
+    """
+    Upload fractionné et reprenable d'une vidéo de Highlight, puis tâche de
+    traitement (voir highlight_uploads.py)
+    """
+    STATUS_CHOICES = [
+        ('uploading', 'Upload en cours'),
+        ('queued', 'En attente de traitement'),
+        ('processing', 'Traitement en cours'),
+        ('ready', 'Publiée'),
+        ('failed', 'Échec'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='highlight_uploads')
+    highlight = models.OneToOneField(Highlight, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload')
+    filename = models.CharField(max_length=255)
+    caption = models.TextField(max_length=500, blank=True)
+    source = models.FileField(upload_to='highlights_uploads/', blank=True, help_text="Vidéo réassemblée en attente de traitement")
+    total_size = models.BigIntegerField()
+    received_size = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    attempts = models.IntegerField(default=0)
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='hl_upload_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.status}) - {self.received_size}/{self.total_size}"
+
 class HighlightAppreciation(models.Model):
     """Système d'appréciation avec 6 niveaux d'émotions"""
     APPRECIATION_CHOICES = [
@@ -148,6 +190,63 @@ class UserSubscription(models.Model):
     def __str__(self):
         return f"{self.subscriber.username} subscribed to {self.subscribed_to.username}"
 
+class HighlightHashtag(models.Model):
+    """Index inversé hashtag -> highlight (tags normalisés en minuscules, sans '#')"""
+    tag = models.CharField(max_length=100)
+    highlight = models.ForeignKey(Highlight, on_delete=models.CASCADE, related_name='hashtag_index')
+    created_at = models.DateTimeField(help_text="Date de création du highlight (pour les fenêtres de tendances)")
+    
+    class Meta:
+        unique_together = ['highlight', 'tag']
+        indexes = [
+            models.Index(fields=['tag', '-created_at'], name='hashtag_tag_created_idx'),
+            models.Index(fields=['created_at', 'tag'], name='hashtag_created_tag_idx'),
+        ]
+    
+    def __str__(self):
+        return f"#{self.tag} - {self.highlight_id}"
+
+class HashtagTrend(models.Model):
+    """
+    Score de tendance d'un hashtag à décroissance exponentielle.
+    log_score = log2(somme des poids * 2^((bucket - époque) / demi-vie)) : l'ordre
+    des scores ne dépend pas de l'instant de lecture, le top-N est donc lu par index.
+    """
+    tag = models.CharField(max_length=100, unique=True)
+    log_score = models.FloatField(db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"#{self.tag} ({self.log_score:.2f})"
+
+class HighlightFeedState(models.Model):
+    """État du feed « Pour toi » matérialisé d'un utilisateur (affinités et fraîcheur)"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='highlight_feed_state')
+    hashtag_affinity = models.JSONField(default=dict, blank=True, help_text="{hashtag: nombre d'interactions}")
+    author_affinity = models.JSONField(default=dict, blank=True, help_text="{author_id: nombre d'interactions}")
+    is_stale = models.BooleanField(default=True, help_text="Le classement doit être recalculé au prochain chargement")
+    built_at = models.DateTimeField(null=True, blank=True)
+    last_read_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    def __str__(self):
+        return f"Feed de {self.user.username}"
+
+class HighlightFeedEntry(models.Model):
+    """Candidat classé du feed matérialisé d'un utilisateur"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='highlight_feed_entries')
+    highlight = models.ForeignKey(Highlight, on_delete=models.CASCADE, related_name='feed_entries')
+    score = models.IntegerField(default=0)
+    highlight_created_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ['user', 'highlight']
+        indexes = [
+            models.Index(fields=['user', '-score', '-highlight_created_at', '-highlight'], name='feed_entry_rank_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.highlight_id} ({self.score})"
+
 # Modèles existants
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -305,6 +404,19 @@ class Post(models.Model):
     custom_game_name = models.CharField(max_length=100, blank=True, null=True)
     coins = models.CharField(max_length=100, default='')
     level = models.CharField(max_length=50, default='')
+    # Recherche plein texte PostgreSQL (voir listing_search.py, index GIN créé par la migration 0108)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Listing de l'accueil : une tranche de statut triée par date
+            # (tranches 1 et 4 : égalité sur les trois booléens)
+            models.Index(fields=['is_on_sale', 'is_sold', 'is_in_transaction', '-created_at'], name='post_listing_status_idx'),
+            # Tranches 2 et 3 : is_on_sale / is_sold libres, index partiels
+            models.Index(fields=['-created_at'], condition=models.Q(is_in_transaction=True), name='post_listing_in_tx_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(is_sold=True, is_in_transaction=False), name='post_listing_sold_idx'),
+            models.Index(fields=['game_type', 'price'], name='post_game_price_idx'),
+        ]
 
     def get_game_display_name(self):
         if self.game_type == 'other' and self.custom_game_name:
@@ -318,7 +430,8 @@ class Post(models.Model):
 
     @property
     def has_banner(self):
-        return bool(self.banner and self.banner.name != 'def_img.png')
+        # Bannière envoyée directement (media_uploads) : seule l'URL est enregistrée
+        return bool(self.banner_url) or bool(self.banner and self.banner.name != 'def_img.png')
 
     @property
     def time_since_created(self):
@@ -334,6 +447,8 @@ class Post(models.Model):
     def __str__(self):
         return self.title
 
+MAX_POST_IMAGES = 10  # Images supplémentaires par annonce (contrainte max_images_per_post)
+
 class PostImage(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='post_images')
@@ -344,7 +459,7 @@ class PostImage(models.Model):
         ordering = ['order']
         constraints = [
             models.UniqueConstraint(fields=['post', 'order'], name='unique_image_order'),
-            models.CheckConstraint(check=models.Q(order__lt=10), name='max_images_per_post'),
+            models.CheckConstraint(check=models.Q(order__lt=MAX_POST_IMAGES), name='max_images_per_post'),
         ]
 
 class PostVideo(models.Model):
@@ -709,6 +824,49 @@ class ShopCinetPayTransaction(models.Model):
     def __str__(self):
         return f"Shop CinetPay {self.cinetpay_transaction_id} - {self.order.order_number}"
 
+class PaymentWebhookEvent(models.Model):
+    """
+    Notification de paiement brute, enregistrée par le webhook et traitée une
+    seule fois par le worker (voir payment_webhooks.py)
+    """
+    PROVIDER_CHOICES = [
+        ('cinetpay_gaming', 'CinetPay (transactions gaming)'),
+        ('cinetpay_shop', 'CinetPay (boutique)'),
+    ]
+    STATE_CHOICES = [
+        ('pending', 'En attente'),
+        ('processing', 'En cours'),
+        ('processed', 'Traité'),
+        ('ignored', 'Ignoré (déjà traité)'),
+        ('failed', 'Échec'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    provider = models.CharField(max_length=20, choices=PROVIDER_CHOICES)
+    merchant_transaction_id = models.CharField(max_length=100)
+    status = models.CharField(max_length=50, blank=True, help_text="Statut annoncé par la notification")
+    payload = models.JSONField(default=dict)
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.CharField(max_length=255, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['provider', 'merchant_transaction_id', 'status'],
+                name='unique_payment_webhook_event'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['state', 'next_attempt_at'], name='payment_event_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} {self.merchant_transaction_id} {self.status} - {self.state}"
+
 # Modèles de réputation et autres (existants)
 class UserReputation(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='userreputation')
@@ -882,7 +1040,7 @@ class UserCurrency(models.Model):
 class ExchangeRate(models.Model):
     base_currency = models.CharField(max_length=3)
     target_currency = models.CharField(max_length=3)
-    rate = models.DecimalField(max_digits=15, decimal_places=6)
+    rate = models.DecimalField(max_digits=20, decimal_places=10)
     last_updated = models.DateTimeField(auto_now=True)
     
     class Meta:
@@ -1000,6 +1158,10 @@ class Message(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Lecture par curseur (chat_history)
+            models.Index(fields=['chat', 'created_at', 'id'], name='message_chat_created_idx'),
+        ]
     
     def __str__(self):
         return f"Message {self.id.hex[:8]}"
@@ -1059,6 +1221,7 @@ class Notification(models.Model):
     # Champs pour le groupement des messages
     message_count = models.PositiveIntegerField(default=1, help_text="Nombre de messages groupés")
     sender_username = models.CharField(max_length=150, blank=True, help_text="Nom d'utilisateur de l'expéditeur des messages groupés")
+    thread = models.CharField(max_length=64, blank=True, default='', help_text="Discussion des messages groupés (chat:<id>, private:<id>, group:<id>)")
     
     # Relations optionnelles
     transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name='notifications', null=True, blank=True)
@@ -1069,10 +1232,72 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['is_read', '-created_at']  # Non lues en premier, puis par date décroissante
+        indexes = [
+            # Recalcul à froid du compteur de non lues (notification_counters)
+            models.Index(fields=['user'], condition=models.Q(is_read=False), name='notif_user_unread_idx'),
+            # Boîte de réception paginée par curseur (notification_inbox)
+            models.Index(fields=['user', 'is_read', '-created_at', '-id'], name='notif_user_read_created_idx'),
+        ]
+        constraints = [
+            # Une seule notification non lue par discussion (message_notifications)
+            models.UniqueConstraint(
+                fields=['user', 'type', 'thread'],
+                condition=models.Q(is_read=False) & ~models.Q(thread=''),
+                name='notif_unread_thread_uniq'
+            ),
+        ]
 
     def __str__(self):
         return f"Notification for {self.user.username}: {self.title}"
 
+
+class ArchivedNotification(models.Model):
+    """
+    Stockage froid des notifications lues anciennes (cleanup_notifications).
+    Les relations sont conservées sous forme d'identifiants dans `links` :
+    l'archive survit à la suppression des objets liés.
+    """
+    id = models.UUIDField(primary_key=True)  # Identifiant de la notification d'origine
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_notifications')
+    type = models.CharField(max_length=20, choices=Notification.TYPE_CHOICES)
+    title = models.CharField(max_length=100)
+    content = models.TextField()
+    message_count = models.PositiveIntegerField(default=1)
+    sender_username = models.CharField(max_length=150, blank=True)
+    links = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    LINK_FIELDS = ['transaction', 'message', 'dispute', 'report', 'order']
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_notif_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived notification for {self.user_id}: {self.title}"
+
+    @classmethod
+    def from_notification(cls, notification):
+        links = {}
+        for field in cls.LINK_FIELDS:
+            value = getattr(notification, f'{field}_id')
+            if value is not None:
+                links[field] = str(value)
+        return cls(
+            id=notification.id,
+            user_id=notification.user_id,
+            type=notification.type,
+            title=notification.title,
+            content=notification.content,
+            message_count=notification.message_count,
+            sender_username=notification.sender_username,
+            links=links,
+            created_at=notification.created_at,
+        )
+
 # Modèles pour les informations de paiement vendeur
 class SellerPaymentInfo(models.Model):
     PAYMENT_METHOD_CHOICES = [
@@ -1172,6 +1397,9 @@ class GroupMembership(models.Model):
     joined_at = models.DateTimeField(auto_now_add=True)
     left_at = models.DateTimeField(null=True, blank=True)
     added_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='added_members')
+    # Watermark de lecture (group_reads) : dernier message lu par le membre
+    last_read_message_at = models.DateTimeField(null=True, blank=True)
+    last_read_message = models.ForeignKey('GroupMessage', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
 
     class Meta:
         unique_together = ['user', 'group']
@@ -1194,19 +1422,14 @@ class GroupMessage(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Lecture par curseur (chat_history)
+            models.Index(fields=['group', 'created_at', 'id'], name='groupmsg_group_created_idx'),
+        ]
 
     def __str__(self):
         return f"Group message from {self.sender.username} in {self.group.name}"
 
-class GroupMessageRead(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
-    message = models.ForeignKey(GroupMessage, on_delete=models.CASCADE, related_name='read_by')
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='read_group_messages')
-    read_at = models.DateTimeField(auto_now_add=True)
-
-    class Meta:
-        unique_together = ['message', 'user']
-
 class PrivateConversation(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
     user1 = models.ForeignKey(User, on_delete=models.CASCADE, related_name='private_chats_as_user1')
@@ -1245,6 +1468,10 @@ class PrivateMessage(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Lecture par curseur (chat_history)
+            models.Index(fields=['conversation', 'created_at', 'id'], name='privmsg_conv_created_idx'),
+        ]
 
     def __str__(self):
         return f"Private message from {self.sender.username}"
@@ -2105,7 +2332,8 @@ class UserBan(models.Model):
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['user', 'is_active']),
+            # Bannissements actifs non expirés (ban_status), couvre aussi (user, is_active)
+            models.Index(fields=['user', 'is_active', 'ends_at'], name='userban_active_idx'),
             models.Index(fields=['admin', 'created_at']),
         ]
     
@@ -0,0 +1,94 @@
+"""
+Compteur de notifications non lues par utilisateur
+
+Le badge de notifications ne fait plus de COUNT(*) à chaque affichage : le
+nombre de notifications non lues est gardé dans Redis et ajusté par les
+signaux de Notification (création, lecture, suppression) après le commit.
+Les mises à jour en masse (tout marquer comme lu, actions admin) appellent
+reset_unread / invalidate_unread.
+
+Sur un cache froid (clé absente ou expirée), le compteur est recalculé par un
+COUNT limité à l'index partiel (user_id) WHERE is_read = false.
+
+Chaque changement est poussé aux onglets de l'utilisateur via le channel layer
+(événement notification_count, fusionné par lot, voir realtime_dispatch) ; le
+compteur courant est aussi envoyé à chaque connexion du WebSocket, les clients
+n'interrogent plus /notifications/unread/count/.
+"""
+import logging
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+from .models import Notification
+from . import chat_realtime, realtime_dispatch
+
+logger = logging.getLogger(__name__)
+
+# Compteurs chauds : base Redis dédiée (settings.CACHES['counters'])
+cache = ConnectionProxy(caches, 'counters')
+
+UNREAD_COUNT_TIMEOUT = 24 * 60 * 60  # 24 heures
+
+
+def _key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def count_unread(user_id):
+    """COUNT en base (index partiel notif_user_unread_idx)"""
+    return Notification.objects.filter(user_id=user_id, is_read=False).count()
+
+
+def get_unread_count(user_id):
+    count = cache.get(_key(user_id))
+    if count is None:
+        count = count_unread(user_id)
+        # add et non set : un incr concurrent (clé recréée entre-temps) n'est
+        # pas écrasé par un COUNT déjà dépassé
+        if not cache.add(_key(user_id), count, UNREAD_COUNT_TIMEOUT):
+            count = cache.get(_key(user_id), count)
+    return max(int(count), 0)
+
+
+def adjust_unread(user_id, delta):
+    """
+    Ajuste le compteur d'un utilisateur. Si la clé est absente, on ne fait
+    rien : le prochain get_unread_count la reconstruira depuis la base.
+    """
+    if delta:
+        try:
+            count = cache.incr(_key(user_id), delta)
+            # Compteur désynchronisé (négatif) : recalcul au prochain accès
+            if count is not None and count < 0:
+                cache.delete(_key(user_id))
+        except ValueError:
+            pass
+    push_unread_count(user_id)
+
+
+def reset_unread(user_id, count=0):
+    cache.set(_key(user_id), count, UNREAD_COUNT_TIMEOUT)
+    push_unread_count(user_id)
+
+
+def invalidate_unread(user_ids):
+    """Force le recalcul (mises à jour en masse dont on ne connaît pas le détail)"""
+    user_ids = set(user_ids)
+    cache.delete_many([_key(user_id) for user_id in user_ids])
+    for user_id in user_ids:
+        push_unread_count(user_id)
+
+
+def push_unread_count(user_id):
+    """Envoie le compteur à jour aux connexions temps réel de l'utilisateur"""
+    try:
+        count = get_unread_count(user_id)
+    except Exception as e:
+        logger.error(f"Compteur de notifications indisponible pour {user_id}: {e}")
+        return
+    realtime_dispatch.publish(
+        realtime_dispatch.CHANNEL_LAYER,
+        chat_realtime.user_group(user_id),
+        'notification_count',
+        {'type': 'notification_count', 'unread': count},
+        coalesce=True
+    )
@@ -0,0 +1,134 @@
+"""
+Boîte de réception des notifications (pagination par curseur)
+
+Les notifications sont lues par tranches (non lues puis lues), chacune triée
+par (created_at, id) décroissants : chaque requête est une lecture par plage
+de l'index composite (user, is_read, created_at, id), sans tri en Python,
+sans COUNT ni OFFSET. Les données liées (transaction, litige, message) sont
+jointes et les demandes d'information en attente chargées en une requête :
+le nombre de requêtes ne dépend pas du nombre de notifications affichées.
+
+Les notifications lues anciennes sont déplacées vers ArchivedNotification par
+la commande cleanup_notifications (archive_read_notifications).
+"""
+import logging
+import uuid
+from datetime import datetime
+from django.db import transaction
+from django.db.models import Q
+from .highlight_feed import InvalidCursor, decode_cursor, encode_cursor
+from .models import ArchivedNotification, DisputeInformationRequest, Notification
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 30
+CURSOR_KIND = 'n'
+ARCHIVE_BATCH_SIZE = 1000
+
+# Tranches dans l'ordre d'affichage : non lues puis lues
+READ_BANDS = [False, True]
+
+
+def inbox_queryset(user):
+    return Notification.objects.filter(user=user).select_related(
+        'transaction', 'dispute', 'message__chat'
+    )
+
+
+def _encode(notification):
+    return encode_cursor(CURSOR_KIND, [
+        notification.is_read, notification.created_at.isoformat(), str(notification.id)
+    ])
+
+
+def _decode(cursor):
+    kind, values = decode_cursor(cursor)
+    try:
+        if kind != CURSOR_KIND or len(values) != 3 or not isinstance(values[0], bool):
+            raise ValueError
+        return values[0], datetime.fromisoformat(values[1]), uuid.UUID(values[2])
+    except (TypeError, ValueError):
+        raise InvalidCursor('Curseur invalide')
+
+
+def read_inbox(user, cursor=None, limit=PAGE_SIZE):
+    """
+    Retourne (notifications, next_cursor). Au plus une requête par tranche,
+    plus une pour les demandes d'information en attente.
+    """
+    start_read, key = (False, None)
+    if cursor:
+        is_read, created_at, notification_id = _decode(cursor)
+        start_read, key = is_read, (created_at, notification_id)
+
+    notifications = []
+    for is_read in READ_BANDS:
+        if start_read and not is_read:
+            continue
+        queryset = inbox_queryset(user).filter(is_read=is_read)
+        if key is not None and is_read == start_read:
+            created_at, notification_id = key
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=notification_id)
+            )
+        remaining = limit + 1 - len(notifications)
+        notifications.extend(queryset.order_by('-created_at', '-id')[:remaining])
+        if len(notifications) > limit:
+            break
+
+    has_more = len(notifications) > limit
+    notifications = notifications[:limit]
+    attach_pending_requests(user, notifications)
+    next_cursor = _encode(notifications[-1]) if has_more and notifications else None
+    return notifications, next_cursor
+
+
+def attach_pending_requests(user, notifications):
+    """
+    Pose `pending_request` (première demande d'information en attente adressée
+    à l'utilisateur) sur les notifications de litige, en une seule requête.
+    """
+    dispute_ids = {
+        note.dispute_id for note in notifications
+        if note.type == 'dispute_message' and note.dispute_id
+    }
+    pending = {}
+    if dispute_ids:
+        pending_requests = DisputeInformationRequest.objects.filter(
+            dispute_id__in=dispute_ids, requested_to=user, status='pending'
+        ).order_by('dispute_id', '-created_at')
+        for information_request in pending_requests:
+            pending.setdefault(information_request.dispute_id, information_request)
+
+    for note in notifications:
+        if note.type == 'dispute_message' and note.dispute_id:
+            note.pending_request = pending.get(note.dispute_id)
+
+
+# ===== ARCHIVAGE =====
+
+def archive_read_notifications(cutoff, batch_size=ARCHIVE_BATCH_SIZE, dry_run=False):
+    """
+    Déplace les notifications lues créées avant `cutoff` vers
+    ArchivedNotification, par lots (copie puis suppression dans la même
+    transaction). Retourne le nombre de notifications archivées.
+    """
+    queryset = Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+    if dry_run:
+        return queryset.count()
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            batch = list(queryset.order_by('created_at', 'id')[:batch_size])
+            if not batch:
+                break
+            ArchivedNotification.objects.bulk_create(
+                [ArchivedNotification.from_notification(note) for note in batch],
+                ignore_conflicts=True
+            )
+            Notification.objects.filter(id__in=[note.id for note in batch]).delete()
+        archived += len(batch)
+        if len(batch) < batch_size:
+            break
+    return archived
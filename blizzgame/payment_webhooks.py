@@ -0,0 +1,323 @@
+"""
+Notifications de paiement CinetPay : enregistrement immédiat, traitement par un worker
+
+Les webhooks (transactions gaming et boutique) ne vérifient plus le paiement
+pendant la requête : record_event() insère la notification brute
+(PaymentWebhookEvent) et la vue répond aussitôt. La contrainte unique
+(provider, merchant_transaction_id, status) absorbe les renvois de CinetPay
+et les notifications en double (INSERT ... ON CONFLICT DO NOTHING) ; un
+renvoi d'un événement abandonné le remet en file.
+
+Le worker (commande process_payment_webhooks) :
+
+- réserve les événements dus par UPDATE conditionnel : un événement n'est
+  traité que par un seul worker ; un événement resté « processing » après un
+  crash est repris à l'expiration de son bail (PROCESSING_TIMEOUT) ;
+- vérifie le paiement auprès de CinetPay hors transaction. Une vérification
+  impossible (réseau, erreur 5xx) ou un statut non final est réessayé plus
+  tard avec un délai exponentiel, jusqu'à MAX_ATTEMPTS essais ;
+- applique le résultat dans une seule transaction atomique, lignes
+  CinetPayTransaction / Transaction / Post (ou ShopCinetPayTransaction /
+  Order) verrouillées par select_for_update. Une transition ne part que de
+  l'état d'attente du paiement et l'événement est marqué traité dans la même
+  transaction : un doublon traité en parallèle trouve le paiement déjà à jour
+  et ne change rien (pas de seconde notification, pas de statut inversé).
+
+Les tests utilisent fake_cinetpay (serveur CinetPay local).
+"""
+import logging
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .cinetpay_utils import CinetPayAPI, GamingCinetPayAPI
+from .models import (
+    CinetPayTransaction, Notification, Order, PaymentWebhookEvent, Post,
+    ShopCinetPayTransaction, Transaction,
+)
+
+logger = logging.getLogger(__name__)
+
+GAMING = 'cinetpay_gaming'
+SHOP = 'cinetpay_shop'
+
+PROCESS_BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+RETRY_BASE_DELAY = timedelta(seconds=30)
+RETRY_MAX_DELAY = timedelta(hours=1)
+PROCESSING_TIMEOUT = timedelta(minutes=5)
+
+SUCCESS = 'SUCCESS'
+FAILED = 'FAILED'
+
+
+class RetryLater(Exception):
+    """Paiement impossible à vérifier pour l'instant (à réessayer)"""
+
+
+# ===== ENREGISTREMENT (WEBHOOK) =====
+
+def event_key(provider, payload):
+    """(merchant_transaction_id, statut annoncé) d'une notification"""
+    if provider == GAMING:
+        identifier = payload.get('merchant_transaction_id') or payload.get('cpm_trans_id')
+    else:
+        identifier = payload.get('cpm_trans_id')
+    status = payload.get('status') or payload.get('cpm_trans_status') or payload.get('cpm_result') or ''
+    return str(identifier or '').strip()[:100], str(status).strip().upper()[:50]
+
+
+def record_event(provider, payload):
+    """
+    Enregistre la notification (une seule fois par clé). Un renvoi d'une
+    notification abandonnée (état failed) la remet en file avec un budget
+    d'essais neuf. Retourne la clé de l'événement, ou None si la
+    notification n'a pas d'identifiant.
+    """
+    merchant_transaction_id, status = event_key(provider, payload)
+    if not merchant_transaction_id:
+        return None
+    PaymentWebhookEvent.objects.bulk_create([
+        PaymentWebhookEvent(
+            provider=provider,
+            merchant_transaction_id=merchant_transaction_id,
+            status=status,
+            payload=payload,
+        )
+    ], ignore_conflicts=True)
+    PaymentWebhookEvent.objects.filter(
+        provider=provider,
+        merchant_transaction_id=merchant_transaction_id,
+        status=status,
+        state='failed',
+    ).update(state='pending', attempts=0, next_attempt_at=timezone.now(), processed_at=None)
+    return merchant_transaction_id, status
+
+
+# ===== PAIEMENTS =====
+
+class GamingPayments:
+    """Transactions gaming (API v1) : CinetPayTransaction -> Transaction -> Post"""
+    model = CinetPayTransaction
+    pending_statuses = ('pending_payment',)
+
+    @staticmethod
+    def verify(cinetpay_transaction):
+        # On privilégie le payment_token si présent, sinon l'identifiant marchand
+        identifier = cinetpay_transaction.payment_token or cinetpay_transaction.cinetpay_transaction_id
+        result = GamingCinetPayAPI().verify_payment(identifier)
+        if not result:
+            raise RetryLater('Vérification CinetPay impossible')
+        status = (result.get('status') or '').upper()
+        if status not in (SUCCESS, FAILED):
+            raise RetryLater(f'Statut de paiement non final: {status or "inconnu"}')
+        return status
+
+    @staticmethod
+    def apply(payment_id, payment_status):
+        # Ordre de verrouillage fixe : paiement, transaction, annonce
+        cinetpay_transaction = CinetPayTransaction.objects.select_for_update().get(pk=payment_id)
+        gaming_transaction = Transaction.objects.select_for_update().get(pk=cinetpay_transaction.transaction_id)
+        post = Post.objects.select_for_update().get(pk=gaming_transaction.post_id)
+        if cinetpay_transaction.status not in GamingPayments.pending_statuses:
+            return 'ignored'
+
+        if payment_status == SUCCESS:
+            cinetpay_transaction.status = 'payment_received'
+            cinetpay_transaction.payment_received_at = timezone.now()
+            cinetpay_transaction.save(update_fields=['status', 'payment_received_at'])
+
+            gaming_transaction.status = 'processing'
+            gaming_transaction.save(update_fields=['status', 'updated_at'])
+
+            # L'annonce passe en mode transaction (paiement confirmé)
+            post.is_in_transaction = True
+            post.is_on_sale = False
+            post.save(update_fields=['is_in_transaction', 'is_on_sale'])
+
+            Notification.objects.create(
+                user_id=gaming_transaction.seller_id,
+                type='transaction_update',
+                title=' Paiement reçu',
+                content=f'Le paiement pour "{post.title}" a été reçu. La transaction est maintenant active.',
+                transaction=gaming_transaction
+            )
+            logger.info(f"Paiement gaming réussi pour: {cinetpay_transaction.cinetpay_transaction_id}, annonce marquée en transaction")
+        else:
+            cinetpay_transaction.status = 'failed'
+            cinetpay_transaction.save(update_fields=['status'])
+
+            gaming_transaction.status = 'cancelled'
+            gaming_transaction.save(update_fields=['status', 'updated_at'])
+
+            # Remettre l'annonce en vente
+            post.is_in_transaction = False
+            post.is_on_sale = True
+            post.save(update_fields=['is_in_transaction', 'is_on_sale'])
+            logger.info(f"Paiement gaming échoué pour: {cinetpay_transaction.cinetpay_transaction_id}, annonce remise en vente")
+        return 'processed'
+
+
+class ShopPayments:
+    """Boutique (Checkout API v2) : ShopCinetPayTransaction -> Order"""
+    model = ShopCinetPayTransaction
+    pending_statuses = ('pending', 'processing')
+
+    @staticmethod
+    def verify(shop_transaction):
+        result = CinetPayAPI().verify_payment(shop_transaction.cinetpay_transaction_id)
+        if not result:
+            raise RetryLater('Vérification CinetPay impossible')
+        status = (result.get('data') or {}).get('payment_status') or ''
+        if status == 'ACCEPTED':
+            return SUCCESS
+        if status == 'REFUSED':
+            return FAILED
+        raise RetryLater(f'Statut de paiement non final: {status or "inconnu"}')
+
+    @staticmethod
+    def apply(payment_id, payment_status):
+        shop_transaction = ShopCinetPayTransaction.objects.select_for_update().get(pk=payment_id)
+        order = Order.objects.select_for_update().get(pk=shop_transaction.order_id)
+        if shop_transaction.status not in ShopPayments.pending_statuses:
+            return 'ignored'
+
+        if payment_status == SUCCESS:
+            shop_transaction.status = 'completed'
+            shop_transaction.completed_at = timezone.now()
+            shop_transaction.save(update_fields=['status', 'completed_at', 'updated_at'])
+
+            order.payment_status = 'paid'
+            order.status = 'processing'
+            order.save(update_fields=['payment_status', 'status', 'updated_at'])
+            # TEMPORAIRE: Shopify désactivé car Wiio ne livre pas au Sénégal
+            logger.info(f"Paiement accepté pour: {order.order_number}")
+        else:
+            shop_transaction.status = 'failed'
+            shop_transaction.save(update_fields=['status', 'updated_at'])
+
+            order.payment_status = 'failed'
+            order.status = 'cancelled'
+            order.save(update_fields=['payment_status', 'status', 'updated_at'])
+            logger.info(f"Paiement échoué pour: {shop_transaction.cinetpay_transaction_id}")
+        return 'processed'
+
+
+PAYMENTS = {
+    GAMING: GamingPayments,
+    SHOP: ShopPayments,
+}
+
+
+# ===== TRAITEMENT (WORKER) =====
+
+def retry_delay(attempts):
+    """Délai avant le prochain essai : 30 s, 1 min, 2 min... plafonné à 1 h"""
+    return min(RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0)), RETRY_MAX_DELAY)
+
+
+def claim(event):
+    """Réserve un événement dû pour ce worker (False s'il est déjà pris)"""
+    now = timezone.now()
+    claimed = PaymentWebhookEvent.objects.filter(
+        Q(state='pending') | Q(state='processing'),
+        pk=event.pk,
+        attempts=event.attempts,
+        next_attempt_at__lte=now,
+    ).update(state='processing', attempts=event.attempts + 1, next_attempt_at=now + PROCESSING_TIMEOUT)
+    if claimed:
+        event.state = 'processing'
+        event.attempts += 1
+    return bool(claimed)
+
+
+def due_events(limit=PROCESS_BATCH_SIZE):
+    """
+    Événements à traiter : en attente et dus, ou en cours dont le bail a
+    expiré (worker interrompu)
+    """
+    return list(
+        PaymentWebhookEvent.objects.filter(
+            state__in=['pending', 'processing'],
+            next_attempt_at__lte=timezone.now(),
+        ).order_by('next_attempt_at')[:limit]
+    )
+
+
+def _finish(event, state, error=''):
+    PaymentWebhookEvent.objects.filter(pk=event.pk).update(
+        state=state, last_error=error[:255], processed_at=timezone.now()
+    )
+    event.state = state
+
+
+def _retry(event, error):
+    if event.attempts >= MAX_ATTEMPTS:
+        logger.error(f"Notification {event.provider} {event.merchant_transaction_id} abandonnée après {event.attempts} essais: {error}")
+        _finish(event, 'failed', error)
+        return 'failed'
+    PaymentWebhookEvent.objects.filter(pk=event.pk).update(
+        state='pending', last_error=error[:255], next_attempt_at=timezone.now() + retry_delay(event.attempts)
+    )
+    event.state = 'pending'
+    return 'retry'
+
+
+def process_event(event):
+    """
+    Traite un événement réservé par claim(). Retourne 'processed',
+    'ignored' (paiement déjà traité), 'retry' ou 'failed'.
+    """
+    payments = PAYMENTS[event.provider]
+    try:
+        payment = payments.model.objects.filter(cinetpay_transaction_id=event.merchant_transaction_id).first()
+        if not payment:
+            logger.error(f"Transaction CinetPay non trouvée: {event.merchant_transaction_id}")
+            _finish(event, 'failed', 'Transaction CinetPay inconnue')
+            return 'failed'
+        if payment.status not in payments.pending_statuses:
+            # Doublon d'un paiement déjà traité : aucun appel à CinetPay
+            _finish(event, 'ignored')
+            return 'ignored'
+
+        payment_status = payments.verify(payment)
+        with transaction.atomic():
+            outcome = payments.apply(payment.pk, payment_status)
+            _finish(event, outcome)
+        return outcome
+    except RetryLater as e:
+        logger.warning(f"Notification {event.provider} {event.merchant_transaction_id}: {e} (essai {event.attempts})")
+        return _retry(event, str(e))
+    except Exception as e:
+        logger.error(f"Erreur traitement notification {event.provider} {event.merchant_transaction_id}: {e}")
+        return _retry(event, str(e))
+
+
+def process_pending(limit=PROCESS_BATCH_SIZE):
+    """Traite les événements dus ; retourne le nombre d'événements par résultat"""
+    results = {'processed': 0, 'ignored': 0, 'retry': 0, 'failed': 0}
+    for event in due_events(limit):
+        if claim(event):
+            results[process_event(event)] += 1
+    return results
+
+
+def process_now(provider, payload):
+    """
+    Enregistre une notification et la traite aussitôt (scripts, support).
+    Retourne True si le paiement est à jour (traité maintenant ou déjà).
+    """
+    key = record_event(provider, payload)
+    if not key:
+        logger.error("ID de transaction manquant dans la notification")
+        return False
+    event = PaymentWebhookEvent.objects.get(provider=provider, merchant_transaction_id=key[0], status=key[1])
+    if event.state in ('processed', 'ignored'):
+        return True
+    if not claim(event):
+        return False
+    return process_event(event) in ('processed', 'ignored')
+
+
+def pending_events():
+    return PaymentWebhookEvent.objects.filter(state__in=['pending', 'processing']).count()
@@ -7,6 +7,7 @@ import logging
 from django.utils import timezone
 from django.db import transaction
 from .models import Post, UserBan, Dispute, Transaction
+from . import ban_status
 
 logger = logging.getLogger(__name__)
 
@@ -16,12 +17,7 @@ def is_user_banned(user):
     Vérifie si un utilisateur est actuellement banni
     """
     try:
-        active_bans = UserBan.objects.filter(
-            user=user,
-            is_active=True
-        ).exclude(ends_at__lt=timezone.now())
-        
-        return active_bans.exists()
+        return ban_status.is_banned(user.id)
     except Exception as e:
         logger.error(f"Erreur lors de la vérification du bannissement pour {user.username}: {e}")
         return False
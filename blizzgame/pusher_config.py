@@ -1,5 +1,6 @@
 import pusher
 from django.conf import settings
+from .realtime_dispatch import PUSHER, publish
 
 # Configuration Pusher
 pusher_client = pusher.Pusher(
@@ -13,42 +14,16 @@ pusher_client = pusher.Pusher(
 def send_message_to_chat(transaction_id, message_data):
     """
     Envoyer un message à un canal de chat spécifique
+    (différé après le commit, voir realtime_dispatch)
     """
-    try:
-        pusher_client.trigger(
-            f'transaction-chat-{transaction_id}',
-            'new-message',
-            message_data
-        )
-        return True
-    except Exception as e:
-        print(f"Erreur Pusher: {e}")
-        return False
+    publish(PUSHER, f'transaction-chat-{transaction_id}', 'new-message', message_data)
+    return True
 
 def send_notification_to_user(user_id, notification_data):
     """
     Envoyer une notification en temps réel à un utilisateur spécifique
+    Uniquement sur son canal personnel ; une rafale de notifications pour un
+    même utilisateur est fusionnée en un seul événement par lot.
     """
-    try:
-        # Envoyer à l'utilisateur spécifique
-        pusher_client.trigger(
-            f'user-notifications-{user_id}',
-            'new-notification',
-            notification_data
-        )
-        
-        # Envoyer aussi sur le canal global pour l'indicateur
-        pusher_client.trigger(
-            'notifications',
-            'new_notification',
-            {
-                'title': notification_data.get('title', 'Nouvelle notification'),
-                'message': notification_data.get('content', ''),
-                'user_id': user_id
-            }
-        )
-        
-        return True
-    except Exception as e:
-        print(f"Erreur Pusher notification: {e}")
-        return False
+    publish(PUSHER, f'user-notifications-{user_id}', 'new-notification', notification_data, coalesce=True)
+    return True
@@ -0,0 +1,195 @@
+"""
+Diffusion temps réel différée (Pusher et channel layer)
+
+Les vues ne parlent plus directement à Pusher ni au channel layer : publish()
+ajoute l'événement à une file Redis une fois la transaction validée (un
+message annulé par un rollback n'est jamais diffusé) et la requête répond
+sans attendre. Le worker (commande dispatch_realtime) vide la file par lots :
+
+- coalescence : dans un lot, les événements publiés avec coalesce=True pour un
+  même (transport, canal, nom) ne gardent que le dernier (badges, activité) ;
+  les messages de chat ne sont jamais fusionnés ;
+- Pusher : envoi groupé par trigger_batch (PUSHER_BATCH_SIZE événements par
+  appel HTTP) ;
+- channel layer : tous les group_send du lot dans une seule boucle asyncio.
+
+Livraison au plus une fois : un lot retiré de la file n'est pas rejoué, les
+clients rattrapent les messages manqués à la reconnexion (chat_history).
+Si Redis est indisponible, l'événement est envoyé directement (mode dégradé).
+Les tests remplacent les transports par FakeTransport (fake_transports()).
+"""
+import json
+import logging
+from contextlib import contextmanager
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = f"{settings.CACHES['default'].get('KEY_PREFIX', 'blizz')}:realtime:queue"
+DISPATCH_BATCH_SIZE = 500
+PUSHER_BATCH_SIZE = 10  # limite de l'API batch de Pusher
+
+PUSHER = 'pusher'
+CHANNEL_LAYER = 'channels'
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+class PusherTransport:
+    def send(self, events):
+        from .pusher_config import pusher_client
+        batch = [
+            {'channel': event['channel'], 'name': event['name'], 'data': event['data']}
+            for event in events
+        ]
+        for start in range(0, len(batch), PUSHER_BATCH_SIZE):
+            pusher_client.trigger_batch(batch[start:start + PUSHER_BATCH_SIZE])
+
+
+class ChannelLayerTransport:
+    def send(self, events):
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+
+        async def send_all():
+            for event in events:
+                await channel_layer.group_send(event['channel'], event['data'])
+
+        async_to_sync(send_all)()
+
+
+class FakeTransport:
+    """Transport local pour les tests : garde en mémoire les lots envoyés"""
+
+    def __init__(self):
+        self.batches = []
+
+    def send(self, events):
+        self.batches.append(list(events))
+
+    @property
+    def sent(self):
+        return [event for batch in self.batches for event in batch]
+
+
+_transports = {
+    PUSHER: PusherTransport(),
+    CHANNEL_LAYER: ChannelLayerTransport(),
+}
+
+
+@contextmanager
+def fake_transports():
+    """Remplace les transports par des FakeTransport le temps du bloc"""
+    global _transports
+    previous = _transports
+    _transports = {PUSHER: FakeTransport(), CHANNEL_LAYER: FakeTransport()}
+    try:
+        yield _transports
+    finally:
+        _transports = previous
+
+
+def publish(transport, channel, name, data, coalesce=False):
+    """
+    Programme l'envoi d'un événement après le commit de la transaction en
+    cours (immédiatement hors transaction).
+    - transport : PUSHER ou CHANNEL_LAYER
+    - channel : canal Pusher ou groupe du channel layer
+    - name : nom de l'événement Pusher (type du message pour le channel layer)
+    """
+    event = {
+        'transport': transport,
+        'channel': channel,
+        'name': name,
+        'data': data,
+        'coalesce': coalesce,
+    }
+    transaction.on_commit(lambda: _enqueue([event]))
+
+
+def _enqueue(events):
+    try:
+        _redis().rpush(QUEUE_KEY, *[json.dumps(event, cls=DjangoJSONEncoder) for event in events])
+    except Exception as e:
+        logger.warning(f"File temps réel indisponible, envoi direct: {e}")
+        dispatch_events(events)
+
+
+def coalesce_events(events):
+    """Ne garde que le dernier événement fusionnable par (transport, canal, nom)"""
+    last = {}
+    for index, event in enumerate(events):
+        if event.get('coalesce'):
+            last[(event['transport'], event['channel'], event['name'])] = index
+    return [
+        event for index, event in enumerate(events)
+        if not event.get('coalesce') or last[(event['transport'], event['channel'], event['name'])] == index
+    ]
+
+
+def dispatch_events(events):
+    """
+    Envoie un lot : coalescence puis un envoi groupé par transport.
+    Retourne le nombre d'événements envoyés.
+    """
+    by_transport = {}
+    for event in coalesce_events(events):
+        by_transport.setdefault(event['transport'], []).append(event)
+
+    sent = 0
+    for name, batch in by_transport.items():
+        transport = _transports.get(name)
+        if transport is None:
+            logger.error(f"Transport temps réel inconnu: {name}")
+            continue
+        try:
+            transport.send(batch)
+            sent += len(batch)
+        except Exception as e:
+            logger.error(f"Envoi temps réel {name} impossible ({len(batch)} événements): {e}")
+    return sent
+
+
+def dispatch_pending(batch_size=DISPATCH_BATCH_SIZE, wait=0):
+    """
+    Retire un lot de la file et l'envoie. Avec wait (secondes), attend
+    l'arrivée du premier événement (BLPOP) au lieu de rendre la main.
+    Retourne (événements lus, événements envoyés).
+    """
+    conn = _redis()
+    raw_events = []
+    if wait:
+        first = conn.blpop(QUEUE_KEY, timeout=wait)
+        if first is None:
+            return 0, 0
+        raw_events.append(first[1])
+    remaining = batch_size - len(raw_events)
+    if remaining > 0:
+        raw_events.extend(conn.lpop(QUEUE_KEY, remaining) or [])
+    if not raw_events:
+        return 0, 0
+
+    events = []
+    for raw in raw_events:
+        try:
+            events.append(json.loads(raw))
+        except (TypeError, ValueError):
+            logger.error(f"Événement temps réel illisible ignoré: {raw!r}")
+    return len(raw_events), dispatch_events(events)
+
+
+def pending_events():
+    """Nombre d'événements en attente dans la file"""
+    try:
+        return _redis().llen(QUEUE_KEY)
+    except Exception:
+        return 0
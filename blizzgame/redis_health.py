@@ -0,0 +1,144 @@
+"""
+Métriques de santé Redis (commande redis_health)
+
+- Channel layer : pour chaque shard (REDIS_CHANNEL_URLS), nombre de canaux
+  ayant des messages en attente, messages en attente au total et plus longue
+  file. Une file qui grossit signale des consommateurs WebSocket trop lents
+  (au-delà de la capacité, channels_redis rejette les messages).
+- Caches : pour chaque serveur Redis des CACHES, taux de succès
+  (keyspace_hits / keyspace_misses depuis le démarrage du serveur) et
+  saturation des connexions (clients connectés / maxclients).
+- Files applicatives : événements temps réel et vues de highlights en attente.
+
+Les compteurs INFO sont ceux du serveur : plusieurs alias sur le même serveur
+(bases différentes) partagent les mêmes chiffres.
+"""
+import logging
+import redis
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django_redis import get_redis_connection
+from . import highlight_view_buffer, realtime_dispatch
+
+logger = logging.getLogger(__name__)
+
+SCAN_COUNT = 1000
+
+
+def _sync_client(host):
+    """Client redis-py synchrone pour une entrée `hosts` décodée par channels_redis"""
+    if 'address' in host:
+        options = {key: value for key, value in host.items() if key != 'address'}
+        return redis.Redis.from_url(host['address'], **options)
+    if 'host' in host:
+        return redis.Redis(host=host['host'], port=host.get('port', 6379))
+    return None
+
+
+def _max_clients(conn):
+    """maxclients du serveur (CONFIG peut être interdit sur un Redis managé)"""
+    try:
+        return int(conn.config_get('maxclients').get('maxclients'))
+    except (redis.RedisError, TypeError, ValueError):
+        return settings.REDIS_MAX_CLIENTS
+
+
+def _saturation(conn, info):
+    max_clients = _max_clients(conn)
+    connected = info.get('connected_clients', 0)
+    return {
+        'connected_clients': connected,
+        'max_clients': max_clients,
+        'saturation': connected / max_clients if max_clients else None,
+    }
+
+
+def channel_layer_stats():
+    """Une entrée par shard du channel layer"""
+    layer = get_channel_layer()
+    hosts = getattr(layer, 'hosts', None)
+    if not hosts:
+        return []
+
+    group_prefix = f'{layer.prefix}:group:'.encode()
+    shards = []
+    for index, host in enumerate(hosts):
+        conn = _sync_client(host)
+        if conn is None:
+            shards.append({'shard': index, 'error': 'Hôte non supporté (sentinel)'})
+            continue
+        try:
+            groups = 0
+            queue_keys = []
+            for key in conn.scan_iter(match=f'{layer.prefix}*', count=SCAN_COUNT):
+                if key.startswith(group_prefix):
+                    groups += 1
+                else:
+                    queue_keys.append(key)
+
+            pipe = conn.pipeline(transaction=False)
+            for key in queue_keys:
+                pipe.zcard(key)
+            depths = pipe.execute() if queue_keys else []
+
+            # File la plus remplie par rapport à sa capacité (channel_capacity)
+            largest_queue, capacity = 0, layer.capacity
+            for key, depth in zip(queue_keys, depths):
+                key_capacity = layer.get_capacity(key.decode()[len(layer.prefix):])
+                if depth * capacity > largest_queue * key_capacity:
+                    largest_queue, capacity = depth, key_capacity
+
+            shard = {
+                'shard': index,
+                'groups': groups,
+                'channels': len(queue_keys),
+                'pending_messages': sum(depths),
+                'largest_queue': largest_queue,
+                'capacity': capacity,
+            }
+            shard.update(_saturation(conn, conn.info('clients')))
+            shards.append(shard)
+        except redis.RedisError as e:
+            logger.error(f"Erreur métriques channel layer (shard {index}): {e}")
+            shards.append({'shard': index, 'error': str(e)})
+        finally:
+            conn.close()
+    return shards
+
+
+def cache_stats():
+    """Une entrée par alias de cache Redis (django_redis)"""
+    stats = []
+    for alias, config in settings.CACHES.items():
+        if not config['BACKEND'].startswith('django_redis.'):
+            continue
+        try:
+            conn = get_redis_connection(alias)
+            info = conn.info()
+            hits = info.get('keyspace_hits', 0)
+            misses = info.get('keyspace_misses', 0)
+            pool = conn.connection_pool
+            entry = {
+                'alias': alias,
+                'location': f"{pool.connection_kwargs.get('host')}:{pool.connection_kwargs.get('port')}/{pool.connection_kwargs.get('db', 0)}",
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': hits / (hits + misses) if hits + misses else None,
+                'pool_size': pool.max_connections,
+                # Connexions au pire ouvertes par le web : un pool par processus
+                'web_connections': pool.max_connections * settings.WEB_CONCURRENCY,
+            }
+            entry.update(_saturation(conn, info))
+            stats.append(entry)
+        except Exception as e:
+            logger.error(f"Erreur métriques cache {alias}: {e}")
+            stats.append({'alias': alias, 'error': str(e)})
+    return stats
+
+
+def queue_stats():
+    """Files applicatives gardées dans Redis (0 si Redis est indisponible)"""
+    return {
+        'realtime_dispatch': realtime_dispatch.pending_events(),
+        'highlight_views': highlight_view_buffer.pending_views(),
+    }
@@ -0,0 +1,155 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import Highlight, HighlightAppreciation, HighlightComment, HighlightView, Notification, Post, UserBan, UserSubscription
+from .highlight_counters import appreciation_field, bump_counters
+from .highlight_hashtags import sync_highlight_hashtags
+from . import ban_status, highlight_feed, highlight_trending, listing_search, marketplace_listing, notification_counters
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# ===== COMPTEURS DÉNORMALISÉS DES HIGHLIGHTS =====
+
+@receiver(pre_save, sender=HighlightAppreciation)
+def remember_previous_appreciation_level(sender, instance, **kwargs):
+    """Mémorise l'ancien niveau pour ajuster les compteurs lors d'une modification"""
+    instance._previous_level = None
+    if not instance._state.adding:
+        instance._previous_level = sender.objects.filter(pk=instance.pk).values_list(
+            'appreciation_level', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=HighlightAppreciation)
+def update_counters_on_appreciation_save(sender, instance, created, **kwargs):
+    previous_level = getattr(instance, '_previous_level', None)
+    if created or previous_level is None:
+        bump_counters(instance.highlight_id, **{appreciation_field(instance.appreciation_level): 1})
+        highlight_feed.record_interaction(instance.user_id, instance.highlight)
+        highlight_trending.record_highlight_event(instance.highlight_id, 'appreciation')
+    elif previous_level != instance.appreciation_level:
+        bump_counters(instance.highlight_id, **{
+            appreciation_field(previous_level): -1,
+            appreciation_field(instance.appreciation_level): 1,
+        })
+
+
+@receiver(post_delete, sender=HighlightAppreciation)
+def update_counters_on_appreciation_delete(sender, instance, **kwargs):
+    bump_counters(instance.highlight_id, **{appreciation_field(instance.appreciation_level): -1})
+
+
+@receiver(post_save, sender=HighlightComment)
+def update_counters_on_comment_save(sender, instance, created, **kwargs):
+    if created:
+        bump_counters(instance.highlight_id, comments_count=1)
+        highlight_feed.record_interaction(instance.user_id, instance.highlight, include_hashtags=False)
+        highlight_trending.record_highlight_event(instance.highlight_id, 'comment')
+
+
+@receiver(post_delete, sender=HighlightComment)
+def update_counters_on_comment_delete(sender, instance, **kwargs):
+    bump_counters(instance.highlight_id, comments_count=-1)
+
+
+@receiver(post_save, sender=HighlightView)
+def update_counters_on_view_save(sender, instance, created, **kwargs):
+    if created:
+        bump_counters(instance.highlight_id, views_count=1)
+        highlight_trending.record_highlight_event(instance.highlight_id, 'view')
+
+
+@receiver(post_delete, sender=HighlightView)
+def update_counters_on_view_delete(sender, instance, **kwargs):
+    bump_counters(instance.highlight_id, views_count=-1)
+
+
+# ===== INDEX INVERSÉ DES HASHTAGS =====
+
+@receiver(post_save, sender=Highlight)
+def index_highlight_hashtags(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or 'hashtags' in update_fields:
+        sync_highlight_hashtags(instance)
+    # Un Highlight créé inactif (upload en file) compte à sa publication (highlight_uploads._publish)
+    if created and instance.is_active:
+        highlight_trending.record_hashtag_event(instance.hashtags, 'publish', instance.created_at)
+
+
+# ===== FEED « POUR TOI » MATÉRIALISÉ =====
+
+@receiver(post_save, sender=Highlight)
+def add_new_highlight_to_feeds(sender, instance, created, **kwargs):
+    if created and instance.is_active:
+        transaction.on_commit(lambda: highlight_feed.add_highlight_to_feeds(instance))
+
+
+@receiver(post_save, sender=UserSubscription)
+@receiver(post_delete, sender=UserSubscription)
+def refresh_feed_on_subscription_change(sender, instance, **kwargs):
+    highlight_feed.mark_feed_stale(instance.subscriber_id)
+
+
+# ===== LISTING DE L'ACCUEIL =====
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_marketplace_first_page(sender, instance, **kwargs):
+    marketplace_listing.invalidate_first_page()
+
+
+@receiver(post_save, sender=Post)
+def index_post_for_search(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'title', 'caption', 'game_type', 'custom_game_name'} & set(update_fields):
+        return
+    try:
+        listing_search.index_posts([instance.pk])
+    except Exception as e:
+        logger.error(f"Erreur indexation recherche annonce {instance.pk}: {e}")
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_from_search(sender, instance, **kwargs):
+    try:
+        listing_search.remove_post(instance.pk)
+    except Exception as e:
+        logger.error(f"Erreur suppression index recherche annonce {instance.pk}: {e}")
+
+
+# ===== COMPTEUR DE NOTIFICATIONS NON LUES =====
+
+@receiver(pre_save, sender=Notification)
+def remember_previous_read_state(sender, instance, **kwargs):
+    """Mémorise l'ancien état de lecture pour ajuster le compteur"""
+    instance._was_read = None
+    if not instance._state.adding:
+        instance._was_read = sender.objects.filter(pk=instance.pk).values_list(
+            'is_read', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Notification)
+def update_unread_count_on_save(sender, instance, created, **kwargs):
+    was_read = True if created else getattr(instance, '_was_read', None)
+    if was_read is None or was_read == instance.is_read:
+        return
+    delta = -1 if instance.is_read else 1
+    transaction.on_commit(lambda: notification_counters.adjust_unread(instance.user_id, delta))
+
+
+@receiver(post_delete, sender=Notification)
+def update_unread_count_on_delete(sender, instance, **kwargs):
+    if not instance.is_read:
+        transaction.on_commit(lambda: notification_counters.adjust_unread(instance.user_id, -1))
+
+
+# ===== ÉTAT DE BANNISSEMENT EN CACHE =====
+
+@receiver(post_save, sender=UserBan)
+@receiver(post_delete, sender=UserBan)
+def invalidate_ban_status_on_change(sender, instance, **kwargs):
+    # Une seconde fois après le commit : une requête concurrente a pu remettre
+    # l'ancien état en cache avant que le bannissement soit visible
+    ban_status.invalidate_ban_status([instance.user_id])
+    transaction.on_commit(lambda: ban_status.invalidate_ban_status([instance.user_id]))
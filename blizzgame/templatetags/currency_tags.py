@@ -28,6 +28,13 @@ def format_currency(amount, currency='EUR'):
     """
     return CurrencyService.format_amount(amount, currency)
 
+def _user_currency(context, user):
+    """Devise de l'utilisateur, résolue une fois par requête quand il s'agit de request.user"""
+    request = context.get('request')
+    if request is not None and (user is None or user == getattr(request, 'user', None)):
+        return CurrencyService.get_request_currency(request)
+    return CurrencyService.get_user_currency(user)
+
 @register.simple_tag(takes_context=True)
 def display_price(context, amount, base_currency, user=None):
     """
@@ -40,15 +47,15 @@ def display_price(context, amount, base_currency, user=None):
     if not user or not user.is_authenticated:
         return CurrencyService.format_amount(amount, base_currency)
     
-    user_currency = CurrencyService.get_user_currency(user)
+    user_currency = _user_currency(context, user)
     converted_amount, currency, formatted = CurrencyService.get_display_price(
         amount, base_currency, user_currency
     )
     
     return mark_safe(formatted)
 
-@register.simple_tag
-def display_price_with_original(amount, base_currency, user):
+@register.simple_tag(takes_context=True)
+def display_price_with_original(context, amount, base_currency, user):
     """
     Affiche le prix converti avec le prix original en petit
     Usage: {% display_price_with_original post.price "EUR" request.user %}
@@ -56,7 +63,7 @@ def display_price_with_original(amount, base_currency, user):
     if not user.is_authenticated:
         return CurrencyService.format_amount(amount, base_currency)
     
-    user_currency = CurrencyService.get_user_currency(user)
+    user_currency = _user_currency(context, user)
     
     if user_currency == base_currency:
         return CurrencyService.format_amount(amount, base_currency)
@@ -86,7 +93,7 @@ def currency_selector(context):
     current_currency = 'EUR'
     
     if user.is_authenticated:
-        current_currency = CurrencyService.get_user_currency(user)
+        current_currency = CurrencyService.get_request_currency(context['request'])
     
     currencies = [
         # Devises principales
@@ -197,11 +204,15 @@ def convert_notification_content(content, user):
     """
     import re
     
-    if not content or not user or not user.is_authenticated:
+    if not content or '€' not in content or not user or not user.is_authenticated:
         return content
     
     try:
-        user_currency = CurrencyService.get_user_currency(user)
+        # Devise résolue une fois par utilisateur (filtre appliqué à chaque notification de la liste)
+        user_currency = getattr(user, '_notification_currency', None)
+        if user_currency is None:
+            user_currency = CurrencyService.get_user_currency(user)
+            user._notification_currency = user_currency
         
         # Pattern pour trouver les montants avec € (ex: "15.50€", "100€")
         euro_pattern = r'(\d+(?:\.\d{1,2})?)\s*€'
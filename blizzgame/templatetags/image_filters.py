@@ -2,6 +2,7 @@ from django import template
 from django.templatetags.static import static
 from django.conf import settings
 import os
+from blizzgame import image_variants
 
 register = template.Library()
 
@@ -160,3 +161,25 @@ def shopify_media_or_static(product_or_image, field_type):
     return static('images/def_img.png')
 
 
+@register.filter
+def media_variant(url, variant):
+    """
+    URL d'une variante (thumb, card, full) d'un média normalisé ; les anciens
+    médias sont renvoyés tels quels
+
+    Usage:
+        {{ post|post_media_or_static:'banner'|media_variant:'card' }}
+        {{ user_profile|cloudinary_or_static:'profileimg'|media_variant:'thumb' }}
+    """
+    return image_variants.variant_url(url, variant)
+
+
+@register.filter
+def media_srcset(url):
+    """
+    Attribut srcset des variantes d'un média normalisé ('' pour un ancien média)
+
+    Usage:
+        <img src="{{ url|media_variant:'card' }}" srcset="{{ url|media_srcset }}" sizes="...">
+    """
+    return image_variants.srcset(url)
@@ -6,6 +6,7 @@ from . import admin_views
 urlpatterns = [
     # URLs existantes pour les comptes gaming
     path('', views.index, name='index'),
+    path('api/search/', views.marketplace_search_api, name='marketplace_search_api'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('settings/', views.settings, name='settings'),
     path('create/', views.create, name='create'),
@@ -34,6 +35,7 @@ urlpatterns = [
     path('chat/dispute/<uuid:dispute_id>/', views.dispute_chat, name='dispute_chat'),
     path('chat/list/', views.chat_list, name='chat_list'),
     path('chat/<uuid:chat_id>/send/', views.send_message, name='send_message'),
+    path('chat/<uuid:chat_id>/messages/', views.get_chat_messages, name='get_chat_messages'),
     path('chat/<uuid:chat_id>/upload-image/', views.upload_chat_image, name='upload_chat_image'),
     path('chat/<uuid:chat_id>/mark-read/', views.mark_messages_read, name='mark_messages_read'),
     
@@ -172,6 +174,8 @@ urlpatterns = [
     
     # Gestion des Highlights - Redirigées vers la page d'accueil
     path('highlights/create/', views.redirect_to_index, name='create_highlight'),
+    path('highlights/uploads/', views.redirect_to_index, name='start_highlight_upload'),
+    path('highlights/uploads/<uuid:upload_id>/', views.redirect_to_index, name='highlight_upload'),
     path('highlights/<uuid:highlight_id>/', views.redirect_to_index, name='highlight_detail'),
     path('highlights/<uuid:highlight_id>/delete/', views.redirect_to_index, name='delete_highlight'),
     
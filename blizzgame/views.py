@@ -4,7 +4,7 @@ from django.contrib.auth.decorators import login_required
 from functools import wraps
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST, require_http_methods
 from django.contrib.admin.views.decorators import staff_member_required
@@ -12,11 +12,33 @@ from django.utils import timezone
 from django.core.paginator import Paginator
 from django.db.models import Q, Count, Avg
 from django.conf import settings
+from django.templatetags.static import static
 from .models import *
 # Shopify désactivé - Pas nécessaire pour le moment
 # from .shopify_utils import create_shopify_order_from_blizz_order, sync_products_from_shopify
-from .cinetpay_utils import CinetPayAPI, handle_cinetpay_notification, convert_currency_for_cinetpay, DisputeResolutionAPI
+from .cinetpay_utils import CinetPayAPI, convert_currency_for_cinetpay, DisputeResolutionAPI
 from .currency_service import CurrencyService
+from .highlight_counters import COUNTER_FIELDS
+from .templatetags.image_filters import cloudinary_or_static
+from . import ban_status
+from . import chat_history
+from . import chat_realtime
+from . import conversation_summary
+from . import group_reads
+from . import highlight_feed
+from . import highlight_hashtags
+from . import highlight_trending
+from . import highlight_uploads
+from . import highlight_view_buffer
+from . import image_variants
+from . import listing_search
+from . import marketplace_listing
+from . import media_uploads
+from . import message_notifications
+from . import notification_counters
+from . import notification_inbox
+from . import payment_webhooks
+from .highlight_serializers import author_avatar_url, prepare_highlights, serialize_highlights
 from .chat_views import *
 import json
 import uuid
@@ -30,92 +52,10 @@ import cloudinary.uploader
 
 def upload_image_to_cloudinary(image_file, folder_name):
     """
-    Upload une image directement vers Cloudinary et retourne l'URL publique
+    Upload une image vers le stockage des médias (Cloudinary en production) et
+    retourne l'URL publique, ou None en cas d'erreur (voir media_uploads)
     """
-    try:
-        # Configuration Cloudinary (déjà fait dans settings.py mais on s'assure)
-        if not hasattr(cloudinary.config(), 'cloud_name') or not cloudinary.config().cloud_name:
-            cloudinary_url = os.environ.get('CLOUDINARY_URL', '')
-            if cloudinary_url:
-                import re
-                match = re.search(r'cloudinary://([^:]+):([^@]+)@(.+)', cloudinary_url)
-                if match:
-                    api_key, api_secret, cloud_name = match.groups()
-                    cloudinary.config(
-                        cloud_name=cloud_name,
-                        api_key=api_key,
-                        api_secret=api_secret,
-                        secure=True
-                    )
-        
-        # Upload vers Cloudinary
-        result = cloudinary.uploader.upload(
-            image_file,
-            folder=folder_name,
-            use_filename=True,
-            unique_filename=True,
-            resource_type="image"
-        )
-        
-        # Retourner l'URL sécurisée
-        return result.get('secure_url', result.get('url'))
-        
-    except Exception as e:
-        # En cas d'erreur, log et retourner None pour utiliser le fallback
-        logging.error(f"Erreur upload Cloudinary: {e}")
-        return None
-
-def create_or_update_message_notification(message, recipient):
-    """
-    Crée ou met à jour une notification groupée pour les messages
-    """
-    try:
-        # Vérifier s'il existe déjà une notification non lue pour ce chat et cet expéditeur
-        existing_notification = Notification.objects.filter(
-            user=recipient,
-            type='new_message',
-            transaction=message.chat.transaction,
-            is_read=False
-        ).first()
-        
-        # Vérifier si c'est le même expéditeur (si le champ existe)
-        if existing_notification and hasattr(existing_notification, 'sender_username'):
-            if existing_notification.sender_username != message.sender.username:
-                existing_notification = None
-        
-        if existing_notification:
-            # Mettre à jour la notification existante
-            if hasattr(existing_notification, 'message_count'):
-                existing_notification.message_count += 1
-            else:
-                existing_notification.message_count = 2
-            existing_notification.content = f"Vous avez reçu {existing_notification.message_count} messages de {message.sender.username}"
-            existing_notification.created_at = timezone.now()  # Mettre à jour la date
-            if hasattr(existing_notification, 'sender_username'):
-                existing_notification.sender_username = message.sender.username
-            existing_notification.save()
-            return existing_notification
-        else:
-            # Créer une nouvelle notification
-            notification_data = {
-                'user': recipient,
-                'type': 'new_message',
-                'title': "Nouveau message",
-                'content': f"Vous avez reçu un message de {message.sender.username}",
-                'transaction': message.chat.transaction,
-                'message': message,
-                'message_count': 1
-            }
-            
-            # Ajouter sender_username si le champ existe
-            if hasattr(Notification, 'sender_username'):
-                notification_data['sender_username'] = message.sender.username
-            
-            notification = Notification.objects.create(**notification_data)
-            return notification
-    except Exception as e:
-        logging.error(f"Erreur lors de la création de la notification de message: {e}")
-        return None
+    return media_uploads.upload_file(image_file, folder_name)
 
 logger = logging.getLogger(__name__)
 
@@ -164,189 +104,46 @@ def redirect_to_index(request, *args, **kwargs):
 
 def index(request):
     from blizzgame.models import Post
-    from django.db.models import Q, Case, When, IntegerField
-    from django.core.paginator import Paginator
     from django.http import JsonResponse
     import logging
     
     logger = logging.getLogger(__name__)
     
-    try:
-        # Récupérer tous les posts avec les relations nécessaires
-        base_posts = Post.objects.select_related('author', 'author__profile', 'author__userreputation').prefetch_related('images', 'transactions')
-        logger.info(f"Base posts query successful: {base_posts.count()} posts found")
-    except Exception as e:
-        logger.error(f"Error in base posts query: {e}")
-        # Fallback sans relations si problème
-        base_posts = Post.objects.all()
-        logger.info(f"Fallback query successful: {base_posts.count()} posts found")
-    
-    try:
-        # Appliquer les filtres
-        filters = Q()
-        
-        # Filtre par jeu
-        game_filter = request.GET.get('game')
-        if game_filter and game_filter != 'all':
-            filters &= Q(game_type=game_filter)
-        
-        # Filtre par prix minimum
-        price_min = request.GET.get('price_min')
-        if price_min:
-            try:
-                price_min_value = float(price_min)
-                filters &= Q(price__gte=price_min_value)
-            except ValueError:
-                pass
-        
-        # Filtre par prix maximum
-        price_max = request.GET.get('price_max')
-        if price_max:
-            try:
-                price_max_value = float(price_max)
-                filters &= Q(price__lte=price_max_value)
-            except ValueError:
-                pass
-        
-        # Filtre par pièces (recherche dans le titre ou la description)
-        coins_filter = request.GET.get('coins')
-        if coins_filter:
-            filters &= Q(title__icontains=coins_filter) | Q(caption__icontains=coins_filter)
-        
-        # Filtre par niveau (recherche dans le titre ou la description)
-        level_filter = request.GET.get('level')
-        if level_filter:
-            filters &= Q(title__icontains=level_filter) | Q(caption__icontains=level_filter)
-        
-        # Filtre par date
-        date_filter = request.GET.get('date')
-        if date_filter:
-            from django.utils import timezone
-            from datetime import timedelta
-            now = timezone.now()
-            
-            if date_filter == 'today':
-                filters &= Q(created_at__date=now.date())
-            elif date_filter == 'week':
-                week_ago = now - timedelta(days=7)
-                filters &= Q(created_at__gte=week_ago)
-            elif date_filter == 'month':
-                month_ago = now - timedelta(days=30)
-                filters &= Q(created_at__gte=month_ago)
-        
-        # Appliquer les filtres
-        if filters:
-            base_posts = base_posts.filter(filters)
-            logger.info(f"Filters applied successfully")
-        
-    except Exception as e:
-        logger.error(f"Error applying filters: {e}")
-        # Continuer sans filtres si erreur
-    
-    try:
-        # Organiser le feed selon l'ordre de priorité :
-        # 1. Annonces récentes et disponibles (en haut)
-        # 2. Annonces en transaction (au milieu) 
-        # 3. Annonces vendues (tout en bas)
-        
-        posts_query = base_posts.annotate(
-            priority=Case(
-                # Priorité 1: Disponibles et récentes (en haut)
-                When(
-                    Q(is_on_sale=True) & Q(is_sold=False) & Q(is_in_transaction=False),
-                    then=1
-                ),
-                # Priorité 2: En transaction (au milieu)
-                When(
-                    Q(is_in_transaction=True),
-                    then=2
-                ),
-                # Priorité 3: Vendues (tout en bas)
-                When(
-                    Q(is_sold=True),
-                    then=3
-                ),
-                # Priorité 4: Autres (désactivées, etc.)
-                default=4,
-                output_field=IntegerField()
-            )
-        )
-        logger.info(f"Annotation successful: {posts_query.count()} posts")
-    except Exception as e:
-        logger.error(f"Error in annotation: {e}")
-        # Fallback sans annotation si erreur
-        posts_query = base_posts
-        logger.info(f"Fallback query without annotation: {posts_query.count()} posts")
-    
-    try:
-        # Appliquer le tri
-        sort_by = request.GET.get('sort', 'created_at')
-        if sort_by == 'price_asc':
-            posts_query = posts_query.order_by('priority', 'price', '-created_at')
-        elif sort_by == 'price_desc':
-            posts_query = posts_query.order_by('priority', '-price', '-created_at')
-        elif sort_by == 'title':
-            posts_query = posts_query.order_by('priority', 'title', '-created_at')
-        else:  # created_at par défaut
-            posts_query = posts_query.order_by('priority', '-created_at')
-        logger.info(f"Sorting applied: {sort_by}")
-    except Exception as e:
-        logger.error(f"Error in sorting: {e}")
-        # Fallback tri simple si erreur
-        posts_query = posts_query.order_by('-created_at')
-        logger.info("Fallback sorting applied")
+    # Listing par tranches de priorité (disponibles, en transaction, vendues)
+    # avec pagination par curseur : pas de COUNT ni d'OFFSET, nombre de requêtes fixe
+    cursor = request.GET.get('cursor') or None
+    sort_by = request.GET.get('sort', 'created_at')
+    game_filter = request.GET.get('game')
+    search_query = request.GET.get('q', '').strip()
+    filters = marketplace_listing.build_filters(request.GET)
     
     try:
-        # Pagination avec 12 posts par page
-        paginator = Paginator(posts_query, 12)
-        page_number = request.GET.get('page', 1)
-        posts = paginator.get_page(page_number)
-        logger.info(f"Pagination successful: {len(posts)} posts on page {page_number}")
+        if search_query:
+            # Recherche plein texte : classement par disponibilité puis pertinence
+            posts, next_cursor = listing_search.search_posts(search_query, filters), None
+        elif marketplace_listing.is_cacheable(request.GET):
+            # Première page sans filtre (hors jeu) : servie depuis le cache
+            posts, next_cursor = marketplace_listing.read_first_page(game_filter)
+        else:
+            posts, next_cursor = marketplace_listing.read_listing(filters, sort_by, cursor)
+    except marketplace_listing.InvalidCursor:
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return JsonResponse({'error': 'Curseur invalide'}, status=400)
+        posts, next_cursor = marketplace_listing.read_listing(filters, sort_by)
     except Exception as e:
-        logger.error(f"Error in pagination: {e}")
-        # Fallback pagination simple si erreur
-        posts = list(posts_query[:12])
-        logger.info(f"Fallback pagination: {len(posts)} posts")
+        logger.error(f"Error in marketplace listing: {e}")
+        posts, next_cursor = [], None
     
     # Si c'est une requête AJAX (pour le bouton "voir plus")
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         try:
-            posts_data = []
-            for post in posts:
-                try:
-                    # Gestion sécurisée des propriétés
-                    banner_url = '/static/images/default.png'
-                    if hasattr(post, 'banner') and post.banner:
-                        try:
-                            banner_url = post.banner.url
-                        except:
-                            banner_url = '/static/images/default.png'
-                    
-                    posts_data.append({
-                        'id': str(post.id),
-                        'title': post.title or '',
-                        'price': float(post.price) if post.price else 0.0,
-                        'game_type': post.get_game_display_name() if hasattr(post, 'get_game_display_name') else str(post.game_type),
-                        'user': str(post.user) if post.user else '',
-                        'created_at': post.created_at.strftime('%d/%m/%Y') if post.created_at else '',
-                        'is_sold': bool(post.is_sold),
-                        'is_in_transaction': bool(post.is_in_transaction),
-                        'is_on_sale': bool(post.is_on_sale),
-                        'no_of_likes': int(post.no_of_likes) if post.no_of_likes else 0,
-                        'banner_url': banner_url,
-                        'time_since': post.time_since_created if hasattr(post, 'time_since_created') else '',
-                    })
-                except Exception as e:
-                    logger.error(f"Error processing post {post.id}: {e}")
-                    continue
+            posts_data = serialize_listing_posts(posts)
             
             return JsonResponse({
                 'posts': posts_data,
-                'has_next': hasattr(posts, 'has_next') and posts.has_next() if hasattr(posts, 'has_next') else False,
-                'next_page': posts.next_page_number() if hasattr(posts, 'has_next') and posts.has_next() else None,
-                'current_page': posts.number if hasattr(posts, 'number') else 1,
-                'total_pages': paginator.num_pages if 'paginator' in locals() else 1,
-                'filters_applied': bool(filters) if 'filters' in locals() else False
+                'has_next': next_cursor is not None,
+                'next_cursor': next_cursor,
+                'filters_applied': bool(filters)
             })
         except Exception as e:
             logger.error(f"Error in AJAX response: {e}")
@@ -363,22 +160,15 @@ def index(request):
             'level': request.GET.get('level', ''),
             'date': request.GET.get('date', ''),
             'sort': request.GET.get('sort', 'created_at'),
+            'q': search_query,
         }
         
-        # Gestion sécurisée des propriétés de pagination
-        has_next = False
-        next_page = None
-        if hasattr(posts, 'has_next'):
-            has_next = posts.has_next()
-            if has_next and hasattr(posts, 'next_page_number'):
-                next_page = posts.next_page_number()
-        
         context = {
             'posts': posts,
             'game_choices': game_choices,
             'current_filters': current_filters,
-            'has_next': has_next,
-            'next_page': next_page,
+            'has_next': next_cursor is not None,
+            'next_cursor': next_cursor,
             'page_title': 'Accueil - Blizz Gaming',
         }
         
@@ -393,11 +183,71 @@ def index(request):
             'game_choices': [],
             'current_filters': {},
             'has_next': False,
-            'next_page': None,
+            'next_cursor': None,
             'page_title': 'Accueil - Blizz Gaming',
         }
         return render(request, 'index.html', context)
 
+def serialize_listing_posts(posts):
+    """Données JSON des cartes d'annonces (bouton « voir plus » et recherche instantanée)"""
+    import logging
+    
+    logger = logging.getLogger(__name__)
+    
+    posts_data = []
+    for post in posts:
+        try:
+            # Gestion sécurisée des propriétés
+            # Variante card (grille d'annonces) d'une bannière normalisée
+            banner_url = image_variants.variant_url(post.banner_url, 'card') or '/static/images/default.png'
+            if not post.banner_url and post.banner:
+                try:
+                    banner_url = post.banner.url
+                except:
+                    banner_url = '/static/images/default.png'
+            
+            posts_data.append({
+                'id': str(post.id),
+                'title': post.title or '',
+                'price': float(post.price) if post.price else 0.0,
+                'game_type': post.get_game_display_name() if hasattr(post, 'get_game_display_name') else str(post.game_type),
+                'user': str(post.user) if post.user else '',
+                'created_at': post.created_at.strftime('%d/%m/%Y') if post.created_at else '',
+                'is_sold': bool(post.is_sold),
+                'is_in_transaction': bool(post.is_in_transaction),
+                'is_on_sale': bool(post.is_on_sale),
+                'no_of_likes': int(post.no_of_likes) if post.no_of_likes else 0,
+                'banner_url': banner_url,
+                'time_since': post.time_since_created if hasattr(post, 'time_since_created') else '',
+            })
+        except Exception as e:
+            logger.error(f"Error processing post {post.id}: {e}")
+            continue
+    return posts_data
+
+@require_http_methods(["GET"])
+def marketplace_search_api(request):
+    """Recherche instantanée des annonces : résultats classés + suggestions (titres, jeux)"""
+    try:
+        query = request.GET.get('q', '').strip()
+        if len(query) < 2:
+            return JsonResponse({'success': True, 'results': [], 'suggestions': {'titles': [], 'games': []}})
+        
+        limit = max(1, min(int(request.GET.get('limit', 12)), listing_search.SEARCH_LIMIT))
+        filters = marketplace_listing.build_filters(request.GET)
+        posts = listing_search.search_posts(query, filters, limit=limit)
+        
+        return JsonResponse({
+            'success': True,
+            'results': serialize_listing_posts(posts),
+            'suggestions': listing_search.autocomplete(query)
+        })
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Paramètre invalide'}, status=400)
+    except Exception as e:
+        logger.error(f"Erreur marketplace_search_api: {e}")
+        return JsonResponse({'success': False, 'error': 'Erreur lors de la recherche'}, status=500)
+
 def profile(request, username):
     user = get_object_or_404(User, username=username)
     prof = getattr(user, 'profile', None)
@@ -513,36 +363,23 @@ def settings(request):
             messages.success(request, 'Pseudo modifié avec succès !')
             return redirect('settings')
         
-        # Gestion des images avec upload direct vers Cloudinary
+        # Gestion des images : upload direct normalisé (media_uploads), le
+        # FileField ne sert que de fallback si l'upload échoue
         if 'profileimg' in request.FILES:
             cloudinary_url = upload_image_to_cloudinary(request.FILES['profileimg'], 'profile_images')
             if cloudinary_url:
-                # Sauver l'URL Cloudinary seulement si le champ existe
-                try:
-                    prof.profileimg_url = cloudinary_url
-                except AttributeError:
-                    # Le champ n'existe pas encore, migration pas appliquée
-                    pass
-                # Garder aussi le champ traditionnel pour compatibilité
-                prof.profileimg = request.FILES['profileimg']
+                prof.profileimg_url = cloudinary_url
             else:
-                # Fallback si Cloudinary échoue
                 prof.profileimg = request.FILES['profileimg']
+                prof.profileimg_url = None
                 
         if 'banner' in request.FILES:
             cloudinary_url = upload_image_to_cloudinary(request.FILES['banner'], 'banner_images')
             if cloudinary_url:
-                # Sauver l'URL Cloudinary seulement si le champ existe
-                try:
-                    prof.banner_url = cloudinary_url
-                except AttributeError:
-                    # Le champ n'existe pas encore, migration pas appliquée
-                    pass
-                # Garder aussi le champ traditionnel pour compatibilité
-                prof.banner = request.FILES['banner']
+                prof.banner_url = cloudinary_url
             else:
-                # Fallback si Cloudinary échoue
                 prof.banner = request.FILES['banner']
+                prof.banner_url = None
         
         # Gestion des jeux favoris
         favorite_games = request.POST.getlist('favorite_games')
@@ -702,11 +539,7 @@ def create(request):
         coins = request.POST.get('coins', '')
         level = request.POST.get('level', '')
         banner = request.FILES.get('banner')
-        
-        # Upload de la bannière vers Cloudinary
-        banner_cloudinary_url = None
-        if banner:
-            banner_cloudinary_url = upload_image_to_cloudinary(banner, 'post_banners')
+        images = request.FILES.getlist('images[]')[:MAX_POST_IMAGES]
         
         # Validation du prix et ajout de la commission de 10%
         try:
@@ -820,7 +653,13 @@ def create(request):
                 'payment_configured': check_payment_setup(request.user)
             })
         
-        # Créer le post avec tous les champs
+        # Upload de la bannière et des images : une seule fois chacune, en
+        # parallèle, doublons ignorés (media_uploads)
+        upload_items = [(banner, 'post_banners')] + [(image, 'post_images') for image in images]
+        banner_cloudinary_url, *image_urls = media_uploads.upload_files(upload_items)
+        
+        # Créer le post avec tous les champs ; le fichier n'est gardé dans le
+        # FileField que si l'upload direct a échoué
         post = Post.objects.create(
             user=request.user.username,
             author=request.user,
@@ -831,38 +670,20 @@ def create(request):
             custom_game_name=custom_game_name if game_type == 'other' else '',
             coins=coins,
             level=level,
-            banner=banner if banner else 'def_img.png'
+            banner=banner if banner and not banner_cloudinary_url else 'def_img.png',
+            banner_url=banner_cloudinary_url
         )
         
-        # Sauver l'URL Cloudinary de la bannière si disponible
-        if banner_cloudinary_url:
-            try:
-                post.banner_url = banner_cloudinary_url
-                post.save()
-            except AttributeError:
-                # Le champ n'existe pas encore, migration pas appliquée
-                pass
-        
         # Gérer les images supplémentaires
-        images = request.FILES.getlist('images[]')
-        for i, image in enumerate(images[:15]):  # Max 15 images
-            # Upload vers Cloudinary
-            image_cloudinary_url = upload_image_to_cloudinary(image, 'post_images')
-            
-            post_image = PostImage.objects.create(
+        PostImage.objects.bulk_create([
+            PostImage(
                 post=post,
-                image=image,
+                image='' if image_url else image,
+                image_url=image_url,
                 order=i
             )
-            
-            # Sauver l'URL Cloudinary si disponible
-            if image_cloudinary_url:
-                try:
-                    post_image.image_url = image_cloudinary_url
-                    post_image.save()
-                except AttributeError:
-                    # Le champ n'existe pas encore, migration pas appliquée
-                    pass
+            for i, (image, image_url) in enumerate(zip(images, image_urls))
+        ])
         
         
         messages.success(request, 'Annonce créée avec succès!')
@@ -974,40 +795,12 @@ def signin(request):
                     # Utiliser directement l'utilisateur authentifié
                     user_profile = user
 
-                    # Récupérer les bannissements actifs (filtrer l'expiration côté Python
-                    # pour éviter les erreurs de champ entre end_date/ends_at)
-                    active_bans_qs = UserBan.objects.filter(
-                        user=user_profile,
-                        is_active=True
-                    )
+                    # État de bannissement (mis en cache, expiration filtrée en SQL)
+                    info = ban_status.get_active_ban(user_profile.id)
 
-                    now_ts = timezone.now()
-                    active_bans = []
-                    for b in active_bans_qs:
-                        ban_end = getattr(b, 'ends_at', getattr(b, 'end_date', None))
-                        if ban_end and ban_end < now_ts:
-                            continue
-                        active_bans.append(b)
-
-                    if active_bans:
-                        # Récupérer le bannissement le plus récent par created_at si dispo sinon starts_at
-                        latest_ban = sorted(
-                            active_bans,
-                            key=lambda x: getattr(x, 'created_at', getattr(x, 'starts_at', now_ts)),
-                            reverse=True
-                        )[0]
-                        
+                    if info:
                         # Stocker les informations du bannissement dans la session
-                        request.session['ban_info'] = {
-                            'reason': latest_ban.reason,
-                            'ban_type': latest_ban.ban_type,
-                            'ends_at': (
-                                getattr(latest_ban, 'ends_at', None) or getattr(latest_ban, 'end_date', None)
-                            ).strftime('%d/%m/%Y à %H:%M') if (
-                                getattr(latest_ban, 'ends_at', None) or getattr(latest_ban, 'end_date', None)
-                            ) else '',
-                            'details': latest_ban.details or '',
-                        }
+                        request.session['ban_info'] = info
                         
                         # Logger la tentative de connexion
                         logger.warning(f"Utilisateur banni {username} a tenté de se connecter")
@@ -1282,8 +1075,9 @@ def transaction_detail(request, transaction_id):
         chat.is_locked = transaction.status not in ['processing']
         chat.save()
         
-        # Récupérer les messages de chat
-        chat_messages = Message.objects.filter(chat=chat).order_by('created_at')
+        # Récupérer la dernière page de messages (les plus anciens via le curseur `before`)
+        chat_page = chat_history.read_messages(Message.objects.filter(chat=chat).select_related('sender'))
+        chat_messages = chat_page['messages']
         
         # Marquer les messages comme lus seulement si le chat est activé
         if chat_enabled:
@@ -1312,6 +1106,7 @@ def transaction_detail(request, transaction_id):
         'has_open_dispute': has_open_dispute,
         'chat': chat,
         'chat_messages': chat_messages,
+        'chat_cursors': chat_history.cursor_payload(chat_page) if chat else None,
         'chat_locked': chat.is_locked if chat else True,
         'websocket_url': websocket_url,
         'other_user': transaction.seller if is_buyer else transaction.buyer,
@@ -1621,7 +1416,18 @@ def send_transaction_message(request, transaction_id):
             sender=request.user,
             content=content
         )
-        
+
+        recipient = transaction.seller if request.user == transaction.buyer else transaction.buyer
+        chat_realtime.broadcast_message('chat', chat.id, {
+            'id': str(message.id),
+            'content': message.content,
+            'sender': message.sender.username,
+            'sender_id': message.sender.id,
+            'created_at': message.created_at.isoformat(),
+            'message_type': message.message_type,
+            'is_read': message.is_read
+        }, recipient_ids=[recipient.id])
+
         # Envoyer le message via Pusher
         try:
             from blizzgame.pusher_config import send_message_to_chat, send_notification_to_user
@@ -1633,15 +1439,14 @@ def send_transaction_message(request, transaction_id):
             }
             send_message_to_chat(transaction_id, message_data)
             
-            # Créer ou mettre à jour une notification groupée
-            recipient = transaction.seller if request.user == transaction.buyer else transaction.buyer
-            notification = create_or_update_message_notification(message, recipient)
+            # Créer ou mettre à jour la notification groupée de la discussion
+            message_notifications.notify_chat_message(chat, message, [recipient])
             
             # Envoyer une notification en temps réel au destinataire
+            # (le client recharge son compteur, pas de COUNT dans la requête d'envoi)
             send_notification_to_user(recipient.id, {
                 'title': 'Nouveau message',
                 'message': f'Nouveau message de {message.sender.username}',
-                'count': Notification.objects.filter(user=recipient, is_read=False).count()
             })
         except Exception as e:
             print(f"Erreur Pusher: {e}")
@@ -1667,20 +1472,28 @@ def get_transaction_messages(request, transaction_id):
     if request.user != transaction.buyer and request.user != transaction.seller:
         return JsonResponse({'status': 'error', 'message': 'Accès non autorisé'})
     
-    # Récupérer les messages de transaction
+    # Récupérer les messages de transaction (après/avant un curseur)
     chat = Chat.objects.filter(transaction=transaction).first()
     
     messages_data = []
+    cursors = {'has_more': False, 'after': request.GET.get('after') or None, 'before': None}
     if chat:
-        messages_list = chat.messages.select_related('sender').order_by('created_at')
+        try:
+            page = chat_history.read_request_messages(request, chat.messages.select_related('sender'))
+        except highlight_feed.InvalidCursor:
+            return JsonResponse({'status': 'error', 'message': 'Curseur invalide'}, status=400)
         messages_data = [{
+            'id': str(msg.id),
             'content': msg.content,
             'sender': msg.sender.username,
-            'created_at': msg.created_at.strftime('%H:%M'),
-            'is_mine': msg.sender == request.user
-        } for msg in messages_list]
+            'sender_id': msg.sender_id,
+            'created_at': msg.created_at.isoformat(),
+            'is_own': msg.sender_id == request.user.id,
+            'is_mine': msg.sender_id == request.user.id
+        } for msg in page['messages']]
+        cursors = chat_history.cursor_payload(page)
     
-    return JsonResponse({'messages': messages_data})
+    return JsonResponse({'messages': messages_data, 'cursors': cursors})
 
 # ===== CinetPay pour transactions gaming existantes (stubs) =====
 
@@ -1781,7 +1594,7 @@ def initiate_cinetpay_payment(request, transaction_id):
             seller_amount = amount * 0.90
             
             # Convertir selon la devise de l'utilisateur
-            user_currency = CurrencyService.get_user_currency(request.user)
+            user_currency = CurrencyService.get_request_currency(request)
             if user_currency != 'EUR':
                 # Convertir les montants vers la devise de l'utilisateur pour l'affichage
                 amount = CurrencyService.convert_amount(amount, 'EUR', user_currency)
@@ -1920,18 +1733,15 @@ def initiate_cinetpay_payment(request, transaction_id):
 def gaming_cinetpay_notification(request):
     """
     Webhook pour recevoir les notifications CinetPay des transactions gaming
+    (enregistrées puis traitées par le worker process_payment_webhooks)
     """
     if request.method == 'POST':
         try:
             notification_data = json.loads(request.body)
-            from .cinetpay_utils import handle_gaming_cinetpay_notification
-            
-            success = handle_gaming_cinetpay_notification(notification_data)
-            
-            if success:
+            if payment_webhooks.record_event(payment_webhooks.GAMING, notification_data):
                 return HttpResponse('OK', status=200)
-            else:
-                return HttpResponse('Error processing notification', status=400)
+            logger.error("ID de transaction manquant dans la notification gaming")
+            return HttpResponse('Error processing notification', status=400)
         except Exception as e:
             logger.error(f"Erreur notification CinetPay Gaming: {e}")
             return HttpResponse('Error', status=500)
@@ -1968,18 +1778,10 @@ def cinetpay_payment_success(request, transaction_id):
             messages.error(request, f"Transaction {transaction_id} introuvable. Veuillez contacter le support.")
             return redirect('index')
         
-        # Mettre à jour les statuts
-        transaction.status = 'processing'
-        transaction.save()
-        logger.info(f"Transaction {transaction_id} mise à jour avec le statut 'processing'")
-        
-        # Mettre à jour le statut CinetPay
-        if hasattr(transaction, 'cinetpay_transaction'):
-            transaction.cinetpay_transaction.status = 'payment_received'
-            transaction.cinetpay_transaction.payment_received_at = timezone.now()
-            transaction.cinetpay_transaction.save()
-            logger.info(f"Transaction CinetPay {transaction.cinetpay_transaction.id} mise à jour")
-        else:
+        # Page de retour de l'acheteur : affichage seulement. Le paiement n'est
+        # pas vérifié ici ; le statut est appliqué par le worker des
+        # notifications (payment_webhooks) après vérification auprès de CinetPay
+        if not hasattr(transaction, 'cinetpay_transaction'):
             logger.warning(f"Aucune transaction CinetPay associée à la transaction {transaction_id}")
         
         return render(request, 'cinetpay_success.html', {'transaction': transaction})
@@ -2030,33 +1832,9 @@ def chat_home(request):
     if not request.user.is_authenticated:
         return redirect('login')
     
-    # Récupérer les conversations privées de l'utilisateur
-    private_conversations = PrivateConversation.objects.filter(
-        Q(user1=request.user) | Q(user2=request.user),
-        is_active=True
-    ).select_related('user1', 'user2').order_by('-last_message_at')[:10]
-    
-    # Préparer les données des conversations
-    conversations_data = []
-    for conv in private_conversations:
-        other_user = conv.user2 if conv.user1 == request.user else conv.user1
-        last_message = conv.private_messages.order_by('-created_at').first()
-        
-        conversations_data.append({
-            'conversation': conv,
-            'other_user': other_user,
-            'last_message': last_message,
-            'unread_count': conv.private_messages.filter(
-                is_read=False
-            ).exclude(sender=request.user).count()
-        })
-    
-    # Récupérer les groupes de l'utilisateur
-    user_groups = Group.objects.filter(
-        memberships__user=request.user,
-        memberships__is_active=True,
-        is_active=True
-    ).select_related('created_by').order_by('-last_message_at')[:5]
+    # Conversations et groupes avec dernier message et non lus (conversation_summary)
+    conversations_data = conversation_summary.private_conversations(request.user, limit=10)
+    user_groups = conversation_summary.group_conversations(request.user, limit=5)
     
     context = {
         'conversations': conversations_data,
@@ -2069,31 +1847,20 @@ def chat_list(request):
     return render(request, 'chat_list.html')
 
 def notifications(request):
+    notes = []
+    next_cursor = None
     if request.user.is_authenticated:
-        # Récupérer toutes les notifications
-        all_notes = Notification.objects.filter(user=request.user)
-        
-        # Trier manuellement selon la priorité : non lues récentes > non lues anciennes > lues récentes > lues anciennes
-        # Utiliser une clé de tri plus robuste
-        def sort_key(notification):
-            # Priorité : False (non lue) = 0, True (lue) = 1
-            # Puis par date décroissante (plus récent en premier)
-            return (notification.is_read, -notification.created_at.timestamp())
-        
-        notes = sorted(all_notes, key=sort_key)
-    else:
-        notes = []
-    
-    # Pour chaque notification de litige, ajouter la première demande d'information en attente
-    for note in notes:
-        if note.type == 'dispute_message' and note.dispute:
-            pending_request = note.dispute.information_requests.filter(
-                requested_to=request.user,
-                status='pending'
-            ).first()
-            note.pending_request = pending_request
-    
-    return render(request, 'notifications.html', {'notifications': notes})
+        # Non lues puis lues, par date décroissante, triées en base (notification_inbox)
+        try:
+            notes, next_cursor = notification_inbox.read_inbox(request.user, cursor=request.GET.get('cursor') or None)
+        except notification_inbox.InvalidCursor:
+            return redirect('notifications')
+    
+    return render(request, 'notifications.html', {
+        'notifications': notes,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor'),
+    })
 
 def mark_notification_read(request, notification_id):
     note = get_object_or_404(Notification, id=notification_id, user=request.user)
@@ -2102,12 +1869,23 @@ def mark_notification_read(request, notification_id):
     return redirect('notifications')
 
 def unread_notifications_count(request):
-    """API endpoint pour obtenir le nombre de notifications non lues"""
+    """
+    API endpoint pour obtenir le nombre de notifications non lues
+    Compteur en cache (notification_counters) ; l'ETag permet au navigateur de
+    revalider sans retransférer la réponse (304).
+    """
     if not request.user.is_authenticated:
         return JsonResponse({'count': 0})
     
-    count = Notification.objects.filter(user=request.user, is_read=False).count()
-    return JsonResponse({'count': count})
+    count = notification_counters.get_unread_count(request.user.id)
+    etag = f'"unread-{request.user.id}-{count}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse({'count': count})
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 def user_search(request):
     if not request.user.is_authenticated:
@@ -2298,12 +2076,6 @@ def send_private_message(request, conversation_id):
         conversation.save()
         
         # Diffuser le message via WebSocket
-        from channels.layers import get_channel_layer
-        from asgiref.sync import async_to_sync
-        
-        channel_layer = get_channel_layer()
-        room_group_name = f'private_chat_{conversation_id}'
-        
         message_data = {
             'id': str(message.id),
             'content': message.content,
@@ -2321,13 +2093,8 @@ def send_private_message(request, conversation_id):
             } if reply_to else None
         }
         
-        async_to_sync(channel_layer.group_send)(
-            room_group_name,
-            {
-                'type': 'chat_message',
-                'message': message_data
-            }
-        )
+        chat_realtime.broadcast_message('private', conversation.id, message_data, recipient_ids=[conversation.user2_id if request.user.id == conversation.user1_id else conversation.user1_id])
+        message_notifications.notify_private_message(conversation, request.user)
         
         return JsonResponse({
             'success': True,
@@ -2348,18 +2115,15 @@ def get_private_messages(request, conversation_id):
         if request.user not in [conversation.user1, conversation.user2]:
             return JsonResponse({'success': False, 'error': 'Accès non autorisé'})
         
-        # Paramètres de pagination
-        page = int(request.GET.get('page', 1))
-        limit = min(int(request.GET.get('limit', 20)), 50)  # Max 50 messages
-        offset = (page - 1) * limit
-        
-        # Récupérer les messages
-        messages_query = conversation.private_messages.select_related('sender').order_by('-created_at')
-        total_messages = messages_query.count()
-        messages_list = messages_query[offset:offset + limit]
+        # Récupérer les messages (après/avant un curseur, ordre chronologique)
+        page = chat_history.read_request_messages(
+            request,
+            conversation.private_messages.select_related('sender', 'reply_to__sender'),
+            default_limit=20
+        )
         
         messages_data = []
-        for message in reversed(messages_list):  # Ordre chronologique
+        for message in page['messages']:
             message_data = {
                 'id': str(message.id),
                 'content': message.content,
@@ -2367,7 +2131,7 @@ def get_private_messages(request, conversation_id):
                 'sender_id': message.sender.id,
                 'created_at': message.created_at.isoformat(),
                 'is_read': message.is_read,
-                'is_own': message.sender == request.user,
+                'is_own': message.sender_id == request.user.id,
                 'is_edited': message.is_edited,
                 'image': message.image.url if message.image else None,
                 'file': message.file.url if message.file else None,
@@ -2389,14 +2153,11 @@ def get_private_messages(request, conversation_id):
         return JsonResponse({
             'success': True,
             'messages': messages_data,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total_messages,
-                'has_more': offset + limit < total_messages
-            }
+            'cursors': chat_history.cursor_payload(page)
         })
         
+    except highlight_feed.InvalidCursor:
+        return JsonResponse({'success': False, 'error': 'Curseur invalide'}, status=400)
     except Exception as e:
         logger.error(f"Erreur récupération messages: {e}")
         return JsonResponse({'success': False, 'error': 'Erreur serveur'})
@@ -2405,26 +2166,9 @@ def group_list(request):
     if not request.user.is_authenticated:
         return redirect('login')
     
-    # Récupérer les groupes dont l'utilisateur est membre
-    user_groups = Group.objects.filter(
-        memberships__user=request.user,
-        memberships__is_active=True,
-        is_active=True
-    ).select_related('created_by').prefetch_related('memberships').order_by('-last_message_at')
-    
-    # Ajouter des informations supplémentaires pour chaque groupe
-    groups_data = []
-    for group in user_groups:
-        membership = group.memberships.filter(user=request.user, is_active=True).first()
-        last_message = group.group_messages.order_by('-created_at').first()
-        
-        groups_data.append({
-            'group': group,
-            'is_admin': membership.is_admin if membership else False,
-            'members_count': group.memberships.filter(is_active=True).count(),
-            'last_message': last_message,
-            'unread_count': 0  # TODO: Implémenter le comptage des messages non lus
-        })
+    # Groupes dont l'utilisateur est membre, avec dernier message, nombre de
+    # membres et nombre de non lus (conversation_summary)
+    groups_data = conversation_summary.group_conversations(request.user)
     
     context = {
         'groups_data': groups_data,
@@ -2489,28 +2233,16 @@ def group_chat(request, group_id):
             messages.error(request, "Vous n'êtes pas membre de ce groupe.")
             return redirect('group_list')
         
-        # Récupérer les messages non lus pour cet utilisateur
-        unread_messages = GroupMessage.objects.filter(
-            group=group
-        ).exclude(
-            read_by__user=request.user
-        ).exclude(
-            sender=request.user
-        ).order_by('created_at')
-        
-        first_unread_message = unread_messages.first()
+        # Premier message non lu (au-delà du watermark de lecture)
+        first_unread_message = group_reads.unread_messages(membership).first()
         
         # Récupérer les derniers messages (50 max)
         messages_list = group.group_messages.select_related('sender').order_by('-created_at')[:50]
         messages_list = list(reversed(messages_list))  # Ordre chronologique
         
-        # Marquer les messages comme lus
-        for message in messages_list:
-            if message.sender != request.user:
-                GroupMessageRead.objects.get_or_create(
-                    message=message,
-                    user=request.user
-                )
+        # Marquer les messages comme lus (avance le watermark)
+        if messages_list:
+            group_reads.mark_read(membership, messages_list[-1])
         
         # Récupérer les membres du groupe
         members = GroupMembership.objects.filter(
@@ -2574,12 +2306,6 @@ def send_group_message(request, group_id):
         )
         
         # Diffuser le message via WebSocket
-        from channels.layers import get_channel_layer
-        from asgiref.sync import async_to_sync
-        
-        channel_layer = get_channel_layer()
-        room_group_name = f'group_chat_{group_id}'
-        
         message_data = {
             'id': str(message.id),
             'content': message.content,
@@ -2597,13 +2323,11 @@ def send_group_message(request, group_id):
             } if reply_to else None
         }
         
-        async_to_sync(channel_layer.group_send)(
-            room_group_name,
-            {
-                'type': 'chat_message',
-                'message': message_data
-            }
+        recipient_ids = list(
+            group.memberships.filter(is_active=True).exclude(user=request.user).values_list('user_id', flat=True)
         )
+        chat_realtime.broadcast_message('group', group.id, message_data, recipient_ids=recipient_ids)
+        message_notifications.notify_group_message(group, request.user, recipient_ids)
         
         return JsonResponse({
             'success': True,
@@ -2632,25 +2356,26 @@ def get_group_messages(request, group_id):
         if not membership:
             return JsonResponse({'success': False, 'error': 'Accès non autorisé'})
         
-        # Paramètres de pagination
-        page = int(request.GET.get('page', 1))
-        limit = min(int(request.GET.get('limit', 20)), 50)  # Max 50 messages
-        offset = (page - 1) * limit
+        # Récupérer les messages (après/avant un curseur, ordre chronologique)
+        page = chat_history.read_request_messages(
+            request,
+            group.group_messages.select_related('sender', 'reply_to__sender'),
+            default_limit=20
+        )
         
-        # Récupérer les messages
-        messages_query = group.group_messages.select_related('sender').order_by('-created_at')
-        total_messages = messages_query.count()
-        messages_list = messages_query[offset:offset + limit]
+        # Les messages les plus récents ont été affichés : avancer le watermark
+        if page['messages'] and not request.GET.get('before'):
+            group_reads.mark_read(membership, page['messages'][-1])
         
         messages_data = []
-        for message in reversed(messages_list):  # Ordre chronologique
+        for message in page['messages']:
             messages_data.append({
                 'id': str(message.id),
                 'content': message.content,
                 'sender': message.sender.username,
                 'sender_id': message.sender.id,
                 'created_at': message.created_at.isoformat(),
-                'is_own': message.sender == request.user,
+                'is_own': message.sender_id == request.user.id,
                 'is_edited': message.is_edited,
                 'image': message.image.url if message.image else None,
                 'file': message.file.url if message.file else None,
@@ -2665,14 +2390,11 @@ def get_group_messages(request, group_id):
         return JsonResponse({
             'success': True,
             'messages': messages_data,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total_messages,
-                'has_more': offset + limit < total_messages
-            }
+            'cursors': chat_history.cursor_payload(page)
         })
         
+    except highlight_feed.InvalidCursor:
+        return JsonResponse({'success': False, 'error': 'Curseur invalide'}, status=400)
     except Exception as e:
         logger.error(f"Erreur récupération messages groupe: {e}")
         return JsonResponse({'success': False, 'error': 'Erreur serveur'})
@@ -3290,7 +3012,7 @@ def shop_payment(request, order_id):
                 messages.error(request, f"Erreur de paiement: {result['error']}")
         
         # Ajouter la devise de l'utilisateur au contexte
-        user_currency = CurrencyService.get_user_currency(request.user)
+        user_currency = CurrencyService.get_request_currency(request)
         return render(request, 'shop/payment.html', {
             'order': order, 
             'user_profile': getattr(request.user, 'profile', None) if request.user.is_authenticated else None,
@@ -3320,8 +3042,8 @@ def shop_cinetpay_notification(request):
             else:
                 notification_data = request.POST.dict()
             logger.info(f"Notification CinetPay reçue: {notification_data}")
-            success = handle_cinetpay_notification(notification_data)
-            if success:
+            # Traitée par le worker process_payment_webhooks
+            if payment_webhooks.record_event(payment_webhooks.SHOP, notification_data):
                 return HttpResponse('OK', status=200)
             return HttpResponse('Error', status=400)
         except Exception as e:
@@ -3691,6 +3413,7 @@ def highlights_home(request):
             is_active=True,
             expires_at__gt=timezone.now()
         ).select_related('author', 'author__profile').order_by('-created_at')[:10]
+        recent_highlights = prepare_highlights(recent_highlights, request.user)
         
         # Statistiques pour l'utilisateur connecté
         user_stats = {}
@@ -3728,71 +3451,19 @@ def highlights_for_you(request):
             }
             return render(request, 'highlights/feed.html', context)
         
-        # Mode normal : chargement initial limité (3-5 vidéos)
+        # Mode normal : chargement initial limité (3-5 vidéos) depuis le feed matérialisé
         initial_limit = 3
+        highlights, next_cursor = highlight_feed.read_feed(request.user, 'for_you', None, initial_limit)
         
-        base_highlights = Highlight.objects.filter(
-            is_active=True,
-            expires_at__gt=timezone.now()
-        ).select_related('author', 'author__profile')
-        
-        # Appliquer la logique de tri selon l'utilisateur
-        if request.user.is_authenticated:
-            # Récupérer les IDs des highlights déjà vus par l'utilisateur
-            viewed_highlight_ids = HighlightView.objects.filter(
-                user=request.user
-            ).values_list('highlight_id', flat=True)
-            
-            # Séparer les highlights vus et non vus
-            unviewed_highlights = base_highlights.exclude(
-                id__in=viewed_highlight_ids
-            ).order_by('-created_at')
-            
-            viewed_highlights = base_highlights.filter(
-                id__in=viewed_highlight_ids
-            ).order_by('-created_at')
-            
-            # Prioriser les abonnements dans les highlights non vus
-            subscribed_users = request.user.subscriptions.values_list('subscribed_to', flat=True)
-            if subscribed_users:
-                unviewed_subscribed = unviewed_highlights.filter(author__in=subscribed_users)
-                unviewed_others = unviewed_highlights.exclude(author__in=subscribed_users)
-                
-                # Priorité : non vus (abonnements + autres) puis vus
-                from itertools import chain
-                highlights_query = chain(unviewed_subscribed, unviewed_others, viewed_highlights)
-                # Convertir en liste et prendre seulement les premiers
-                highlights = list(highlights_query)[:initial_limit]
-            else:
-                from itertools import chain
-                highlights_query = chain(unviewed_highlights, viewed_highlights)
-                highlights = list(highlights_query)[:initial_limit]
-        else:
-            # Utilisateur non connecté: tri classique par date, limité
-            highlights = list(base_highlights.order_by('-created_at')[:initial_limit])
-        
-        # Ajouter les informations d'appréciation pour les highlights initiaux
-        for highlight in highlights:
-            if request.user.is_authenticated:
-                highlight.user_appreciation = HighlightAppreciation.objects.filter(
-                    highlight=highlight,
-                    user=request.user
-                ).first()
-                highlight.is_viewed = HighlightView.objects.filter(
-                    highlight=highlight,
-                    user=request.user
-                ).exists()
-            else:
-                highlight.user_appreciation = None
-                highlight.is_viewed = False
-            
-            highlight.appreciation_counts = highlight.get_appreciation_counts_by_level()
+        # Appréciations, vues et compteurs des highlights initiaux (requêtes groupées)
+        highlights = prepare_highlights(highlights, request.user)
         
         context = {
             'highlights': highlights,
             'feed_type': 'for_you',
             'target_highlight_id': None,
             'load_mode': 'initial',
+            'next_cursor': next_cursor,
             'page_title': 'Highlights',
         }
         return render(request, 'highlights/feed.html', context)
@@ -3812,21 +3483,14 @@ def highlights_friends(request):
             author__in=subscribed_users,
             is_active=True,
             expires_at__gt=timezone.now()
-        ).select_related('author', 'author__profile').prefetch_related(
-            'appreciations', 'comments', 'views'
-        ).order_by('-created_at')
+        ).select_related('author', 'author__profile').order_by('-created_at')
         
         paginator = Paginator(highlights, 20)
         page_number = request.GET.get('page')
         highlights = paginator.get_page(page_number)
         
-        # Ajouter les appréciations utilisateur et compteurs pour chaque highlight
-        for highlight in highlights:
-            highlight.user_appreciation = HighlightAppreciation.objects.filter(
-                highlight=highlight,
-                user=request.user
-            ).first()
-            highlight.appreciation_counts = highlight.get_appreciation_counts_by_level()
+        # Appréciations utilisateur et compteurs de la page (requêtes groupées)
+        highlights.object_list = prepare_highlights(highlights.object_list, request.user)
         
         context = {
             'highlights': highlights,
@@ -3849,9 +3513,8 @@ def highlights_search(request):
         
         if query:
             if query.startswith('#'):
-                # Recherche par hashtag
-                hashtag = query[1:].lower()
-                highlights = highlights.filter(hashtags__icontains=hashtag)
+                # Recherche par hashtag exact (index inversé)
+                highlights = highlight_hashtags.highlights_with_hashtag(highlights, query)
             else:
                 # Recherche par utilisateur ou caption
                 highlights = highlights.filter(
@@ -3862,18 +3525,14 @@ def highlights_search(request):
         paginator = Paginator(highlights, 20)
         page_number = request.GET.get('page')
         highlights = paginator.get_page(page_number)
+        highlights.object_list = prepare_highlights(highlights.object_list, request.user)
         
         # Hashtags populaires
         popular_hashtags = []
         try:
-            all_hashtags = []
-            for h in Highlight.objects.filter(is_active=True, expires_at__gt=timezone.now()).values_list('hashtags', flat=True):
-                if h:
-                    all_hashtags.extend(h)
-            
-            from collections import Counter
-            hashtag_counts = Counter(all_hashtags)
-            popular_hashtags = [tag for tag, count in hashtag_counts.most_common(10)]
+            popular_hashtags = [item['tag'] for item in get_trending_hashtags(10)]
+            if not popular_hashtags:
+                popular_hashtags = [item['tag'] for item in highlight_hashtags.popular_hashtags(limit=10)]
         except Exception:
             pass
         
@@ -3892,15 +3551,15 @@ def highlights_search(request):
 def highlights_hashtag(request, hashtag):
     """Highlights pour un hashtag spécifique"""
     try:
-        highlights = Highlight.objects.filter(
-            hashtags__icontains=hashtag.lower(),
-            is_active=True,
-            expires_at__gt=timezone.now()
+        highlights = highlight_hashtags.highlights_with_hashtag(
+            Highlight.objects.filter(is_active=True, expires_at__gt=timezone.now()),
+            hashtag
         ).select_related('author', 'author__profile').order_by('-created_at')
         
         paginator = Paginator(highlights, 20)
         page_number = request.GET.get('page')
         highlights = paginator.get_page(page_number)
+        highlights.object_list = prepare_highlights(highlights.object_list, request.user)
         
         context = {
             'highlights': highlights,
@@ -3925,19 +3584,15 @@ def create_highlight(request):
                 messages.error(request, 'Veuillez sélectionner une vidéo')
                 return render(request, 'highlights/create.html')
             
-            # Extraire les hashtags de la caption
-            hashtags = re.findall(r'#(\w+)', caption.lower())
-            
-            # Créer le highlight
-            highlight = Highlight.objects.create(
-                author=request.user,
-                video=video,
-                caption=caption,
-                hashtags=hashtags
-            )
+            # Même file de traitement que l'upload fractionné (publication après validation)
+            try:
+                highlight_uploads.upload_from_file(request.user, video, caption)
+            except highlight_uploads.UploadError as e:
+                messages.error(request, str(e))
+                return render(request, 'highlights/create.html')
             
-            messages.success(request, 'Highlight créé avec succès!')
-            return redirect('highlight_detail', highlight_id=highlight.id)
+            messages.success(request, 'Vidéo reçue ! Votre Highlight sera publié après traitement.')
+            return redirect('highlights_for_you')
         
         return render(request, 'highlights/create.html')
     except Exception as e:
@@ -3945,6 +3600,45 @@ def create_highlight(request):
         messages.error(request, "Erreur lors de la création du Highlight")
         return redirect('highlights_for_you')
 
+@login_required
+@require_POST
+def start_highlight_upload(request):
+    """Démarre l'upload fractionné d'une vidéo de Highlight (voir highlight_uploads)"""
+    try:
+        total_size = int(request.POST.get('size', 0))
+    except ValueError:
+        return JsonResponse({'error': 'Taille invalide'}, status=400)
+    try:
+        upload = highlight_uploads.start_upload(
+            request.user,
+            request.POST.get('filename', ''),
+            total_size,
+            request.POST.get('caption', '').strip()
+        )
+        return JsonResponse(highlight_uploads.upload_status(upload), status=201)
+    except highlight_uploads.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Erreur start_highlight_upload: {e}")
+        return JsonResponse({'error': 'Erreur serveur'}, status=500)
+
+@login_required
+@require_http_methods(['GET', 'PUT'])
+def highlight_upload(request, upload_id):
+    """GET : offset reçu et état du traitement ; PUT : morceau suivant (Content-Range)"""
+    upload = get_object_or_404(HighlightUpload, id=upload_id, author=request.user)
+    if request.method == 'PUT':
+        try:
+            upload = highlight_uploads.write_chunk(upload, request.META.get('HTTP_CONTENT_RANGE'), request)
+        except highlight_uploads.OffsetMismatch as e:
+            return JsonResponse({'error': str(e), 'offset': e.offset}, status=409)
+        except highlight_uploads.UploadError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except Exception as e:
+            logger.error(f"Erreur highlight_upload: {e}")
+            return JsonResponse({'error': 'Erreur serveur'}, status=500)
+    return JsonResponse(highlight_uploads.upload_status(upload))
+
 def highlight_detail(request, highlight_id):
     """Détail d'un Highlight avec commentaires"""
     try:
@@ -3958,21 +3652,20 @@ def highlight_detail(request, highlight_id):
             messages.warning(request, "Ce Highlight a expiré")
             return redirect('highlights_for_you')
         
-        # Enregistrer la vue
+        # Enregistrer la vue (tampon d'écriture différée)
         if request.user.is_authenticated:
-            HighlightView.objects.get_or_create(
-                highlight=highlight,
+            highlight_view_buffer.enqueue_view(
+                highlight.id,
                 user=request.user,
-                defaults={'ip_address': request.META.get('REMOTE_ADDR')}
+                ip_address=request.META.get('REMOTE_ADDR')
             )
         
         # Récupérer les commentaires
         comments = highlight.comments.select_related('user', 'user__profile').order_by('-created_at')
         
         # Vérifier si l'utilisateur a apprécié
-        user_appreciation = None
-        if request.user.is_authenticated:
-            user_appreciation = highlight.appreciations.filter(user=request.user).first()
+        prepare_highlights([highlight], request.user)
+        user_appreciation = highlight.user_appreciation
         
         # Navigation précédent/suivant (par date de création)
         now = timezone.now()
@@ -4071,19 +3764,19 @@ def toggle_highlight_appreciation(request, highlight_id):
             author_profile = highlight.author.profile
             author_profile.update_score_from_appreciation(appreciation_level)
         
-        # Calculer les statistiques d'appréciation
-        appreciations = highlight.appreciations.all()
-        appreciation_stats = {}
-        for level in range(1, 7):
-            count = appreciations.filter(appreciation_level=level).count()
-            appreciation_stats[f'level_{level}'] = count
+        # Calculer les statistiques d'appréciation (compteurs mis à jour par les signaux)
+        highlight.refresh_from_db(fields=COUNTER_FIELDS)
+        appreciation_stats = {
+            f'level_{level}': count
+            for level, count in highlight.get_appreciation_counts_by_level().items()
+        }
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
                 'success': True,
                 'appreciation_level': appreciation_level,
                 'appreciation_stats': appreciation_stats,
-                'total_appreciations': appreciations.count()
+                'total_appreciations': highlight.appreciations_count
             })
         
         return redirect('highlight_detail', highlight_id=highlight.id)
@@ -4109,6 +3802,7 @@ def add_highlight_comment(request, highlight_id):
         )
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            highlight.refresh_from_db(fields=['comments_count'])
             return JsonResponse({
                 'success': True,
                 'comment': {
@@ -4116,7 +3810,7 @@ def add_highlight_comment(request, highlight_id):
                     'content': comment.content,
                     'user': comment.user.username,
                     'created_at': comment.created_at.strftime('%H:%M'),
-                    'user_avatar': comment.user.profile.profileimg.url if hasattr(comment.user, 'profile') and comment.user.profile.profileimg else None
+                    'user_avatar': author_avatar_url(comment.user)
                 },
                 'comments_count': highlight.comments_count
             })
@@ -4155,27 +3849,14 @@ def share_highlight(request, highlight_id):
 
 @require_POST
 def record_highlight_view(request, highlight_id):
-    """Enregistrer une vue sur un Highlight"""
+    """Enregistrer une vue sur un Highlight (tampon d'écriture différée, réponse 204)"""
     try:
-        highlight = get_object_or_404(Highlight, id=highlight_id, is_active=True)
-        
-        if request.user.is_authenticated:
-            view, created = HighlightView.objects.get_or_create(
-                highlight=highlight,
-                user=request.user,
-                defaults={'ip_address': request.META.get('REMOTE_ADDR')}
-            )
-        else:
-            # Pour les utilisateurs anonymes, utiliser l'IP
-            ip_address = request.META.get('REMOTE_ADDR')
-            if ip_address:
-                view, created = HighlightView.objects.get_or_create(
-                    highlight=highlight,
-                    ip_address=ip_address,
-                    user=None
-                )
-        
-        return JsonResponse({'success': True, 'views_count': highlight.views.count()})
+        highlight_view_buffer.enqueue_view(
+            highlight_id,
+            user=request.user,
+            ip_address=request.META.get('REMOTE_ADDR')
+        )
+        return HttpResponse(status=204)
     except Exception as e:
         logger.error(f"Erreur record_highlight_view: {e}")
         return JsonResponse({'success': False, 'error': str(e)})
@@ -4258,81 +3939,33 @@ def highlights_feed_api(request):
     try:
         # Paramètres de pagination optimisés pour TikTok-like feed
         limit = int(request.GET.get('limit', 5))  # Par défaut 5 vidéos au lieu de 10
-        offset = int(request.GET.get('offset', 0))  # Offset au lieu de page
+        cursor = request.GET.get('cursor') or None  # Curseur opaque renvoyé par la page précédente
         feed_type = request.GET.get('type', 'for_you')
         
         # Limiter le nombre maximum pour éviter la surcharge
-        limit = min(limit, 10)
+        limit = max(1, min(limit, 10))
         
-        highlights = Highlight.objects.filter(
-            is_active=True,
-            expires_at__gt=timezone.now()
-        ).select_related('author', 'author__profile').prefetch_related(
-            'appreciations', 'comments', 'views'
-        )
-        
-        # Smart discovery algorithm
-        if feed_type == 'for_you' and request.user.is_authenticated:
-            # Prioritize based on user engagement patterns
-            user_liked_hashtags = get_user_preferred_hashtags(request.user)
-            user_interactions = get_user_interaction_history(request.user)
-            
-            # Apply intelligent sorting
-            highlights = apply_discovery_algorithm(highlights, request.user, user_liked_hashtags, user_interactions)
-        elif feed_type == 'friends' and request.user.is_authenticated:
-            subscribed_users = request.user.subscriptions.values_list('subscribed_to', flat=True)
-            highlights = highlights.filter(author__in=subscribed_users)
-        
-        highlights = highlights.order_by('-created_at')
-        
-        # Utiliser offset/limit au lieu de pagination Django
-        total_count = highlights.count()
-        highlights_slice = highlights[offset:offset + limit]
+        # Feed matérialisé (classement précalculé) lu par curseur, sans OFFSET ni COUNT
+        try:
+            highlights_slice, next_cursor = highlight_feed.read_feed(request.user, feed_type, cursor, limit)
+        except highlight_feed.InvalidCursor:
+            return JsonResponse({'success': False, 'error': 'Curseur invalide'}, status=400)
         
-        highlights_data = []
-        for highlight in highlights_slice:
-            user_appreciated = None
-            appreciation_counts = {}
-            if request.user.is_authenticated:
-                user_appreciated = highlight.appreciations.filter(user=request.user).first()
-            
-            # Récupérer les compteurs d'appréciations par niveau
-            appreciation_counts = highlight.get_appreciation_counts_by_level()
-            
+        # Sérialisation groupée (appréciations, vues, avatars en requêtes IN)
+        highlights_data = serialize_highlights(highlights_slice, request.user)
+        for highlight, data in zip(highlights_slice, highlights_data):
             # Enhanced analytics data
-            engagement_rate = calculate_engagement_rate(highlight)
-            view_duration_avg = get_average_view_duration(highlight)
-            
-            highlights_data.append({
-                'id': str(highlight.id),
-                'video_url': highlight.video.url,
-                'caption': highlight.caption,
-                'hashtags': highlight.hashtags,
-                'author': {
-                    'id': highlight.author.id,
-                    'username': highlight.author.username,
-                    'avatar': highlight.author.profile.profileimg.url if hasattr(highlight.author, 'profile') and highlight.author.profile.profileimg else None
-                },
-                'appreciations_count': highlight.appreciations_count,
-                'appreciation_counts': appreciation_counts,
-                'comments_count': highlight.comments_count,
-                'views_count': highlight.views.count(),
-                'user_appreciation': {
-                    'appreciation_level': user_appreciated.appreciation_level if user_appreciated else None
-                },
-                'created_at': highlight.created_at.strftime('%H:%M'),
-                'time_remaining': str(highlight.time_remaining) if highlight.time_remaining else None,
-                'engagement_rate': engagement_rate,
-                'avg_view_duration': view_duration_avg,
+            data.update({
+                'engagement_rate': calculate_engagement_rate(highlight),
+                'avg_view_duration': get_average_view_duration(highlight),
                 'performance_score': calculate_performance_score(highlight)
             })
         
         return JsonResponse({
             'success': True,
             'highlights': highlights_data,
-            'has_more': offset + limit < total_count,
-            'next_offset': offset + limit if offset + limit < total_count else None,
-            'total_count': total_count,
+            'has_more': next_cursor is not None,
+            'next_cursor': next_cursor,
             'analytics': {
                 'avg_engagement': calculate_average_engagement(highlights_slice),
                 'trending_hashtags': get_trending_hashtags()
@@ -4362,39 +3995,10 @@ def highlights_context_api(request, highlight_id):
         context_before = min(context_before, 5)
         context_after = min(context_after, 5)
         
-        # Base query pour tous les highlights
-        base_highlights = Highlight.objects.filter(
-            is_active=True,
-            expires_at__gt=timezone.now()
-        ).select_related('author', 'author__profile')
-        
-        # Appliquer la logique de feed selon le type
-        if feed_type == 'for_you' and request.user.is_authenticated:
-            user_liked_hashtags = get_user_preferred_hashtags(request.user)
-            user_interactions = get_user_interaction_history(request.user)
-            base_highlights = apply_discovery_algorithm(base_highlights, request.user, user_liked_hashtags, user_interactions)
-        elif feed_type == 'friends' and request.user.is_authenticated:
-            subscribed_users = request.user.subscriptions.values_list('subscribed_to', flat=True)
-            base_highlights = base_highlights.filter(author__in=subscribed_users)
-        
-        base_highlights = base_highlights.order_by('-created_at')
-        
-        # Trouver la position du highlight cible dans le feed ordonné
-        target_position = None
-        highlights_before_target = []
-        highlights_after_target = []
-        
-        # Récupérer les highlights avant le target
-        before_highlights = base_highlights.filter(
-            created_at__gt=target_highlight.created_at
-        ).order_by('created_at')[:context_before]
-        highlights_before_target = list(reversed(before_highlights))
-        
-        # Récupérer les highlights après le target
-        after_highlights = base_highlights.filter(
-            created_at__lt=target_highlight.created_at
-        ).order_by('-created_at')[:context_after]
-        highlights_after_target = list(after_highlights)
+        # Voisins du highlight cible dans l'ordre du feed de l'utilisateur
+        highlights_before_target, highlights_after_target, next_cursor = highlight_feed.read_context(
+            request.user, target_highlight, feed_type, context_before, context_after
+        )
         
         # Combiner tous les highlights : avant + target + après
         all_highlights = highlights_before_target + [target_highlight] + highlights_after_target
@@ -4402,43 +4006,18 @@ def highlights_context_api(request, highlight_id):
         # Position du target dans la liste combinée
         target_index = len(highlights_before_target)
         
-        # Préparer les données
-        highlights_data = []
-        for highlight in all_highlights:
-            user_appreciated = None
-            appreciation_counts = {}
-            if request.user.is_authenticated:
-                user_appreciated = highlight.appreciations.filter(user=request.user).first()
-            
-            appreciation_counts = highlight.get_appreciation_counts_by_level()
-            
-            highlights_data.append({
-                'id': str(highlight.id),
-                'video_url': highlight.video.url,
-                'caption': highlight.caption,
-                'hashtags': highlight.hashtags,
-                'author': {
-                    'id': highlight.author.id,
-                    'username': highlight.author.username,
-                    'avatar': highlight.author.profile.profileimg.url if hasattr(highlight.author, 'profile') and highlight.author.profile.profileimg else None
-                },
-                'appreciations_count': highlight.appreciations_count,
-                'appreciation_counts': appreciation_counts,
-                'comments_count': highlight.comments_count,
-                'views_count': highlight.views.count(),
-                'user_appreciation': {
-                    'appreciation_level': user_appreciated.appreciation_level if user_appreciated else None
-                },
-                'created_at': highlight.created_at.strftime('%H:%M'),
-                'time_remaining': str(highlight.time_remaining) if highlight.time_remaining else None,
-                'is_target': highlight.id == target_highlight.id
-            })
+        # Préparer les données (requêtes groupées)
+        highlights_data = serialize_highlights(all_highlights, request.user)
+        for highlight, data in zip(all_highlights, highlights_data):
+            data['is_target'] = highlight.id == target_highlight.id
         
         return JsonResponse({
             'success': True,
             'highlights': highlights_data,
             'target_index': target_index,
             'target_id': str(target_highlight.id),
+            'has_more': next_cursor is not None,
+            'next_cursor': next_cursor,
             'context': {
                 'before': len(highlights_before_target),
                 'after': len(highlights_after_target)
@@ -4462,7 +4041,7 @@ def highlight_comments_api(request, highlight_id):
                 'content': comment.content,
                 'user': {
                     'username': comment.user.username,
-                    'avatar': comment.user.profile.profileimg.url if hasattr(comment.user, 'profile') and comment.user.profile.profileimg else None
+                    'avatar': author_avatar_url(comment.user)
                 },
                 'created_at': comment.created_at.strftime('%H:%M')
             })
@@ -4477,76 +4056,10 @@ def highlight_comments_api(request, highlight_id):
 
 # ===== ANALYTICS AND PERFORMANCE HELPERS =====
 
-def get_user_preferred_hashtags(user, limit=10):
-    """Get user's preferred hashtags based on interaction history"""
-    try:
-        # Get hashtags from highlights the user liked
-        liked_highlights = Highlight.objects.filter(
-            appreciations__user=user,
-            is_active=True
-        ).values_list('hashtags', flat=True)
-        
-        all_hashtags = []
-        for hashtag_list in liked_highlights:
-            if hashtag_list:
-                all_hashtags.extend(hashtag_list)
-        
-        from collections import Counter
-        hashtag_counts = Counter(all_hashtags)
-        return [tag for tag, count in hashtag_counts.most_common(limit)]
-    except Exception as e:
-        logger.error(f"Error getting user preferred hashtags: {e}")
-        return []
-
-def get_user_interaction_history(user):
-    """Get user's interaction patterns for recommendation algorithm"""
-    try:
-        from django.db.models import Count
-        
-        # Get users the current user interacts with most
-        interacted_users = User.objects.filter(
-            Q(highlights__appreciations__user=user) |
-            Q(highlights__comments__user=user)
-        ).annotate(
-            interaction_count=Count('highlights__appreciations') + Count('highlights__comments')
-        ).order_by('-interaction_count')[:20]
-        
-        return list(interacted_users.values_list('id', flat=True))
-    except Exception as e:
-        logger.error(f"Error getting user interaction history: {e}")
-        return []
-
-def apply_discovery_algorithm(highlights_queryset, user, preferred_hashtags, interaction_users):
-    """Apply smart discovery algorithm to sort highlights"""
-    try:
-        from django.db.models import Case, When, IntegerField, F
-        
-        # Create scoring conditions
-        hashtag_score = Case(
-            *[When(hashtags__icontains=tag, then=5) for tag in preferred_hashtags[:5]],
-            default=0,
-            output_field=IntegerField()
-        )
-        
-        interaction_score = Case(
-            When(author__id__in=interaction_users[:10], then=3),
-            default=0,
-            output_field=IntegerField()
-        )
-        
-        # Apply scoring and sort
-        return highlights_queryset.annotate(
-            discovery_score=hashtag_score + interaction_score
-        ).order_by('-discovery_score', '-created_at')
-        
-    except Exception as e:
-        logger.error(f"Error applying discovery algorithm: {e}")
-        return highlights_queryset.order_by('-created_at')
-
 def calculate_engagement_rate(highlight):
     """Calculate engagement rate for a highlight"""
     try:
-        views_count = highlight.views.count()
+        views_count = highlight.views_count
         if views_count == 0:
             return 0.0
         
@@ -4571,7 +4084,7 @@ def calculate_performance_score(highlight):
     """Calculate overall performance score for a highlight"""
     try:
         engagement_rate = calculate_engagement_rate(highlight)
-        views_count = highlight.views.count()
+        views_count = highlight.views_count
         recency_score = max(0, 100 - (timezone.now() - highlight.created_at).days * 10)
         
         # Weighted score calculation
@@ -4599,52 +4112,9 @@ def calculate_average_engagement(highlights_page):
         return 0.0
 
 def get_trending_hashtags(limit=10):
-    """Get currently trending hashtags with engagement scoring"""
+    """Hashtags tendances (scores à décroissance exponentielle, lus par index)"""
     try:
-        from collections import Counter
-        
-        # Get hashtags from recent highlights (last 24 hours) with engagement data
-        recent_highlights = Highlight.objects.filter(
-            is_active=True,
-            created_at__gte=timezone.now() - timezone.timedelta(hours=24)
-        ).prefetch_related('appreciations', 'views', 'comments')
-        
-        hashtag_scores = {}
-        
-        for highlight in recent_highlights:
-            if not highlight.hashtags:
-                continue
-            
-            # Calculate engagement score
-            engagement_score = (
-                highlight.appreciations.count() * 3 +
-                highlight.views.count() * 1 +
-                highlight.comments.count() * 2
-            )
-            
-            for hashtag in highlight.hashtags:
-                hashtag_lower = hashtag.lower()
-                if hashtag_lower not in hashtag_scores:
-                    hashtag_scores[hashtag_lower] = {'score': 0, 'count': 0}
-                hashtag_scores[hashtag_lower]['score'] += engagement_score + 1
-                hashtag_scores[hashtag_lower]['count'] += 1
-        
-        # Sort by engagement score
-        trending = sorted(
-            hashtag_scores.items(), 
-            key=lambda x: x[1]['score'], 
-            reverse=True
-        )[:limit]
-        
-        return [
-            {
-                'tag': tag, 
-                'score': data['score'], 
-                'count': data['count'],
-                'engagement_rate': round(data['score'] / data['count'], 1) if data['count'] > 0 else 0
-            } 
-            for tag, data in trending
-        ]
+        return highlight_trending.top_hashtags(limit)
     except Exception as e:
         logger.error(f"Error getting trending hashtags: {e}")
         return []
@@ -4660,21 +4130,12 @@ def hashtag_suggestions_api(request):
         # Hashtags populaires (30 derniers jours)
         popular_hashtags = []
         try:
-            all_hashtags = []
-            for h in Highlight.objects.filter(
-                is_active=True, 
-                created_at__gte=timezone.now() - timezone.timedelta(days=30)
-            ).values_list('hashtags', flat=True):
-                if h:
-                    all_hashtags.extend(h)
-            
-            from collections import Counter
-            hashtag_counts = Counter(all_hashtags)
-            popular_hashtags = [
-                {'tag': tag, 'count': count} 
-                for tag, count in hashtag_counts.most_common(15)
-                if count >= 3
-            ]
+            popular_hashtags = highlight_hashtags.popular_hashtags(
+                since=timezone.now() - timezone.timedelta(days=30),
+                limit=15,
+                min_count=3,
+                active_only=False
+            )
         except Exception:
             pass
         
@@ -4711,41 +4172,15 @@ def hashtag_suggestions_api(request):
 # Enhanced view recording with duration tracking
 @require_POST
 def record_highlight_view_enhanced(request, highlight_id):
-    """Enhanced view recording with duration and analytics"""
+    """Enhanced view recording with duration (tampon d'écriture différée, réponse 204)"""
     try:
-        highlight = get_object_or_404(Highlight, id=highlight_id, is_active=True)
-        view_duration = request.POST.get('duration', 0)  # Duration in seconds
-        
-        if request.user.is_authenticated:
-            view, created = HighlightView.objects.get_or_create(
-                highlight=highlight,
-                user=request.user,
-                defaults={
-                    'ip_address': request.META.get('REMOTE_ADDR'),
-                    'view_duration': float(view_duration) if view_duration else 0
-                }
-            )
-            
-            # Update duration if view already exists
-            if not created and view_duration:
-                view.view_duration = max(view.view_duration or 0, float(view_duration))
-                view.save()
-        else:
-            # For anonymous users, use IP
-            ip_address = request.META.get('REMOTE_ADDR')
-            if ip_address:
-                view, created = HighlightView.objects.get_or_create(
-                    highlight=highlight,
-                    ip_address=ip_address,
-                    user=None,
-                    defaults={'view_duration': float(view_duration) if view_duration else 0}
-                )
-        
-        return JsonResponse({
-            'success': True,
-            'views_count': highlight.views.count(),
-            'engagement_rate': calculate_engagement_rate(highlight)
-        })
+        highlight_view_buffer.enqueue_view(
+            highlight_id,
+            user=request.user,
+            ip_address=request.META.get('REMOTE_ADDR'),
+            duration=request.POST.get('duration', 0)  # Duration in seconds
+        )
+        return HttpResponse(status=204)
     except Exception as e:
         logger.error(f"Erreur record_highlight_view_enhanced: {e}")
         return JsonResponse({'success': False, 'error': str(e)})
@@ -5330,38 +4765,35 @@ def get_active_chats(request):
     Vue pour récupérer les chats actifs pour le chat flottant
     """
     try:
-        # Récupérer les transactions actives de l'utilisateur
-        active_transactions = Transaction.objects.filter(
-            Q(buyer=request.user) | Q(seller=request.user),
-            status__in=['pending', 'processing', 'completed']
-        ).select_related('buyer', 'seller', 'post').order_by('-created_at')[:10]
-        
+        # Chats de transaction avec dernier message et non lus (conversation_summary)
         chats = []
-        for transaction in active_transactions:
-            # Déterminer l'autre utilisateur
-            other_user = transaction.seller if transaction.buyer == request.user else transaction.buyer
-            
-            # Récupérer le dernier message
-            last_message = Message.objects.filter(
-                chat__transaction=transaction
-            ).order_by('-created_at').first()
-            
-            chat_data = {
-                'id': str(transaction.id),
+        for summary in conversation_summary.transaction_chats(request.user, limit=10):
+            transaction = summary['transaction']
+            other_user = summary['other_user']
+            last_message = summary['last_message']
+            profile = getattr(other_user, 'profile', None)
+            
+            chats.append({
+                'id': str(summary['chat'].id),
+                'transaction_id': str(transaction.id),
+                'is_buyer': summary['is_buyer'],
+                'buyer_username': transaction.buyer.username,
+                'seller_username': transaction.seller.username,
                 'other_user': {
                     'username': other_user.username,
                     'id': other_user.id
                 },
+                'other_user_profile_img': cloudinary_or_static(profile, 'profileimg') if profile else static('images/default.png'),
+                'post_title': transaction.post.title,
                 'product_title': transaction.post.title,
                 'last_message': {
                     'content': last_message.content if last_message else 'Aucun message',
                     'timestamp': last_message.created_at.isoformat() if last_message else transaction.created_at.isoformat(),
                     'sender': last_message.sender.username if last_message else 'Système'
                 },
-                'unread_count': 0,  # TODO: Implémenter le comptage des messages non lus
+                'unread_count': summary['unread_count'],
                 'status': transaction.status
-            }
-            chats.append(chat_data)
+            })
         
         return JsonResponse({
             'success': True,
@@ -6356,23 +5788,9 @@ def banned_user_view(request):
 def get_unread_notifications_count(request):
     """
     API pour obtenir le nombre de notifications non lues
+    (alias de unread_notifications_count)
     """
-    try:
-        # Récupérer le profil utilisateur BlizzGame
-        user_profile, created = User.objects.get_or_create(
-            username=request.user.username,
-            defaults={'email': request.user.email}
-        )
-        
-        count = Notification.objects.filter(
-            user=user_profile,
-            is_read=False
-        ).count()
-        
-        return JsonResponse({'count': count})
-    except Exception as e:
-        logger.error(f"Erreur lors du comptage des notifications: {e}")
-        return JsonResponse({'count': 0})
+    return unread_notifications_count(request)
 
 
 @login_required
@@ -6381,17 +5799,12 @@ def mark_all_notifications_read(request):
     Marquer toutes les notifications comme lues
     """
     try:
-        # Récupérer le profil utilisateur BlizzGame
-        user_profile, created = User.objects.get_or_create(
-            username=request.user.username,
-            defaults={'email': request.user.email}
-        )
-        
         # Marquer toutes les notifications non lues comme lues
         updated_count = Notification.objects.filter(
-            user=user_profile,
+            user=request.user,
             is_read=False
         ).update(is_read=True)
+        notification_counters.reset_unread(request.user.id)
         
         messages.success(request, f'{updated_count} notifications marquées comme lues')
         
@@ -13,4 +13,4 @@ python manage.py migrate --noinput
 
 # Démarrer Gunicorn
 echo "🌐 Démarrage de Gunicorn..."
-gunicorn socialgame.wsgi:application --bind 0.0.0.0:$PORT
+gunicorn socialgame.asgi:application -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT
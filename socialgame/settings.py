@@ -12,7 +12,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 import os
 from pathlib import Path
-from decouple import config
+from urllib.parse import urlsplit, urlunsplit
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -96,6 +97,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'blizzgame.middleware.BanCheckMiddleware',
+    'blizzgame.middleware.UserCurrencyMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
@@ -122,44 +124,104 @@ TEMPLATES = [
 WSGI_APPLICATION = 'socialgame.wsgi.application'
 ASGI_APPLICATION = 'socialgame.asgi.application'
 
-# Configuration Channels avec Redis
+# ===== REDIS (channel layer, cache, sessions) =====
+# - REDIS_URL : hôte par défaut
+# - REDIS_CHANNEL_URLS : hôtes du channel layer (séparés par des virgules) ;
+#   channels_redis répartit groupes et canaux entre eux par hachage cohérent
+# - REDIS_CACHE_URL : hôte du cache ; cache général, compteurs chauds et
+#   sessions y ont chacun leur base (REDIS_*_DB)
+REDIS_URL = config('REDIS_URL', default='redis://localhost:6379')
+REDIS_CHANNEL_URLS = config('REDIS_CHANNEL_URLS', default=REDIS_URL, cast=Csv())
+REDIS_CACHE_URL = config('REDIS_CACHE_URL', default=REDIS_URL)
+REDIS_CACHE_DB = config('REDIS_CACHE_DB', default=0, cast=int)
+REDIS_COUNTERS_DB = config('REDIS_COUNTERS_DB', default=1, cast=int)
+REDIS_SESSIONS_DB = config('REDIS_SESSIONS_DB', default=2, cast=int)
+
+
+def redis_db_url(url, db):
+    """URL Redis pointant sur la base `db`"""
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc, f'/{db}', parts.query, parts.fragment))
+
+
+# Pools de connexions : chaque processus gunicorn (WEB_CONCURRENCY) a un pool
+# par alias de cache. La moitié de REDIS_MAX_CLIENTS est réservée au web, le
+# reste aux workers (dispatch_realtime, flush_highlight_views) et au channel layer.
+WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=2, cast=int)
+REDIS_MAX_CLIENTS = config('REDIS_MAX_CLIENTS', default=250, cast=int)
+REDIS_CACHE_ALIASES = 3  # default, counters, sessions
+REDIS_POOL_SIZE = config(
+    'REDIS_POOL_SIZE',
+    default=max(4, REDIS_MAX_CLIENTS // (2 * max(WEB_CONCURRENCY, 1) * REDIS_CACHE_ALIASES)),
+    cast=int
+)
+
+# Configuration Channels avec Redis (shardé sur REDIS_CHANNEL_URLS)
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels_redis.core.RedisChannelLayer',
         'CONFIG': {
-            "hosts": [config('REDIS_URL', default='redis://localhost:6379')],
+            'hosts': REDIS_CHANNEL_URLS,
+            'prefix': 'asgi',
+            # Événements temps réel : inutiles après 30 s (rattrapage par les
+            # endpoints get_*_messages à la reconnexion)
+            'expiry': config('CHANNEL_LAYER_EXPIRY', default=30, cast=int),
+            'group_expiry': config('CHANNEL_LAYER_GROUP_EXPIRY', default=86400, cast=int),
+            'capacity': config('CHANNEL_LAYER_CAPACITY', default=100, cast=int),
+            'channel_capacity': {
+                # Canal de processus des consommateurs WebSocket : reçoit les
+                # groupes (chat_*, private_chat_*, group_chat_*, realtime_user_*)
+                # de toutes les connexions du processus
+                'specific.*': config('CHANNEL_LAYER_WEBSOCKET_CAPACITY', default=1000, cast=int),
+            },
         },
     },
 }
 
-# Configuration du cache Redis pour Render - Optimisée pour faible trafic
-CACHES = {
-    'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
-        'LOCATION': config('REDIS_URL', default='redis://localhost:6379'),
-        'OPTIONS': {
-            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-            'CONNECTION_POOL_KWARGS': {
-                'max_connections': 10,  # Réduit de 50 à 10 pour faible trafic
-                'retry_on_timeout': True,
-                'socket_keepalive': True,
-                'socket_keepalive_options': {
-                    1: 1,  # TCP_KEEPIDLE
-                    2: 1,  # TCP_KEEPINTVL
-                    3: 3,  # TCP_KEEPCNT
-                },
+
+def redis_cache(db, compress=True, timeout=3600):
+    options = {
+        'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+        'CONNECTION_POOL_KWARGS': {
+            'max_connections': REDIS_POOL_SIZE,
+            'retry_on_timeout': True,
+            'socket_keepalive': True,
+            'socket_keepalive_options': {
+                1: 1,  # TCP_KEEPIDLE
+                2: 1,  # TCP_KEEPINTVL
+                3: 3,  # TCP_KEEPCNT
             },
-            # TTL par défaut pour le cache (1 heure)
-            'TIMEOUT': 3600,
-            # Compression pour réduire l'utilisation mémoire
-            'COMPRESSOR': 'django_redis.compressors.zlib.ZlibCompressor',
-            # Ne pas faire planter l'app si Redis est temporairement indisponible
-            'IGNORE_EXCEPTIONS': True,
         },
+        # Ne pas faire planter l'app si Redis est temporairement indisponible
+        # (les erreurs ignorées sont journalisées, voir DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS)
+        'IGNORE_EXCEPTIONS': True,
+    }
+    if compress:
+        # Compression pour réduire l'utilisation mémoire
+        options['COMPRESSOR'] = 'django_redis.compressors.zlib.ZlibCompressor'
+    return {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': redis_db_url(REDIS_CACHE_URL, db),
+        'TIMEOUT': timeout,
+        'OPTIONS': options,
         'KEY_PREFIX': 'blizz',
         'VERSION': 1,
     }
+
+
+# Configuration du cache Redis
+# - default : cache général (pages, listes, taux de change), files de travail
+# - counters : compteurs chauds lus à chaque requête (non lues, bannissements)
+# - sessions : sessions (cached_db : la base reste la source de vérité)
+CACHES = {
+    'default': redis_cache(REDIS_CACHE_DB),
+    'counters': redis_cache(REDIS_COUNTERS_DB, compress=False),
+    'sessions': redis_cache(REDIS_SESSIONS_DB, compress=False),
 }
+DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sessions'
 
 # Configuration du rate limiting
 RATELIMIT_USE_CACHE = 'default'
@@ -317,6 +379,24 @@ else:
 # Legacy settings for compatibility
 USE_CLOUDINARY = bool(CLOUDINARY_URL)
 
+# Uploads de médias : nombre de threads d'upload parallèles par processus
+MEDIA_UPLOAD_WORKERS = config('MEDIA_UPLOAD_WORKERS', default=4, cast=int)
+
+# Ramasse-miettes des médias (media_gc) : suppressions groupées en parallèle
+MEDIA_GC_WORKERS = config('MEDIA_GC_WORKERS', default=4, cast=int)
+
+# Vidéos de Highlights : morceaux reçus en attente de réassemblage, traitement
+# par le worker process_highlight_uploads (ffmpeg si présent, sinon validation seule).
+# HIGHLIGHT_UPLOAD_DIR vide : répertoire temporaire du système
+HIGHLIGHT_UPLOAD_DIR = config('HIGHLIGHT_UPLOAD_DIR', default='')
+HIGHLIGHT_MAX_DURATION = config('HIGHLIGHT_MAX_DURATION', default=60, cast=int)
+FFMPEG_BINARY = config('FFMPEG_BINARY', default='ffmpeg')
+FFPROBE_BINARY = config('FFPROBE_BINARY', default='ffprobe')
+
+# Tendances des hashtags (scores à décroissance exponentielle)
+TRENDING_HASHTAGS_HALF_LIFE_HOURS = config('TRENDING_HASHTAGS_HALF_LIFE_HOURS', default=6, cast=float)
+TRENDING_HASHTAGS_BUCKET_MINUTES = config('TRENDING_HASHTAGS_BUCKET_MINUTES', default=5, cast=int)
+
 # Configuration CinetPay (ancienne Checkout API + nouvelle API v1)
 CINETPAY_API_KEY = config('CINETPAY_API_KEY', default='')
 CINETPAY_SITE_ID = config('CINETPAY_SITE_ID', default='')
@@ -326,6 +406,8 @@ CINETPAY_SECRET_KEY = config('CINETPAY_SECRET_KEY', default='')
 CINETPAY_ACCOUNT_KEY = config('CINETPAY_ACCOUNT_KEY', default=CINETPAY_API_KEY)
 CINETPAY_ACCOUNT_PASSWORD = config('CINETPAY_ACCOUNT_PASSWORD', default='')
 CINETPAY_API_BASE_URL = config('CINETPAY_API_BASE_URL', default='https://api.cinetpay.net')
+# Checkout API v2 (boutique), configurable pour les tests (fake_cinetpay)
+CINETPAY_CHECKOUT_BASE_URL = config('CINETPAY_CHECKOUT_BASE_URL', default='https://api-checkout.cinetpay.com/v2')
 
 # Modes test CinetPay - Séparés pour gaming et dropshipping
 CINETPAY_GAMING_TEST_MODE = config('CINETPAY_GAMING_TEST_MODE', default=False, cast=bool)  # Désactivé pour gaming
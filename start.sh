@@ -12,6 +12,6 @@ echo "🚀 Démarrage BLIZZ sur le port $PORT"
 echo "📦 Application des migrations..."
 python manage.py migrate --noinput
 
-# Démarrer Gunicorn
-echo "🌐 Démarrage Gunicorn..."
-exec gunicorn socialgame.wsgi:application --bind "0.0.0.0:$PORT" --workers 2 --timeout 120
+# Démarrer Gunicorn (workers uvicorn : ASGI, nécessaire pour les WebSockets /ws/)
+echo "🌐 Démarrage Gunicorn (ASGI)..."
+exec gunicorn socialgame.asgi:application -k uvicorn.workers.UvicornWorker --bind "0.0.0.0:$PORT" --workers "${WEB_CONCURRENCY:-2}" --timeout 120
@@ -84,7 +84,7 @@ function openChatWindow(chatId, otherPerson, postTitle) {
     // Fermer la fenêtre si elle est déjà ouverte
     const existingChat = document.querySelector(`.chat-window[data-chat-id="${chatId}"]`);
     if (existingChat) {
-        existingChat.remove();
+        closeChatWindow(existingChat);
         return;
     }
     
@@ -121,8 +121,14 @@ function openChatWindow(chatId, otherPerson, postTitle) {
     // Rendre la fenêtre déplaçable
     makeDraggable(chatWindow);
     
-    // Charger les messages
+    // Charger les messages puis recevoir les nouveaux en temps réel
     loadChatMessages(chatId);
+    if (window.BlizzRealtime) {
+        chatSubscriptions[chatId] = BlizzRealtime.subscribe(`chat:${chatId}`, {
+            message: message => appendChatMessage(chatId, message),
+            resync: () => loadChatMessages(chatId),
+        });
+    }
     
     // Ajouter les écouteurs d'événements
     const minimizeBtn = chatWindow.querySelector('.chat-window-minimize');
@@ -145,7 +151,7 @@ function openChatWindow(chatId, otherPerson, postTitle) {
     });
     
     closeBtn.addEventListener('click', function() {
-        chatWindow.remove();
+        closeChatWindow(chatWindow);
     });
     
     form.addEventListener('submit', function(e) {
@@ -160,6 +166,47 @@ function openChatWindow(chatId, otherPerson, postTitle) {
     });
 }
 
+// Abonnements temps réel des fenêtres de chat ouvertes
+const chatSubscriptions = {};
+
+function closeChatWindow(chatWindow) {
+    const chatId = chatWindow.dataset.chatId;
+    if (chatSubscriptions[chatId]) {
+        chatSubscriptions[chatId].unsubscribe();
+        delete chatSubscriptions[chatId];
+    }
+    chatWindow.remove();
+}
+
+// Ajoute un message reçu en temps réel (ignoré s'il est déjà affiché)
+function appendChatMessage(chatId, message) {
+    const messagesContainer = document.getElementById(`chat-messages-${chatId}`);
+    if (!messagesContainer || messagesContainer.querySelector(`[data-message-id="${message.id}"]`)) return;
+    
+    const noMessages = messagesContainer.querySelector('.no-messages');
+    if (noMessages) {
+        noMessages.remove();
+    }
+    
+    const messageEl = document.createElement('div');
+    messageEl.className = `chat-message ${message.is_own ? 'message-mine' : 'message-other'}`;
+    messageEl.dataset.messageId = message.id;
+    
+    const contentEl = document.createElement('div');
+    contentEl.className = 'message-content';
+    contentEl.textContent = message.content;
+    const metaEl = document.createElement('div');
+    metaEl.className = 'message-meta';
+    metaEl.innerHTML = '<span class="message-sender"></span><span class="message-time"></span>';
+    metaEl.querySelector('.message-sender').textContent = message.sender;
+    metaEl.querySelector('.message-time').textContent = new Date(message.created_at).toLocaleTimeString('fr-FR', { hour: '2-digit', minute: '2-digit' });
+    messageEl.appendChild(contentEl);
+    messageEl.appendChild(metaEl);
+    
+    messagesContainer.appendChild(messageEl);
+    messagesContainer.scrollTop = messagesContainer.scrollHeight;
+}
+
 // Fonction pour charger les messages d'un chat
 function loadChatMessages(chatId) {
     fetch(`/chat/${chatId}/messages/`)
@@ -210,7 +257,8 @@ function sendChatMessage(chatId, content) {
     })
     .then(response => response.json())
     .then(data => {
-        if (data.status === 'success') {
+        // Avec la connexion temps réel, le message revient par le WebSocket
+        if (data.status === 'success' && data.message) {
             // Ajouter le message à la fenêtre de chat
             const messagesContainer = document.getElementById(`chat-messages-${chatId}`);
             if (!messagesContainer) return;
@@ -281,5 +329,21 @@ function makeDraggable(element) {
     }
 }
 
-// Actualiser les chats toutes les 30 secondes
-setInterval(fetchActiveChats, 30000);
+// Actualiser la liste à chaque activité signalée par le WebSocket ;
+// polling toutes les 30 secondes uniquement si la connexion est indisponible
+let activeChatsInterval = null;
+document.addEventListener('DOMContentLoaded', function() {
+    if (!window.BlizzRealtime) {
+        activeChatsInterval = setInterval(fetchActiveChats, 30000);
+        return;
+    }
+    BlizzRealtime.onActivity(fetchActiveChats);
+    BlizzRealtime.onStatus(function(connected) {
+        if (connected) {
+            clearInterval(activeChatsInterval);
+            activeChatsInterval = null;
+        } else if (!activeChatsInterval) {
+            activeChatsInterval = setInterval(fetchActiveChats, 30000);
+        }
+    });
+});
\ No newline at end of file
@@ -5,7 +5,7 @@ class NotificationManager {
         this.notificationSound = null;
         this.initAudio();
         this.setupNotificationIndicator();
-        this.checkUnreadNotifications();
+        this.listening = false;
     }
 
     initAudio() {
@@ -39,16 +39,14 @@ class NotificationManager {
         }
     }
 
-    async checkUnreadNotifications() {
-        try {
-            const response = await fetch('/api/notifications/unread-count/');
-            if (response.ok) {
-                const data = await response.json();
-                this.updateNotificationIndicator(data.count > 0, data.count);
-            }
-        } catch (e) {
-            console.log('Erreur lors de la vérification des notifications');
-        }
+    // Compteur poussé par le WebSocket (envoyé aussi à chaque (re)connexion)
+    listenUnreadCount() {
+        if (this.listening || !window.BlizzRealtime) return;
+        this.listening = true;
+        window.BlizzRealtime.onNotifications(data => {
+            const count = data.unread || 0;
+            this.updateNotificationIndicator(count > 0, count);
+        });
     }
 
     updateNotificationIndicator(hasUnread, count = 0) {
@@ -97,18 +95,17 @@ class NotificationManager {
 // Initialiser le gestionnaire de notifications
 const notificationManager = new NotificationManager();
 
-// Écouter les nouvelles notifications via Pusher
-if (typeof Pusher !== 'undefined') {
+// Écouter les nouvelles notifications via Pusher (canal personnel uniquement)
+if (typeof Pusher !== 'undefined' && document.body && document.body.dataset.userId) {
     const pusher = new Pusher('6c5ea23d443700ec8467', {
         cluster: 'eu'
     });
     
-    const channel = pusher.subscribe('notifications');
+    const channel = pusher.subscribe(`user-notifications-${document.body.dataset.userId}`);
     
-    channel.bind('new_notification', function(data) {
+    channel.bind('new-notification', function(data) {
         // Son désactivé
         notificationManager.showNotificationPopup(data.title, data.message);
-        notificationManager.checkUnreadNotifications();
     });
 }
 
@@ -116,17 +113,17 @@ if (typeof Pusher !== 'undefined') {
 document.addEventListener('DOMContentLoaded', function() {
     // Forcer la création de l'indicateur
     notificationManager.setupNotificationIndicator();
-    notificationManager.checkUnreadNotifications();
+    notificationManager.listenUnreadCount();
 });
 
 // Aussi s'exécuter immédiatement si le DOM est déjà chargé
 if (document.readyState === 'loading') {
     document.addEventListener('DOMContentLoaded', function() {
         notificationManager.setupNotificationIndicator();
-        notificationManager.checkUnreadNotifications();
+        notificationManager.listenUnreadCount();
     });
 } else {
     // DOM déjà chargé
     notificationManager.setupNotificationIndicator();
-    notificationManager.checkUnreadNotifications();
+    notificationManager.listenUnreadCount();
 }
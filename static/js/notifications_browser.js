@@ -31,7 +31,6 @@ document.addEventListener('DOMContentLoaded', function() {
     // Récupérer le compteur précédent depuis localStorage
     let previousNotificationCount = parseInt(localStorage.getItem('blizz_last_notif_count') || '0', 10);
     let notificationPermission = Notification.permission; // 'granted', 'denied', 'default'
-    let pollingInterval = null;
     
     // ========================================
     // FONCTIONS DE GESTION DES PERMISSIONS
@@ -467,73 +466,39 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     // ========================================
-    // POLLING DES NOTIFICATIONS
+    // COMPTEUR DES NOTIFICATIONS
     // ========================================
     
     /**
-     * Vérifie les nouvelles notifications
+     * Applique un nouveau compteur de notifications non lues
      */
-    async function checkForNewNotifications() {
-        try {
-            console.log('🔍 Vérification des notifications...');
-            const response = await fetch('/notifications/unread/count/');
-            const data = await response.json();
-            
-            console.log('📊 Données reçues:', data);
-            console.log('📊 Compteur précédent:', previousNotificationCount);
+    function applyNotificationCount(currentCount) {
+        // Si de nouvelles notifications sont arrivées
+        if (currentCount > previousNotificationCount && previousNotificationCount > 0) {
+            const newCount = currentCount - previousNotificationCount;
+            console.log(`🔔 ${newCount} nouvelle(s) notification(s) détectée(s)!`);
             
-            if (data.count !== undefined) {
-                const currentCount = data.count;
-                
-                // Si de nouvelles notifications sont arrivées
-                if (currentCount > previousNotificationCount && previousNotificationCount > 0) {
-                    const newCount = currentCount - previousNotificationCount;
-                    console.log(`🔔 ${newCount} nouvelle(s) notification(s) détectée(s)!`);
-                    console.log(`🔔 Permission actuelle: ${notificationPermission}`);
-                    
-                    // Afficher la notification
-                    showNotification(
-                        'Blizz Gaming',
-                        `Vous avez ${newCount} nouvelle${newCount > 1 ? 's' : ''} notification${newCount > 1 ? 's' : ''}`
-                    );
-                }
-                
-                // Mettre à jour le compteur
-                updateNotificationCount(currentCount);
-                previousNotificationCount = currentCount;
-                
-                // Sauvegarder dans localStorage pour persister entre les pages
-                localStorage.setItem('blizz_last_notif_count', currentCount.toString());
-                
-                console.log('✅ Compteur mis à jour:', currentCount);
-            }
-        } catch (error) {
-            console.error('❌ Erreur lors de la vérification des notifications:', error);
+            // Afficher la notification
+            showNotification(
+                'Blizz Gaming',
+                `Vous avez ${newCount} nouvelle${newCount > 1 ? 's' : ''} notification${newCount > 1 ? 's' : ''}`
+            );
         }
-    }
-    
-    /**
-     * Démarre le polling des notifications
-     */
-    function startNotificationPolling() {
-        // Vérifier immédiatement
-        checkForNewNotifications();
         
-        // Puis vérifier toutes les 15 secondes
-        pollingInterval = setInterval(checkForNewNotifications, 15000);
+        // Mettre à jour le compteur
+        updateNotificationCount(currentCount);
+        previousNotificationCount = currentCount;
         
-        console.log('✅ Polling des notifications démarré (toutes les 15 secondes)');
+        // Sauvegarder dans localStorage pour persister entre les pages
+        localStorage.setItem('blizz_last_notif_count', currentCount.toString());
     }
     
     /**
-     * Arrête le polling des notifications
+     * Compteur poussé par le WebSocket (envoyé aussi à chaque (re)connexion)
      */
-    function stopNotificationPolling() {
-        if (pollingInterval) {
-            clearInterval(pollingInterval);
-            pollingInterval = null;
-            console.log('🛑 Polling des notifications arrêté');
-        }
+    function startNotificationUpdates() {
+        if (!window.BlizzRealtime) return;
+        window.BlizzRealtime.onNotifications(data => applyNotificationCount(data.unread || 0));
     }
     
     // ========================================
@@ -547,8 +512,8 @@ document.addEventListener('DOMContentLoaded', function() {
     // Mettre à jour l'état initial du bouton
     updateEnableButton();
     
-    // Démarrer le polling
-    startNotificationPolling();
+    // Démarrer la mise à jour du compteur
+    startNotificationUpdates();
     
     // Demander automatiquement la permission après 3 secondes (une seule fois par session)
     if (!sessionStorage.getItem('blizz-notification-permission-asked')) {
@@ -560,8 +525,5 @@ document.addEventListener('DOMContentLoaded', function() {
         }, 3000);
     }
     
-    // Arrêter le polling quand l'utilisateur quitte la page
-    window.addEventListener('beforeunload', stopNotificationPolling);
-    
     console.log('✅ Système de notifications navigateur initialisé');
 });
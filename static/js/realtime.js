@@ -0,0 +1,152 @@
+// Client temps réel : une seule connexion WebSocket par onglet (/ws/realtime/)
+// multiplexée sur les discussions (chat:<id>, private:<id>, group:<id>).
+//
+//   const sub = BlizzRealtime.subscribe('chat:' + chatId, {
+//       message: (message) => ...,    // nouveau message
+//       typing: (event) => ...,       // indicateur de frappe
+//       presence: (event) => ...,     // connexion / déconnexion d'un participant
+//       ack: (event) => ...,          // accusé de réception d'un participant
+//       resync: () => ...,            // (re)connexion : recharger les messages manqués
+//       error: (event) => ...,        // abonnement refusé
+//   });
+//   BlizzRealtime.onActivity((event) => ...);   // activité sur mes discussions
+//   BlizzRealtime.onNotifications((event) => ...); // compteur de notifications non lues (event.unread)
+//   BlizzRealtime.onStatus((connected) => ...); // état de la connexion
+(function() {
+    const PING_INTERVAL = 25000;
+    const MAX_BACKOFF = 30000;
+
+    let socket = null;
+    let connected = false;
+    let attempts = 0;
+    let pingTimer = null;
+    let reconnectTimer = null;
+    const channels = new Map();
+    const activityHandlers = [];
+    const notificationHandlers = [];
+    const statusHandlers = [];
+
+    function socketUrl() {
+        const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        return `${scheme}://${window.location.host}/ws/realtime/`;
+    }
+
+    function send(payload) {
+        if (socket && socket.readyState === WebSocket.OPEN) {
+            socket.send(JSON.stringify(payload));
+            return true;
+        }
+        return false;
+    }
+
+    function setStatus(value) {
+        if (connected === value) return;
+        connected = value;
+        statusHandlers.forEach(handler => handler(connected));
+    }
+
+    function connect() {
+        if (socket && (socket.readyState === WebSocket.OPEN || socket.readyState === WebSocket.CONNECTING)) {
+            return;
+        }
+        clearTimeout(reconnectTimer);
+        socket = new WebSocket(socketUrl());
+
+        socket.onopen = function() {
+            attempts = 0;
+            setStatus(true);
+            channels.forEach((handlers, channel) => send({ action: 'subscribe', channel: channel }));
+            pingTimer = setInterval(() => send({ action: 'ping' }), PING_INTERVAL);
+        };
+
+        socket.onclose = function(event) {
+            clearInterval(pingTimer);
+            setStatus(false);
+            // 4401 : non authentifié, inutile de réessayer
+            if (event.code === 4401 || (channels.size === 0 && activityHandlers.length === 0 && notificationHandlers.length === 0)) return;
+            const delay = Math.min(MAX_BACKOFF, 1000 * Math.pow(2, attempts)) * (0.5 + Math.random() / 2);
+            attempts += 1;
+            reconnectTimer = setTimeout(connect, delay);
+        };
+
+        socket.onmessage = function(event) {
+            let data;
+            try {
+                data = JSON.parse(event.data);
+            } catch (e) {
+                return;
+            }
+            dispatch(data);
+        };
+    }
+
+    function call(channel, name, payload) {
+        const handlers = channels.get(channel);
+        if (handlers && typeof handlers[name] === 'function') {
+            handlers[name](payload);
+        }
+    }
+
+    function dispatch(data) {
+        switch (data.type) {
+            case 'message':
+                call(data.channel, 'message', data.message);
+                if (!data.message.is_own && data.message.id) {
+                    send({ action: 'ack', channel: data.channel, message_id: data.message.id });
+                }
+                break;
+            case 'subscribed':
+                // Rattrapage des messages émis pendant la déconnexion
+                call(data.channel, 'resync');
+                break;
+            case 'typing':
+            case 'presence':
+            case 'ack':
+                call(data.channel, data.type, data);
+                break;
+            case 'activity':
+                activityHandlers.forEach(handler => handler(data));
+                break;
+            case 'notifications':
+                notificationHandlers.forEach(handler => handler(data));
+                break;
+            case 'error':
+                if (data.channel) {
+                    call(data.channel, 'error', data);
+                    if (data.code === 'forbidden') channels.delete(data.channel);
+                }
+                break;
+        }
+    }
+
+    window.BlizzRealtime = {
+        subscribe(channel, handlers) {
+            channels.set(channel, handlers || {});
+            if (!send({ action: 'subscribe', channel: channel })) connect();
+            return {
+                typing(isTyping) {
+                    send({ action: 'typing', channel: channel, is_typing: isTyping !== false });
+                },
+                unsubscribe() {
+                    channels.delete(channel);
+                    send({ action: 'unsubscribe', channel: channel });
+                },
+            };
+        },
+        onActivity(handler) {
+            activityHandlers.push(handler);
+            connect();
+        },
+        onNotifications(handler) {
+            notificationHandlers.push(handler);
+            connect();
+        },
+        onStatus(handler) {
+            statusHandlers.push(handler);
+            handler(connected);
+        },
+        isConnected() {
+            return connected;
+        },
+    };
+})();
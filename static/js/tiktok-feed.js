@@ -9,6 +9,7 @@ class TikTokFeed {
         this.currentIndex = 0;
         this.loading = false;
         this.hasMore = true;
+        this.nextCursor = null; // Curseur opaque fourni par l'API pour la page suivante
         this.feedType = 'for_you';
         this.container = document.getElementById('highlightsViewer');
         this.loadMode = 'initial';
@@ -24,6 +25,7 @@ class TikTokFeed {
         this.feedType = window.feedType || 'for_you';
         this.loadMode = window.loadMode || 'initial';
         this.targetHighlightId = window.targetHighlightId;
+        this.nextCursor = window.nextCursor || null;
         
         // Initialiser selon le mode
         if (this.loadMode === 'direct' && this.targetHighlightId) {
@@ -154,6 +156,8 @@ class TikTokFeed {
             if (data.success) {
                 this.highlights = data.highlights;
                 this.currentIndex = data.target_index;
+                this.nextCursor = data.next_cursor;
+                this.hasMore = data.has_more;
                 this.clearContainer();
                 this.renderHighlights(this.highlights);
                 this.scrollToIndex(this.currentIndex, true);
@@ -181,15 +185,16 @@ class TikTokFeed {
             if (existingCards.length > 0) {
                 // Convertir les highlights existants en format API
                 this.highlights = this.parseExistingHighlights(existingCards);
-                this.hasMore = true; // Supposer qu'il y en a plus
+                this.hasMore = Boolean(this.nextCursor);
             } else {
                 // Charger via API
-                const response = await fetch(`/api/highlights/feed/?limit=3&offset=0&type=${this.feedType}`);
+                const response = await fetch(`/api/highlights/feed/?limit=3&type=${this.feedType}`);
                 const data = await response.json();
                 
                 if (data.success) {
                     this.highlights = data.highlights;
                     this.hasMore = data.has_more;
+                    this.nextCursor = data.next_cursor;
                     this.clearContainer();
                     this.renderHighlights(this.highlights);
                 }
@@ -212,15 +217,16 @@ class TikTokFeed {
         
         try {
             this.loading = true;
-            const offset = this.highlights.length;
+            const cursorParam = this.nextCursor ? `&cursor=${encodeURIComponent(this.nextCursor)}` : '';
             
-            const response = await fetch(`/api/highlights/feed/?limit=5&offset=${offset}&type=${this.feedType}`);
+            const response = await fetch(`/api/highlights/feed/?limit=5&type=${this.feedType}${cursorParam}`);
             const data = await response.json();
             
             if (data.success && data.highlights.length > 0) {
                 const newHighlights = data.highlights;
                 this.highlights.push(...newHighlights);
                 this.hasMore = data.has_more;
+                this.nextCursor = data.next_cursor;
                 
                 // Render nouveaux highlights
                 this.renderHighlights(newHighlights, true);
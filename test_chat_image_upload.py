@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Script de test : envoi d'une image dans un chat de transaction (message créé,
+réponse JSON, diffusion temps réel aux autres participants)
+"""
+
+import os
+import django
+import io
+import json
+import shutil
+import tempfile
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialgame.settings')
+django.setup()
+
+from PIL import Image
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import RequestFactory, TestCase
+from django.test.utils import override_settings
+from blizzgame.models import Chat, Message, Post, Transaction
+from blizzgame import chat_realtime, realtime_dispatch
+from blizzgame.views import upload_chat_image
+
+
+class Rollback(Exception):
+    """Annule les données de test à la fin du script"""
+
+
+def png_file(name='capture.png'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 32), (200, 30, 30)).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+def create_chat():
+    buyer, _ = User.objects.get_or_create(username='chat_image_buyer')
+    seller, _ = User.objects.get_or_create(username='chat_image_seller')
+    post = Post.objects.create(
+        user=seller.username, author=seller, title="Compte Test Image",
+        caption="Description de test", price=10.00, game_type="FreeFire"
+    )
+    deal = Transaction.objects.create(buyer=buyer, seller=seller, post=post, amount=10, status='processing')
+    return buyer, seller, Chat.objects.create(transaction=deal)
+
+
+def test_upload(buyer, seller, chat, transports):
+    """L'acheteur envoie une image : message enregistré, vendeur prévenu en temps réel"""
+    print("\n=== Envoi d'une image ===")
+    request = RequestFactory().post(f'/chat/{chat.id}/upload-image/', {'image': png_file()})
+    request.user = buyer
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        response = upload_chat_image(request, chat.id)
+    data = json.loads(response.content)
+    assert response.status_code == 200, data
+    assert data['success'] and data['image_url'], data
+
+    message = Message.objects.get(pk=data['message_id'])
+    assert message.message_type == 'image' and message.sender == buyer
+    assert os.path.exists(message.image.path)
+    print(f"✓ Message image enregistré ({message.image.name})")
+
+    sent = transports[realtime_dispatch.CHANNEL_LAYER].sent
+    broadcast = [event for event in sent if event['name'] == 'chat_message']
+    assert len(broadcast) == 1 and broadcast[0]['data']['message']['id'] == str(message.id)
+    assert broadcast[0]['data']['message']['image_url'] == data['image_url']
+    activity = [event for event in sent if event['name'].startswith('chat_activity:')]
+    assert [event['channel'] for event in activity] == [chat_realtime.user_group(seller.id)], activity
+    print("✓ Message diffusé sur le canal du chat, activité signalée au vendeur seulement")
+
+
+def test_rejections(buyer, chat):
+    """Type de fichier refusé, fichier absent"""
+    print("\n=== Refus ===")
+    request = RequestFactory().post(
+        f'/chat/{chat.id}/upload-image/',
+        {'image': SimpleUploadedFile('notes.txt', b'texte', content_type='text/plain')}
+    )
+    request.user = buyer
+    assert upload_chat_image(request, chat.id).status_code == 400
+    request = RequestFactory().post(f'/chat/{chat.id}/upload-image/', {})
+    request.user = buyer
+    assert upload_chat_image(request, chat.id).status_code == 400
+    assert Message.objects.filter(chat=chat, message_type='image').count() == 1
+    print("✓ Fichier texte et requête sans image refusés (400)")
+
+
+def main():
+    print("🚀 Test de l'envoi d'images dans le chat")
+    print("=" * 50)
+
+    media_root = tempfile.mkdtemp()
+    local = override_settings(
+        MEDIA_ROOT=media_root,
+        STORAGES={
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        },
+        CACHES={
+            alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+            for alias in ('default', 'counters', 'sessions')
+        },
+    )
+    try:
+        with local, realtime_dispatch.fake_transports() as transports, transaction.atomic():
+            buyer, seller, chat = create_chat()
+            test_upload(buyer, seller, chat, transports)
+            test_rejections(buyer, chat)
+            raise Rollback()
+    except Rollback:
+        print("\n🎉 TOUS LES TESTS SONT PASSÉS!")
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
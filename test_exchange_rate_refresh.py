@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+"""
+Script de test : rafraîchissement des taux de change en un seul appel API
+La réponse de l'API est rejouée depuis un enregistrement (test_fixtures/),
+le test ne nécessite donc pas de réseau.
+"""
+
+import os
+import json
+from decimal import Decimal
+from unittest import mock
+import django
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialgame.settings')
+django.setup()
+
+from datetime import timedelta
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from blizzgame.models import ExchangeRate, UserCurrency
+from blizzgame.currency_service import CurrencyService
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_fixtures', 'exchangerate_api_latest_eur.json')
+
+
+class Rollback(Exception):
+    """Annule les données de test à la fin du script"""
+
+
+def load_fixture():
+    with open(FIXTURE_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def recorded_response(payload):
+    response = mock.Mock()
+    response.json.return_value = payload
+    response.raise_for_status.return_value = None
+    return response
+
+
+def test_single_api_call(payload):
+    """Une seule requête HTTP pour toute la matrice"""
+    print("\n=== Appel API unique ===")
+    ExchangeRate.objects.all().delete()
+    with mock.patch('blizzgame.currency_service.requests.get', return_value=recorded_response(payload)) as get:
+        timings = {}
+        updated = CurrencyService.refresh_all_rates(timings=timings)
+
+    assert get.call_count == 1, f"{get.call_count} appels API"
+    assert get.call_args[0][0].endswith('/EUR')
+    assert set(timings) == {'fetch', 'write', 'cache'}, timings
+    print(f"✓ 1 appel API, {updated} taux écrits")
+    return updated
+
+
+def test_full_matrix(updated):
+    """Toutes les paires des devises supportées sont en base"""
+    print("\n=== Matrice complète ===")
+    currencies = [code for code, _ in UserCurrency.CURRENCY_CHOICES]
+    expected = len(currencies) * (len(currencies) - 1)
+    assert updated == expected, f"{updated} taux au lieu de {expected}"
+    assert ExchangeRate.objects.count() == expected
+    # Les devises hors CURRENCY_CHOICES présentes dans la réponse sont ignorées
+    assert not ExchangeRate.objects.filter(base_currency='AED').exists()
+    print(f"✓ {expected} paires pour {len(currencies)} devises")
+
+
+def test_cross_rates(payload):
+    """Les taux croisés sont dérivés de la table EUR"""
+    print("\n=== Taux croisés ===")
+    rates = payload['rates']
+    eur_usd = ExchangeRate.objects.get(base_currency='EUR', target_currency='USD').rate
+    assert eur_usd == Decimal(str(rates['USD']))
+
+    usd_gbp = ExchangeRate.objects.get(base_currency='USD', target_currency='GBP').rate
+    expected = Decimal(str(rates['GBP'])) / Decimal(str(rates['USD']))
+    assert abs(usd_gbp - expected) < Decimal('0.0000000001'), (usd_gbp, expected)
+
+    # Petits taux : la précision reste suffisante pour les grosses sommes
+    vnd_eur = ExchangeRate.objects.get(base_currency='VND', target_currency='EUR').rate
+    converted = Decimal('1000000') * vnd_eur
+    assert abs(converted - Decimal('1000000') / Decimal(str(rates['VND']))) < Decimal('0.001'), converted
+    print(f"✓ USD→GBP {usd_gbp}, VND→EUR {vnd_eur}")
+
+
+def test_refresh_is_idempotent(payload):
+    """Un second rafraîchissement met à jour les lignes existantes"""
+    print("\n=== Second rafraîchissement ===")
+    payload = json.loads(json.dumps(payload))
+    payload['rates']['USD'] = 1.2
+    count = ExchangeRate.objects.count()
+    with mock.patch('blizzgame.currency_service.requests.get', return_value=recorded_response(payload)):
+        CurrencyService.refresh_all_rates()
+
+    assert ExchangeRate.objects.count() == count
+    assert ExchangeRate.objects.get(base_currency='EUR', target_currency='USD').rate == Decimal('1.2')
+    print("✓ Lignes mises à jour sans doublon")
+
+
+def test_cache_primed():
+    """Après le rafraîchissement, les conversions ne touchent ni la base ni l'API"""
+    print("\n=== Cache amorcé ===")
+    with mock.patch('blizzgame.currency_service.requests.get') as get:
+        with CaptureQueriesContext(connection) as context:
+            amounts = CurrencyService.convert_many([10, 25, 99], 'EUR', 'USD')
+            CurrencyService.convert_amount(50, 'GBP', 'NGN')
+    assert get.call_count == 0
+    assert len(context.captured_queries) == 0, context.captured_queries
+    assert amounts == [Decimal('12.00'), Decimal('30.00'), Decimal('118.80')], amounts
+    print(f"✓ Conversions sans requête: {amounts}")
+
+
+def test_leftover_pair_not_stale():
+    """Une paire que le rafraîchissement n'écrit plus ne rend pas la table périmée"""
+    print("\n=== Paires non rafraîchies ===")
+    ExchangeRate.objects.create(base_currency='EUR', target_currency='AED', rate=Decimal('4'))
+    # last_updated est auto_now : vieillissement par UPDATE
+    old = timezone.now() - timedelta(days=30)
+    ExchangeRate.objects.filter(target_currency='AED').update(last_updated=old)
+    assert CurrencyService.rates_are_fresh()
+    # Devise absente de la dernière réponse API : ses paires gardent leur date
+    ExchangeRate.objects.filter(base_currency='NGN').update(last_updated=old)
+    ExchangeRate.objects.filter(target_currency='NGN').update(last_updated=old)
+    assert CurrencyService.rates_are_fresh()
+    ExchangeRate.objects.update(last_updated=old)
+    assert not CurrencyService.rates_are_fresh()
+    print("✓ Fraîcheur calculée sur le dernier rafraîchissement")
+
+
+def test_api_failure_keeps_rates():
+    """Si l'API échoue, les taux existants sont conservés"""
+    print("\n=== API indisponible ===")
+    import requests
+    count = ExchangeRate.objects.count()
+    with mock.patch('blizzgame.currency_service.requests.get', side_effect=requests.ConnectionError('offline')):
+        assert CurrencyService.refresh_all_rates() == 0
+    assert ExchangeRate.objects.count() == count
+    print("✓ Aucun taux supprimé")
+
+
+def main():
+    print("🚀 Test du rafraîchissement des taux de change")
+    print("=" * 50)
+
+    payload = load_fixture()
+    try:
+        with transaction.atomic():
+            updated = test_single_api_call(payload)
+            test_full_matrix(updated)
+            test_cross_rates(payload)
+            test_refresh_is_idempotent(payload)
+            test_cache_primed()
+            test_api_failure_keeps_rates()
+            test_leftover_pair_not_stale()
+            raise Rollback()
+    except Rollback:
+        CurrencyService.prime_rate_cache()
+        print("\n🎉 TOUS LES TESTS SONT PASSÉS!")
+
+
+if __name__ == '__main__':
+    main()
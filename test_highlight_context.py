@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Script de test : contexte d'un highlight (API context) dans l'ordre
+chronologique (visiteur anonyme, feed des abonnements)
+"""
+
+import os
+import django
+import json
+from datetime import timedelta
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialgame.settings')
+django.setup()
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.db import transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+from blizzgame.models import Highlight, Profile, UserSubscription
+from blizzgame.views import highlights_context_api
+
+
+class Rollback(Exception):
+    """Annule les données de test à la fin du script"""
+
+
+def create_test_data():
+    """Un spectateur abonné à un auteur sur deux, dix highlights espacés d'une minute"""
+    viewer, _ = User.objects.get_or_create(username='context_viewer')
+    Profile.objects.get_or_create(user=viewer)
+
+    Highlight.objects.all().delete()
+    now = timezone.now()
+    highlights = []
+    for i in range(10):
+        author, _ = User.objects.get_or_create(username=f'context_author_{i % 2}')
+        Profile.objects.get_or_create(user=author)
+        highlight = Highlight.objects.create(author=author, video='test_video.mp4', caption=f'Context {i}')
+        Highlight.objects.filter(pk=highlight.pk).update(created_at=now - timedelta(minutes=i))
+        highlights.append(highlight)
+    UserSubscription.objects.get_or_create(subscriber=viewer, subscribed_to=User.objects.get(username='context_author_0'))
+    # Du plus récent au plus ancien, comme le feed chronologique
+    return viewer, highlights
+
+
+def fetch_context(user, highlight, feed_type):
+    request = RequestFactory().get(f'/api/highlights/{highlight.id}/context/', {'type': feed_type, 'before': 2, 'after': 3})
+    request.user = user
+    data = json.loads(highlights_context_api(request, highlight.id).content)
+    assert data['success'], data
+    return [item['id'] for item in data['highlights']], data['target_index']
+
+
+def test_anonymous(highlights):
+    """Visiteur anonyme : voisins par date de publication"""
+    print("\n=== Contexte anonyme ===")
+    ids, target_index = fetch_context(AnonymousUser(), highlights[4], 'for_you')
+    assert ids == [str(h.id) for h in highlights[2:8]], ids
+    assert target_index == 2
+    print(f"✓ {len(ids)} highlights, cible à l'index {target_index}")
+
+
+def test_friends(viewer, highlights):
+    """Feed des abonnements : seulement les auteurs suivis"""
+    print("\n=== Contexte des abonnements ===")
+    followed = highlights[0::2]
+    ids, target_index = fetch_context(viewer, followed[2], 'friends')
+    assert ids == [str(h.id) for h in followed], ids
+    assert target_index == 2
+    print(f"✓ {len(ids)} highlights des auteurs suivis, cible à l'index {target_index}")
+
+
+def main():
+    print("🚀 Test de l'API de contexte des Highlights (ordre chronologique)")
+    print("=" * 50)
+
+    local = override_settings(
+        CACHES={
+            alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+            for alias in ('default', 'counters', 'sessions')
+        },
+    )
+    try:
+        with local, transaction.atomic():
+            viewer, highlights = create_test_data()
+            test_anonymous(highlights)
+            test_friends(viewer, highlights)
+            raise Rollback()
+    except Rollback:
+        print("\n🎉 TOUS LES TESTS SONT PASSÉS!")
+
+
+if __name__ == '__main__':
+    main()
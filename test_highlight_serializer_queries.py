@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Script de test : le nombre de requêtes du sérialiseur groupé des Highlights
+ne doit pas dépendre de la taille de la page
+"""
+
+import os
+import django
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+import json
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialgame.settings')
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from blizzgame.models import Highlight, HighlightAppreciation, HighlightView, Profile
+from blizzgame.highlight_serializers import serialize_highlights
+from blizzgame.views import highlights_feed_api
+
+PAGE_SIZES = [2, 5, 10]
+
+
+class Rollback(Exception):
+    """Annule les données de test à la fin du script"""
+
+
+def create_test_data():
+    """Créer des auteurs, un spectateur et des highlights avec appréciations et vues"""
+    viewer, _ = User.objects.get_or_create(username='serializer_viewer')
+    Profile.objects.get_or_create(user=viewer)
+
+    highlights = []
+    for i in range(max(PAGE_SIZES)):
+        author, _ = User.objects.get_or_create(username=f'serializer_author_{i}')
+        Profile.objects.get_or_create(user=author)
+        highlight = Highlight.objects.create(
+            author=author,
+            video='test_video.mp4',
+            caption=f'Highlight {i} #test',
+            hashtags=['test']
+        )
+        if i % 2 == 0:
+            HighlightAppreciation.objects.create(highlight=highlight, user=viewer, appreciation_level=(i % 6) + 1)
+        if i % 3 == 0:
+            HighlightView.objects.create(highlight=highlight, user=viewer)
+        highlights.append(highlight)
+    return viewer, highlights
+
+
+def count_queries(func):
+    with CaptureQueriesContext(connection) as context:
+        func()
+    return len(context.captured_queries)
+
+
+def test_serializer_query_count(viewer):
+    """Le sérialiseur utilise un nombre fixe de requêtes"""
+    print("\n=== Sérialiseur groupé ===")
+    counts = {}
+    for size in PAGE_SIZES:
+        # Highlights sans relations préchargées : le sérialiseur doit tout charger lui-même
+        page = list(Highlight.objects.filter(author__username__startswith='serializer_author_').order_by('-created_at')[:size])
+        counts[size] = count_queries(lambda: serialize_highlights(page, viewer))
+        print(f"✓ {size} highlights: {counts[size]} requêtes")
+
+    assert len(set(counts.values())) == 1, f"Le nombre de requêtes varie avec la taille de page: {counts}"
+
+
+def test_serializer_viewer_state(viewer, highlights):
+    """Les appréciations et vues de l'utilisateur sont bien rattachées"""
+    print("\n=== État du spectateur ===")
+    data = {item['id']: item for item in serialize_highlights(highlights, viewer)}
+    for i, highlight in enumerate(highlights):
+        item = data[str(highlight.id)]
+        expected_level = (i % 6) + 1 if i % 2 == 0 else None
+        assert item['user_appreciation']['appreciation_level'] == expected_level
+        assert item['is_viewed'] == (i % 3 == 0)
+    print(f"✓ {len(highlights)} highlights vérifiés")
+
+
+def test_feed_api_query_count(viewer):
+    """L'API du feed ne fait pas plus de requêtes pour une page plus grande"""
+    print("\n=== API Feed ===")
+    factory = RequestFactory()
+    counts = {}
+    for size in PAGE_SIZES:
+        request = factory.get('/highlights/api/feed/', {'limit': size, 'type': 'trending'})
+        request.user = viewer
+        response = None
+
+        def call():
+            nonlocal response
+            response = highlights_feed_api(request)
+
+        counts[size] = count_queries(call)
+        data = json.loads(response.content)
+        assert data['success'], data
+        print(f"✓ limit={size}: {len(data['highlights'])} highlights, {counts[size]} requêtes")
+
+    assert len(set(counts.values())) == 1, f"Le nombre de requêtes varie avec la taille de page: {counts}"
+
+
+def main():
+    print("🚀 Test des requêtes du sérialiseur de Highlights")
+    print("=" * 50)
+
+    try:
+        with transaction.atomic():
+            viewer, highlights = create_test_data()
+            test_serializer_query_count(viewer)
+            test_serializer_viewer_state(viewer, highlights)
+            test_feed_api_query_count(viewer)
+            raise Rollback()
+    except Rollback:
+        print("\n🎉 TOUS LES TESTS SONT PASSÉS!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+"""
+Script de test : upload fractionné et reprenable des vidéos de Highlights et
+file de traitement (validation Python pur, sans ffmpeg, sur le disque local)
+"""
+
+import os
+import django
+import json
+import shutil
+import struct
+import tempfile
+from datetime import timedelta
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialgame.settings')
+django.setup()
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+from blizzgame.models import HashtagTrend, Highlight, HighlightUpload, Profile
+from blizzgame import highlight_uploads
+from blizzgame.views import highlight_upload, start_highlight_upload
+
+CHUNK = highlight_uploads.CHUNK_SIZE
+
+
+def trend_score(tag='gaming'):
+    return HashtagTrend.objects.filter(tag=tag).values_list('log_score', flat=True).first()
+
+
+def box(kind, payload):
+    return struct.pack('>I4s', 8 + len(payload), kind) + payload
+
+
+def full_box(kind, payload):
+    return box(kind, b'\0\0\0\0' + payload)
+
+
+def build_mp4(duration=10, codec=b'avc1', media_size=int(CHUNK * 2.5)):
+    """MP4 minimal : ftyp, moov (mvhd + piste vidéo) et mdat de remplissage"""
+    timescale = 1000
+    mvhd = full_box(b'mvhd', struct.pack('>IIII', 0, 0, timescale, int(duration * timescale)) + b'\0' * 80)
+    hdlr = full_box(b'hdlr', b'\0' * 4 + b'vide' + b'\0' * 12 + b'video\0')
+    entry = box(codec, b'\0' * 6 + struct.pack('>H', 1) + b'\0' * 16 + struct.pack('>HH', 720, 1280) + b'\0' * 50)
+    stsd = full_box(b'stsd', struct.pack('>I', 1) + entry)
+    trak = box(b'trak', box(b'mdia', hdlr + box(b'minf', box(b'stbl', stsd))))
+    return box(b'ftyp', b'isom\0\0\0\0isomavc1') + box(b'moov', mvhd + trak) + box(b'mdat', b'\x42' * media_size)
+
+
+def put_chunk(factory, user, upload_id, data, start, total, claimed_length=None):
+    length = claimed_length or len(data)
+    request = factory.put(
+        f'/highlights/uploads/{upload_id}/', data=data, content_type='application/octet-stream',
+        HTTP_CONTENT_RANGE=f'bytes {start}-{start + length - 1}/{total}'
+    )
+    request.user = user
+    response = highlight_upload(request, upload_id=upload_id)
+    return response.status_code, json.loads(response.content)
+
+
+def start(factory, user, content, filename='clip.mp4', caption='Mon clip #Gaming'):
+    request = factory.post('/highlights/uploads/', {'filename': filename, 'size': len(content), 'caption': caption})
+    request.user = user
+    response = start_highlight_upload(request)
+    assert response.status_code == 201, response.content
+    return json.loads(response.content)
+
+
+def upload_all(factory, user, content, **kwargs):
+    upload_id = start(factory, user, content, **kwargs)['upload_id']
+    for offset in range(0, len(content), CHUNK):
+        status, data = put_chunk(factory, user, upload_id, content[offset:offset + CHUNK], offset, len(content))
+        assert status == 200, data
+    return HighlightUpload.objects.get(id=upload_id)
+
+
+def test_chunked_upload(factory, user):
+    """Morceaux hors séquence refusés, renvois ignorés, morceau tronqué conservé"""
+    print("\n=== Upload fractionné ===")
+    content = build_mp4()
+    total = len(content)
+    score = trend_score()
+    upload_id = start(factory, user, content)['upload_id']
+
+    status, data = put_chunk(factory, user, upload_id, content[:CHUNK], 0, total)
+    assert status == 200 and data['offset'] == CHUNK, data
+    print(f"✓ Premier morceau reçu (offset {data['offset']})")
+
+    status, data = put_chunk(factory, user, upload_id, content[2 * CHUNK:3 * CHUNK], 2 * CHUNK, total)
+    assert status == 409 and data['offset'] == CHUNK, data
+    print("✓ Morceau hors séquence refusé avec l'offset attendu")
+
+    status, data = put_chunk(factory, user, upload_id, content[:CHUNK], 0, total)
+    assert status == 200 and data['offset'] == CHUNK, data
+    print("✓ Renvoi d'un morceau déjà reçu ignoré")
+
+    half = CHUNK // 2
+    status, data = put_chunk(factory, user, upload_id, content[CHUNK:CHUNK + half], CHUNK, total, claimed_length=CHUNK)
+    assert status == 200 and data['offset'] == CHUNK + half, data
+    print("✓ Morceau tronqué (coupure réseau) : octets reçus conservés")
+
+    offset = data['offset']
+    while offset < total:
+        status, data = put_chunk(factory, user, upload_id, content[offset:offset + CHUNK], offset, total)
+        assert status == 200, data
+        offset = data['offset']
+
+    upload = HighlightUpload.objects.get(id=upload_id)
+    assert upload.status == 'queued' and upload.received_size == total
+    assert not os.path.exists(highlight_uploads.part_path(upload))
+    with upload.source.open('rb') as f:
+        assert f.read() == content
+    assert upload.highlight and not upload.highlight.is_active
+    assert upload.highlight.hashtags == ['gaming']
+    assert trend_score() == score
+    print("✓ Fichier réassemblé à l'identique, Highlight créé inactif et mis en file (hors tendances)")
+    return upload
+
+
+def test_processing(upload):
+    """Le worker valide la vidéo et publie le Highlight"""
+    print("\n=== Traitement (validation seule) ===")
+    score = trend_score()
+    published, failed = highlight_uploads.process_pending()
+    assert (published, failed) == (1, 0), (published, failed)
+
+    upload.refresh_from_db()
+    highlight = Highlight.objects.get(pk=upload.highlight_id)
+    assert upload.status == 'ready' and not upload.source
+    assert highlight.is_active and highlight.video.name.endswith('.mp4')
+    assert os.path.exists(highlight.video.path)
+    assert highlight.expires_at > timezone.now() + timedelta(hours=47)
+    assert trend_score() is not None and (score is None or trend_score() > score)
+    print(f"✓ Highlight publié ({highlight.video.name}), source supprimée")
+
+
+def test_rejections(factory, user):
+    """Vidéos trop longues, codec non lisible ou fichier non vidéo refusés"""
+    print("\n=== Vidéos refusées ===")
+    cases = {
+        'trop longue': build_mp4(duration=highlight_uploads.MAX_DURATION + 30, media_size=1000),
+        'codec mp4v': build_mp4(codec=b'mp4v', media_size=1000),
+        'pas une vidéo': b'not a video' * 100,
+    }
+    uploads = {label: upload_all(factory, user, content) for label, content in cases.items()}
+    score = trend_score()
+    published, failed = highlight_uploads.process_pending()
+    assert (published, failed) == (0, len(cases)), (published, failed)
+    assert trend_score() == score
+
+    for label, upload in uploads.items():
+        highlight_id = upload.highlight_id
+        upload.refresh_from_db()
+        assert upload.status == 'failed' and upload.error, upload.error
+        assert not Highlight.objects.filter(pk=highlight_id).exists()
+        print(f"✓ {label} : {upload.error}")
+
+
+def test_form_upload(user):
+    """L'envoi classique en un formulaire passe par la même file"""
+    print("\n=== Envoi en un formulaire ===")
+    video = SimpleUploadedFile('clip.mov', build_mp4(media_size=1000), content_type='video/quicktime')
+    upload = highlight_uploads.upload_from_file(user, video, 'Formulaire')
+    assert upload.status == 'queued'
+    assert highlight_uploads.process_pending() == (1, 0)
+    upload.refresh_from_db()
+    assert upload.status == 'ready'
+    print("✓ Vidéo publiée après traitement")
+
+
+def test_recovery(factory, user):
+    """Un traitement interrompu est remis en file, un upload abandonné supprimé"""
+    print("\n=== Reprise du worker ===")
+    stale = timezone.now() - timedelta(days=2)
+    interrupted = upload_all(factory, user, build_mp4(media_size=1000))
+    HighlightUpload.objects.filter(pk=interrupted.pk).update(status='processing', updated_at=stale)
+    abandoned = HighlightUpload.objects.get(id=start(factory, user, build_mp4())['upload_id'])
+    HighlightUpload.objects.filter(pk=abandoned.pk).update(updated_at=stale)
+
+    exhausted = upload_all(factory, user, build_mp4(media_size=1000))
+    HighlightUpload.objects.filter(pk=exhausted.pk).update(
+        status='processing', attempts=highlight_uploads.MAX_ATTEMPTS, updated_at=stale
+    )
+
+    assert highlight_uploads.recover_stale_uploads() == (1, 1)
+    assert HighlightUpload.objects.get(pk=interrupted.pk).status == 'queued'
+    assert not HighlightUpload.objects.filter(pk=abandoned.pk).exists()
+    assert not os.path.exists(highlight_uploads.part_path(abandoned))
+    exhausted_highlight = exhausted.highlight_id
+    exhausted.refresh_from_db()
+    assert exhausted.status == 'failed' and not Highlight.objects.filter(pk=exhausted_highlight).exists()
+    print("✓ Traitement remis en file, upload abandonné nettoyé, tentatives épuisées en échec")
+
+
+def main():
+    print("🚀 Test de l'upload fractionné des vidéos de Highlights")
+    print("=" * 50)
+
+    media_root = tempfile.mkdtemp()
+    upload_dir = tempfile.mkdtemp()
+    local = override_settings(
+        MEDIA_ROOT=media_root,
+        HIGHLIGHT_UPLOAD_DIR=upload_dir,
+        FFMPEG_BINARY='',
+        FFPROBE_BINARY='',
+        STORAGES={
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        },
+        CACHES={
+            alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+            for alias in ('default', 'counters', 'sessions')
+        },
+    )
+    user, _ = User.objects.get_or_create(username='highlight_upload_tester')
+    Profile.objects.get_or_create(user=user)
+    factory = RequestFactory()
+    try:
+        with local:
+            upload = test_chunked_upload(factory, user)
+            test_processing(upload)
+            test_rejections(factory, user)
+            test_form_upload(user)
+            test_recovery(factory, user)
+        print("\n🎉 TOUS LES TESTS SONT PASSÉS!")
+    finally:
+        user.delete()
+        shutil.rmtree(media_root, ignore_errors=True)
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
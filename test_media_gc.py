@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+"""
+Script de test : ramasse-miettes des médias (références par URL, variantes,
+média partagé, dry-run, reprise au checkpoint) sur le disque local
+"""
+
+import os
+import django
+import io
+import shutil
+import tempfile
+import time
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialgame.settings')
+django.setup()
+
+from PIL import Image
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test.utils import override_settings
+from blizzgame.models import Post
+from blizzgame import image_variants, media_cleanup, media_gc, media_uploads
+
+OLD = time.time() - 3 * 24 * 60 * 60
+
+
+class Rollback(Exception):
+    """Annule les données de test à la fin du script"""
+
+
+def image_file(name, color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (800, 600), color).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+def variant_paths(media_root, url):
+    """Fichiers des trois variantes d'un média (à partir de l'URL full)"""
+    return [
+        os.path.join(media_root, media_gc.media_path(image_variants.variant_url(url, variant)))
+        for variant in image_variants.VARIANTS
+    ]
+
+
+def age(paths):
+    for path in paths:
+        os.utime(path, (OLD, OLD))
+
+
+def create_post(seller, title, banner_url):
+    return Post.objects.create(
+        user=seller.username, author=seller, title=title, caption="Description de test",
+        price=10.00, game_type="FreeFire", banner_url=banner_url
+    )
+
+
+def test_media_path():
+    """URL ou nom de FileField ramené au chemin dans le stockage"""
+    print("\n=== Chemins des médias ===")
+    assert media_gc.media_path('post_banners/abc.png') == 'post_banners/abc.png'
+    assert media_gc.media_path('/media/post_images/abc_full.webp') == 'post_images/abc_full.webp'
+    assert media_gc.media_path('https://blizz.example/media/post_images/a%20b.jpg') == 'post_images/a b.jpg'
+    assert media_gc.media_path(
+        'https://res.cloudinary.com/demo/image/upload/c_fill,w_480/v1712345678/post_banners/abc-800x600_card.webp'
+    ) == 'post_banners/abc-800x600_card.webp'
+    assert media_gc.media_path('https://cdn.example.com/images/abc.png') is None
+    assert media_gc.media_path('') is None and media_gc.media_path(None) is None
+    print("✓ Nom de FileField, URL locale, URL Cloudinary (transformations, version), URL externe")
+
+    keys = media_gc._reference_keys('post_banners/abc-800x600_card.webp')
+    assert {f'post_banners/abc-800x600_{variant}' for variant in image_variants.VARIANTS} <= keys, keys
+    assert media_gc._reference_keys('post_banners/ancien.png') == {'post_banners/ancien.png', 'post_banners/ancien'}
+    print("✓ Une variante référencée protège les variantes du même contenu")
+
+
+def create_media(media_root):
+    """
+    - shared : bannière d'une annonce vendue et d'une annonce en vente
+    - sold : bannière d'une annonce vendue seulement
+    - card : seule la variante card est référencée
+    - recent : fichier non référencé encore trop récent
+    """
+    seller, _ = User.objects.get_or_create(username='media_gc_seller')
+    shared, sold, card = media_uploads.upload_files([
+        (image_file('partagee.png', (10, 120, 200)), 'post_banners'),
+        (image_file('vendue.png', (200, 40, 40)), 'post_banners'),
+        (image_file('carte.png', (40, 200, 40)), 'post_images'),
+    ])
+    create_post(seller, "Annonce en vente", shared)
+    sold_posts = [create_post(seller, "Annonce vendue", shared), create_post(seller, "Annonce vendue 2", sold)]
+    create_post(seller, "Annonce carte", image_variants.variant_url(card, 'card'))
+    for post in sold_posts:
+        Post.objects.filter(pk=post.pk).update(is_sold=True, is_on_sale=False)
+        post.refresh_from_db()
+        assert media_cleanup.delete_post_media(post)['success']
+
+    files = {name: variant_paths(media_root, url) for name, url in (('shared', shared), ('sold', sold), ('card', card))}
+    for paths in files.values():
+        age(paths)
+    recent = os.path.join(media_root, 'post_images', 'upload_en_cours.webp')
+    with open(recent, 'wb') as f:
+        f.write(b'x' * 10)
+    files['recent'] = [recent]
+    return files
+
+
+def exists(paths):
+    return [os.path.exists(path) for path in paths]
+
+
+def test_dry_run(files, store):
+    """Rapport complet, aucun fichier supprimé, pas de checkpoint"""
+    print("\n=== Dry-run ===")
+    report = media_gc.collect_garbage(store=store, dry_run=True)
+    assert report['completed'] and report['orphans'] == 3, report
+    assert report['orphan_bytes'] == sum(os.path.getsize(path) for path in files['sold'])
+    assert report['recent'] == 1 and report['deleted'] == 0, report
+    assert all(all(exists(paths)) for paths in files.values())
+    assert cache.get(media_gc.CHECKPOINT_KEY) is None
+
+    # Commande : stockage par défaut (MEDIA_ROOT temporaire)
+    output = io.StringIO()
+    call_command('media_gc', '--dry-run', stdout=output)
+    assert all(all(exists(paths)) for paths in files.values())
+    assert '3 orphelins' in output.getvalue(), output.getvalue()
+    print(f"✓ {report['orphans']} orphelins ({report['orphan_bytes']} octets) signalés, rien supprimé")
+
+
+def test_sweep(files, store):
+    """Seuls les fichiers de l'annonce vendue partent"""
+    print("\n=== Balayage ===")
+    report = media_gc.collect_garbage(store=store)
+    assert report['completed'] and report['deleted'] == 3 and report['errors'] == 0, report
+    assert exists(files['sold']) == [False] * 3
+    print("✓ Variantes de la bannière vendue supprimées")
+    assert all(exists(files['shared']))
+    print("✓ Bannière partagée avec une annonce en vente conservée")
+    assert all(exists(files['card']))
+    print("✓ Variante card référencée : thumb et full conservées")
+    assert all(exists(files['recent']))
+    print("✓ Fichier récent non référencé conservé")
+    assert cache.get(media_gc.CHECKPOINT_KEY) is None
+
+    report = media_gc.collect_garbage(store=store)
+    assert report['deleted'] == 0 and report['orphans'] == 0, report
+    print("✓ Second passage : plus aucun orphelin")
+
+
+def test_checkpoint(media_root, store):
+    """Passage limité en pages : reprise au checkpoint"""
+    print("\n=== Reprise au checkpoint ===")
+    orphan = os.path.join(media_root, 'post_videos', 'orpheline.mp4')
+    os.makedirs(os.path.dirname(orphan), exist_ok=True)
+    with open(orphan, 'wb') as f:
+        f.write(b'\0' * 100)
+    age([orphan])
+
+    first = media_gc.collect_garbage(store=store, max_pages=1)
+    assert not first['completed'] and cache.get(media_gc.CHECKPOINT_KEY)
+    assert os.path.exists(orphan)
+    passes = 1
+    report = first
+    while not report['completed']:
+        report = media_gc.collect_garbage(store=store, max_pages=5)
+        passes += 1
+    assert report['deleted'] == 1 and not os.path.exists(orphan), report
+    assert cache.get(media_gc.CHECKPOINT_KEY) is None
+    print(f"✓ Balayage terminé en {passes} passages, orphelin supprimé une fois")
+
+
+def main():
+    print("🚀 Test du ramasse-miettes des médias")
+    print("=" * 50)
+
+    media_root = tempfile.mkdtemp()
+    local = override_settings(
+        MEDIA_ROOT=media_root,
+        MEDIA_URL='/media/',
+        CACHES={
+            alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+            for alias in ('default', 'counters', 'sessions')
+        },
+    )
+    store = media_gc.LocalMediaStore(FileSystemStorage(location=media_root, base_url='/media/'))
+    try:
+        with local, media_uploads.local_uploads(media_root), transaction.atomic():
+            test_media_path()
+            files = create_media(media_root)
+            test_dry_run(files, store)
+            test_sweep(files, store)
+            test_checkpoint(media_root, store)
+            raise Rollback()
+    except Rollback:
+        print("\n🎉 TOUS LES TESTS SONT PASSÉS!")
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
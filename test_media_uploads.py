@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Script de test : upload des médias d'annonces (déduplication par contenu,
+variantes thumb/card/full, fichiers non image) sur le disque local
+"""
+
+import os
+import django
+import hashlib
+import io
+import shutil
+import tempfile
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialgame.settings')
+django.setup()
+
+from PIL import Image
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.utils import override_settings
+from blizzgame import image_variants, media_uploads
+
+
+def image_file(name, color, size=(2000, 1000)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+def count_uploads(uploader):
+    """Compte les appels à l'uploader (un par fichier envoyé au stockage)"""
+    calls = []
+    upload = uploader.upload
+
+    def counting_upload(file, folder, name):
+        calls.append(name)
+        return upload(file, folder, name)
+
+    uploader.upload = counting_upload
+    return calls
+
+
+def stored_files(media_root, folder):
+    directory = os.path.join(media_root, folder)
+    return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+
+def test_variants(media_root, calls):
+    """Une image : trois variantes nommées par le SHA-256, URL de la variante full"""
+    print("\n=== Variantes ===")
+    banner = image_file('banniere.png', (10, 120, 200))
+    digest = hashlib.sha256(banner.read()).hexdigest()
+    [url] = media_uploads.upload_files([(banner, 'post_banners')])
+
+    assert url == f'/media/post_banners/{digest}-2000x1000_full{image_variants.EXTENSION}', url
+    assert len(calls) == 3, calls
+    files = stored_files(media_root, 'post_banners')
+    assert files == sorted(f'{digest}-2000x1000_{variant}{image_variants.EXTENSION}' for variant in image_variants.VARIANTS), files
+    for variant in image_variants.VARIANTS:
+        path = os.path.join(media_root, 'post_banners', f'{digest}-2000x1000_{variant}{image_variants.EXTENSION}')
+        with Image.open(path) as stored:
+            assert stored.size == image_variants.variant_size(2000, 1000, variant), (variant, stored.size)
+    print(f"✓ {len(files)} variantes écrites, URL {url}")
+    return url
+
+
+def test_dedup(media_root, calls, banner_url):
+    """Contenus identiques envoyés une fois, contenu déjà envoyé retrouvé en cache"""
+    print("\n=== Déduplication ===")
+    del calls[:]
+    items = [
+        (image_file('copie.png', (10, 120, 200)), 'post_banners'),  # même contenu que la bannière
+        (image_file('a.png', (200, 40, 40)), 'post_images'),
+        (image_file('b.png', (200, 40, 40)), 'post_images'),       # doublon dans la requête
+        (None, 'post_images'),
+    ]
+    banner, first, second, missing = media_uploads.upload_files(items)
+    assert banner == banner_url
+    assert first == second and first.startswith('/media/post_images/'), (first, second)
+    assert missing is None
+    assert len(calls) == 3, calls  # seules les variantes du nouveau contenu
+    assert len(stored_files(media_root, 'post_images')) == 3
+    print("✓ Doublon de requête envoyé une fois, contenu déjà connu servi depuis le cache")
+
+    # Cache vidé (autre processus, expiration) : le nom déterministe évite une copie
+    cache.clear()
+    assert media_uploads.upload_file(image_file('a.png', (200, 40, 40)), 'post_images') == first
+    assert len(stored_files(media_root, 'post_images')) == 3
+    print("✓ Cache vidé : même URL, aucun fichier en double")
+
+
+def test_not_an_image(media_root):
+    """Fichier que Pillow ne lit pas : envoyé tel quel sous son SHA-256"""
+    print("\n=== Fichier non image ===")
+    content = b'pas une image'
+    url = media_uploads.upload_file(SimpleUploadedFile('notes.txt', content), 'post_images')
+    digest = hashlib.sha256(content).hexdigest()
+    assert url == f'/media/post_images/{digest}.txt', url
+    with open(os.path.join(media_root, 'post_images', f'{digest}.txt'), 'rb') as stored:
+        assert stored.read() == content
+    print(f"✓ Original conservé ({url})")
+
+
+def main():
+    print("🚀 Test de l'upload des médias")
+    print("=" * 50)
+
+    media_root = tempfile.mkdtemp()
+    local = override_settings(
+        CACHES={
+            alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+            for alias in ('default', 'counters', 'sessions')
+        },
+    )
+    try:
+        with local, media_uploads.local_uploads(media_root) as uploader:
+            calls = count_uploads(uploader)
+            banner_url = test_variants(media_root, calls)
+            test_dedup(media_root, calls, banner_url)
+            test_not_an_image(media_root)
+        print("\n🎉 TOUS LES TESTS SONT PASSÉS!")
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
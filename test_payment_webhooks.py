@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+"""
+Script de test : notifications CinetPay enregistrées par le webhook puis
+traitées une seule fois par le worker (faux serveur CinetPay local)
+"""
+
+import os
+import django
+import json
+import uuid
+from datetime import timedelta
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialgame.settings')
+django.setup()
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+from blizzgame.models import (
+    CinetPayTransaction, Notification, Order, PaymentWebhookEvent, Post,
+    ShopCinetPayTransaction, Transaction,
+)
+from blizzgame import payment_webhooks
+from blizzgame.fake_cinetpay import fake_cinetpay
+from blizzgame.views import cinetpay_payment_success, gaming_cinetpay_notification, shop_cinetpay_notification
+
+
+def create_gaming_payment(buyer, seller):
+    post = Post.objects.create(
+        user=seller.username,
+        author=seller,
+        title="Compte Test Webhook",
+        caption="Description de test",
+        price=10.00,
+        game_type="FreeFire"
+    )
+    transaction = Transaction.objects.create(buyer=buyer, seller=seller, post=post, amount=10, status='pending')
+    return CinetPayTransaction.objects.create(
+        transaction=transaction,
+        customer_id=str(buyer.id), customer_name='Test', customer_surname='Acheteur',
+        customer_phone_number='770000000', customer_email='buyer@example.com',
+        customer_address='Dakar', customer_city='Dakar', customer_country='SN',
+        customer_state='DK', customer_zip_code='10000',
+        seller_phone_number='770000001', seller_country='SN', seller_operator='orange',
+        amount=6500, platform_commission=650, seller_amount=5850,
+        cinetpay_transaction_id=f'BLZ{uuid.uuid4().hex[:12]}',
+    )
+
+
+def create_shop_payment(buyer):
+    order = Order.objects.create(
+        user=buyer, order_number=f'T{uuid.uuid4().hex[:12]}',
+        customer_email='buyer@example.com', customer_phone='770000000',
+        customer_first_name='Test', customer_last_name='Acheteur',
+        shipping_address_line1='Rue 1', shipping_city='Dakar', shipping_state='DK',
+        shipping_postal_code='10000', shipping_country='SN',
+        subtotal=20, total_amount=20,
+    )
+    return ShopCinetPayTransaction.objects.create(
+        order=order, cinetpay_transaction_id=f'SHOP{uuid.uuid4().hex[:12]}',
+        customer_name='Test', customer_surname='Acheteur', customer_phone_number='770000000',
+        customer_email='buyer@example.com', customer_country='SN', amount=13000,
+    )
+
+
+def post_gaming(factory, payload):
+    request = factory.post('/gaming/cinetpay/notification/', data=json.dumps(payload), content_type='application/json')
+    return gaming_cinetpay_notification(request)
+
+
+def make_due(payment_id):
+    PaymentWebhookEvent.objects.filter(merchant_transaction_id=payment_id).update(
+        next_attempt_at=timezone.now() - timedelta(seconds=1)
+    )
+
+
+def test_duplicates(server, factory, buyer, seller):
+    """Renvois enregistrés une fois, paiement appliqué une fois, une seule notification"""
+    print("\n=== Notifications en double ===")
+    payment = create_gaming_payment(buyer, seller)
+    payment_id = payment.cinetpay_transaction_id
+    server.payments[payment_id] = 'SUCCESS'
+
+    payload = {'merchant_transaction_id': payment_id, 'status': 'SUCCESS'}
+    for _ in range(3):
+        response = post_gaming(factory, payload)
+        assert response.status_code == 200, response.content
+    post_gaming(factory, {'cpm_trans_id': payment_id, 'cpm_trans_status': 'ACCEPTED'})
+    assert PaymentWebhookEvent.objects.filter(merchant_transaction_id=payment_id).count() == 2
+    assert not server.verifications()
+    print("✓ Webhook : 4 notifications acquittées, 2 événements enregistrés, aucun appel à CinetPay")
+
+    results = payment_webhooks.process_pending()
+    assert results['processed'] == 1 and results['ignored'] == 1, results
+    assert len(server.verifications()) == 1, server.requests
+
+    payment.refresh_from_db()
+    transaction = Transaction.objects.get(pk=payment.transaction_id)
+    post = Post.objects.get(pk=transaction.post_id)
+    assert payment.status == 'payment_received' and payment.payment_received_at
+    assert transaction.status == 'processing'
+    assert post.is_in_transaction and not post.is_on_sale
+    assert Notification.objects.filter(transaction=transaction, type='transaction_update').count() == 1
+    print("✓ Paiement appliqué une fois, doublon ignoré sans vérification, une seule notification")
+
+    # Un FAILED tardif ne remet pas en vente une annonce payée
+    post_gaming(factory, {'merchant_transaction_id': payment_id, 'status': 'FAILED'})
+    results = payment_webhooks.process_pending()
+    assert results['ignored'] == 1, results
+    payment.refresh_from_db()
+    assert payment.status == 'payment_received'
+    print("✓ Notification FAILED tardive ignorée, statut inchangé")
+
+
+def test_return_url_first(server, factory, buyer, seller):
+    """Retour de l'acheteur avant le webhook : rien n'est appliqué sans vérification"""
+    print("\n=== Page de retour avant la notification ===")
+    payment = create_gaming_payment(buyer, seller)
+    payment_id = payment.cinetpay_transaction_id
+    server.payments[payment_id] = 'SUCCESS'
+
+    request = factory.get(f'/payment/cinetpay/success/{payment.transaction_id}/')
+    request.user = buyer
+    response = cinetpay_payment_success(request, payment.transaction_id)
+    assert response.status_code == 200
+    payment.refresh_from_db()
+    transaction = Transaction.objects.get(pk=payment.transaction_id)
+    assert payment.status == 'pending_payment' and transaction.status == 'pending'
+    print("✓ Page de retour affichée, paiement toujours en attente de vérification")
+
+    post_gaming(factory, {'merchant_transaction_id': payment_id, 'status': 'SUCCESS'})
+    assert payment_webhooks.process_pending()['processed'] == 1
+    assert [path for path in server.verifications() if path.endswith(payment_id)], server.requests
+    payment.refresh_from_db()
+    transaction.refresh_from_db()
+    post = Post.objects.get(pk=transaction.post_id)
+    assert payment.status == 'payment_received' and transaction.status == 'processing'
+    assert post.is_in_transaction and not post.is_on_sale
+    assert Notification.objects.filter(transaction=transaction, type='transaction_update').count() == 1
+    print("✓ Notification traitée ensuite : paiement vérifié, annonce retirée de la vente, vendeur notifié")
+
+
+def test_retry(server, factory, buyer, seller):
+    """Vérification en échec puis statut non final : réessais avec délai croissant"""
+    print("\n=== Réessais de vérification ===")
+    payment = create_gaming_payment(buyer, seller)
+    payment_id = payment.cinetpay_transaction_id
+    post_gaming(factory, {'merchant_transaction_id': payment_id, 'status': 'SUCCESS'})
+
+    server.fail_next = 1
+    assert payment_webhooks.process_pending()['retry'] == 1
+    event = PaymentWebhookEvent.objects.get(merchant_transaction_id=payment_id)
+    first_delay = event.next_attempt_at - timezone.now()
+    assert event.state == 'pending' and event.attempts == 1 and event.last_error
+    assert timedelta(seconds=20) < first_delay <= payment_webhooks.RETRY_BASE_DELAY
+    assert payment_webhooks.process_pending()['retry'] == 0
+    print(f"✓ Erreur CinetPay : réessai programmé dans {first_delay.seconds}s, pas avant")
+
+    make_due(payment_id)
+    assert payment_webhooks.process_pending()['retry'] == 1  # Statut PENDING
+    event.refresh_from_db()
+    assert event.next_attempt_at - timezone.now() > first_delay
+    print("✓ Paiement encore en attente : délai doublé")
+
+    server.payments[payment_id] = 'FAILED'
+    make_due(payment_id)
+    assert payment_webhooks.process_pending()['processed'] == 1
+    payment.refresh_from_db()
+    transaction = Transaction.objects.get(pk=payment.transaction_id)
+    assert payment.status == 'failed' and transaction.status == 'cancelled'
+    assert Post.objects.get(pk=transaction.post_id).is_on_sale
+    print("✓ Paiement refusé au troisième essai : transaction annulée, annonce remise en vente")
+
+
+def test_abandon_and_recovery(server, factory, buyer, seller):
+    """Événement abandonné après MAX_ATTEMPTS, bail expiré repris"""
+    print("\n=== Abandon et reprise ===")
+    payment = create_gaming_payment(buyer, seller)
+    payment_id = payment.cinetpay_transaction_id
+    post_gaming(factory, {'merchant_transaction_id': payment_id, 'status': 'SUCCESS'})
+    PaymentWebhookEvent.objects.filter(merchant_transaction_id=payment_id).update(
+        attempts=payment_webhooks.MAX_ATTEMPTS - 1
+    )
+    assert payment_webhooks.process_pending()['failed'] == 1
+    assert PaymentWebhookEvent.objects.get(merchant_transaction_id=payment_id).state == 'failed'
+    print("✓ Abandon après le dernier essai")
+
+    # Renvoi de CinetPay après l'abandon : l'événement repart avec un budget neuf
+    server.payments[payment_id] = 'SUCCESS'
+    post_gaming(factory, {'merchant_transaction_id': payment_id, 'status': 'SUCCESS'})
+    event = PaymentWebhookEvent.objects.get(merchant_transaction_id=payment_id)
+    assert event.state == 'pending' and event.attempts == 0
+    assert payment_webhooks.process_pending()['processed'] == 1
+    payment.refresh_from_db()
+    assert payment.status == 'payment_received'
+    print("✓ Renvoi d'une notification abandonnée remis en file et appliqué")
+
+    payment = create_gaming_payment(buyer, seller)
+    payment_id = payment.cinetpay_transaction_id
+    server.payments[payment_id] = 'SUCCESS'
+    post_gaming(factory, {'merchant_transaction_id': payment_id, 'status': 'SUCCESS'})
+    event = PaymentWebhookEvent.objects.get(merchant_transaction_id=payment_id)
+    assert payment_webhooks.claim(event)
+    # Worker interrompu : l'événement reste réservé jusqu'à l'expiration du bail
+    assert payment_webhooks.process_pending()['processed'] == 0
+    make_due(payment_id)
+    assert payment_webhooks.process_pending()['processed'] == 1
+    print("✓ Événement d'un worker interrompu repris après expiration du bail")
+
+
+def test_shop(server, factory, buyer):
+    """Boutique : notification formulaire, vérification v2, commande payée"""
+    print("\n=== Boutique ===")
+    payment = create_shop_payment(buyer)
+    payment_id = payment.cinetpay_transaction_id
+    server.payments[payment_id] = 'SUCCESS'
+    for _ in range(2):
+        response = shop_cinetpay_notification(factory.post('/shop/cinetpay/notification/', {'cpm_trans_id': payment_id}))
+        assert response.status_code == 200
+    assert payment_webhooks.process_pending()['processed'] == 1
+
+    payment.refresh_from_db()
+    order = Order.objects.get(pk=payment.order_id)
+    assert payment.status == 'completed' and payment.completed_at
+    assert order.payment_status == 'paid' and order.status == 'processing'
+    print("✓ Commande payée")
+
+
+def main():
+    print("🚀 Test du traitement des notifications CinetPay")
+    print("=" * 50)
+
+    local = override_settings(
+        CACHES={
+            alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+            for alias in ('default', 'counters', 'sessions')
+        },
+    )
+    buyer, _ = User.objects.get_or_create(username='webhook_buyer_tester')
+    seller, _ = User.objects.get_or_create(username='webhook_seller_tester')
+    factory = RequestFactory()
+    with local:
+        try:
+            with fake_cinetpay() as server:
+                test_duplicates(server, factory, buyer, seller)
+                test_return_url_first(server, factory, buyer, seller)
+                test_retry(server, factory, buyer, seller)
+                test_abandon_and_recovery(server, factory, buyer, seller)
+                test_shop(server, factory, buyer)
+            print("\n🎉 TOUS LES TESTS SONT PASSÉS!")
+        finally:
+            payment_ids = list(
+                CinetPayTransaction.objects.filter(transaction__buyer=buyer).values_list('cinetpay_transaction_id', flat=True)
+            ) + list(
+                ShopCinetPayTransaction.objects.filter(order__user=buyer).values_list('cinetpay_transaction_id', flat=True)
+            )
+            PaymentWebhookEvent.objects.filter(merchant_transaction_id__in=payment_ids).delete()
+            Order.objects.filter(user=buyer).delete()
+            buyer.delete()
+            seller.delete()
+
+if __name__ == '__main__':
+    main()
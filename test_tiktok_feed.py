@@ -61,7 +61,7 @@ def test_feed_api():
     factory = RequestFactory()
     
     # Test de chargement initial
-    request = factory.get('/api/highlights/feed/?limit=5&offset=0&type=for_you')
+    request = factory.get('/api/highlights/feed/?limit=5&type=for_you')
     request.user = User.objects.first()
     
     response = highlights_feed_api(request)
@@ -71,8 +71,8 @@ def test_feed_api():
     print(f"✓ Highlights retournés: {len(data.get('highlights', []))}")
     print(f"✓ Has more: {data.get('has_more', False)}")
     
-    # Test de pagination
-    request = factory.get('/api/highlights/feed/?limit=5&offset=5&type=for_you')
+    # Test de pagination (curseur renvoyé par la page précédente)
+    request = factory.get('/api/highlights/feed/', {'limit': 5, 'type': 'for_you', 'cursor': data.get('next_cursor') or ''})
     request.user = User.objects.first()
     
     response = highlights_feed_api(request)
@@ -122,7 +122,7 @@ def test_performance():
     for batch_size in batch_sizes:
         start_time = time.time()
         
-        request = factory.get(f'/api/highlights/feed/?limit={batch_size}&offset=0&type=for_you')
+        request = factory.get(f'/api/highlights/feed/?limit={batch_size}&type=for_you')
         request.user = User.objects.first()
         
         response = highlights_feed_api(request)